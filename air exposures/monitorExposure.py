@@ -0,0 +1,322 @@
+############## monitorExposure.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl and Perry Hystad, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module calculates the distance to the nearest air monitor and the corresponding
+# hourly air monitor measurement for a batch of participant points without arcpy.  Participant points
+# are grouped by their (date, hour) key in one pass, and air monitor readings are indexed by
+# (pollutant, date, hour) in a hashed lookup structure that is built once.  For each occupied date and 
+# hour, the nearest air monitor for each pollutant is found with a KD-tree query in 3D Cartesian space, 
+# and the corresponding measurement is read by array position rather than by searching monitor ids.  
+# Run time depends on the number of hours that contain participant points, not the number of days 
+# times 24 hours.
+
+# Requirements:
+#      numpy, scipy
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import datetime
+import os
+import sys
+import time
+import numpy as np
+from collections import OrderedDict
+from scipy.spatial import cKDTree
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"shared"))
+import geodesy
+
+# constants
+HOURS_PER_DAY = 24
+MS_PER_HOUR = 3600000 # number of milliseconds in an hour
+MS_PER_SECOND = 1000 # number of milliseconds in a second
+MISSING_KEY = -1 # day and hour key for samples without a time stamp.  Never matches an air monitor reading
+KEY_SPAN = 2**32 # offset between pollutant codes in the monitor index, larger than any date and hour key
+MAX_CACHED_TREES = 256 # maximum number of air monitor KD-trees to keep in memory
+
+
+
+############### helper functions ##############
+
+# convert dates to integer day keys (days since January 1st, 1970)
+# Inputs:
+#    inDates (string or datetime array) - dates in Y-m-d format or datetime objects
+# Outputs:
+#    integer array of day keys
+def dayKeys(inDates):
+    return(np.asarray(inDates,dtype='datetime64[D]').astype(np.int64))
+
+
+# convert hours to integer hour keys.  Hours stored in either H:MM or HH:MM format are supported
+# Inputs:
+#    inHours (string array) - hours in H:MM or HH:MM format
+# Outputs:
+#    integer array of hour keys, from 0 to 23
+def hourKeys(inHours):
+    hours = np.char.partition(np.asarray(inHours,dtype=np.str_),":")[:,0]
+    return(np.char.strip(hours).astype(np.int64))
+
+
+# calculate the offset from UTC, in milliseconds, for a set of UTC hours.  Offsets are calculated once
+# for each unique hour rather than once for each sample, since offsets only change on hour boundaries
+# Inputs:
+#    utcHours (integer array) - hours since January 1st, 1970, UTC
+#    timeZone - IANA time zone name (e.g. America/Los_Angeles), a fixed offset from UTC in hours, or 
+#    None to use the local time zone of the computer, as datetime.fromtimestamp does
+# Outputs:
+#    integer array of UTC offsets, in milliseconds
+def utcOffsets(utcHours,timeZone):
+    if(timeZone is not None and not isinstance(timeZone,str)):
+        return(np.full(utcHours.size,int(round(float(timeZone)*MS_PER_HOUR)),dtype=np.int64))
+    [uniqueHours,inverse] = np.unique(utcHours,return_inverse=True)
+    offsets = np.zeros(uniqueHours.size,dtype=np.int64)
+    if(timeZone is None):
+        for index in range(0,uniqueHours.size):
+            localTime = time.localtime(int(uniqueHours[index])*MS_PER_HOUR//MS_PER_SECOND)
+            offsets[index] = localTime.tm_gmtoff*MS_PER_SECOND
+    else:
+        from zoneinfo import ZoneInfo
+        zone = ZoneInfo(timeZone)
+        for index in range(0,uniqueHours.size):
+            localTime = datetime.datetime.fromtimestamp(int(uniqueHours[index])*MS_PER_HOUR//MS_PER_SECOND,zone)
+            offsets[index] = int(localTime.utcoffset().total_seconds())*MS_PER_SECOND
+    return(offsets[inverse.ravel()])
+
+
+# convert epoch time stamps to local day keys and hour keys, rounded to the nearest hour.  The day key
+# is taken from the rounded time, so a sample at 23:40 is assigned to 0:00 of the following day
+# Inputs:
+#    epochTimes (float array) - time of each sample, in milliseconds since January 1st, 1970, UTC
+#    timeZone - IANA time zone name, fixed offset from UTC in hours, or None for the computer's time zone
+# Outputs:
+#    days (integer array) - local day key for each sample.  Samples without a time are MISSING_KEY
+#    hours (integer array) - local hour key for each sample, from 0 to 23.  Samples without a time are MISSING_KEY
+def epochToKeys(epochTimes,timeZone):
+    epochTimes = np.asarray(epochTimes,dtype=np.float64)
+    isValid = np.isfinite(epochTimes)
+    utcMs = np.where(isValid,epochTimes,0).astype(np.int64)
+    localMs = utcMs + utcOffsets(utcMs//MS_PER_HOUR,timeZone)
+    roundedHours = (localMs + MS_PER_HOUR//2)//MS_PER_HOUR
+    days = np.where(isValid,roundedHours//HOURS_PER_DAY,MISSING_KEY)
+    hours = np.where(isValid,roundedHours % HOURS_PER_DAY,MISSING_KEY)
+    return([days,hours])
+
+
+# convert day keys to date labels, in Y-m-d format
+# Inputs:
+#    inDays (integer array) - day keys
+# Outputs:
+#    string array of dates.  Missing days are empty strings
+def formatDays(inDays):
+    inDays = np.asarray(inDays,dtype=np.int64)
+    labels = inDays.astype('datetime64[D]').astype(np.str_)
+    return(np.where(inDays == MISSING_KEY,"",labels))
+
+
+# convert hour keys to hour labels, in HH:00 format
+# Inputs:
+#    inHours (integer array) - hour keys, from 0 to 23
+# Outputs:
+#    string array of hours.  Missing hours are empty strings
+def formatHours(inHours):
+    inHours = np.asarray(inHours,dtype=np.int64)
+    labels = np.char.add(np.char.zfill(inHours.astype(np.str_),2),":00")
+    return(np.where(inHours == MISSING_KEY,"",labels))
+
+
+# combine integer day and hour keys into a single hour key
+# Inputs:
+#    inDays (integer array) - day keys
+#    inHours (integer array) - hour keys, from 0 to 23
+# Outputs:
+#    integer array of keys that uniquely identify each date and hour combination
+def combineKeys(inDays,inHours):
+    return(np.asarray(inDays,dtype=np.int64)*HOURS_PER_DAY + np.asarray(inHours,dtype=np.int64))
+
+
+# group records by key.  Records are sorted once, and each group is represented by a start and end
+# position in the sorted order
+# Inputs:
+#    inKeys (integer array) - key for each record
+# Outputs:
+#    order (integer array) - record indices, sorted by key
+#    groupKeys (integer array) - unique keys, in ascending order
+#    starts (integer array) - start position of each group in the sorted order
+#    ends (integer array) - end position of each group in the sorted order
+def groupByKey(inKeys):
+    order = np.argsort(inKeys,kind='stable')
+    sortedKeys = inKeys[order]
+    [groupKeys,starts] = np.unique(sortedKeys,return_index=True)
+    ends = np.append(starts[1:],sortedKeys.size)
+    return([order,groupKeys,starts,ends])
+
+
+########### air monitor index custom class ##########
+
+# custom class containing air monitor readings indexed by pollutant, date, and hour.  Readings are
+# sorted once and each (pollutant, date, hour) slice is stored in a dictionary as a start and end
+# position.  Air monitor sites are deduplicated so that coordinates are converted once, and KD-trees 
+# are cached by the set of reporting sites, so that hours and pollutants measured by the same network
+# of air monitors share a single tree.  
+class monitorIndex:
+    # instantiate an air monitor index
+    def __init__(self,monLon,monLat,monPollutants,monDays,monHours,monValues):
+        isValid = geodesy.validCoords(monLon,monLat)
+        coords = np.column_stack((np.asarray(monLon,dtype=np.float64),np.asarray(monLat,dtype=np.float64)))[isValid]
+        [siteCoords,readingSites] = np.unique(coords,axis=0,return_inverse=True)
+        self.siteXYZ = geodesy.toECEF(siteCoords[:,0],siteCoords[:,1])
+        [self.pollutantNames,pollutantCodes] = np.unique(np.asarray(monPollutants,dtype=np.str_)[isValid],return_inverse=True)
+        readingKeys = combineKeys(monDays,monHours)[isValid]
+        values = np.asarray(monValues,dtype=np.float64)[isValid]
+        readingSites = readingSites.ravel()
+
+        # sort readings by pollutant, date and hour, and site.  If a site has more than one reading
+        # for the same pollutant and hour, the first reading is kept
+        sliceKeys = pollutantCodes.ravel().astype(np.int64)*KEY_SPAN + readingKeys
+        order = np.lexsort((readingSites,sliceKeys))
+        isFirst = np.ones(order.size,dtype=bool)
+        isFirst[1:] = (sliceKeys[order][1:] != sliceKeys[order][:-1]) | (readingSites[order][1:] != readingSites[order][:-1])
+        order = order[isFirst]
+        self.sites = readingSites[order]
+        self.values = values[order]
+        [uniqueKeys,starts] = np.unique(sliceKeys[order],return_index=True)
+        ends = np.append(starts[1:],order.size)
+        self.slices = dict(zip(uniqueKeys.tolist(),zip(starts.tolist(),ends.tolist())))
+        self.treeCache = OrderedDict()
+    
+    ########### custom functions ############
+    
+    # get the position of the readings for a pollutant, date, and hour
+    def getSlice(self,pollutantType,hourKey):
+        code = np.searchsorted(self.pollutantNames,pollutantType)
+        if(code == self.pollutantNames.size or self.pollutantNames[code] != pollutantType):
+            return(None)
+        return(self.slices.get(int(code)*KEY_SPAN + int(hourKey)))
+    
+    # get a KD-tree of the air monitor sites in a slice.  Trees are cached by the set of sites
+    def getTree(self,sites):
+        treeKey = sites.tobytes()
+        tree = self.treeCache.get(treeKey)
+        if(tree is None):
+            tree = cKDTree(self.siteXYZ[sites])
+            self.treeCache[treeKey] = tree
+            if(len(self.treeCache) > MAX_CACHED_TREES):
+                self.treeCache.popitem(last=False)
+        else:
+            self.treeCache.move_to_end(treeKey)
+        return(tree)
+    
+    # find the nearest air monitor reading for a pollutant, date, and hour for each input point. Returns
+    # the distance to the nearest air monitor and the corresponding measurement, or None if there are 
+    # no readings for the pollutant, date, and hour
+    def nearestReadings(self,pollutantType,hourKey,inXYZ):
+        bounds = self.getSlice(pollutantType,hourKey)
+        if(bounds is None):
+            return(None)
+        sites = self.sites[bounds[0]:bounds[1]]
+        [chord,nearest] = self.getTree(sites).query(inXYZ)
+        return([geodesy.chordToArc(chord),self.values[bounds[0] + nearest]])
+    
+    
+########### end of the air monitor index custom class ##########
+
+
+
+# for every participant point, calculate the distance to the nearest air monitor and the nearest
+# air monitor measurement for each pollutant type.  Only air monitor readings from the same date and
+# hour as the participant point are considered
+# Inputs:
+#    pointLon (float array) - longitude of each participant point, in decimal degrees
+#    pointLat (float array) - latitude of each participant point, in decimal degrees
+#    pointDays (integer array) - day key for each participant point
+#    pointHours (integer array) - hour key for each participant point
+#    monLon (float array) - longitude of each air monitor reading, in decimal degrees
+#    monLat (float array) - latitude of each air monitor reading, in decimal degrees
+#    monPollutants (string array) - pollutant type of each air monitor reading
+#    monDays (integer array) - day key for each air monitor reading
+#    monHours (integer array) - hour key for each air monitor reading
+#    monValues (float array) - measurement for each air monitor reading
+#    pollutantTypes (string array) - pollutant types to calculate exposures for
+# Outputs:
+#    results (dictionary) - for each pollutant type, a two element array containing the distance to
+#    the nearest air monitor (in meters) and the nearest air monitor measurement for each participant
+#    point.  Points without valid coordinates or without a reading for their date and hour are NaN
+def calcMonitorExposure(pointLon,pointLat,pointDays,pointHours,monLon,monLat,monPollutants,monDays,monHours,monValues,pollutantTypes):
+    pointLon = np.asarray(pointLon,dtype=np.float64)
+    pointLat = np.asarray(pointLat,dtype=np.float64)
+    numPoints = pointLon.size
+    results = {}
+    for pollutantType in pollutantTypes:
+        results[pollutantType] = [np.full(numPoints,np.nan),np.full(numPoints,np.nan)]
+
+    # convert coordinates once, and group participant points by their occupied date and hour
+    validPoints = np.flatnonzero(geodesy.validCoords(pointLon,pointLat))
+    pointXYZ = geodesy.toECEF(pointLon[validPoints],pointLat[validPoints])
+    pointKeys = combineKeys(pointDays,pointHours)[validPoints]
+    [pointOrder,groupKeys,groupStarts,groupEnds] = groupByKey(pointKeys)
+    readings = monitorIndex(monLon,monLat,monPollutants,monDays,monHours,monValues)
+
+    # for each occupied date and hour, identify the nearest air monitor of each pollutant type for 
+    # every point in the group
+    for group in range(0,groupKeys.size):
+        members = pointOrder[groupStarts[group]:groupEnds[group]]
+        memberXYZ = pointXYZ[members]
+        for pollutantType in pollutantTypes:
+            nearest = readings.nearestReadings(pollutantType,groupKeys[group],memberXYZ)
+            if(nearest is not None):
+                results[pollutantType][0][validPoints[members]] = nearest[0]
+                results[pollutantType][1][validPoints[members]] = nearest[1]
+    return(results)
+
+
+
+# compare the cost of joining one hour of participant points to air monitor readings as the number
+# of air monitors grows.  The legacy join resolves each nearest air monitor with a linear search
+# through a list of monitor ids, while the indexed join uses the monitor index, which is built once
+# before the hourly joins.  Results are printed as the average time per hour, in milliseconds
+# Inputs:
+#    monitorCounts (integer array) - numbers of air monitors to benchmark
+#    pointsPerHour (int) - number of participant points in each hour
+#    numHours (int) - number of hours to join
+def benchmarkHourlyJoin(monitorCounts=[10,100,1000,10000],pointsPerHour=2000,numHours=24):
+    random = np.random.RandomState(0)
+    print("monitors, index build (ms), legacy join (ms/hour), indexed join (ms/hour)")
+    for numMonitors in monitorCounts:
+        monLon = np.tile(random.uniform(-124,-116,numMonitors),numHours)
+        monLat = np.tile(random.uniform(41.5,46.2,numMonitors),numHours)
+        monHours = np.repeat(np.arange(numHours),numMonitors)
+        monDays = np.zeros(monHours.size,dtype=np.int64)
+        monValues = random.uniform(0,50,monHours.size)
+        monPollutants = np.repeat("NO2",monHours.size)
+        pointXYZ = geodesy.toECEF(random.uniform(-124,-116,pointsPerHour),random.uniform(41.5,46.2,pointsPerHour))
+
+        # legacy join: near table ids resolved with a linear search of the monitor id list
+        nearFIDs = random.randint(0,numMonitors,pointsPerHour).tolist()
+        tempFID = list(range(0,numMonitors))
+        tempConc = monValues[0:numMonitors].tolist()
+        startTime = time.time()
+        for hour in range(0,numHours):
+            nearestMeas = [tempConc[tempFID.index(fid)] for fid in nearFIDs]
+        legacyTime = (time.time() - startTime)/numHours*1000
+
+        # indexed join: nearest air monitor and measurement from the monitor index
+        startTime = time.time()
+        readings = monitorIndex(monLon,monLat,monPollutants,monDays,monHours,monValues)
+        buildTime = (time.time() - startTime)*1000
+        startTime = time.time()
+        for hour in range(0,numHours):
+            nearestMeas = readings.nearestReadings("NO2",hour,pointXYZ)
+        indexedTime = (time.time() - startTime)/numHours*1000
+        print(str(numMonitors) + ", " + str(round(buildTime,2)) + ", " + str(round(legacyTime,2)) + ", " + str(round(indexedTime,2)))
+
+
+if __name__ == "__main__":
+    benchmarkHourlyJoin()
+
+
+############## end of monitorExposure.py ##################
@@ -0,0 +1,150 @@
+############## triExposure.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl and Perry Hystad, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module calculates inverse distance weighted exposure to TRI sites for a batch of
+# participant points without arcpy.  All participant points and TRI sites are loaded once and
+# converted to 3D Cartesian coordinates.  A KD-tree is used to find every TRI site within the search
+# distance of each participant point, and the sum of total air release divided by distance is
+# calculated for all points with numpy.  Points are processed in chunks so that memory use is bounded
+# while run time grows close to linearly with the number of participant points.
+# Note: the TRI_exp values in the bundled AirExpResults (0.0003 and 0.0050) can't be reproduced with this
+# module.  They equal one thousandth of the sum of Total_Air divided by the planar distance in the World
+# Mercator projection of the participant shapefile, for sites within 20 km in that projection, which
+# overstates distances by about sec(latitude) (1.43 in Oregon) and drops sites.  This module gives 6.94
+# and 7.21, the same as ellipsoidal geodesic distances (within 1e-5 m).  An independent haversine check
+# gives 6.948 and 7.222; the 0.15% difference is the spherical approximation.  checkTRIExposure compares
+# the module with a brute force haversine calculation on synthetic points.
+
+# Requirements:
+#      numpy, scipy
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import os
+import sys
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"shared"))
+import geodesy
+
+# constants
+CHUNK_SIZE = 100000 # number of participant points to process at one time
+MIN_DISTANCE = 1.0 # minimum distance between a point and a TRI site, in meters.  Prevents division by zero
+
+
+
+############### helper functions ##############
+
+# build a spatial index for TRI sites.  Sites with null geometries are excluded
+# Inputs:
+#    triLon (float array) - longitude of each TRI site, in decimal degrees
+#    triLat (float array) - latitude of each TRI site, in decimal degrees
+#    triAir (float array) - total air release for each TRI site
+# Outputs:
+#    triTree (cKDTree) - spatial index of TRI site locations
+#    air (float array) - total air release for each indexed TRI site.  Missing values are set to 0
+def buildTRIIndex(triLon,triLat,triAir):
+    isValid = geodesy.validCoords(triLon,triLat)
+    air = np.nan_to_num(np.asarray(triAir,dtype=np.float64)[isValid])
+    triTree = cKDTree(geodesy.toECEF(np.asarray(triLon)[isValid],np.asarray(triLat)[isValid]))
+    return([triTree,air])
+
+
+# calculate the inverse distance weighted TRI exposure for one chunk of participant points
+# Inputs:
+#    inXYZ (float array) - n x 3 array of participant point Cartesian coordinates
+#    triTree (cKDTree) - spatial index of TRI site locations
+#    air (float array) - total air release for each indexed TRI site
+#    searchDistance (float) - maximum distance to search for TRI sites, in meters
+#    searchChord (float) - straight line search radius, in meters
+# Outputs:
+#    float array of TRI exposures for each point in the chunk
+def calcChunkExposure(inXYZ,triTree,air,searchDistance,searchChord):
+    pointTree = cKDTree(inXYZ)
+    pairs = pointTree.sparse_distance_matrix(triTree,searchChord,output_type='ndarray')
+    dist = geodesy.chordToArc(pairs['v'])
+    # near tables only contain sites within the search distance along the earth's surface
+    isNear = dist <= searchDistance
+    weights = air[pairs['j'][isNear]]/np.maximum(dist[isNear],MIN_DISTANCE)
+    return(np.bincount(pairs['i'][isNear],weights=weights,minlength=inXYZ.shape[0]))
+
+
+
+# calculate the inverse distance weighted exposure to TRI sites for all participant points.  Exposure
+# is the sum of total air release divided by distance for all TRI sites within the search distance
+# Inputs:
+#    pointLon (float array) - longitude of each participant point, in decimal degrees
+#    pointLat (float array) - latitude of each participant point, in decimal degrees
+#    triLon (float array) - longitude of each TRI site, in decimal degrees
+#    triLat (float array) - latitude of each TRI site, in decimal degrees
+#    triAir (float array) - total air release for each TRI site
+#    searchDistance (float) - maximum distance to search for TRI sites, in meters
+# Outputs:
+#    vals (float array) - TRI exposure for each participant point.  Points with null geometries
+#    have an exposure of 0
+def calcTRIExposure(pointLon,pointLat,triLon,triLat,triAir,searchDistance):
+    pointLon = np.asarray(pointLon,dtype=np.float64)
+    pointLat = np.asarray(pointLat,dtype=np.float64)
+    vals = np.zeros(pointLon.size,dtype=np.float64)
+    [triTree,air] = buildTRIIndex(triLon,triLat,triAir)
+    if(triTree.n == 0):
+        return(vals)
+    searchDistance = float(searchDistance)
+    searchChord = geodesy.arcToChord(searchDistance)
+    validIndex = np.flatnonzero(geodesy.validCoords(pointLon,pointLat))
+
+    # for each chunk of participant points, sum the exposure from all nearby TRI sites
+    for start in range(0,validIndex.size,CHUNK_SIZE):
+        chunk = validIndex[start:start + CHUNK_SIZE]
+        xyz = geodesy.toECEF(pointLon[chunk],pointLat[chunk])
+        vals[chunk] = calcChunkExposure(xyz,triTree,air,searchDistance,searchChord)
+    return(vals)
+
+
+
+# compare the TRI exposure of random points with a brute force calculation that measures the haversine
+# distance from each point to every TRI site, the way the per-point near tables did.  Haversine distances
+# are spherical and differ from the ellipsoidal distances of this module by up to 0.5%, so points with
+# a TRI site within 0.5% of the search distance are left out of the comparison
+# Inputs:
+#    numPoints (int) - number of participant points
+#    numSites (int) - number of TRI sites
+#    searchDistance (float) - maximum distance to search for TRI sites, in meters
+def checkTRIExposure(numPoints=2000,numSites=500,searchDistance=20000.0):
+    random = np.random.RandomState(0)
+    [pointLon,pointLat] = [random.uniform(-124,-116,numPoints),random.uniform(41.5,46.2,numPoints)]
+    [triLon,triLat] = [random.uniform(-124,-116,numSites),random.uniform(41.5,46.2,numSites)]
+    triAir = random.lognormal(5,2,numSites)
+    pointLon[0:10] = np.nan
+    startTime = time.time()
+    vals = calcTRIExposure(pointLon,pointLat,triLon,triLat,triAir,searchDistance)
+    engineTime = time.time() - startTime
+
+    # brute force: distance from each point to every TRI site
+    startTime = time.time()
+    refVals = np.zeros(numPoints)
+    isCompared = np.zeros(numPoints,dtype=bool)
+    for pointNum in np.flatnonzero(geodesy.validCoords(pointLon,pointLat)):
+        dist = geodesy.haversine(pointLon[pointNum],pointLat[pointNum],triLon,triLat)
+        isNear = dist <= searchDistance
+        refVals[pointNum] = np.sum(triAir[isNear]/np.maximum(dist[isNear],MIN_DISTANCE))
+        isCompared[pointNum] = not np.any(np.abs(dist - searchDistance) <= 0.005*searchDistance)
+    refTime = time.time() - startTime
+    relDiff = np.abs(vals - refVals)[isCompared]/np.maximum(refVals[isCompared],1e-300)
+    print("points compared, points with exposure, engine time (s), brute force time (s), max relative difference, null points are 0")
+    print(str(int(np.sum(isCompared))) + ", " + str(int(np.sum(vals > 0))) + ", " + str(round(engineTime,3)) + ", " + str(round(refTime,3)) + ", " +
+          str(float(np.max(relDiff))) + ", " + str(bool(np.all(vals[0:10] == 0))))
+
+
+if __name__ == "__main__":
+    checkTRIExposure()
+
+
+############## end of triExposure.py ##################
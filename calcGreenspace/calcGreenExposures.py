@@ -1,29 +1,43 @@
 ############ calcGreenExposures.py ##########
 # Author: Andrew Larkin
 # Developed for Laurel Kincl and Perry Hystad, Oregon State University
-# Date last modified: November 22nd, 2016
+# Date last modified: October 17th, 2026
 
 # Description: this script calculates monthly NDVI and class-specific NDVI values within a
 # user-defined buffer distance.  The user must provide a series of folders.  Exposure
 # raster names must start with the month of coverage and end with the variable type
 # (e.g. OctoberNDVI.tif, NovemberHay.tif).  Months and variable types must be defined
-# in the 'set global constants' section of the script.  
+# in the 'set global constants' section of the script.  Class-specific NDVI values can also be read
+# from the land type store created by extractLandTypes.py.  Instead of calculating the focal mean of
+# every cell of each raster, buffer means are only calculated for the cells of the sample points, from
+# the raster tiles around the points (greenEngine.py), so run time depends on the number of points
+# rather than the size of the rasters.  To check exposures quickly, set QA_LEVEL to an overview (pyramid)
+# level, which has 4^QA_LEVEL times fewer cells.
+
+# Requirements:
+#      numpy, for the buffer means in greenEngine.py, and for reading rasters and shapefiles with
+#      shared/rasterIO.py and shared/shapefileIO.py
+# Tested and developed on:
+#      Linux
+#      Python 3.11
 
 
 # import modules 
-import arcpy
 import os
 import sys
+import numpy as np
 
-#set environmental variables 
-arcpy.CheckOutExtension("spatial")
-arcpy.env.overwriteOutput = True
-arcpy.env.workspace = r"in_memory/"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"shared"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"land classification"))
+import shapefileIO
+import geodesy
+import rasterIO
+import landTypeEngine
+import greenEngine
 
 
 # folder paths and variables 
 folder = os.path.dirname(sys.argv[0]) + "/"
-tempFolder = folder + "tempFiles/"  # location to store intermediate files to delete later 
 rasterFolder = folder + "rasters/" # folder containing input NDVI rasters
 variableTypes = ["NDVI","crop","hay","grassland","forest","shrub","urban","wetlands"] # list of monthly NDVI rasters
 monthList = ["August","September","October"] # list of months covered by the NDVI dataset
@@ -31,70 +45,87 @@ inputShapefile = "exampleParticipant.shp" # shapefile containing smartphone samp
 MONTH_FIELD = "months" # field in the inputShapefile attribute table that corresponds to a month
 BUFFER_DISTANCE = 5000
 outputFile = folder + "outputFile.shp"
+typeStoreFolder = rasterFolder + "typeStore/" # land type store from extractLandTypes.py, used for rasters that are not in rasterFolder
+RASTER_PRJ = geodesy.NLCD_PRJ # coordinate system of the NDVI rasters, used to project the sample points
+QA_LEVEL = None # overview level used for coarse exposures.  None calculates full resolution exposures
 
 ################### helper functions ####################
 
+# open the raster of a variable for one month.  Rasters in the month folder are used if they exist,
+# otherwise the variable is read from the land type store
+# INPUTS:
+#    rasterFolder (string) - filepath to the folder containing the input rasters
+#    store (landTypeStore) - land type store, or None if there is no land type store
+#    month (string) - month of the raster
+#    varType (string) - variable type of the raster
+# OUTPUTS:
+#    rasterReader or land type view of the raster, or None if the raster doesn't exist
+def openExposureRaster(rasterFolder, store, month, varType):
+    if(varType == "NDVI"):
+        rawRaster = rasterFolder + month + "/" + month + "NDVI.tif"
+    else:
+        rawRaster = rasterFolder + month + "/" + varType + "NDVI" + month + ".tif"
+    if(os.path.exists(rawRaster)):
+        return(rasterIO.rasterReader(rawRaster))
+    if(store is not None and month in store.getMonthNames() and varType in [landTypeEngine.ALL_TYPES] + store.getTypeNames()):
+        return(store.getView(varType,month))
+    print("warning: filepath " + rawRaster + " doesn't exist")
+    return(None)
+
+
 # calculate average NDVI and composition of NDVI (e.g. hay, crop, etc) for points in an input shapefile.  
-# Potential rasters are stored in a single input folder.  Calculated values are added to the input shapefile
-# as a new attirbute field
+# Potential rasters are stored in a single input folder or in the land type store.  Calculated values are
+# added to the input shapefile as new attribute fields.  Buffer means are calculated in the same way as
+# ArcGIS focal statistics (NbrCircle MEAN) extracted at each point, but only the cells around the points
+# are read.  The buffer distance is measured in the coordinate system of the rasters (Albers equal area
+# for the land classification) rather than UTM Zone 10N, which differs by less than 1% in Oregon.  Points
+# are written in month order, as when the monthly subsets were merged with ArcGIS
 # INPUTS:
 #    rasterFolder (string) - filepath to the folder containing list of input rasters.  
 #    shapefile (string) - filepath to the shapefile containing points to calculate raster values for
 #    outputFile (string) - filepath and name for the results output
-def calcNDVIExposure(rasterFolder, shapefile, outputFile):
-
-    tempFileList = []   # to store monthly intermediate files that are merged at the end 
-
-    # for each month within the input dataset, calculate NDVI and composition values.  The monthly
-    # subset values are merge at the end of the function
+#    level (int) - overview level to read.  0 reads the full resolution rasters
+def calcNDVIExposure(rasterFolder, shapefile, outputFile, level=0):
+    table = shapefileIO.readShapefile(shapefile)
+    [lon,lat] = geodesy.projectToGeographic(table.getX(),table.getY(),table.getPrj())
+    [x,y] = geodesy.projectFromGeographic(lon,lat,RASTER_PRJ)
+    months = table.getColumn(MONTH_FIELD)
+    monthIndex = [np.flatnonzero(months == month) for month in monthList]
+    table = table.selectRows(np.concatenate(monthIndex))
+    store = landTypeEngine.landTypeStore(typeStoreFolder) if os.path.exists(typeStoreFolder) else None
+    exposures = dict([[varType,np.full(table.getNumRecords(),np.nan)] for varType in variableTypes])
+    firstRow = 0
     for month in range(0,len(monthList)):
-        
-        monthSubset = "temp" + str(month)
-        whereClause =  MONTH_FIELD + str(" = ") + "'" + str(monthList[month]) + "'"  
-        arcpy.Select_analysis(shapefile,monthSubset,whereClause) # extract smartphone values for the month of interest
-        currentShapefile = monthSubset
-        extent = arcpy.Describe(currentShapefile).extent
-        
-        # for each variable, calculate the exposure value
-        for varType in range(0,len(variableTypes)):
-            
-            if(variableTypes[varType] == "NDVI"):
-                rawRaster = rasterFolder + monthList[month] + "/" + monthList[month] + "NDVI.tif"
-            else:
-                rawRaster = rasterFolder + monthList[month] + "/" + variableTypes[varType] + "NDVI" + monthList[month] + ".tif"
-                arcpy.DeleteField_management(currentShapefile, "RASTERVALU")     
-                        
-            # load the variable raster into memory and calculate exposure values for the buffer size of interest
-            if(os.path.exists(rawRaster)):
-                projectedRaster = "projectedRaster"          
-                outCS = arcpy.SpatialReference('NAD 1983 UTM Zone 10N')
-                arcpy.ProjectRaster_management(rawRaster,projectedRaster,outCS)
-                neighborhood = arcpy.sa.NbrCircle(BUFFER_DISTANCE, "MAP")
-                tempRaster = arcpy.sa.FocalStatistics(projectedRaster,neighborhood,"MEAN")                
-                newShapefile = currentShapefile + "v" + variableTypes[varType]
-                arcpy.sa.ExtractValuesToPoints(currentShapefile,tempRaster,newShapefile)
-                currentShapefile = newShapefile
-                arcpy.AddField_management(currentShapefile, variableTypes[varType], "DOUBLE")
-                arcpy.CalculateField_management(currentShapefile,variableTypes[varType],"1*!RASTERVALU!","PYTHON_9.3")
-               
-                # if the variable type is not NDVI, calculate the percent of NDVI that is captured by the variable
-                if(variableTypes[varType] != 'NVDI'):
-                    arcpy.AddField_management(currentShapefile, variableTypes[varType] + "perc", "DOUBLE")
-                    arcpy.CalculateField_management(currentShapefile,variableTypes[varType] + "perc","!" + variableTypes[varType] + "!" + "/!NDVI!","PYTHON_9.3")      
-            else:
-                print "warning: filepath " + rasterFilepath + " doesn't exist"
-            
-        tempFileList.append(currentShapefile)
-        
-    # combine monthly files into single file and write the results to the output file
-    arcpy.Merge_management(tempFileList,outputFile)
+        pointIndex = monthIndex[month]
+        for varType in variableTypes:
+            reader = openExposureRaster(rasterFolder,store,monthList[month],varType)
+            if(reader is None or pointIndex.size == 0):
+                continue
+            if(level >= reader.getNumLevels()):
+                raise ValueError("no overview at level " + str(level) + " for " + varType + " in " + monthList[month] + ".  Create overviews with rasterIO.buildOverviews")
+            means = greenEngine.calcBufferMeans(reader,x[pointIndex],y[pointIndex],BUFFER_DISTANCE,level)
+            exposures[varType][firstRow:firstRow + pointIndex.size] = means
+            if(isinstance(reader,rasterIO.rasterReader)):
+                reader.close()
+        firstRow += pointIndex.size
+    if(store is not None):
+        store.close()
+
+    # add each variable and the percent of NDVI that is captured by the variable
+    exposureColumns = []
+    for varType in variableTypes:
+        exposureColumns.append([varType,exposures[varType],"DOUBLE"])
+        with np.errstate(divide='ignore',invalid='ignore'):
+            exposureColumns.append([varType + "perc",exposures[varType]/exposures["NDVI"],"DOUBLE"])
+    table.appendColumns(exposureColumns)
+    shapefileIO.writeShapefile(table,outputFile)
 
 
 ############# main script ###########
 
 def main():
 
-    calcNDVIExposure(rasterFolder,inputShapefile,outputFile)
+    calcNDVIExposure(rasterFolder,folder + inputShapefile,outputFile,0 if QA_LEVEL is None else QA_LEVEL)
     
 main()
 
@@ -0,0 +1,271 @@
+############## greenEngine.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl and Perry Hystad, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module calculates the mean NDVI within a circular buffer of points without arcpy.
+# Instead of calculating the focal mean of every cell of the raster and extracting the values at each
+# point, only the cells around the points are read.  As with ArcGIS focal statistics, the buffer is
+# centered on the cell containing the point, includes the cells with centers within the buffer distance,
+# and NoData cells are ignored.  The half width of each row of the buffer is calculated once.  Nearby
+# points are grouped, one window covering the buffers of the group is read, and the cumulative sums of
+# each row of the window are calculated, so the sum of each buffer takes one difference per buffer row.
+# The run time grows with the number of points, not with the size of the raster.  Windows are read from
+# the tiles of the raster that overlap them, and groups are processed in tile order so that neighbouring
+# groups reuse the tiles in the reader's cache.  Any pyramid level of the raster can be read, so coarse
+# checks of the exposures can read a small overview instead of the full resolution raster.
+
+# Requirements:
+#      numpy
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"shared"))
+import rasterIO
+
+# constants
+GROUP_SIZE = 256 # width and height of the blocks of cells used to group nearby points, in cells
+MAX_LOOKUPS = 4000000 # largest number of buffer rows summed at one time
+DISTANCE_TOLERANCE = 1e-9 # cells with centers this fraction of a cell beyond the buffer distance are in the buffer, to avoid rounding errors
+
+
+############### helper functions ##############
+
+# find the half width of each row of a circular buffer.  A cell is in the buffer if its center is within the
+# buffer distance of the center of the buffer's cell, as in an ArcGIS NbrCircle neighbourhood in map units
+# Inputs:
+#    bufferDistance (float) - buffer radius, in the units of the raster coordinate system
+#    cellWidth (float) - width of each cell
+#    cellHeight (float) - height of each cell
+# Outputs:
+#    halfWidths (int array) - largest number of columns between the buffer's cell and a cell in the buffer, for
+#    each row from -radiusRows to radiusRows rows away from the buffer's cell
+def getDiskOffsets(bufferDistance,cellWidth,cellHeight):
+    radiusRows = int(np.floor(bufferDistance/abs(cellHeight) + DISTANCE_TOLERANCE))
+    rowDistances = np.arange(-radiusRows,radiusRows + 1)*abs(cellHeight)
+    halfDistances = np.sqrt(np.maximum(bufferDistance**2 - rowDistances**2,0))
+    return(np.floor(halfDistances/abs(cellWidth) + DISTANCE_TOLERANCE).astype(np.int64))
+
+
+# divide points into groups of nearby points.  Points are grouped by the block of GROUP_SIZE x GROUP_SIZE
+# cells that contains them, and groups are sorted in row major order, so consecutive groups read
+# neighbouring tiles
+# Inputs:
+#    rows (int array) - row of the cell containing each point
+#    cols (int array) - column of the cell containing each point
+#    groupSize (int) - width and height of each block of cells, in cells
+# Outputs:
+#    list of integer arrays with the index of the points in each group
+def groupPoints(rows,cols,groupSize):
+    blockIndex = (rows//groupSize)*(np.max(cols,initial=0)//groupSize + 1) + cols//groupSize
+    pointOrder = np.argsort(blockIndex,kind='stable')
+    bounds = np.flatnonzero(np.diff(blockIndex[pointOrder])) + 1
+    return([pointIndex for pointIndex in np.split(pointOrder,bounds) if pointIndex.size > 0])
+
+
+# calculate the sum and count of cells with data in the buffer of each point of a group, from a window of
+# the raster that covers all of the buffers.  The cumulative sums of each row of the window (a summed area
+# table along rows) are calculated once for the group, so each buffer is the sum of one difference per
+# buffer row, no matter how many cells are in the buffer
+# Inputs:
+#    values (2D array) - raster values of the window
+#    isValid (2D boolean array) - true for cells with data
+#    rows (int array) - row of each point's cell, relative to the window
+#    cols (int array) - column of each point's cell, relative to the window
+#    halfWidths (int array) - half width of each buffer row, from getDiskOffsets
+# Outputs:
+#    sums (float array) - sum of the values of the cells with data in each buffer
+#    counts (int array) - number of cells with data in each buffer
+def sumDisks(values,isValid,rows,cols,halfWidths):
+    [numRows,numCols] = values.shape
+    rowSums = np.zeros((numRows,numCols + 1))
+    np.cumsum(np.where(isValid,values,0),axis=1,dtype=np.float64,out=rowSums[:,1:])
+    rowCounts = np.zeros((numRows,numCols + 1),dtype=np.int64)
+    np.cumsum(isValid,axis=1,out=rowCounts[:,1:])
+    radiusRows = (halfWidths.size - 1)//2
+    sums = np.zeros(rows.size)
+    counts = np.zeros(rows.size,dtype=np.int64)
+    pointsPerChunk = max(MAX_LOOKUPS//halfWidths.size,1)
+    for start in range(0,rows.size,pointsPerChunk):
+        [chunkRows,chunkCols] = [rows[start:start + pointsPerChunk,np.newaxis],cols[start:start + pointsPerChunk,np.newaxis]]
+        diskRows = chunkRows + np.arange(-radiusRows,radiusRows + 1)[np.newaxis,:]
+        inWindow = (diskRows >= 0) & (diskRows < numRows)
+        diskRows = np.clip(diskRows,0,numRows - 1)
+        lefts = np.clip(chunkCols - halfWidths[np.newaxis,:],0,numCols)
+        rights = np.clip(chunkCols + halfWidths[np.newaxis,:] + 1,0,numCols)
+        sums[start:start + pointsPerChunk] = np.sum(np.where(inWindow,rowSums[diskRows,rights] - rowSums[diskRows,lefts],0),axis=1)
+        counts[start:start + pointsPerChunk] = np.sum(np.where(inWindow,rowCounts[diskRows,rights] - rowCounts[diskRows,lefts],0),axis=1)
+    return([sums,counts])
+
+
+# calculate the mean raster value within a buffer of each point, in the same way as an ArcGIS focal mean
+# (FocalStatistics with an NbrCircle neighbourhood in map units) extracted at each point.  Only the
+# windows of cells around groups of nearby points are read, so the run time depends on the number of
+# points rather than the size of the raster.  Works with rasterReaders and with the land type views of a
+# land type store
+# Inputs:
+#    reader (rasterReader or typeView) - raster to read
+#    inX (float array) - x coordinate of each point, in the coordinate system of the raster
+#    inY (float array) - y coordinate of each point, in the coordinate system of the raster
+#    bufferDistance (float) - buffer radius, in the units of the raster coordinate system
+#    level (int) - pyramid level to read.  0 is the full resolution raster
+#    groupSize (int) - width and height of the blocks of cells used to group nearby points, in cells
+# Outputs:
+#    means (float array) - mean value of the cells within the buffer of each point.  NaN for points outside
+#    of the raster and points without any cells with data in the buffer
+def calcBufferMeans(reader,inX,inY,bufferDistance,level=0,groupSize=GROUP_SIZE):
+    [left,cellWidth,top,cellHeight] = reader.getTransform(level)
+    [numRows,numCols] = [reader.getNumRows(level),reader.getNumCols(level)]
+    [rows,cols,isInside] = reader.mapToCells(inX,inY,level)
+    halfWidths = getDiskOffsets(bufferDistance,cellWidth,cellHeight)
+    [radiusRows,radiusCols] = [(halfWidths.size - 1)//2,int(np.max(halfWidths))]
+    noData = reader.getNoData()
+    means = np.full(rows.size,np.nan)
+    insideIndex = np.flatnonzero(isInside)
+    for pointIndex in groupPoints(rows[insideIndex],cols[insideIndex],groupSize):
+        pointIndex = insideIndex[pointIndex]
+        [groupRows,groupCols] = [rows[pointIndex],cols[pointIndex]]
+        [startRow,startCol] = [max(int(np.min(groupRows)) - radiusRows,0),max(int(np.min(groupCols)) - radiusCols,0)]
+        [endRow,endCol] = [min(int(np.max(groupRows)) + radiusRows + 1,numRows),min(int(np.max(groupCols)) + radiusCols + 1,numCols)]
+        values = reader.readWindow(startRow,startCol,endRow - startRow,endCol - startCol,level)
+        isValid = np.ones(values.shape,dtype=bool)
+        if(values.dtype.kind == 'f'):
+            isValid &= ~np.isnan(values)
+        if(noData is not None):
+            isValid &= values != noData
+        [sums,counts] = sumDisks(values,isValid,groupRows - startRow,groupCols - startCol,halfWidths)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            means[pointIndex] = np.where(counts > 0,sums/counts,np.nan)
+    return(means)
+
+
+# calculate the focal mean of every cell of a raster in memory, as ArcGIS FocalStatistics does.  The sums
+# and counts of each buffer are calculated by convolving the raster with the buffer with fast Fourier
+# transforms.  Used to check calcBufferMeans
+# Inputs:
+#    values (2D array) - raster values
+#    isValid (2D boolean array) - true for cells with data
+#    halfWidths (int array) - half width of each buffer row, from getDiskOffsets
+# Outputs:
+#    focalMeans (2D float array) - mean value of the cells with data within the buffer of each cell.  NaN
+#    for cells without any cells with data in the buffer
+def calcFocalMeans(values,isValid,halfWidths):
+    [radiusRows,radiusCols] = [(halfWidths.size - 1)//2,int(np.max(halfWidths))]
+    disk = np.abs(np.arange(-radiusCols,radiusCols + 1))[np.newaxis,:] <= halfWidths[:,np.newaxis]
+    fftShape = [values.shape[0] + disk.shape[0] - 1,values.shape[1] + disk.shape[1] - 1]
+    diskFFT = np.fft.rfft2(disk.astype(np.float64),fftShape)
+    sums = np.fft.irfft2(np.fft.rfft2(np.where(isValid,values,0).astype(np.float64),fftShape)*diskFFT,fftShape)
+    counts = np.fft.irfft2(np.fft.rfft2(isValid.astype(np.float64),fftShape)*diskFFT,fftShape)
+    sums = sums[radiusRows:radiusRows + values.shape[0],radiusCols:radiusCols + values.shape[1]]
+    counts = np.round(counts[radiusRows:radiusRows + values.shape[0],radiusCols:radiusCols + values.shape[1]])
+    with np.errstate(divide='ignore',invalid='ignore'):
+        return(np.where(counts > 0,sums/counts,np.nan))
+
+
+# create a synthetic NDVI raster, with smoothly varying values and 1% NoData cells
+# Inputs:
+#    outFile (string) - filepath of the raster to create
+#    numRows (int) - number of rows in the raster
+#    numCols (int) - number of columns in the raster
+#    inSeed (int) - random number seed
+def makeTestRaster(outFile,numRows,numCols,inSeed):
+    generator = np.random.default_rng(inSeed)
+    geoTags = {33550:[12,[30.0,30.0,0.0]],33922:[12,[0.0,0.0,0.0,-2333250.0,2929560.0,0.0]]}
+    rowWaves = np.sin(np.arange(0,numRows)/generator.uniform(200,400))[:,np.newaxis]
+    colWaves = np.cos(np.arange(0,numCols)/generator.uniform(200,400))[np.newaxis,:]
+    ndviValues = (0.35 + 0.25*rowWaves*colWaves + generator.normal(0,0.1,(numRows,numCols))).astype(np.float32)
+    ndviValues[generator.random((numRows,numCols)) < 0.01] = -3.4028235e+38
+    rasterIO.writeRaster(outFile,ndviValues,geoTags,-3.4028235e+38)
+    rasterIO.buildOverviews(outFile)
+
+
+# compare buffer means with focal means of the whole raster (the previous approach) for synthetic rasters
+# of increasing size, and with buffer means read from each pyramid level of the largest raster.  The run
+# time, the number of bytes read, and the largest difference from the focal means are reported.  Buffer
+# means of float32, int16 (with non-square cells), and uint8 (without NoData) rasters, with points outside
+# the raster and in a NoData block, are also compared with focal means for several buffers and group sizes
+# Inputs:
+#    rasterSizes (list) - number of rows and columns of each test raster
+#    numPoints (int) - number of points, in clusters of 10 within 1 kilometer
+#    bufferDistance (float) - buffer radius, in meters
+def benchmarkEngine(rasterSizes=[[1024,1024],[2048,2048],[4096,4096]],numPoints=200,bufferDistance=5000.0):
+    outFolder = tempfile.mkdtemp() + "/"
+    try:
+        print("cells, focal means (s), focal means (MB read), buffer means (s), buffer means (MB read), largest difference")
+        for [numRows,numCols] in rasterSizes:
+            makeTestRaster(outFolder + "testNDVI.tif",numRows,numCols,numRows)
+            reader = rasterIO.rasterReader(outFolder + "testNDVI.tif")
+            [left,cellWidth,top,cellHeight] = reader.getTransform()
+            generator = np.random.default_rng(0)
+            centers = generator.uniform(0,1,(numPoints//10,2))*[numCols*cellWidth,numRows*cellHeight]
+            pointX = left + np.repeat(centers[:,0],10) + generator.uniform(-1000,1000,numPoints)
+            pointY = top + np.repeat(centers[:,1],10) + generator.uniform(-1000,1000,numPoints)
+            startTime = time.time()
+            values = reader.readWindow(0,0,numRows,numCols)
+            focalMeans = calcFocalMeans(values,values != reader.getNoData(),getDiskOffsets(bufferDistance,cellWidth,cellHeight))
+            [rows,cols,isInside] = reader.mapToCells(pointX,pointY)
+            focalMeans = np.where(isInside,focalMeans[rows,cols],np.nan)
+            focalTime = time.time() - startTime
+            focalBytes = reader.getBytesRead()
+            reader.close()
+            reader = rasterIO.rasterReader(outFolder + "testNDVI.tif")
+            startTime = time.time()
+            means = calcBufferMeans(reader,pointX,pointY,bufferDistance)
+            bufferTime = time.time() - startTime
+            print(str(numRows*numCols) + ", " + str(round(focalTime,3)) + ", " + str(round(focalBytes/1e6,1)) + ", " + str(round(bufferTime,3)) + ", " +
+                  str(round(reader.getBytesRead()/1e6,1)) + ", " + str(float(np.nanmax(np.abs(means - focalMeans)))))
+            reader.close()
+        print("level, buffer means (s), buffer means (MB read), largest difference")
+        for level in range(0,rasterIO.rasterReader(outFolder + "testNDVI.tif").getNumLevels()):
+            reader = rasterIO.rasterReader(outFolder + "testNDVI.tif")
+            startTime = time.time()
+            means = calcBufferMeans(reader,pointX,pointY,bufferDistance,level)
+            levelTime = time.time() - startTime
+            print(str(level) + ", " + str(round(levelTime,3)) + ", " + str(round(reader.getBytesRead()/1e6,1)) + ", " +
+                  str(round(float(np.nanmax(np.abs(means - focalMeans))),6)))
+            reader.close()
+
+        # other data types and cell shapes
+        print("data type, cell size (m), buffer (m), group size, largest difference, same missing points")
+        generator = np.random.default_rng(1)
+        for [dataType,cellWidth,cellHeight,noData] in [[np.float32,30.0,30.0,-9999.0],[np.int16,25.0,40.0,-1],[np.uint8,30.0,30.0,None]]:
+            values = generator.integers(0,100,(700,900)).astype(dataType)
+            if(noData is not None):
+                values[generator.random(values.shape) < 0.3] = noData
+                values[0:100,0:100] = noData
+            geoTags = {33550:[12,[cellWidth,cellHeight,0.0]],33922:[12,[0.0,0.0,0.0,1000.0,5000.0,0.0]]}
+            rasterIO.writeRaster(outFolder + "testTypes.tif",values,geoTags,noData)
+            reader = rasterIO.rasterReader(outFolder + "testTypes.tif")
+            pointX = 1000 + generator.uniform(-500,900*cellWidth + 500,3000)
+            pointY = 5000 - generator.uniform(-500,700*cellHeight + 500,3000)
+            [pointX[0:5],pointY[0:5]] = [1020.0,4980.0]
+            [rows,cols,isInside] = reader.mapToCells(pointX,pointY)
+            isValid = np.ones(values.shape,dtype=bool) if noData is None else values != noData
+            for bufferDistance in [1000.0,3000.0,cellWidth*7]:
+                focalMeans = calcFocalMeans(values,isValid,getDiskOffsets(bufferDistance,cellWidth,cellHeight))
+                focalMeans = np.where(isInside,focalMeans[rows,cols],np.nan)
+                for groupSize in [16,GROUP_SIZE]:
+                    means = calcBufferMeans(reader,pointX,pointY,bufferDistance,0,groupSize)
+                    print(np.dtype(dataType).name + ", " + str(cellWidth) + " x " + str(cellHeight) + ", " + str(bufferDistance) + ", " + str(groupSize) + ", " +
+                          str(float(np.nanmax(np.abs(means - focalMeans)))) + ", " + str(np.array_equal(np.isnan(means),np.isnan(focalMeans))))
+            reader.close()
+    finally:
+        shutil.rmtree(outFolder)
+
+
+# only run the benchmark when the module is run as a script
+if __name__ == "__main__":
+    benchmarkEngine()
+
+
+############## end of greenEngine.py ##################
@@ -0,0 +1,630 @@
+############## hotspotEngine.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl and Perry Hystad, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module calculates the amount of time a participant spends within a given radius
+# of each of their observation points without arcpy.  All of a participant's points are converted to 3D
+# Cartesian coordinates and loaded into one KD-tree, and the neighbours of every point are found in
+# batches.  The time within the radius of each point is the product of the sparse neighbour matrix and
+# the vector of observation times, summed one batch of neighbour pairs at a time.  Batches are
+# sized by the number of neighbour pairs rather than the number of points, so that memory use is bounded
+# even when many points are clustered at the same location, and repeated fixes at identical coordinates
+# are only searched once.  An approximate mode aggregates time into a grid and sums a disk-shaped kernel
+# with cumulative row sums, then only calculates exact distances for points that might be hotspots.  Overlapping
+# candidate hotspots are screened and ranked with array operations on a compact candidate set.
+
+# Requirements:
+#      numpy, scipy
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import os
+import sys
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.sparse import csr_matrix
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"shared"))
+import geodesy
+
+# constants
+MAX_PAIRS = 5000000 # maximum number of neighbour pairs to hold in memory at one time
+MAX_GRID_CELLS = 20000000 # maximum number of grid cells for the approximate mode.  Larger extents use exact distances
+GRID_MARGIN = 0.01 # relative difference allowed between grid distances and distances on the ellipsoid
+REFINE_TOLERANCE = 1e-9 # relative tolerance for rounding errors when selecting points to refine
+
+
+
+############### helper functions ##############
+
+# split a sequence of query points into batches so that no batch has more than MAX_PAIRS neighbour pairs.
+# Points with more than MAX_PAIRS neighbours are placed in their own batch
+# Inputs:
+#    inTree (cKDTree) - spatial index of all points
+#    queryPositions (integer array) - position of each query point in the spatial index
+#    searchChord (float) - straight line search radius, in meters
+# Outputs:
+#    batches (list of integer arrays) - positions of the query points in each batch
+def getBatches(inTree,queryPositions,searchChord):
+    counts = inTree.query_ball_point(inTree.data[queryPositions],searchChord,return_length=True)
+    cumulative = np.cumsum(counts,dtype=np.int64)
+    batches = []
+    start = 0
+    while(start < cumulative.size):
+        previous = cumulative[start-1] if start > 0 else 0
+        end = max(int(np.searchsorted(cumulative,previous + MAX_PAIRS,side='right')),start + 1)
+        batches.append(queryPositions[start:end])
+        start = end
+    return(batches)
+
+
+# find all pairs of points within the search distance of each other for one batch of query points.  Points
+# are not considered neighbours of themselves
+# Inputs:
+#    inTree (cKDTree) - spatial index of all points
+#    batchPositions (integer array) - position of each query point in the spatial index
+#    searchDistance (float) - search distance along the earth's surface, in meters
+#    searchChord (float) - straight line search radius, in meters
+# Outputs:
+#    rows (integer array) - index of the query point in each pair, relative to the start of the batch
+#    cols (integer array) - position of the neighbouring point in each pair
+def getBatchPairs(inTree,batchPositions,searchDistance,searchChord):
+    batchTree = cKDTree(inTree.data[batchPositions])
+    pairs = batchTree.sparse_distance_matrix(inTree,searchChord,output_type='ndarray')
+    isNear = (geodesy.chordToArc(pairs['v']) <= searchDistance) & (batchPositions[pairs['i']] != pairs['j'])
+    return([pairs['i'][isNear],pairs['j'][isNear]])
+
+
+# build a spatial index for points with valid coordinates.  Points are reordered to follow the leaves of
+# the KD-tree, so that each batch of query points covers a compact area
+# Inputs:
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+# Outputs:
+#    validIndex (integer array) - index of each indexed point in the input arrays, in tree order
+#    tree (cKDTree) - spatial index of the points.  None if no points have valid coordinates
+def buildPointIndex(inLon,inLat):
+    validIndex = np.flatnonzero(geodesy.validCoords(inLon,inLat))
+    if(validIndex.size == 0):
+        return([validIndex,None])
+    validIndex = validIndex[cKDTree(geodesy.toECEF(np.asarray(inLon)[validIndex],np.asarray(inLat)[validIndex])).indices]
+    tree = cKDTree(geodesy.toECEF(np.asarray(inLon)[validIndex],np.asarray(inLat)[validIndex]))
+    return([validIndex,tree])
+
+
+
+# calculate the time spent within the search distance of each point.  The time associated with a point
+# is counted once, plus the time associated with every other point within the search distance.  Points
+# with identical coordinates are combined into one site before searching, since stationary participants
+# often report the same location many times.  For each batch of sites, the time within the search distance
+# is the product of the sparse neighbour matrix and the vector of site times, calculated as a weighted count
+# over the neighbour pairs
+# Inputs:
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+#    inTimes (float array) - time associated with each point
+#    searchDistance (float) - search distance, in meters
+#    queryMask (boolean array) - optional.  If given, times are only calculated for points where queryMask is
+#    true, and the own time of all other points is returned.  All points are still counted as neighbours
+# Outputs:
+#    bufferTimes (float array) - time within the search distance of each point.  Points with null
+#    geometries only include their own time
+def calcBufferTimes(inLon,inLat,inTimes,searchDistance,queryMask=None):
+    inTimes = np.asarray(inTimes,dtype=np.float64)
+    bufferTimes = inTimes.copy()
+    validIndex = np.flatnonzero(geodesy.validCoords(inLon,inLat))
+    if(validIndex.size == 0):
+        return(bufferTimes)
+    coords = np.column_stack((np.asarray(inLon,dtype=np.float64)[validIndex],np.asarray(inLat,dtype=np.float64)[validIndex]))
+    [sites,siteLookup] = np.unique(coords,axis=0,return_inverse=True)
+    siteLookup = siteLookup.ravel()
+    siteTimes = np.bincount(siteLookup,weights=inTimes[validIndex],minlength=sites.shape[0])
+    [siteIndex,tree] = buildPointIndex(sites[:,0],sites[:,1])
+    orderedTimes = siteTimes[siteIndex]
+    siteBufferTimes = siteTimes.copy()
+    searchDistance = float(searchDistance)
+    searchChord = geodesy.arcToChord(searchDistance)
+    isQuery = np.ones(sites.shape[0],dtype=bool)
+    if(queryMask is not None):
+        isQuery = np.bincount(siteLookup,weights=np.asarray(queryMask)[validIndex],minlength=sites.shape[0]) > 0
+
+    # for each batch of sites, add the time of all neighbouring sites
+    for batch in getBatches(tree,np.flatnonzero(isQuery[siteIndex]),searchChord):
+        [rows,cols] = getBatchPairs(tree,batch,searchDistance,searchChord)
+        siteBufferTimes[siteIndex[batch]] += np.bincount(rows,weights=orderedTimes[cols],minlength=batch.size)
+    isQueryPoint = isQuery[siteLookup] if queryMask is None else np.asarray(queryMask)[validIndex]
+    bufferTimes[validIndex[isQueryPoint]] = siteBufferTimes[siteLookup[isQueryPoint]]
+    return(bufferTimes)
+
+
+
+# find the neighbours of each point within the search distance, as compressed sparse row lists
+# Inputs:
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+#    searchDistance (float) - search distance, in meters
+# Outputs:
+#    indptr (integer array) - neighbours of point i are indices[indptr[i]:indptr[i+1]]
+#    indices (integer array) - index of each neighbour, in ascending order for each point.  Points with
+#    null geometries have no neighbours
+def findNeighbours(inLon,inLat,searchDistance):
+    numPoints = np.asarray(inLon).size
+    searchDistance = float(searchDistance)
+    searchChord = geodesy.arcToChord(searchDistance)
+    [validIndex,tree] = buildPointIndex(inLon,inLat)
+    allRows = [np.zeros(0,dtype=np.int64)]
+    allCols = [np.zeros(0,dtype=np.int64)]
+
+    # for each batch of points, convert neighbour positions back to positions in the input arrays
+    if(tree is not None):
+        for batch in getBatches(tree,np.arange(validIndex.size),searchChord):
+            [rows,cols] = getBatchPairs(tree,batch,searchDistance,searchChord)
+            allRows.append(validIndex[batch[rows]])
+            allCols.append(validIndex[cols])
+    rows = np.concatenate(allRows)
+    cols = np.concatenate(allCols)
+    neighbours = csr_matrix((np.ones(rows.size,dtype=np.int8),(rows,cols)),shape=(numPoints,numPoints))
+    neighbours.sort_indices()
+    return([neighbours.indptr.astype(np.int64),neighbours.indices.astype(np.int64)])
+
+
+# custom class that aggregates the time of a participant's points into a square grid.  Points are projected
+# to a plane centered on the participant's mean location.  Distances between points in two cells are bounded
+# by the distance between the cells, after allowing for the scale error of the projection and GRID_MARGIN
+# for the difference between the sphere and the ellipsoid
+class timeGrid:
+    # instantiate a grid
+    # Inputs:
+    #    inLon (float array) - longitude of each point, in decimal degrees
+    #    inLat (float array) - latitude of each point, in decimal degrees
+    #    inTimes (float array) - time associated with each point
+    #    cellSize (float) - width of each grid cell, in meters
+    def __init__(self,inLon,inLat,inTimes,cellSize):
+        self.cellSize = float(cellSize)
+        self.times = np.asarray(inTimes,dtype=np.float64)
+        self.validIndex = np.flatnonzero(geodesy.validCoords(inLon,inLat))
+        self.lon = np.asarray(inLon,dtype=np.float64)[self.validIndex]
+        self.lat = np.asarray(inLat,dtype=np.float64)[self.validIndex]
+        self.numRows = 0
+        self.numCols = 0
+        if(self.validIndex.size == 0):
+            return
+        lat = np.radians(self.lat)
+        centerLat = lat.mean()
+        x = geodesy.MEAN_RADIUS*np.cos(centerLat)*np.radians(np.mod(self.lon - self.lon.mean() + 180,360) - 180)
+        y = geodesy.MEAN_RADIUS*(lat - centerLat)
+
+        # ratio of distances on the sphere to distances on the plane, at the extremes of the participant's latitudes
+        absLat = np.abs(lat)
+        self.lowScale = min(1.0,np.cos(absLat.max())/np.cos(centerLat))*(1 - GRID_MARGIN)
+        self.highScale = max(1.0,np.cos(0 if lat.min() <= 0 <= lat.max() else absLat.min())/np.cos(centerLat))*(1 + GRID_MARGIN)
+        cols = np.floor((x - x.min())/self.cellSize).astype(np.int64)
+        rows = np.floor((y - y.min())/self.cellSize).astype(np.int64)
+        [self.numRows,self.numCols] = [int(rows.max()) + 1,int(cols.max()) + 1]
+        if(self.isTooLarge()):
+            return
+        [self.cells,self.cellLookup] = np.unique(rows*self.numCols + cols,return_inverse=True)
+        self.cellLookup = self.cellLookup.ravel()
+        self.pointOrder = np.argsort(self.cellLookup,kind='stable')
+        self.cellStarts = np.searchsorted(self.cellLookup[self.pointOrder],np.arange(0,self.cells.size + 1))
+        cellTimes = np.bincount(self.cells[self.cellLookup],weights=self.times[self.validIndex],minlength=self.numRows*self.numCols)
+        self.rowSums = np.zeros((self.numRows,self.numCols+1),dtype=np.float64)
+        self.rowSums[:,1:] = np.cumsum(cellTimes.reshape(self.numRows,self.numCols),axis=1)
+    
+    ########### custom functions ############
+    
+    # determine if the grid would have more than MAX_GRID_CELLS cells
+    def isTooLarge(self):
+        return(self.numRows*(self.numCols+1) > MAX_GRID_CELLS)
+    
+    # calculate the half width, in cells, of each row of a disk-shaped kernel.  The center kernel contains cells
+    # whose centers are within the search distance, the inner kernel contains cells that must lie entirely within
+    # the search distance, and the outer kernel contains cells that might lie partially within the search distance
+    # Inputs:
+    #    searchDistance (float) - search distance, in meters
+    #    kernelType (string) - "center", "inner", or "outer"
+    # Outputs:
+    #    widths (integer array) - half width of each row, from row offset -K to K.  Rows outside the kernel are -1
+    def getKernelWidths(self,searchDistance,kernelType):
+        radius = float(searchDistance)/self.cellSize
+        numOffsets = int(np.ceil(radius/self.lowScale)) + 2
+        dx = np.arange(0,numOffsets+1)
+        widths = np.full(2*numOffsets+1,-1,dtype=np.int64)
+        for index in range(0,widths.size):
+            dy = abs(index - numOffsets)
+            if(kernelType == "center"):
+                dist = np.hypot(dx,dy)
+            elif(kernelType == "inner"):
+                dist = np.hypot(dx + 1,dy + 1)*self.highScale
+            else:
+                dist = np.hypot(np.maximum(dx - 1,0),max(dy - 1,0))*self.lowScale
+            inKernel = np.flatnonzero(dist <= radius)
+            if(inKernel.size > 0):
+                widths[index] = inKernel.max()
+        return(widths)
+
+    # sum time over a disk-shaped kernel centered on the cell of each point, using cumulative sums along each
+    # grid row so that each kernel row is added in one step for all cells
+    # Inputs:
+    #    widths (integer array) - half width of each kernel row, from getKernelWidths
+    # Outputs:
+    #    float array of kernel sums for each point with valid coordinates
+    def sumKernel(self,widths):
+        numOffsets = (widths.size - 1)//2
+        [cellRows,cellCols] = [self.cells//self.numCols,self.cells % self.numCols]
+        sums = np.zeros(self.cells.size,dtype=np.float64)
+        for index in np.flatnonzero(widths >= 0):
+            rows = cellRows + index - numOffsets
+            isInside = (rows >= 0) & (rows < self.numRows)
+            low = np.clip(cellCols[isInside] - widths[index],0,self.numCols)
+            high = np.clip(cellCols[isInside] + widths[index] + 1,0,self.numCols)
+            sums[isInside] += self.rowSums[rows[isInside],high] - self.rowSums[rows[isInside],low]
+        return(sums[self.cellLookup])
+
+    # sum the time of points in the ring of cells between the inner and outer kernels that are within the search
+    # distance of each query point, using exact distances.  Adding the inner kernel sum gives the exact time 
+    # within the search distance
+    # Inputs:
+    #    queryMask (boolean array) - true for each point with valid coordinates that should be calculated
+    #    searchDistance (float) - search distance, in meters
+    # Outputs:
+    #    float array of ring sums for each point with valid coordinates.  Points not in queryMask are 0
+    def sumRing(self,queryMask,searchDistance):
+        sums = np.zeros(self.validIndex.size,dtype=np.float64)
+        [inner,outer] = [self.getKernelWidths(searchDistance,"inner"),self.getKernelWidths(searchDistance,"outer")]
+        numOffsets = (outer.size - 1)//2
+        xyz = geodesy.toECEF(self.lon,self.lat)
+        validTimes = self.times[self.validIndex]
+        queryOrder = self.pointOrder[queryMask[self.pointOrder]]
+        queryCells = np.unique(self.cellLookup[queryOrder])
+        queryStarts = np.searchsorted(self.cellLookup[queryOrder],np.arange(0,self.cells.size + 1))
+        [cellRows,cellCols] = [self.cells[queryCells]//self.numCols,self.cells[queryCells] % self.numCols]
+
+        # for each cell offset in the ring, pair every query point with every point in the offset cell
+        for index in np.flatnonzero(outer >= 0):
+            for dx in range(-outer[index],outer[index]+1):
+                if(abs(dx) <= inner[index]):
+                    continue
+                [rows,cols] = [cellRows + index - numOffsets,cellCols + dx]
+                isInside = (rows >= 0) & (rows < self.numRows) & (cols >= 0) & (cols < self.numCols)
+                neighbourIds = rows[isInside]*self.numCols + cols[isInside]
+                neighbourCells = np.minimum(np.searchsorted(self.cells,neighbourIds),self.cells.size - 1)
+                isOccupied = self.cells[neighbourCells] == neighbourIds
+                self.sumCellPairs(sums,queryCells[isInside][isOccupied],neighbourCells[isOccupied],queryOrder,queryStarts,
+                                  xyz,validTimes,float(searchDistance))
+        return(sums)
+    
+    # add the time of points in neighbour cells that are within the search distance of points in query cells
+    # Inputs:
+    #    sums (float array) - running sum for each point with valid coordinates.  Updated in place
+    #    queryCells (integer array) - cell index of each query cell
+    #    neighbourCells (integer array) - cell index of the neighbour cell paired with each query cell
+    #    queryOrder (integer array) - query points, sorted by cell
+    #    queryStarts (integer array) - start of each cell's query points in queryOrder
+    #    xyz (float array) - Cartesian coordinates of each point with valid coordinates
+    #    validTimes (float array) - time associated with each point with valid coordinates
+    #    searchDistance (float) - search distance, in meters
+    def sumCellPairs(self,sums,queryCells,neighbourCells,queryOrder,queryStarts,xyz,validTimes,searchDistance):
+        numQuery = queryStarts[queryCells+1] - queryStarts[queryCells]
+        numNeighbour = self.cellStarts[neighbourCells+1] - self.cellStarts[neighbourCells]
+        sizes = numQuery*numNeighbour
+        cumulative = np.cumsum(sizes)
+        start = 0
+
+        # split cell pairs into batches of at most MAX_PAIRS point pairs
+        while(start < sizes.size):
+            previous = cumulative[start-1] if start > 0 else 0
+            end = max(int(np.searchsorted(cumulative,previous + MAX_PAIRS,side='right')),start + 1)
+            pairCells = np.repeat(np.arange(start,end),sizes[start:end])
+            offsets = np.arange(0,pairCells.size) - np.repeat(cumulative[start:end] - sizes[start:end] - previous,sizes[start:end])
+            queryPoints = queryOrder[queryStarts[queryCells[pairCells]] + offsets//numNeighbour[pairCells]]
+            neighbourPoints = self.pointOrder[self.cellStarts[neighbourCells[pairCells]] + offsets % numNeighbour[pairCells]]
+            dist = geodesy.chordToArc(np.linalg.norm(xyz[queryPoints] - xyz[neighbourPoints],axis=1))
+            isNear = dist <= searchDistance
+            sums += np.bincount(queryPoints[isNear],weights=validTimes[neighbourPoints[isNear]],minlength=sums.size)
+            start = end
+    
+    ########## getters and setters ##########
+    def getValidIndex(self):
+        return(self.validIndex)
+    
+    def getTimes(self):
+        return(self.times)
+
+########### end of the time grid custom class ##########
+
+
+
+# estimate the time within the search distance of each point by aggregating times into a square grid and summing
+# a disk-shaped kernel over the grid.  Lower and upper bounds are found with kernels containing only the cells
+# that must lie entirely within, or might lie partially within, the search distance
+# Inputs:
+#    inGrid (timeGrid) - grid of the participant's points
+#    searchDistance (float) - search distance, in meters
+# Outputs:
+#    estimate (float array) - estimated time within the search distance of each point
+#    lower (float array) - minimum possible time within the search distance of each point
+#    upper (float array) - maximum possible time within the search distance of each point
+def calcGridBufferTimes(inGrid,searchDistance):
+    [estimate,lower,upper] = [inGrid.getTimes().copy(),inGrid.getTimes().copy(),inGrid.getTimes().copy()]
+    validIndex = inGrid.getValidIndex()
+    if(validIndex.size > 0):
+        estimate[validIndex] = inGrid.sumKernel(inGrid.getKernelWidths(searchDistance,"center"))
+        lower[validIndex] = inGrid.sumKernel(inGrid.getKernelWidths(searchDistance,"inner"))
+        upper[validIndex] = inGrid.sumKernel(inGrid.getKernelWidths(searchDistance,"outer"))
+    return([estimate,lower,upper])
+
+
+
+# approximate the time within the search distance of each point.  Times are estimated with a grid, and exact
+# times are calculated for every point that might have at least minTime within the search distance, by adding
+# the time in cells entirely within the search distance to the time of points within the search distance in 
+# the ring of cells on the edge of the search distance
+# Inputs:
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+#    inTimes (float array) - time associated with each point
+#    searchDistance (float) - search distance, in meters
+#    cellSize (float) - width of each grid cell, in meters
+#    minTime (float) - points that might have more than this amount of time within the search distance are refined
+# Outputs:
+#    bufferTimes (float array) - time within the search distance of each point.  Exact for refined points
+#    maxError (float) - maximum possible difference between the estimated and exact time for points that
+#    weren't refined
+def calcApproxBufferTimes(inLon,inLat,inTimes,searchDistance,cellSize,minTime):
+    grid = timeGrid(inLon,inLat,inTimes,cellSize)
+    if(grid.isTooLarge()):
+        return([calcBufferTimes(inLon,inLat,inTimes,searchDistance),0.0])
+    [bufferTimes,lower,upper] = calcGridBufferTimes(grid,searchDistance)
+    isRefined = upper >= minTime*(1 - REFINE_TOLERANCE)
+    errors = np.maximum(upper - bufferTimes,bufferTimes - lower)[~isRefined]
+    maxError = float(errors.max()) if errors.size > 0 else 0.0
+    validIndex = grid.getValidIndex()
+    invalidIndex = np.setdiff1d(np.arange(0,bufferTimes.size),validIndex)
+    bufferTimes[invalidIndex] = grid.getTimes()[invalidIndex]
+    if(validIndex.size > 0):
+        isValidRefined = isRefined[validIndex]
+        ringSums = grid.sumRing(isValidRefined,searchDistance)
+        bufferTimes[validIndex[isValidRefined]] = lower[validIndex[isValidRefined]] + ringSums[isValidRefined]
+    return([bufferTimes,maxError])
+
+
+
+# custom class containing the candidate hotspots of a participant in compact arrays, with the candidates that 
+# overlap each candidate stored as compressed sparse row lists
+class candidateSet:
+    # instantiate a candidate set
+    # Inputs:
+    #    inFIDs (integer array) - FID of each candidate
+    #    inPercTimes (float array) - percentage of time within the hotspot radius of each candidate
+    #    inIndptr (integer array) - overlapping candidates of candidate i are inIndices[inIndptr[i]:inIndptr[i+1]]
+    #    inIndices (integer array) - index of each overlapping candidate
+    def __init__(self,inFIDs,inPercTimes,inIndptr,inIndices):
+        self.FIDs = np.asarray(inFIDs,dtype=np.int64)
+        self.percTimes = np.asarray(inPercTimes,dtype=np.float64)
+        self.indptr = np.asarray(inIndptr,dtype=np.int64)
+        self.indices = np.asarray(inIndices,dtype=np.int64)
+        self.indexLookup = dict(zip(self.FIDs.tolist(),range(0,self.FIDs.size)))
+    
+    ########### custom functions ############
+    
+    # calculate the highest percentage of time of the overlapping candidates of each candidate, in one pass over
+    # the neighbour lists.  Candidates without overlapping candidates are -infinity
+    def getNeighbourMax(self):
+        neighbourMax = np.full(self.FIDs.size,-np.inf)
+        hasNeighbours = np.flatnonzero(np.diff(self.indptr) > 0)
+        if(hasNeighbours.size > 0):
+            neighbourMax[hasNeighbours] = np.maximum.reduceat(self.percTimes[self.indices],self.indptr[hasNeighbours])
+        return(neighbourMax)
+    
+    # remove candidates that overlap a candidate with a higher percentage of time.  Overlapping candidates with 
+    # exactly the same percentage of time are all kept
+    # Outputs:
+    #    integer array of the index of each remaining candidate, in ascending order
+    def suppress(self):
+        return(np.flatnonzero(self.percTimes >= self.getNeighbourMax()))
+    
+    ########## getters and setters ##########
+    def getIndex(self,inFID):
+        return(self.indexLookup.get(inFID,-1))
+    
+    def getFID(self,inIndex):
+        return(int(self.FIDs[inIndex]))
+    
+    def getPercTime(self,inIndex):
+        return(float(self.percTimes[inIndex]))
+    
+    def getNeighbourFIDs(self,inIndex):
+        return(self.FIDs[self.indices[self.indptr[inIndex]:self.indptr[inIndex+1]]].tolist())
+    
+    def getNumCandidates(self):
+        return(self.FIDs.size)
+
+########### end of the candidate set custom class ##########
+
+
+
+# rank values in descending order with one sort.  Equal values share the rank of their first position in the
+# sorted order, so ranks don't depend on the order of the input values
+# Inputs:
+#    inValues (float array) - values to rank
+# Outputs:
+#    integer array of ranks, starting at 0 for the largest value
+def rankDescending(inValues):
+    negValues = -np.asarray(inValues,dtype=np.float64)
+    return(np.searchsorted(np.sort(negValues,kind='stable'),negValues,side='left'))
+
+
+
+# assign each point to the nearest hotspot of the same participant within the search distance.  Each point is
+# only compared to its own participant's hotspots, with haversine distances calculated for batches of up to
+# MAX_PAIRS point and hotspot pairs.  Ties are assigned to the first hotspot in the input order
+# Inputs:
+#    pointLon (float array) - longitude of each point, in decimal degrees
+#    pointLat (float array) - latitude of each point, in decimal degrees
+#    pointGroups (integer array) - participant index of each point
+#    hotLon (float array) - longitude of each hotspot center, in decimal degrees
+#    hotLat (float array) - latitude of each hotspot center, in decimal degrees
+#    hotGroups (integer array) - participant index of each hotspot
+#    searchDistance (float) - search distance, in meters
+# Outputs:
+#    nearest (integer array) - index of the nearest hotspot for each point, or -1 if no hotspots are within
+#    the search distance
+#    joinCount (integer array) - number of hotspots within the search distance of each point
+#    nearestDist (float array) - distance to the nearest hotspot, in meters.  NaN for points without a hotspot
+def assignHotspots(pointLon,pointLat,pointGroups,hotLon,hotLat,hotGroups,searchDistance):
+    numPoints = np.asarray(pointGroups).size
+    nearest = np.full(numPoints,-1,dtype=np.int64)
+    joinCount = np.zeros(numPoints,dtype=np.int64)
+    nearestDist = np.full(numPoints,np.nan)
+    hotOrder = np.argsort(hotGroups,kind='stable')
+    sortedGroups = np.asarray(hotGroups)[hotOrder]
+    starts = np.searchsorted(sortedGroups,pointGroups,side='left')
+    counts = np.searchsorted(sortedGroups,pointGroups,side='right') - starts
+    cumulative = np.cumsum(counts)
+    start = 0
+
+    # for each batch of points, compare every point to each of its participant's hotspots
+    while(start < numPoints):
+        previous = cumulative[start-1] if start > 0 else 0
+        end = max(int(np.searchsorted(cumulative,previous + MAX_PAIRS,side='right')),start + 1)
+        pairPoints = np.repeat(np.arange(start,end),counts[start:end])
+        offsets = np.arange(0,pairPoints.size) - np.repeat(cumulative[start:end] - counts[start:end] - previous,counts[start:end])
+        pairHotspots = hotOrder[starts[pairPoints] + offsets]
+        dist = geodesy.haversine(np.asarray(pointLon)[pairPoints],np.asarray(pointLat)[pairPoints],
+                                 np.asarray(hotLon)[pairHotspots],np.asarray(hotLat)[pairHotspots])
+        isNear = dist <= searchDistance
+        [pairPoints,pairHotspots,dist] = [pairPoints[isNear],pairHotspots[isNear],dist[isNear]]
+        joinCount[start:end] = np.bincount(pairPoints - start,minlength=end-start)
+
+        # sort pairs by point, distance, and hotspot order, and keep the first pair for each point
+        pairOrder = np.lexsort((pairHotspots,dist,pairPoints))
+        isFirst = np.r_[True,pairPoints[pairOrder][1:] != pairPoints[pairOrder][:-1]] if pairOrder.size > 0 else np.zeros(0,dtype=bool)
+        nearest[pairPoints[pairOrder][isFirst]] = pairHotspots[pairOrder][isFirst]
+        nearestDist[pairPoints[pairOrder][isFirst]] = dist[pairOrder][isFirst]
+        start = end
+    return([nearest,joinCount,nearestDist])
+
+
+
+# create a synthetic participant with most of their time at a few locations, plus travel between them
+# Inputs:
+#    numPoints (int) - number of observation points
+#    inSeed (int) - random number seed
+# Outputs:
+#    lon (float array) - longitude of each point
+#    lat (float array) - latitude of each point
+#    times (float array) - time associated with each point, in seconds
+def makeParticipant(numPoints,inSeed):
+    generator = np.random.default_rng(inSeed)
+    anchors = np.array([[-123.26,44.56],[-123.10,44.63],[-122.68,45.52],[-123.03,44.94]])
+    weights = np.array([0.5,0.25,0.1,0.15])
+    numTravel = numPoints//5
+    anchorIndex = generator.choice(anchors.shape[0],numPoints - numTravel,p=weights)
+    lon = np.concatenate((anchors[anchorIndex,0] + generator.normal(0,0.01,anchorIndex.size),generator.uniform(-123.4,-122.5,numTravel)))
+    lat = np.concatenate((anchors[anchorIndex,1] + generator.normal(0,0.01,anchorIndex.size),generator.uniform(44.4,45.7,numTravel)))
+    return([lon,lat,generator.exponential(30,numPoints)])
+
+
+
+# check the exact mode, neighbour lists, and candidate screening against a brute force version of the per
+# point near tables, which measures the haversine distance from each point to every other point of the
+# participant.  Haversine distances are spherical, so the time within the search distance of each point
+# must lie between the brute force times for the search distance reduced and enlarged by GRID_MARGIN.
+# Candidates whose neighbours don't depend on the margin are screened with the rule of the per point loops:
+# a candidate is kept unless an overlapping candidate has a higher percentage of time
+# Inputs:
+#    pointCounts (int list) - numbers of observation points to test
+#    searchDistance (float) - search distance, in meters
+#    timeCutoff (float) - percentage of time cut off for identifying hotspots.  Lower than TIME_CUTOFF so that
+#    several hotspots overlap
+def checkExactTimes(pointCounts=[2000,5000],searchDistance=10000,timeCutoff=5):
+    print("points, brute force (s), exact (s), times within bounds, times equal, candidates, same neighbours, screened candidates, same hotspots")
+    for numPoints in pointCounts:
+        [lon,lat,times] = makeParticipant(numPoints,numPoints + 1)
+
+        # repeated fixes at identical coordinates, so that candidates tie, and null geometries
+        lon[0:numPoints//10] = -122.68
+        lat[0:numPoints//10] = 45.52
+        lon[-5:] = np.nan
+        lat[-5:] = np.nan
+        startTime = time.time()
+        exact = calcBufferTimes(lon,lat,times,searchDistance)
+        exactTime = time.time() - startTime
+
+        # brute force: own time plus the time of every other point within the search distance
+        startTime = time.time()
+        isValid = geodesy.validCoords(lon,lat)
+        [lower,upper] = [times.copy(),times.copy()]
+        dists = []
+        for pointNum in np.flatnonzero(isValid):
+            dist = geodesy.haversine(lon[pointNum],lat[pointNum],lon,lat)
+            dist[pointNum] = np.inf
+            dist[~isValid] = np.inf
+            lower[pointNum] += np.sum(times[dist <= searchDistance*(1 - GRID_MARGIN)])
+            upper[pointNum] += np.sum(times[dist <= searchDistance*(1 + GRID_MARGIN)])
+            dists.append(dist)
+        bruteTime = time.time() - startTime
+        tolerance = 1e-9*times.sum()
+        isBounded = bool(np.all((exact >= lower - tolerance) & (exact <= upper + tolerance)))
+        isEqual = lower == upper
+        isSameTime = bool(np.allclose(exact[isEqual],lower[isEqual],rtol=1e-12,atol=tolerance))
+
+        # neighbour lists of the candidates, and screening with the rule of the per point loops
+        percTimes = exact/times.sum()*100
+        candidates = np.flatnonzero((percTimes > timeCutoff) & isValid)
+        candidateDists = np.array([dists[int(np.sum(isValid[:pointNum]))][candidates] for pointNum in candidates]).reshape(candidates.size,candidates.size)
+        np.fill_diagonal(candidateDists,np.inf)
+        [indptr,indices] = findNeighbours(lon[candidates],lat[candidates],searchDistance)
+        isSameNeighbours = True
+        isClear = np.ones(candidates.size,dtype=bool)
+        for index in range(0,candidates.size):
+            neighbours = set(indices[indptr[index]:indptr[index+1]].tolist())
+            isSameNeighbours &= set(np.flatnonzero(candidateDists[index] <= searchDistance*(1 - GRID_MARGIN)).tolist()) <= neighbours
+            isSameNeighbours &= neighbours <= set(np.flatnonzero(candidateDists[index] <= searchDistance*(1 + GRID_MARGIN)).tolist())
+            isClear[index] = not np.any(np.abs(candidateDists[index] - searchDistance) <= searchDistance*GRID_MARGIN)
+        kept = set(candidateSet(candidates,percTimes[candidates],indptr,indices).suppress().tolist())
+        bruteKept = set([index for index in range(0,candidates.size) if 
+                         not np.any(percTimes[candidates][candidateDists[index] <= searchDistance] > percTimes[candidates[index]])])
+        isSameHotspots = set(np.flatnonzero(isClear).tolist()) & kept == set(np.flatnonzero(isClear).tolist()) & bruteKept
+        print(str(numPoints) + ", " + str(round(bruteTime,3)) + ", " + str(round(exactTime,3)) + ", " + str(isBounded) + ", " +
+              str(int(np.sum(isEqual))) + " of " + str(numPoints) + " " + str(isSameTime) + ", " + str(candidates.size) + ", " +
+              str(bool(isSameNeighbours)) + ", " + str(int(np.sum(isClear))) + ", " + str(bool(isSameHotspots)) + " (" + str(len(kept)) + " kept)")
+
+
+
+# compare run times of the exact and approximate modes on synthetic participants, and check that both
+# modes identify the same points above the time cutoff
+# Inputs:
+#    pointCounts (int list) - numbers of observation points to test
+#    searchDistance (float) - search distance, in meters
+#    cellFraction (float) - grid cell size, as a fraction of the search distance
+#    timeCutoff (float) - percentage of time cut off for identifying hotspots
+def benchmarkApproximate(pointCounts=[10000,50000],searchDistance=10000,cellFraction=0.1,timeCutoff=17):
+    print("points, exact (s), approximate (s), refined points, max error (% time), same hotspots")
+    for numPoints in pointCounts:
+        [lon,lat,times] = makeParticipant(numPoints,numPoints)
+        minTime = times.sum()*timeCutoff/100
+        startTime = time.time()
+        exact = calcBufferTimes(lon,lat,times,searchDistance)
+        exactTime = time.time() - startTime
+        startTime = time.time()
+        [approx,maxError] = calcApproxBufferTimes(lon,lat,times,searchDistance,searchDistance*cellFraction,minTime)
+        approxTime = time.time() - startTime
+        upper = calcGridBufferTimes(timeGrid(lon,lat,times,searchDistance*cellFraction),searchDistance)[2]
+        isSame = np.array_equal(exact/times.sum()*100 > timeCutoff,approx/times.sum()*100 > timeCutoff)
+        print(str(numPoints) + ", " + str(round(exactTime,3)) + ", " + str(round(approxTime,3)) + ", " + 
+              str(int(np.sum(upper >= minTime))) + ", " + str(round(maxError/times.sum()*100,3)) + ", " + str(isSame))
+
+
+if __name__ == "__main__":
+    checkExactTimes()
+    benchmarkApproximate()
+
+
+############## end of hotspotEngine.py ##################
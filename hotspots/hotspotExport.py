@@ -0,0 +1,222 @@
+############## hotspotExport.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl and Perry Hystad, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module exports hotspot results as csv and columnar files.  Hotspot results are
+# stored as one array per field, and csv rows are formatted with one format string per batch and written in
+# large batches rather than one field at a time.  For downstream statistics, the same columns can be saved as
+# a numpy archive (.npz), or as a Parquet or Feather file if pyarrow is installed.
+
+# Requirements:
+#      numpy
+#      pyarrow (optional), for Parquet and Feather outputs
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import itertools
+import os
+import tempfile
+import time
+import numpy as np
+from collections import OrderedDict
+
+# constants
+CSV_BATCH_SIZE = 100000 # number of csv rows formatted and written at one time
+SEP = "," # separator for csv files
+NEW_LINE = "\n" # new line character for csv files
+COMPRESS_NPZ = False # if true, compress .npz files.  Compressed files are several times smaller but much slower to write
+
+
+
+############### helper functions ##############
+
+# join several sets of columns with the same fields into one set of columns
+# Inputs:
+#    columnSets (list) - ordered dicts of column arrays, e.g. the hotspots of each participant
+#    fieldNames (string array) - names of the fields
+# Outputs:
+#    columns (ordered dict) - concatenated array of values for each field name
+def concatColumns(columnSets,fieldNames):
+    columns = OrderedDict()
+    for fieldName in fieldNames:
+        arrays = [columnSet[fieldName] for columnSet in columnSets if len(columnSet[fieldName]) > 0]
+        columns[fieldName] = np.concatenate(arrays) if len(arrays) > 0 else np.array([])
+    return(columns)
+
+
+# write the header row of a csv file
+# Inputs:
+#    ofStream (file) - output stream of the csv file, opened in text mode with newline=''
+#    fieldNames (string array) - names of the csv columns
+def writeCSVHeader(ofStream,fieldNames):
+    ofStream.write(SEP.join(fieldNames) + NEW_LINE)
+
+
+# choose the csv format of an array of values.  Floats are formatted with %r, the shortest representation
+# that reads back to the same value (the same text as str()), and integers with %d.  Text values that
+# contain the separator, quotes, or new lines are quoted in the same way as the csv module, with numpy
+# string functions rather than one value at a time
+# Inputs:
+#    inValues (array) - values to format
+# Outputs:
+#    formatString (string) - format of one csv field
+#    values (list) - values to format, quoted where needed
+def formatColumn(inValues):
+    values = np.asarray(inValues)
+    if(values.dtype.kind == 'f'):
+        return(["%r",values.tolist()])
+    if(values.dtype.kind in 'iu'):
+        return(["%d",values.tolist()])
+    if(values.dtype.kind == 'U' and values.size > 0):
+        needsQuotes = (np.char.find(values,SEP) >= 0) | (np.char.find(values,'"') >= 0) | (np.char.find(values,NEW_LINE) >= 0)
+        if(needsQuotes.any()):
+            quoted = np.char.add(np.char.add('"',np.char.replace(values,'"','""')),'"')
+            values = np.where(needsQuotes,quoted,values)
+    return(["%s",values.tolist()])
+
+
+# write rows of a csv file from column arrays.  In the same way as np.savetxt, a row format string is
+# built from the format of each column, and CSV_BATCH_SIZE rows are formatted with one % operation and 
+# written with a single write call, rather than converting each value with a Python call
+# Inputs:
+#    ofStream (file) - output stream of the csv file, opened in text mode with newline=''
+#    inColumns (ordered dict) - array of values for each csv column, in column order
+def writeCSVRows(ofStream,inColumns):
+    columns = list(inColumns.values())
+    numRows = len(columns[0]) if len(columns) > 0 else 0
+    for start in range(0,numRows,CSV_BATCH_SIZE):
+        fields = [formatColumn(column[start:start + CSV_BATCH_SIZE]) for column in columns]
+        rowFormat = SEP.join([formatString for [formatString,values] in fields]) + NEW_LINE
+        rowValues = tuple(itertools.chain.from_iterable(zip(*[values for [formatString,values] in fields])))
+        ofStream.write((rowFormat*len(fields[0][1])) % rowValues)
+
+
+# write a csv file from column arrays
+# Inputs:
+#    inColumns (ordered dict) - array of values for each csv column, in column order
+#    outFile (string) - filepath to the output csv file
+def writeCSV(inColumns,outFile):
+    with open(outFile,'w',newline='') as ofStream:
+        writeCSVHeader(ofStream,list(inColumns.keys()))
+        writeCSVRows(ofStream,inColumns)
+
+
+# write column arrays to a columnar file.  The format is chosen by the file extension: .npz files are
+# written with numpy, and .parquet and .feather files are written with pyarrow
+# Inputs:
+#    inColumns (ordered dict) - array of values for each field
+#    outFile (string) - filepath to the output file
+#    compress (boolean) - if true, compress .npz files
+def writeColumnar(inColumns,outFile,compress=COMPRESS_NPZ):
+    extension = os.path.splitext(outFile)[1].lower()
+    if(extension == ".npz"):
+        if(compress):
+            np.savez_compressed(outFile,**inColumns)
+        else:
+            np.savez(outFile,**inColumns)
+        return
+    if(extension not in (".parquet",".feather")):
+        raise ValueError("unsupported columnar format " + extension + ".  Use .npz, .parquet, or .feather")
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("pyarrow is required to write " + extension + " files.  Use a .npz file instead")
+    table = pyarrow.table(OrderedDict([(fieldName,pyarrow.array(values)) for [fieldName,values] in inColumns.items()]))
+    if(extension == ".parquet"):
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(table,outFile)
+    else:
+        import pyarrow.feather
+        pyarrow.feather.write_feather(table,outFile)
+
+
+# read column arrays from a .npz file written by writeColumnar
+# Inputs:
+#    inFile (string) - filepath to the .npz file
+# Outputs:
+#    columns (ordered dict) - array of values for each field, in the order they were written
+def readColumnar(inFile):
+    with np.load(inFile,allow_pickle=False) as archive:
+        return(OrderedDict([(fieldName,archive[fieldName]) for fieldName in archive.files]))
+
+
+# create synthetic hotspot results
+# Inputs:
+#    numRows (int) - number of hotspots
+#    inSeed (int) - random number seed
+# Outputs:
+#    columns (ordered dict) - latitude, longitude, percTime, zoneVal, and studyLabel arrays
+def makeHotspotColumns(numRows,inSeed):
+    generator = np.random.default_rng(inSeed)
+    columns = OrderedDict()
+    columns["latitude"] = generator.uniform(42,46,numRows)
+    columns["longitude"] = generator.uniform(-124,-117,numRows)
+    columns["percTime"] = generator.uniform(17,100,numRows)
+    columns["zoneVal"] = generator.integers(0,5,numRows)
+    columns["studyLabel"] = np.array(["p" + str(i//5) for i in range(0,numRows)])
+    return(columns)
+
+
+# write csv rows one field at a time, in the same way as the original csv writer.  Used as the
+# baseline for benchmarkExport
+# Inputs:
+#    ofStream (file) - output stream of the csv file
+#    inColumns (ordered dict) - array of values for each csv column, in column order
+def writeFieldByField(ofStream,inColumns):
+    columns = list(inColumns.values())
+    for i in range(0,len(columns[0])):
+        for j in range(0,len(columns)-1):
+            ofStream.write(str(columns[j][i]))
+            ofStream.write(SEP)
+        ofStream.write(str(columns[len(columns)-1][i]))
+        ofStream.write(NEW_LINE)
+
+
+# compare run times and file sizes of the output formats on synthetic hotspot results, and check that
+# the batched csv writer produces the same text as the field by field writer
+# Inputs:
+#    rowCounts (int list) - numbers of hotspots to test
+def benchmarkExport(rowCounts=[100000,1000000]):
+    outFolder = tempfile.mkdtemp()
+    print("rows, format, write time (s), file size (MB)")
+    for numRows in rowCounts:
+        columns = makeHotspotColumns(numRows,numRows)
+        fieldNames = list(columns.keys())
+        outputs = [["csv (field by field)",os.path.join(outFolder,"fields.csv")],["csv (batched)",os.path.join(outFolder,"batched.csv")],
+                   ["npz",os.path.join(outFolder,"columns.npz")],["npz (compressed)",os.path.join(outFolder,"compressed.npz")],["parquet",os.path.join(outFolder,"columns.parquet")],
+                   ["feather",os.path.join(outFolder,"columns.feather")]]
+        for [formatName,outFile] in outputs:
+            startTime = time.time()
+            try:
+                if(formatName == "csv (field by field)"):
+                    with open(outFile,'w') as ofStream:
+                        ofStream.write(SEP.join(fieldNames) + NEW_LINE)
+                        writeFieldByField(ofStream,columns)
+                elif(formatName == "csv (batched)"):
+                    writeCSV(columns,outFile)
+                elif(formatName == "npz (compressed)"):
+                    writeColumnar(columns,outFile,True)
+                else:
+                    writeColumnar(columns,outFile)
+            except ImportError:
+                print(str(numRows) + ", " + formatName + ", skipped (pyarrow is not installed)")
+                continue
+            print(str(numRows) + ", " + formatName + ", " + str(round(time.time() - startTime,3)) + ", " +
+                  str(round(os.path.getsize(outFile)/1e6,2)))
+        with open(outputs[0][1],'r') as fieldStream, open(outputs[1][1],'r') as batchStream:
+            print(str(numRows) + ", batched csv matches field by field csv: " + str(fieldStream.read() == batchStream.read()))
+        for [formatName,outFile] in outputs:
+            if(os.path.exists(outFile)):
+                os.remove(outFile)
+    os.rmdir(outFolder)
+
+
+if __name__ == "__main__":
+    benchmarkExport()
+
+
+############## end of hotspotExport.py ##################
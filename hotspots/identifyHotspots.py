@@ -7,396 +7,479 @@
 # called "hotspots".  Hotspots are defined as areas where a participant more than or equal to a 
 # variable -defined percentage of time.  Time-location patterns are based on a combination of latitude,
 # longitude, and time variables as defined in the variable definition section. Results are written 
-# as an output csv file.
+# as an output csv file, and hotspot centers and participant data tagged with the nearest hotspot zone
+# are written as shapefiles.  Participants are processed in parallel by NUM_WORKERS processes, which share
+# memory mapped copies of the input shapefile.  For inputs larger than memory, the STREAMING mode reads 
+# the input shapefile in chunks, processes one participant at a time, and writes the results of each
+# participant as soon as it is completed, so memory use is bounded by the largest participant.  The csv
+# results can also be written to a columnar file (WRITE_COLUMNAR) for downstream statistics.
 
 # Requirements:
-#      ArcGIS with a liscence for the Spatial Analysis Library
+#      numpy, for reading attribute tables with shared/shapefileIO.py
+#      scipy, for the hotspot engine in hotspotEngine.py.  ArcGIS is no longer required
+#      pyarrow (optional), for Parquet and Feather columnar outputs
 # Tested and developed on:
 #      Windows 10
 #      Python 2.
 #      ArcGIS 10.3.1
+#      Linux, Python 3.11 (without ArcGIS)
 
 
 
 # import modules
-import arcpy
+import multiprocessing
 import os
+import shutil
 import sys
+import tempfile
+import time
+import numpy as np
+from collections import OrderedDict
 
-# define environmental variables
-arcpy.env.overwriteOutput = True
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"shared"))
+import shapefileIO
+import geodesy
+import hotspotEngine
+import hotspotExport
 
 # folder paths and environmental variables
 baseFolder = os.path.dirname(sys.argv[0]) + "/"
 participantData = baseFolder + "hotspotInput.shp" # input file containing time-location data 
 outputFile = baseFolder + "hotspotZones.csv" # name and folder path for final results
-hotspotShapefile = baseFolder + "hotSpots.shp"
-outputShapefile = baseFolder + "addedHotspots.shp"
+columnarFile = baseFolder + "hotspotZones.npz" # columnar copy of the final results for downstream statistics (.npz, or .parquet and .feather with pyarrow)
+hotspotShapefile = baseFolder + "hotSpots.shp" # output file containing the center of each hotspot
+outputShapefile = baseFolder + "addedHotspots.shp" # output file containing participant data tagged with hotspot zones
 ID_ATTRIBUTE = 'study_labe' # attribute field in input file that identifies which individual a sample point belongs to
 TIME_ATTRIBUTE = "dTime" # attribute field that identifies amount of time associated with a sample point
 SPOT_RADIUS = 10000 # radius of the hotspot, in units of meters
 TIME_CUTOFF = 17 # percentage of time cut off for identifying hotspots. 
+APPROXIMATE = False # if true, estimate time within SPOT_RADIUS with a grid and only use exact distances for likely hotspots
+GRID_FRACTION = 0.1 # grid cell size for the approximate mode, as a fraction of SPOT_RADIUS
 CSV_DICT = ["latitude","longitude","percTime","zoneVal","studyLabel"] # values to include in output csv
-ID_HOTSPOT = '"studyLabel"'
-ZONE_ATTRIBUTE = '"zoneVal"'
-SEP = "," # separator for the output csv
-NEW_LINE = "\n" # new line character for writing the output csv
-
-# custom class containing information relevant to hotspots
-class hotSpot:
-    # instantiate a hotspot
-    def __init__(self,inLat,inLong,inZoneVal,inPercTime,inStudyLabel,inNearbyPts):
-        self.latitude = inLat
-        self.longitude = inLong
-        self.zoneVal = inZoneVal
-        self.percTime = inPercTime 
-        self.studyLabel = inStudyLabel
-        self.nearbyPoints = inNearbyPts
-    
-    ########### custom functions ############
-    
-    # identify other potential hotspots that are nearby
-    def isNearby(self,comparePt):
-        if(comparePt in self.nearbyPoints):
-            return(True)
-        return(False)
-    
-    ########## getters and setters ##########
-    def getLatitude(self):
-        return(self.latitude)
-    
-    def getLongitude(self):
-        return(self.longitude)
-    
-    def getNearbyZones(self):
-        return(self.nearbyPoints)
-    
-    def getStudyLabel(self):
-        return(self.studyLabel)
-        
-    def getPercTime(self):
-        return(self.percTime)
-    
-    def setZoneVal(self,inZoneVal):
-        self.zoneVal = inZoneVal
-        
-    def getZoneVal(self):
-        return(self.zoneVal)
-    
-    def setZoneVal(self,inZoneVal):
-        self.zoneVal = inZoneVal
-        
-    
-########### end of the hotspot custom class ##########    
+WRITE_COLUMNAR = False # if true, also write the final results to columnarFile
+ZONE_DIST_ATTRIBUTE = "zoneDist" # attribute field for the distance between a sample point and its hotspot center, in meters
+NUM_WORKERS = multiprocessing.cpu_count() # number of processes used to identify hotspots.  1 runs all participants in the main process
+STREAMING = False # if true, read participant data in chunks and write results as each participant is completed, for inputs larger than memory
+CHUNK_SIZE = 1000000 # number of records read at one time in the streaming mode
+SORTED_INPUT = False # if true, the streaming mode expects the records of each participant to be stored together (sorted or partitioned by ID_ATTRIBUTE). Otherwise, records are first partitioned by participant in temporary files
+
+workerData = {} # participant table and row order, opened once in each worker process
 
 ################### helper functions ###############    
     
     
 
-# Sort hotspots in descending order by the percentage of time included within the 
-# hotspot radius.  The output is the same as the input, but sorted by percent time 
+# Rank hotspots in descending order by the percentage of time included within the 
+# hotspot radius.  The zone value of each hotspot is set to its rank, and hotspots with the
+# same percentage of time share the same rank
 # Inputs:
-#    inHotspots (hotspot array) - an array of HotSpot objects
+#    inHotspots (ordered dict) - array of values for each hotspot field in CSV_DICT
 # Outputs:
-#    inHotspots (hotspot array) - the same array as the input array, but ordered
+#    inHotspots (ordered dict) - the same columns as the input, with zone values set 
 #    by percentage of time covered
 def prioritizeHotspots(inHotspots):
-    nonSortedPercents = [0]*len(inHotspots)
-    for i in range(0,len(inHotspots)):
-        nonSortedPercents[i] = inHotspots[i].getPercTime()
-    sortedPercents = sorted(nonSortedPercents,reverse = True)
-    for i in range(0,len(inHotspots)):
-        inHotspots[i].setZoneVal(sortedPercents.index(nonSortedPercents[i]))
+    inHotspots["zoneVal"] = hotspotEngine.rankDescending(inHotspots["percTime"]).astype(np.int64)
     return(inHotspots)
 
 
 
-# Write output csv file of hotspot datapoints
+# Write output csv file of hotspot datapoints.  The hotspot columns of all participants are joined and 
+# written in batches with hotspotExport.py
 # Inputs:
-#    inAllHotSpts (object array) - array of hotspot objects
+#    inAllHotSpts (list) - hotspot columns of each participant, from identifyHotSpots
 #    inFilepath (string) - filepath and filename of the resulting csv file
+# Outputs:
+#    columns (ordered dict) - array of values for each csv column
 def writeCSV(inAllHotSpots,inFilepath):
-    
-    i = 0
-    # create an output stream object
-    ofStream = open(inFilepath, 'wb')
-    
-    # write the csv header
-    for i in range(0,len(CSV_DICT)-1):
-        ofStream.write(CSV_DICT[i])
-        ofStream.write(SEP)
-    ofStream.write(CSV_DICT[len(CSV_DICT)-1])
-    ofStream.write(NEW_LINE)
-    
-    # for each participant in the hotspot array
-    for participantHotSpots in inAllHotSpots:
-        
-        # for each hotspot in the current participant, write the hotspot data into the 
-        # output stream
-        for hotSpot in participantHotSpots:
-            ofStream.write(str(hotSpot.getLatitude()))
-            ofStream.write(SEP)
-            ofStream.write(str(hotSpot.getLongitude()))
-            ofStream.write(SEP)
-            ofStream.write(str(hotSpot.getPercTime()))
-            ofStream.write(SEP)
-            ofStream.write(str(hotSpot.getZoneVal()))
-            ofStream.write(SEP)
-            ofStream.write(hotSpot.getStudyLabel())
-            ofStream.write(NEW_LINE)
-    ofStream.close()   
-    
+    columns = hotspotExport.concatColumns(inAllHotSpots,CSV_DICT)
+    hotspotExport.writeCSV(columns,inFilepath)
     print("completed writing output file: " + inFilepath)
+    return(columns)
     
     
 
 # calculate the sum of time covered by sampling events for a given participant 
 # in the dataset.  
 # Inputs:
-#    inData (shapefile) - shapefile containing participant data, including 
-#    amount of time associated with each sampling event
-#    inTimeField (string) - name of the attribute field in the shapefile that 
-#    containins the amount of time associated with each observation point
-#    inId (string) - ID tag associated with the participant of interest.  Used
-#    to screen the input file for data from a particular participant
+#    inTimes (float array) - amount of time associated with each observation point
+#    of the participant.  Missing values are ignored
+#    inId (string) - ID tag associated with the participant of interest
 # Outputs:
 #    sumVal (float) - the total amount of time, in seconds covered by sampling
 #    events for the participant associated with inID
-def calcTotalTime(inData,inTimeField,inID):
-    sumVal = 0
-    numObs = 0
-    
-    # for each observation point in the shapefile, add the amount of time 
-    # associated with the point to the running sum 
-    with arcpy.da.SearchCursor(inData, inTimeField) as cursor:
-        
-        for row in cursor:
-            try:
-                sumVal += float(row[0])
-            except:
-                sumVal = sumVal
-            numObs +=1
-        
-        if(numObs>0):
-            del row
-        del cursor   
+def calcTotalTime(inTimes,inID):
+    sumVal = float(np.nansum(inTimes))
     print("the total sample time for participant "  + str(inID) + " is : " + str(sumVal) + " seconds")
     return(sumVal) 
 
 
 
 
-# extract time and user id from each observation point 
+# extract FID and time from the observation points of a single participant
 # Inputs:
-#   inData (shapefile) - input shapefile data to extract value from
+#   inTable (shapeTable) - attribute table of the input shapefile
+#   inID (string) - tag used to identify the participant
+#   inFIDs (integer array) - optional FID values for all of the participant's observations.  If not
+#   given, FID values are found by searching the ID attribute
 # Outputs:
-#    FIDArray (integer array) - FID values for all of the inputs
-#    dTimeArray (float array) - array of times associated with the observations
-def getRowsAndDTime(inData):
-    numRows = int(arcpy.GetCount_management(inData).getOutput(0))
-    FIDArray = [0]*numRows
-    dTimeArray = [0]*numRows
-    index = 0
-    
-    # for each observation, extract the FID value and the amount of time associated by the observations
-    with arcpy.da.SearchCursor(inData, ["FID",TIME_ATTRIBUTE]) as cursor:
-        
-        for row in cursor:
-            FIDArray[index] = row[0]
-            try:
-                dTimeArray[index] = float(row[1])
-            except:
-                dTimeArray[index] = dTimeArray[index]
-            index +=1
-            del row
-        del cursor 
+#    FIDArray (integer array) - FID values for all of the participant's observations
+#    dTimeArray (float array) - array of times associated with the observations.  Missing
+#    values are set to 0
+def getRowsAndDTime(inTable,inID,inFIDs=None):
+    if(inFIDs is None):
+        FIDArray = np.flatnonzero(inTable.getColumn(ID_ATTRIBUTE) == inID)
+    else:
+        FIDArray = np.asarray(inFIDs,dtype=np.int64)
+    dTimeArray = np.nan_to_num(np.asarray(inTable.getColumn(TIME_ATTRIBUTE,FIDArray),dtype=np.float64))
     return([FIDArray,dTimeArray])
     
     
     
-# identify the hotspots for a single participant
+# identify the hotspots for a single participant.  The time within SPOT_RADIUS of every observation point
+# is calculated in one batch with hotspotEngine.py, and points covering more than TIME_CUTOFF percent of
+# the participant's total time are kept as candidate hotspots.  In the approximate mode, time is estimated
+# with a grid and exact times are only calculated for points that might be above TIME_CUTOFF, so the same
+# candidates are found.  The percTime of other points may be off by up to the reported maximum error
 # Inputs:
-#    inData (shapefile) - shapefile containing all datapoints
-#    inID (string) - tag used to identify the 
+#    inTable (shapeTable) - attribute table of the shapefile containing all datapoints
+#    inID (string) - tag used to identify the participant
+#    inFIDs (integer array) - optional FID values for all of the participant's observations
 # Outputs:
-#    hotspots (hotspot array) - array of hotspots for the participant identified by inID
-def identifyHotSpots(inData,inID):
-    
-    # screen inData for points that belong to the participant identified by inID
-    whereClause =  ID_ATTRIBUTE + "=" + "'" + inID + "'"
-    tempSubset = "idSubset"
-    tempPoint = "singlePoint"
-    tempTable = "in_memory/tempTable"
-    arcpy.MakeFeatureLayer_management(inData,tempSubset,whereClause)
-    numRows = int(arcpy.GetCount_management(tempSubset).getOutput(0))
-    totalTime = calcTotalTime(tempSubset,TIME_ATTRIBUTE,inID)
-    [FIDArray,timeArray] = getRowsAndDTime(tempSubset) # get the time associated with each observation point
-    candidateHotSpots = []
+#    hotspots (ordered dict) - array of values for each field in CSV_DICT, with one entry for each hotspot 
+#    of the participant identified by inID, or "null" if there are none
+def identifyHotSpots(inTable,inID,inFIDs=None):
+    [FIDArray,timeArray] = getRowsAndDTime(inTable,inID,inFIDs) # get the time associated with each observation point
+    totalTime = calcTotalTime(timeArray,inID)
+    [x,y] = inTable.getCoords(FIDArray)
+    [lon,lat] = geodesy.projectToGeographic(x,y,inTable.getPrj())
+    latitudes = inTable.getColumn("latitude",FIDArray)
+    longitudes = inTable.getColumn("longitude",FIDArray)
+    rows = np.array([],dtype=np.int64)
+    percTimes = np.array([],dtype=np.float64)
     
-    # for each observation point associated with the current participant of interest
-    for FID in FIDArray:
+    # calculate the percent of time within the hotspot buffer zone of every observation point, and keep 
+    # the points where the percent of time is greater than the cutoff
+    if(totalTime > 0):
+        if(APPROXIMATE):
+            [bufferTime,maxError] = hotspotEngine.calcApproxBufferTimes(lon,lat,timeArray,SPOT_RADIUS,SPOT_RADIUS*GRID_FRACTION,
+                                                                        totalTime*TIME_CUTOFF/100)
+            print("the maximum error in percTime for participant " + str(inID) + " is : " + str(maxError/totalTime*100))
+        else:
+            bufferTime = hotspotEngine.calcBufferTimes(lon,lat,timeArray,SPOT_RADIUS)
+        percBufferTime = bufferTime/totalTime*100
+        candidates = np.flatnonzero(percBufferTime > TIME_CUTOFF)
         
-        # screeen the input dataset for one data point at a time
-        whereClause = "FID = " + str(FID)
-        arcpy.MakeFeatureLayer_management(tempSubset,tempPoint,whereClause)
-        with arcpy.da.SearchCursor(tempPoint, TIME_ATTRIBUTE) as cursor:
-            for row in cursor:
-                bufferTime = row[0]
-            del row
-        del cursor        
-        # identify all other datapoints within SPOT_RADIUS meters and store the results in a table 
-        arcpy.GenerateNearTable_analysis(tempPoint,tempSubset,tempTable,str(SPOT_RADIUS) + " Meter", 'NO_LOCATION', 'NO_ANGLE', "ALL")
-        numRows2 = int(arcpy.GetCount_management(tempTable).getOutput(0))
-        nearFIDS = [0]*numRows2
-        index = 0
-        
-        # for each point nearby the main point of interest (i.e. within the hotspot buffer zone), add the point associated with the 
-        # nearby point to the sum of times covered by the hostpot
-        with arcpy.da.SearchCursor(tempTable, "NEAR_FID") as cursor:
-           
-            for row in cursor:
-                nearFIDS[index] = row[0]
-                bufferTime += timeArray[FIDArray.index(row[0])]
-                index+=1
-                del row
-            del cursor
-        percBufferTime = (bufferTime/totalTime)*100
-
-        # if the percent of time covered by the hotspot is greater than the cutoff, then add the hotspot to the list of candidate hotspots
-        if(percBufferTime > TIME_CUTOFF):    
-            with arcpy.da.SearchCursor(tempPoint, ["latitude","longitude","FID",ID_ATTRIBUTE]) as cursor:
-
-                for row in cursor:
-                    candidateHotSpots.append(hotSpot(row[0],row[1],row[2],percBufferTime,row[3],nearFIDS))
-                    del row
-                del cursor
-
-    # screen hotspot data to remove overlapping hotspots
-    hotSpots = screenHotspots(candidateHotSpots) 
+        # only nearby candidates are needed to screen overlapping hotspots
+        [indptr,indices] = hotspotEngine.findNeighbours(lon[candidates],lat[candidates],SPOT_RADIUS)
+        candidateHotSpots = hotspotEngine.candidateSet(FIDArray[candidates],percBufferTime[candidates],indptr,indices)
+
+        # screen hotspot data to remove overlapping hotspots
+        screened = screenHotspots(candidateHotSpots)
+        rows = candidates[screened]
+        percTimes = percBufferTime[rows]
     print("completed identifying hotspots for participant" + str(inID))
-    hotSpots = prioritizeHotspots(hotSpots)
-
-    if(len(hotSpots) > 0):
-        return(hotSpots)
-    else:
+    if(len(rows) == 0):
         return("null")
+    hotSpots = OrderedDict()
+    hotSpots["latitude"] = np.asarray(latitudes)[rows]
+    hotSpots["longitude"] = np.asarray(longitudes)[rows]
+    hotSpots["percTime"] = percTimes
+    hotSpots["zoneVal"] = np.zeros(len(rows),dtype=np.int64)
+    hotSpots["studyLabel"] = np.array([inID]*len(rows))
+    return(prioritizeHotspots(hotSpots))
 
 
-# return a list of unique values
+# group the observation points of the input table by participant
 # Inputs:
-#    inShapefile (shapefile) - shapefile containing all points of interest
-#    inField (string) - name of the attribute field containing the data to return 
+#    inTable (shapeTable) - attribute table of the input shapefile
 # Outputs:
-#    sorted array of unique values for the attribute field of interest 
-def uniqueValues(inShapefile, inField):
-    with arcpy.da.SearchCursor(inShapefile, [inField]) as cursor:
-        return sorted({row[0] for row in cursor})
+#    uniqueIDs (string list) - sorted list of participant IDs
+#    rowOrder (integer array) - FID values, sorted by participant and then FID
+#    bounds (integer array) - FID values of participant i are rowOrder[bounds[i]:bounds[i+1]]
+def groupParticipants(inTable):
+    [uniqueIDs,participantIndex] = np.unique(inTable.getColumn(ID_ATTRIBUTE),return_inverse=True)
+    participantIndex = participantIndex.ravel()
+    rowOrder = np.argsort(participantIndex,kind='stable')
+    bounds = np.searchsorted(participantIndex[rowOrder],np.arange(0,uniqueIDs.size+1))
+    return([uniqueIDs.tolist(),rowOrder,bounds])
+
+
+
+# open the participant shapefile and row order in a worker process.  Coordinates, attributes and the row
+# order are all memory mapped, so workers share the operating system's copy of the data instead of
+# receiving pickled copies, and each worker only reads the rows of its own participants
+# Inputs:
+#    inShapefile (string) - filepath to the participant shapefile
+#    inOrderFile (string) - filepath to the .npy file of FID values sorted by participant
+def initWorker(inShapefile,inOrderFile):
+    workerData["table"] = shapefileIO.readShapefile(inShapefile)
+    workerData["rowOrder"] = np.load(inOrderFile,mmap_mode='r')
 
 
 
-# determine if two hotspots overlap
+# identify the hotspots for one participant in a worker process
 # Inputs:
-#    inOverlap (int) - id value for the hotspot of interest
-#    inAllHotSpts (hotspot array) - array of all hotspotss
+#    inTask (list) - participant ID and the start and end of the participant's FID values in the row order
 # Outputs:
-#    hotspot of interest 
-def getCompareCandidate(inOverlap,inAllHotSpots):
-    for i in range(0,len(inAllHotSpots)):
-        if(inAllHotSpots[i].getZoneVal()==inOverlap):
-            return(inAllHotSpots[i])
-    return(False)
+#    inID (string) - participant ID
+#    hotSpots (ordered dict) - hotspot columns for the participant, or "null" if there are none
+#    runTime (float) - time taken to identify the hotspots, in seconds
+def runParticipant(inTask):
+    [inID,start,end] = inTask
+    startTime = time.time()
+    hotSpots = identifyHotSpots(workerData["table"],inID,np.array(workerData["rowOrder"][start:end]))
+    return([inID,hotSpots,time.time() - startTime])
 
 
 
-# compare a hotspot to other hotspots that may overap.  Return true
-# if the candidate hotspot has the highest percent coverage compared 
-# to overlapping hotspots, false otherwise.
+# identify the hotspots for all participants with a pool of worker processes.  Participants are scheduled
+# from largest to smallest to balance the load between workers, and results are returned in participant
+# ID order regardless of the order workers finish in
 # Inputs:
-#    inCandidate (hotspot) - candidate hotspot object of interest
-#    inAllHostpost (hotspot array) - array of candidate hotspots that might 
-#    overlap the hotspot of interest
+#    inShapefile (string) - filepath to the participant shapefile
+#    numWorkers (int) - number of worker processes.  1 runs all participants in the main process
 # Outputs:
-#    true if the candidate hotspot has the highest percentage time coverage
-#    compared to overlapping hotspots, false otherwise
-def screenHotspot(inCandidate,inAllHotspots):
-    overlapZones = inCandidate.getNearbyZones()
-    
-    # for each overlap zones, compare the overlap zone to overlapping hotspots.
-    # return true if the candidate hotspot is the best option, false otherwise
-    for overlap in overlapZones:
-        compareCandidate = getCompareCandidate(overlap,inAllHotspots)
-        if(compareCandidate != False and compareCandidate.getPercTime() > inCandidate.getPercTime()):
-            return(False)
-    return(True)
-            
+#    uniqueIDs (string list) - sorted list of participant IDs
+#    results (list) - participant ID, hotspots, and run time for each participant, sorted by participant ID
+def identifyAllHotSpots(inShapefile,numWorkers):
+    [uniqueIDs,rowOrder,bounds] = groupParticipants(shapefileIO.readShapefile(inShapefile))
+    tasks = [[uniqueIDs[i],int(bounds[i]),int(bounds[i+1])] for i in range(0,len(uniqueIDs))]
+    tasks.sort(key=lambda task: task[1] - task[2])
+    [fileHandle,orderFile] = tempfile.mkstemp(suffix=".npy")
+    os.close(fileHandle)
+    np.save(orderFile,rowOrder)
+    try:
+        if(numWorkers <= 1):
+            initWorker(inShapefile,orderFile)
+            results = [runParticipant(task) for task in tasks]
+        else:
+            pool = multiprocessing.Pool(numWorkers,initWorker,(inShapefile,orderFile))
+            results = list(pool.imap_unordered(runParticipant,tasks))
+            pool.close()
+            pool.join()
+    finally:
+        workerData.clear()
+        os.remove(orderFile)
+    positions = dict(zip(uniqueIDs,range(0,len(uniqueIDs))))
+    results.sort(key=lambda result: positions[result[0]])
+    return([uniqueIDs,results])
+
 
 
 # screen all cadidate hotspots for potential overlapping candidate hotspots
 # among the overlapping spots, keep the hotspots with the highest percentage
-# time coverage
+# time coverage.  Overlapping hotspots with the same percentage time coverage are
+# all kept
 # Inputs:
-#    inCandidates (hostpost array) - candidate array of hotspots
+#    inCandidates (candidateSet) - candidate hotspots and their overlapping candidates
 # Outputs:
-#    finalList (hostpost array) - screened hotspot array, without overlap
+#    integer array of the index of each screened hotspot in inCandidates, without overlap
 def screenHotspots(inCandidates):
-    finalList = []
-    for candidate in inCandidates:
-        if(screenHotspot(candidate,inCandidates)):
-            finalList.append(candidate)
-    return(finalList)
+    return(inCandidates.suppress())
         
         
         
-# join zone data to participant data
+# join zone data to participant data.  Each sample point is tagged with the zone value, percent time, and
+# distance of the nearest hotspot of the same participant within SPOT_RADIUS, in one pass over all sample
+# points.  Hotspot centers are located by their longitude and latitude values.  Sample points without a 
+# hotspot have a join count of 0 and zero hotspot values, in the same way as an ArcGIS spatial join
 # Inputs:
-#    inParticipants (string) - filepath to the shapefile with participant data  
-#    inHotspots (string) - filepath to the shapefile with hotspot locations and statistics
-#    outputFile (string) - filepath to the output shapefile
-#    uniqueIds (string array) - array of values that uniquely identify which participant 
-#    data comes from        
-def assignZones(inParticipants, inHotspots, outputFile,uniqueIds):
-    tempFiles = []
-    
-    # for each participant in the dataset, subset the participant data and hotspot data
-    # for each participant, and add hotspot statistics to participant data 
-    for idVal in uniqueIds:
+#    inTable (shapeTable) - participant data, with rows grouped by participant in the same order as inResults.
+#    The zone fields are added to this table
+#    inFIDs (integer array) - FID value of each row in the input shapefile
+#    bounds (integer array) - rows of participant i are inTable rows bounds[i]:bounds[i+1]
+#    inResults (list) - participant ID, hotspots, and run time for each participant, from identifyAllHotSpots
+# Outputs:
+#    output (shapeTable) - inTable, tagged with hotspot zones
+#    centers (shapeTable) - hotspot centers
+def tagZones(inTable,inFIDs,bounds,inResults):
+    hotSpotSets = [result[1] for result in inResults if result[1] != "null"]
+    hotSpots = hotspotExport.concatColumns(hotSpotSets,CSV_DICT)
+    numHotSpots = len(hotSpots["percTime"])
+    hotLon = hotSpots["longitude"].astype(np.float64)
+    hotLat = hotSpots["latitude"].astype(np.float64)
+    hotGroups = np.repeat([i for i in range(0,len(inResults)) if inResults[i][1] != "null"],
+                          [len(hotSpotSet["percTime"]) for hotSpotSet in hotSpotSets]).astype(np.int64)
+    [lon,lat] = geodesy.projectToGeographic(inTable.getX(),inTable.getY(),inTable.getPrj())
+    pointGroups = np.repeat(np.arange(0,len(inResults)),np.diff(bounds))
+    [nearest,joinCount,dist] = hotspotEngine.assignHotspots(lon,lat,pointGroups,hotLon,hotLat,hotGroups,SPOT_RADIUS)
     
-        tempAllParticipants = "t_particip" + str(idVal) 
-        whereClause =  ID_ATTRIBUTE + " = " + "'" + str(idVal) + "'"
-        arcpy.MakeFeatureLayer_management(inParticipants,tempAllParticipants,whereClause)
-        whereClause =  ID_HOTSPOT + " = " + "'" + str(idVal) + "'"
-        tempBuffers = "t" + str(idVal)
-        arcpy.MakeFeatureLayer_management(inHotspots, tempBuffers,whereClause)
-        tempParticip2 = "in_memory/t_part_sub" + str(idVal)
-        arcpy.SpatialJoin_analysis(tempAllParticipants,tempBuffers,tempParticip2,match_option= "WITHIN_A_DISTANCE_GEODESIC", 
-                                   search_radius= str(SPOT_RADIUS) + " Meters")
-        tempFiles.append(tempParticip2)
-
-    arcpy.Merge_management(tempFiles,outputFile)
+    # hotspot attributes for each sample point, with zero values for sample points without a hotspot
+    isJoined = nearest >= 0
+    hotValues = []
+    for [fieldName,fieldType] in [["latitude","DOUBLE"],["longitude","DOUBLE"],["percTime","DOUBLE"],["zoneVal","LONG"],
+                                  ["studyLabel","TEXT"]]:
+        values = hotSpots[fieldName] if numHotSpots > 0 else np.array([0])
+        hotValues.append([fieldName,values,fieldType])
+    output = inTable
+    output.appendColumns([["Join_Count",joinCount,"LONG"],["TARGET_FID",inFIDs,"LONG"]],0)
+    for [fieldName,values,fieldType] in hotValues:
+        blank = "" if fieldType == "TEXT" else 0
+        output.appendColumns([[output.getUniqueFieldName(fieldName),np.where(isJoined,values[np.maximum(nearest,0)],blank),fieldType]])
+    output.appendColumns([[ZONE_DIST_ATTRIBUTE,np.where(isJoined,dist,0),"DOUBLE"]])
+    centers = shapefileIO.shapeTable(hotLon,hotLat,[],OrderedDict(),geodesy.WGS84_PRJ)
+    centers.appendColumns([[fieldName,values[0:numHotSpots],fieldType] for [fieldName,values,fieldType] in hotValues])
+    return([output,centers])
+
+
+
+# join zone data to participant data for all participants, and write the tagged participant data and 
+# hotspot centers as shapefiles.  Output rows are grouped by participant, in the same order as the hotspot
+# results
+# Inputs:
+#    inTable (shapeTable) - attribute table of the shapefile with participant data 
+#    inResults (list) - participant ID, hotspots, and run time for each participant, from identifyAllHotSpots
+#    outputFile (string) - filepath to the output shapefile
+#    outputHotspots (string) - filepath to the output shapefile of hotspot centers
+def assignZones(inTable,inResults,outputFile,outputHotspots):
+    [uniqueIDs,rowOrder,bounds] = groupParticipants(inTable)
+    [output,centers] = tagZones(inTable.selectRows(rowOrder),rowOrder,bounds,inResults)
+    shapefileIO.writeShapefile(output,outputFile)
+    shapefileIO.writeShapefile(centers,outputHotspots)
+    print("completed assigning zones: " + outputFile)
+
+
+
+# read the participant data in chunks from a shapefile where the records of each participant are stored
+# together, e.g. sorted or partitioned by ID_ATTRIBUTE.  A participant's records are kept until a record
+# of a different participant is read, so memory use is bounded by the largest participant plus one chunk
+# Inputs:
+#    inShapefile (string) - filepath to the participant shapefile
+#    chunkSize (int) - number of records read at one time
+# Outputs:
+#    generator of [inID,table,FIDs] lists, with the participant ID, a shapeTable of the participant's
+#    records, and the FID of each record, in the order participants are stored in the shapefile
+def iterSortedParticipants(inShapefile,chunkSize):
+    completedIDs = set()
+    currentID = None
+    pending = []
+    for [start,chunk] in shapefileIO.readShapefileChunks(inShapefile,chunkSize):
+        ids = chunk.getColumn(ID_ATTRIBUTE)
+        records = chunk.getRecords(np.arange(start,start + chunk.getNumRecords()))
+        breaks = [0] + (np.flatnonzero(ids[1:] != ids[:-1]) + 1).tolist() + [ids.size]
+        for i in range(0,len(breaks) - 1):
+            runID = ids[breaks[i]]
+            if(runID != currentID):
+                if(currentID is not None):
+                    yield([currentID] + shapefileIO.tableFromRecords(np.concatenate(pending),chunk.fields,chunk.getPrj(),chunk.encoding))
+                    completedIDs.add(currentID)
+                if(runID in completedIDs):
+                    raise ValueError("records of participant " + str(runID) + " are not stored together.  Set SORTED_INPUT to False")
+                currentID = runID
+                pending = []
+            pending.append(records[breaks[i]:breaks[i+1]])
+    if(currentID is not None):
+        yield([currentID] + shapefileIO.tableFromRecords(np.concatenate(pending),chunk.fields,chunk.getPrj(),chunk.encoding))
+
+
+
+# read the participant data in chunks from a shapefile in any order.  Each chunk is split by participant,
+# and the records of each participant are appended to a temporary file.  Once all chunks are read, the
+# participants are read back one at a time, so memory use is bounded by the largest participant plus one
+# chunk.  The temporary files need as much disk space as the input shapefile
+# Inputs:
+#    inShapefile (string) - filepath to the participant shapefile
+#    chunkSize (int) - number of records read at one time
+# Outputs:
+#    generator of [inID,table,FIDs] lists, with the participant ID, a shapeTable of the participant's
+#    records, and the FID of each record, sorted by participant ID.  Records of each participant are in
+#    FID order
+def iterPartitionedParticipants(inShapefile,chunkSize):
+    partitionFolder = tempfile.mkdtemp()
+    partitionFiles = {}
+    try:
+        for [start,chunk] in shapefileIO.readShapefileChunks(inShapefile,chunkSize):
+            [chunkIDs,rowOrder,bounds] = groupParticipants(chunk)
+            records = chunk.getRecords(np.arange(start,start + chunk.getNumRecords()))[rowOrder]
+            for i in range(0,len(chunkIDs)):
+                if(chunkIDs[i] not in partitionFiles):
+                    partitionFiles[chunkIDs[i]] = os.path.join(partitionFolder,"participant" + str(len(partitionFiles)) + ".bin")
+                with open(partitionFiles[chunkIDs[i]],'ab') as outStream:
+                    records[bounds[i]:bounds[i+1]].tofile(outStream)
+        if(len(partitionFiles) == 0):
+            return
+        spillType = shapefileIO.makeSpillType(chunk.fields)
+        for inID in sorted(partitionFiles):
+            records = np.fromfile(partitionFiles[inID],dtype=spillType)
+            os.remove(partitionFiles[inID])
+            yield([inID] + shapefileIO.tableFromRecords(records,chunk.fields,chunk.getPrj(),chunk.encoding))
+    finally:
+        shutil.rmtree(partitionFolder,ignore_errors=True)
+
+
+
+# identify hotspots and assign zones for participant data that is too large to fit in memory.  Participants
+# are read one at a time, and the csv rows, tagged participant data, and hotspot centers of each participant
+# are written as soon as the participant is completed
+# Inputs:
+#    inShapefile (string) - filepath to the participant shapefile
+#    chunkSize (int) - number of records read at one time
+#    isSorted (boolean) - true if the records of each participant are stored together in the shapefile
+#    outputCSV (string) - filepath to the output csv file
+#    outputFile (string) - filepath to the output shapefile of tagged participant data
+#    outputHotspots (string) - filepath to the output shapefile of hotspot centers
+#    outputColumnar (string) - optional filepath to a columnar copy of the csv results
+def streamHotSpots(inShapefile,chunkSize,isSorted,outputCSV,outputFile,outputHotspots,outputColumnar=None):
+    if(isSorted):
+        participants = iterSortedParticipants(inShapefile,chunkSize)
+    else:
+        participants = iterPartitionedParticipants(inShapefile,chunkSize)
+    zoneWriter = shapefileIO.shapefileWriter(outputFile)
+    centerWriter = shapefileIO.shapefileWriter(outputHotspots)
+    columnSets = []
+    ofStream = open(outputCSV,'w',newline='')
+    hotspotExport.writeCSVHeader(ofStream,CSV_DICT)
+    for [idVal,table,FIDs] in participants:
+        startTime = time.time()
+        hotSpotSubset = identifyHotSpots(table,idVal,np.arange(0,table.getNumRecords()))
+        print("participant " + str(idVal) + " took " + str(round(time.time() - startTime,3)) + " seconds")
+        if(hotSpotSubset != "null"):
+            columnSets.append(hotSpotSubset)
+            hotspotExport.writeCSVRows(ofStream,columnSets[-1])
+            ofStream.flush()
+        else:
+            print("warning: no hotspots for participant " + str(idVal))
+        [output,centers] = tagZones(table,FIDs,[0,table.getNumRecords()],[[idVal,hotSpotSubset,0]])
+        zoneWriter.writeTable(output)
+        centerWriter.writeTable(centers)
+    ofStream.close()
+    zoneWriter.close()
+    centerWriter.close()
+    if(outputColumnar is not None):
+        hotspotExport.writeColumnar(hotspotExport.concatColumns(columnSets,CSV_DICT),outputColumnar)
+    print("completed writing output files: " + outputCSV + ", " + outputFile)
             
             
 ################# main function #################    
 
 
 def main():
-    uniqueIDs = uniqueValues(participantData,ID_ATTRIBUTE)
+    if(STREAMING):
+        streamHotSpots(participantData,CHUNK_SIZE,SORTED_INPUT,outputFile,outputShapefile,hotspotShapefile,
+                       columnarFile if WRITE_COLUMNAR else None)
+        print("completed main function")
+        return
+    [uniqueIDs,results] = identifyAllHotSpots(participantData,NUM_WORKERS)
     hotSpotSets = []
-    #for each participant in the study, calculate the hostpots for that participant
-    for idVal in uniqueIDs:
-            hotSpotSubset = identifyHotSpots(participantData,idVal)
+    # for each participant in the study, collect the hostpots for that participant
+    for [idVal,hotSpotSubset,runTime] in results:
+            print("participant " + str(idVal) + " took " + str(round(runTime,3)) + " seconds")
             if(hotSpotSubset != "null"):
                 hotSpotSets.append(hotSpotSubset)
             else:
                 print("warning: no hotspots for participant " + str(idVal))
-    writeCSV(hotSpotSets, outputFile)
-    assignZones(participantData,hotspotShapefile,outputShapefile,uniqueIDs)
+    columns = writeCSV(hotSpotSets, outputFile)
+    if(WRITE_COLUMNAR):
+        hotspotExport.writeColumnar(columns,columnarFile)
+    assignZones(shapefileIO.readShapefile(participantData),results,outputShapefile,hotspotShapefile)
     print("completed main function")
 
 
 
     
-    
-main()
+# worker processes import this script, so the main function only runs in the main process
+if __name__ == "__main__":
+    main()
 
 
 ############## end of identifyHotspots.py ##################
@@ -1,99 +1,96 @@
 ############## extractLandTypes.py ###################
 # Author: Andrew Larkin
 # Developed for Laurel Kincl and Perry Hystad, Oregon State University
-# Date last modified: November 5th, 2016
+# Date last modified: October 17th, 2026
 
 # Description: this script combines the National Land Classification Database and rasters of 
 # monthly NDVI estiamtes to create type-specific NDVI estimates.  The script works by 
-# creating binary rasters of each land type and then taking the product of each
-# binary and monthly NDVI raster.  
+# converting the land classification to land type codes with a lookup table and keeping the
+# monthly NDVI values of each land type (landTypeEngine.py).  The rasters are processed in 
+# windows by parallel worker processes.  Each window of the land classification raster and of 
+# each monthly NDVI raster is read once, and the windows of all type-specific NDVI rasters for 
+# the month are written from it, so the whole rasters are never held in memory and binary 
+# rasters of each land type are no longer created.  By default, the type-specific NDVI values are
+# saved in a land type store, with one raster of land type codes and one copy of each monthly NDVI
+# raster, about 7 times less disk space than a mostly zero raster for each type and month.  
+# Type-specific NDVI rasters (e.g. hay NDVI for September) are read from the store with 
+# landTypeEngine.landTypeStore.  Set WRITE_DENSE to write a raster for each type and month instead.
+# Overviews (pyramids) of the outputs are created when BUILD_OVERVIEWS is true.  To check an existing
+# land type store, set QA_LEVEL to an overview level.  The cover and mean NDVI of each land type and
+# month are then printed from that overview, which reads 4^QA_LEVEL times fewer cells, and no rasters
+# are written.
 
 # Requirements:
-#      ArcGIS with a liscence for the Spatial Analysis Library
+#      numpy, for the land type engine in landTypeEngine.py and for reading and writing rasters with
+#      shared/rasterIO.py
 # Tested and developed on:
-#      Windows 10
-#      Python 2.7
-#      ArcGIS 10.3.1
+#      Linux
+#      Python 3.11
 
 ################### setup ####################
 
 #import modules
-import arcpy
+import multiprocessing
 import os
 import sys
+import landTypeEngine
 
 # folder paths and variables
 baseFolder = os.path.dirname(sys.argv[0]) + "/"
 landClassRaster = baseFolder + "OregonLandClassification.tif" 
-classFolder = baseFolder + "classTypes/" # folder to store binary rasters of class types
 NDVI_Folder = baseFolder + "NDVI/" # parent folder containing all of the subset NDVI folders
 NDVI_GeneralFolder = NDVI_Folder + "general/" # monthly NDVI values, not type-specific
-NDVI_TypeFolder = NDVI_Folder + "typeSpecific/" # type specific NDVI values (e.g. NDVI from hay)
+NDVI_TypeFolder = NDVI_Folder + "typeSpecific/" # type specific NDVI values (e.g. NDVI from hay), when WRITE_DENSE is true
+NDVI_StoreFolder = NDVI_Folder + "typeStore/" # land type store with land type codes and monthly NDVI values
 monthVars = ["August","September","October"] # variable months.  Must be included in the monthly NDVI variable names
-classFiles = [classFolder + "urbanClass.tif",classFolder + "forestClass.tif", classFolder + "shrubClass.tif", classFolder + "grasslandClass.tif", 
-              classFolder + "hayClass.tif", classFolder + "cropClass.tif", classFolder + "wetlandsClass.tif"]
+classNames = ["urban","forest","shrub","grassland","hay","crop","wetlands"] # land types.  Included in the type specific NDVI variable names
+NUM_WORKERS = multiprocessing.cpu_count() # number of processes used to create the rasters.  1 processes all windows in the main process
+BLOCK_SIZE = 1024 # width and height of the windows processed at one time, in cells.  Larger windows use more memory in each process
+WRITE_DENSE = False # if true, write a raster for each type and month to NDVI_TypeFolder instead of the land type store
+BUILD_OVERVIEWS = True # if true, create overviews of the output rasters for coarse checks and exposure estimates
+QA_LEVEL = None # overview level used to summarize an existing land type store.  None creates the outputs instead
 
 # classifications were collapsed into more general categories of interest (e.g. low, mid, and high urban collapsed into urban).  Range of collapsable
 # values were defined as max and min of the ranges, defined by the following variables
 outputMins = [21,41,52,71,81,82,90]
 outputMaxs = [24,43,52,71,81,82,95]
 
-# environmental variables and checkout extension libraries
-arcpy.CheckOutExtension("Spatial")
-arcpy.env.overwriteOutput = True
-
-############### helper functions ################
-
-
-
-# Create a binary raster from select categorical values in input classification image.
-# The result contains 1 for values that fall within the input minimum and maximum values
-# (inclusive), 0 otherwise
-# Inputs:
-#    inRas (string) - complete filepath to input raster
-#    extractMin (int) - lower bound for range of inclusive values
-#    extractMax (int) - upper bound for range of inclusive values
-#    outRas (string) - complete filepath for the output raster
-def extractValueRange(inRas,extractMin,extractMax,outRas):
-    # SQL clause used by ArcGIS
-    whereClause = "VALUE >= " + str(extractMin) + " AND VALUE <= " + str(extractMax)
-    # extract values from raster and save in output file
-    tempExtract = arcpy.sa.ExtractByAttributes(inRas, whereClause)   
-    tempRas = arcpy.sa.Con(arcpy.sa.IsNull(tempExtract),0, 1)
-    tempRas.save(outRas)
-    print("completed extracting values for the " + outRas + " outputfile")
-
-# Craete type-specific NDVI rasters.  Rasters are created by multiplying NDVI
-# rasters with binary classification rasters
-# Inputs:
-#    NDVIRas (ArcGIS layer) - layer containing NDVI values for the time interval of interest
-#    typeRas (ArcGIS layer) - binary classification layer, with 1 for types of interest, 0 o.w.
-#    outRas (string) - complete filepath for the output file to create
-def calcTypeNDVI(NDVIRas,typeRas,outRas):
-    tempRas = arcpy.sa.Times(NDVIRas,typeRas)
-    tempRas.save(outRas)
-
 ################### main function ###############
 
 def main():
     
+    # summarize the land type store from an overview instead of creating the outputs
+    if QA_LEVEL is not None:
+        [summary,bytesRead] = landTypeEngine.summarizeStore(NDVI_StoreFolder,QA_LEVEL)
+        print("month, land type, fraction of cells, mean NDVI")
+        for [monthName,typeName,coverFraction,meanNDVI] in summary:
+            print(monthName + ", " + typeName + ", " + str(round(coverFraction,4)) + ", " + str(round(meanNDVI,4)))
+        print("completed QA summary from overview level " + str(QA_LEVEL) + " (" + str(round(bytesRead/1e6,1)) + " MB read)")
+        return
+
+    NDVI_Inputs = [NDVI_GeneralFolder + monthVars[i] + "NDVI.tif" for i in range(0,len(monthVars))]
+
+    # save the land type codes and monthly NDVI values in the land type store
+    if not WRITE_DENSE:
+        landTypeEngine.writeLandTypeStore(landClassRaster,NDVI_Inputs,monthVars,classNames,NDVI_StoreFolder,outputMins,outputMaxs,NUM_WORKERS,BLOCK_SIZE,BUILD_OVERVIEWS)
+        print("completed main function")
+        return
+
     # for each monthly NDVI raster, create a folder to store values if the folder doesn't already exist
+    NDVI_Outputs = []
     for i in range(0,len(monthVars)):
         if not os.path.exists(NDVI_TypeFolder + monthVars[i] + "/"):
-            os.mkdir(NDVI_TypeFolder + monthVars)
-            
-    # for each classification type defined in the classFiles array, create the binary classification rasters
-    for i in range(0,len(classFiles)):
-        extractValueRange(landClassRaster,outputMins[i],outputMaxs[i],classFiles[i])
-        # for each monthly NDVI raster, calculate type-specific NDVI values and save in the output rasters
-        for j in range(0,len(monthVars)):
-            NDVI_Input = NDVI_GeneralFolder + monthVars[j] + "NDVI.tif"
-            NDVI_Output = NDVI_TypeFolder + monthVars[j] + "/" + (classFiles[i][len(classFolder):len(classFiles[i]) - len("Class.tif")]) + "NDVI" + monthVars[j] + ".tif"
-            calcTypeNDVI(NDVI_Input,classFiles[i],NDVI_Output)
+            os.makedirs(NDVI_TypeFolder + monthVars[i] + "/")
+        NDVI_Outputs.append([NDVI_TypeFolder + monthVars[i] + "/" + className + "NDVI" + monthVars[i] + ".tif" for className in classNames])
+
+    # calculate type-specific NDVI values for all classification types and months in one pass over the rasters
+    landTypeEngine.splitLandTypes(landClassRaster,NDVI_Inputs,NDVI_Outputs,outputMins,outputMaxs,NUM_WORKERS,BLOCK_SIZE,BUILD_OVERVIEWS)
     print("completed main function")
     
     
-main()
+# worker processes import this script, so the main function only runs in the main process
+if __name__ == "__main__":
+    main()
 
 
 
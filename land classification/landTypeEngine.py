@@ -0,0 +1,696 @@
+############## landTypeEngine.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl and Perry Hystad, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module splits monthly NDVI rasters into land type specific NDVI rasters without arcpy.
+# The land classification and NDVI rasters are processed in windows of cells.  Each window of the land
+# classification raster is read once and converted to land type codes with a 256 entry lookup table,
+# built from the ranges of classification values that make up each land type.  Each window of a monthly
+# NDVI raster is then read once, and the windows of all land type NDVI rasters for the month are written
+# from it.  Cells of other land types are set to 0, and NDVI NoData cells stay NoData, as in the product
+# of the NDVI raster and a binary raster of the land type.  Windows are processed in parallel by a pool
+# of worker processes, which each hold one window at a time, so memory use does not depend on raster size.
+# Instead of seven mostly zero rasters per month, the land types can be saved in a land type store, with
+# one raster of 8 bit land type codes and one copy of each month's NDVI raster.  The store is read with
+# virtual land type rasters (e.g. hay NDVI for September), which are calculated from the codes and NDVI
+# values of each window as it is read, so dense land type rasters are never written.  Overviews (pyramids)
+# of the output rasters can be created, so that coarse checks of the land type cover and NDVI of each month
+# read a small overview instead of the full resolution rasters.
+
+# Requirements:
+#      numpy
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"shared"))
+import rasterIO
+
+# constants
+BLOCK_SIZE = 1024 # width and height of the windows processed at one time, in cells.  Must be a multiple of rasterIO.TILE_SIZE
+NUM_CODES = 256 # number of entries in the land type lookup table, one for each 8 bit classification value
+NO_TYPE = 0 # land type code of cells that are not in any land type
+CODE_FILE = "landTypes.tif" # raster of land type codes in a land type store
+TYPE_FILE = "landTypes.txt" # code, name, and classification values of each land type in a land type store
+TYPE_HEADER = "# code\tland type\tlowest class\thighest class\n" # first line of TYPE_FILE
+STORE_SUFFIX = "NDVI.tif" # end of the name of each monthly NDVI raster in a land type store
+ALL_TYPES = "NDVI" # land type name of views of the NDVI values of all land types
+
+# data opened once in each worker process
+workerData = {}
+
+
+
+############### helper functions ##############
+
+# create a lookup table from classification values to land type codes.  Land type i has code i + 1
+# Inputs:
+#    inMins (int list) - lowest classification value of each land type
+#    inMaxs (int list) - highest classification value of each land type
+# Outputs:
+#    lookup (uint8 array) - land type code of each classification value from 0 to 255
+def makeClassLookup(inMins,inMaxs):
+    lookup = np.full(NUM_CODES,NO_TYPE,dtype=np.uint8)
+    for typeNum in range(0,len(inMins)):
+        if(inMins[typeNum] < 0 or inMaxs[typeNum] >= NUM_CODES or inMins[typeNum] > inMaxs[typeNum]):
+            raise ValueError("invalid classification range " + str(inMins[typeNum]) + " to " + str(inMaxs[typeNum]))
+        if(np.any(lookup[inMins[typeNum]:inMaxs[typeNum] + 1] != NO_TYPE)):
+            raise ValueError("classification ranges overlap at " + str(inMins[typeNum]) + " to " + str(inMaxs[typeNum]))
+        lookup[inMins[typeNum]:inMaxs[typeNum] + 1] = typeNum + 1
+    return(lookup)
+
+
+# convert classification values to land type codes.  NoData cells and values outside of the lookup table
+# are not in any land type
+# Inputs:
+#    classValues (2D array) - land classification values
+#    lookup (uint8 array) - land type code of each classification value, from makeClassLookup
+#    noData (float) - NoData value of the land classification raster, or None
+# Outputs:
+#    codes (2D uint8 array) - land type code of each cell
+def classifyWindow(classValues,lookup,noData):
+    if(classValues.dtype == np.uint8):
+        codes = lookup[classValues]
+    else:
+        inRange = (classValues >= 0) & (classValues < NUM_CODES)
+        codes = np.full(classValues.shape,NO_TYPE,dtype=np.uint8)
+        codes[inRange] = lookup[classValues[inRange].astype(np.int64)]
+    if(noData is not None):
+        codes[classValues == noData] = NO_TYPE
+    return(codes)
+
+
+# find NDVI NoData cells
+# Inputs:
+#    ndviValues (2D array) - NDVI values
+#    noData (float) - NoData value of the NDVI raster, or None
+# Outputs:
+#    isMissing (2D boolean array) - true for NoData and NaN cells
+def findMissing(ndviValues,noData):
+    isMissing = np.zeros(ndviValues.shape,dtype=bool)
+    if(ndviValues.dtype.kind == 'f'):
+        isMissing |= np.isnan(ndviValues)
+    if(noData is not None):
+        isMissing |= ndviValues == noData
+    return(isMissing)
+
+
+# split a window of NDVI values into the NDVI values of each land type.  Cells of other land types are 0,
+# and NoData cells keep their NDVI value
+# Inputs:
+#    ndviValues (2D array) - NDVI values
+#    codes (2D uint8 array) - land type code of each cell, from classifyWindow
+#    typeCodes (int list) - land type codes to return
+#    noData (float) - NoData value of the NDVI raster, or None
+# Outputs:
+#    iterator of 2D arrays with the NDVI values of each land type in typeCodes
+def iterTypeValues(ndviValues,codes,typeCodes,noData):
+    baseValues = np.where(findMissing(ndviValues,noData),ndviValues,0).astype(ndviValues.dtype)
+    for typeCode in typeCodes:
+        yield np.where(codes == typeCode,ndviValues,baseValues)
+
+
+# divide a raster into windows.  Windows are square blocks, except when an input raster is stored in strips,
+# in which case windows are bands of whole rows with about as many cells as a block, so that each strip is
+# only read once.  Windows start at the corners of output tiles
+# Inputs:
+#    numRows (int) - number of rows in the rasters
+#    numCols (int) - number of columns in the rasters
+#    blockSize (int) - width and height of square windows, in cells
+#    inReaders (rasterReader list) - input rasters
+# Outputs:
+#    windows (list) - first row, first column, number of rows, and number of columns of each window
+def getWindows(numRows,numCols,blockSize,inReaders):
+    if(blockSize % rasterIO.TILE_SIZE != 0):
+        raise ValueError("block size must be a multiple of " + str(rasterIO.TILE_SIZE) + ", not " + str(blockSize))
+    [windowRows,windowCols] = [blockSize,blockSize]
+    if(any([reader.getBlockShape()[1] == numCols for reader in inReaders]) and numCols > blockSize):
+        windowRows = max((blockSize*blockSize//numCols)//rasterIO.TILE_SIZE,1)*rasterIO.TILE_SIZE
+        windowCols = numCols
+    windows = []
+    for row in range(0,numRows,windowRows):
+        for col in range(0,numCols,windowCols):
+            windows.append([row,col,min(windowRows,numRows - row),min(windowCols,numCols - col)])
+    return(windows)
+
+
+# open the input and output rasters in a worker process
+# Inputs:
+#    classFile (string) - filepath to the land classification raster
+#    ndviFiles (string list) - filepath to the NDVI raster of each month
+#    outFiles (list of string lists) - filepath to the NDVI raster of each land type, for each month.  When
+#    codeFile is given, the filepath to the copy of the NDVI raster in the land type store, for each month
+#    lookup (uint8 array) - land type code of each classification value, from makeClassLookup
+#    codeFile (string) - filepath to the land type code raster of a land type store, or None
+def initWorker(classFile,ndviFiles,outFiles,lookup,codeFile=None):
+    workerData["classReader"] = rasterIO.rasterReader(classFile)
+    workerData["ndviReaders"] = [rasterIO.rasterReader(ndviFile) for ndviFile in ndviFiles]
+    workerData["writers"] = [[rasterIO.rasterWriter(outFile) for outFile in monthFiles] for monthFiles in outFiles]
+    workerData["lookup"] = lookup
+    workerData["codeWriter"] = None if codeFile is None else rasterIO.rasterWriter(codeFile)
+
+
+# close the rasters opened by initWorker
+def closeWorker():
+    workerData["classReader"].close()
+    for reader in workerData["ndviReaders"]:
+        reader.close()
+    for monthWriters in workerData["writers"]:
+        for writer in monthWriters:
+            writer.close()
+    if(workerData["codeWriter"] is not None):
+        workerData["codeWriter"].close()
+    workerData.clear()
+
+
+# write the land type NDVI values of one window for all months.  The land classification window and the
+# window of each NDVI raster are read once.  For a land type store, the land type codes and the NDVI
+# values are written instead
+# Inputs:
+#    inWindow (list) - first row, first column, number of rows, and number of columns of the window
+# Outputs:
+#    bytesRead (int) - number of bytes read from the input rasters
+def runWindow(inWindow):
+    classReader = workerData["classReader"]
+    startBytes = classReader.getBytesRead() + sum([reader.getBytesRead() for reader in workerData["ndviReaders"]])
+    codes = classifyWindow(classReader.readWindow(*inWindow),workerData["lookup"],classReader.getNoData())
+    if(workerData["codeWriter"] is not None):
+        workerData["codeWriter"].writeWindow(inWindow[0],inWindow[1],codes)
+    for monthNum in range(0,len(workerData["ndviReaders"])):
+        ndviReader = workerData["ndviReaders"][monthNum]
+        monthWriters = workerData["writers"][monthNum]
+        if(workerData["codeWriter"] is not None):
+            monthWriters[0].writeWindow(inWindow[0],inWindow[1],ndviReader.readWindow(*inWindow))
+            continue
+        typeValues = iterTypeValues(ndviReader.readWindow(*inWindow),codes,range(1,len(monthWriters) + 1),ndviReader.getNoData())
+        for typeNum in range(0,len(monthWriters)):
+            monthWriters[typeNum].writeWindow(inWindow[0],inWindow[1],next(typeValues))
+    endBytes = classReader.getBytesRead() + sum([reader.getBytesRead() for reader in workerData["ndviReaders"]])
+    return(endBytes - startBytes)
+
+
+# check that the land classification and NDVI rasters cover the same cells, and create the output rasters
+# with the data type, georeferencing, and NoData value of the NDVI raster of the same month
+# Inputs:
+#    classFile (string) - filepath to the land classification raster
+#    ndviFiles (string list) - filepath to the NDVI raster of each month
+#    outFiles (list of string lists) - filepath to the output rasters of each month
+#    blockSize (int) - width and height of the windows processed at one time, in cells
+# Outputs:
+#    windows (list) - first row, first column, number of rows, and number of columns of each window
+def createOutputs(classFile,ndviFiles,outFiles,blockSize):
+    classReader = rasterIO.rasterReader(classFile)
+    ndviReaders = [rasterIO.rasterReader(ndviFile) for ndviFile in ndviFiles]
+    for monthNum in range(0,len(ndviFiles)):
+        if(not classReader.sameGrid(ndviReaders[monthNum])):
+            raise ValueError(ndviFiles[monthNum] + " does not cover the same cells as " + classFile)
+        for outFile in outFiles[monthNum]:
+            rasterIO.createRaster(outFile,classReader.getNumRows(),classReader.getNumCols(),ndviReaders[monthNum].getDtype(),
+                                  ndviReaders[monthNum].getGeoTags(),ndviReaders[monthNum].getNoData())
+    windows = getWindows(classReader.getNumRows(),classReader.getNumCols(),blockSize,[classReader] + ndviReaders)
+    for reader in [classReader] + ndviReaders:
+        reader.close()
+    return(windows)
+
+
+# process windows in the main process or with a pool of worker processes
+# Inputs:
+#    windows (list) - first row, first column, number of rows, and number of columns of each window
+#    numWorkers (int) - number of worker processes.  1 processes all windows in the main process
+#    workerArgs (list) - arguments of initWorker
+# Outputs:
+#    bytesRead (int) - number of bytes read from the input rasters
+def runWindows(windows,numWorkers,workerArgs):
+    if(numWorkers <= 1):
+        initWorker(*workerArgs)
+        try:
+            bytesRead = sum([runWindow(window) for window in windows])
+        finally:
+            closeWorker()
+    else:
+        pool = multiprocessing.Pool(numWorkers,initWorker,workerArgs)
+        bytesRead = sum(pool.imap_unordered(runWindow,windows))
+        pool.close()
+        pool.join()
+    return(bytesRead)
+
+
+# create the land type NDVI rasters for each month from a land classification raster and monthly NDVI
+# rasters.  All rasters must cover the same cells.  Output rasters have the data type, georeferencing,
+# and NoData value of the NDVI raster of the same month
+# Inputs:
+#    classFile (string) - filepath to the land classification raster
+#    ndviFiles (string list) - filepath to the NDVI raster of each month
+#    outFiles (list of string lists) - filepath to the NDVI raster of each land type, for each month
+#    inMins (int list) - lowest classification value of each land type
+#    inMaxs (int list) - highest classification value of each land type
+#    numWorkers (int) - number of worker processes.  1 processes all windows in the main process
+#    blockSize (int) - width and height of the windows processed at one time, in cells
+#    makeOverviews (boolean) - true to create the overviews of each output raster
+# Outputs:
+#    bytesRead (int) - number of bytes read from the input rasters
+def splitLandTypes(classFile,ndviFiles,outFiles,inMins,inMaxs,numWorkers,blockSize=BLOCK_SIZE,makeOverviews=False):
+    lookup = makeClassLookup(inMins,inMaxs)
+    if(any([len(monthFiles) != len(inMins) for monthFiles in outFiles])):
+        raise ValueError("one output raster is needed for each land type")
+    windows = createOutputs(classFile,ndviFiles,outFiles,blockSize)
+    bytesRead = runWindows(windows,numWorkers,(classFile,ndviFiles,outFiles,lookup))
+    if(makeOverviews):
+        for monthFiles in outFiles:
+            for outFile in monthFiles:
+                rasterIO.buildOverviews(outFile)
+    return(bytesRead)
+
+
+# create a land type store from a land classification raster and monthly NDVI rasters.  The store is a
+# folder with one raster of land type codes, one copy of the NDVI raster of each month, and a text file
+# with the name and classification values of each land type.  Land type NDVI rasters are read from the
+# store with a landTypeStore, without writing them.  All rasters must cover the same cells
+# Inputs:
+#    classFile (string) - filepath to the land classification raster
+#    ndviFiles (string list) - filepath to the NDVI raster of each month
+#    monthNames (string list) - name of each month
+#    typeNames (string list) - name of each land type
+#    storeFolder (string) - folder to store the land type codes and NDVI rasters
+#    inMins (int list) - lowest classification value of each land type
+#    inMaxs (int list) - highest classification value of each land type
+#    numWorkers (int) - number of worker processes.  1 processes all windows in the main process
+#    blockSize (int) - width and height of the windows processed at one time, in cells
+#    makeOverviews (boolean) - true to create the overviews of the land type code and NDVI rasters.  Both
+#    use nearest neighbour resampling, so the land type views of each overview stay aligned
+# Outputs:
+#    bytesRead (int) - number of bytes read from the input rasters
+def writeLandTypeStore(classFile,ndviFiles,monthNames,typeNames,storeFolder,inMins,inMaxs,numWorkers,blockSize=BLOCK_SIZE,makeOverviews=False):
+    lookup = makeClassLookup(inMins,inMaxs)
+    if(len(typeNames) != len(inMins) or len(monthNames) != len(ndviFiles)):
+        raise ValueError("one name is needed for each land type and month")
+    if(ALL_TYPES in typeNames):
+        raise ValueError(ALL_TYPES + " can not be used as a land type name")
+    if not os.path.exists(storeFolder):
+        os.makedirs(storeFolder)
+    outFiles = [[storeFolder + monthName + STORE_SUFFIX] for monthName in monthNames]
+    windows = createOutputs(classFile,ndviFiles,outFiles,blockSize)
+    classReader = rasterIO.rasterReader(classFile)
+    rasterIO.createRaster(storeFolder + CODE_FILE,classReader.getNumRows(),classReader.getNumCols(),np.uint8,classReader.getGeoTags())
+    classReader.close()
+    bytesRead = runWindows(windows,numWorkers,(classFile,ndviFiles,outFiles,lookup,storeFolder + CODE_FILE))
+    with open(storeFolder + TYPE_FILE,'w') as outStream:
+        outStream.write(TYPE_HEADER)
+        for typeNum in range(0,len(typeNames)):
+            outStream.write(str(typeNum + 1) + "\t" + typeNames[typeNum] + "\t" + str(inMins[typeNum]) + "\t" + str(inMaxs[typeNum]) + "\n")
+    if(makeOverviews):
+        for outFile in [storeFolder + CODE_FILE] + [monthFiles[0] for monthFiles in outFiles]:
+            rasterIO.buildOverviews(outFile)
+    return(bytesRead)
+
+
+# summarize the land type cover and mean NDVI of each month of a land type store.  The summary can be read
+# from an overview of the store, which reads a fraction of the cells of the full resolution rasters
+# Inputs:
+#    storeFolder (string) - folder of the land type store
+#    level (int) - pyramid level to read.  0 is the full resolution rasters, and each level has half the rows
+#    and columns of the previous level
+#    blockSize (int) - width and height of the windows read at one time, in cells
+# Outputs:
+#    summary (list) - month name, land type name, fraction of cells with NDVI values that are in the land type,
+#    and mean NDVI of the land type, for each month and land type
+#    bytesRead (int) - number of bytes read from the store
+def summarizeStore(storeFolder,level,blockSize=BLOCK_SIZE):
+    store = landTypeStore(storeFolder)
+    if(level >= store.codeReader.getNumLevels()):
+        store.close()
+        raise ValueError("the land type store has no overview at level " + str(level) + ", only " + str(store.codeReader.getNumLevels() - 1))
+    [numRows,numCols] = [store.codeReader.getNumRows(level),store.codeReader.getNumCols(level)]
+    summary = []
+    for monthName in store.getMonthNames():
+        ndviReader = store.getNDVIReader(monthName)
+        [typeCounts,typeSums] = [np.zeros(NUM_CODES),np.zeros(NUM_CODES)]
+        for row in range(0,numRows,blockSize):
+            for col in range(0,numCols,blockSize):
+                window = [row,col,min(blockSize,numRows - row),min(blockSize,numCols - col),level]
+                ndviValues = ndviReader.readWindow(*window)
+                isValid = ~findMissing(ndviValues,ndviReader.getNoData())
+                codes = store.codeReader.readWindow(*window)[isValid]
+                typeCounts += np.bincount(codes,minlength=NUM_CODES)
+                typeSums += np.bincount(codes,weights=ndviValues[isValid].astype(np.float64),minlength=NUM_CODES)
+        for typeName in store.getTypeNames():
+            typeCode = store.typeCodes[typeName]
+            meanNDVI = typeSums[typeCode]/typeCounts[typeCode] if typeCounts[typeCode] > 0 else float('nan')
+            summary.append([monthName,typeName,typeCounts[typeCode]/max(np.sum(typeCounts),1),meanNDVI])
+    bytesRead = store.codeReader.getBytesRead() + sum([store.getNDVIReader(monthName).getBytesRead() for monthName in store.getMonthNames()])
+    store.close()
+    return([summary,bytesRead])
+
+
+
+############## land type store custom class ##############
+
+class landTypeStore:
+
+    # open a land type store created by writeLandTypeStore
+    def __init__(self,storeFolder):
+        self.storeFolder = storeFolder
+        self.typeCodes = {}
+        with open(storeFolder + TYPE_FILE) as inStream:
+            for line in inStream:
+                if(line.startswith("#") or line.strip() == ""):
+                    continue
+                fields = line.rstrip("\n").split("\t")
+                self.typeCodes[fields[1]] = int(fields[0])
+        self.monthNames = sorted([fileName[0:-len(STORE_SUFFIX)] for fileName in os.listdir(storeFolder) if fileName.endswith(STORE_SUFFIX)])
+        self.codeReader = rasterIO.rasterReader(storeFolder + CODE_FILE)
+        self.ndviReaders = {}
+
+    ########### custom functions ############
+
+    # get the reader of the NDVI raster of a month
+    # monthName (string) - name of the month
+    # outputs: rasterReader of the month's NDVI raster
+    def getNDVIReader(self,monthName):
+        if(monthName not in self.monthNames):
+            raise ValueError("no NDVI raster for " + monthName + " in " + self.storeFolder)
+        if(monthName not in self.ndviReaders):
+            self.ndviReaders[monthName] = rasterIO.rasterReader(self.storeFolder + monthName + STORE_SUFFIX)
+        return(self.ndviReaders[monthName])
+
+    # get a virtual raster of the NDVI values of one land type for one month (e.g. hay NDVI for September).
+    # The values are calculated from the land type codes and NDVI values when a window is read
+    # typeName (string) - name of the land type, or ALL_TYPES for the NDVI values of all land types
+    # monthName (string) - name of the month
+    # outputs: typeView, which is read in the same way as a rasterReader
+    def getView(self,typeName,monthName):
+        if(typeName != ALL_TYPES and typeName not in self.typeCodes):
+            raise ValueError("unknown land type " + typeName + " in " + self.storeFolder)
+        return(typeView(self.codeReader,self.getNDVIReader(monthName),self.typeCodes.get(typeName)))
+
+    # read a window of the NDVI values of several land types for one month.  The land type codes and NDVI
+    # values of the window are read once
+    # typeNames (string list) - names of the land types
+    # monthName (string) - name of the month
+    # row (int) - first row of the window
+    # col (int) - first column of the window
+    # numRows (int) - number of rows in the window
+    # numCols (int) - number of columns in the window
+    # level (int) - pyramid level.  Rows and columns are cells of this level
+    # outputs: list of 2D arrays with the NDVI values of each land type
+    def readTypeWindows(self,typeNames,monthName,row,col,numRows,numCols,level=0):
+        ndviReader = self.getNDVIReader(monthName)
+        ndviValues = ndviReader.readWindow(row,col,numRows,numCols,level)
+        codes = self.codeReader.readWindow(row,col,numRows,numCols,level)
+        return(list(iterTypeValues(ndviValues,codes,[self.typeCodes[typeName] for typeName in typeNames],ndviReader.getNoData())))
+
+    def close(self):
+        self.codeReader.close()
+        for monthName in self.ndviReaders:
+            self.ndviReaders[monthName].close()
+        self.ndviReaders = {}
+
+    ########## getters and setters ##########
+
+    def getTypeNames(self):
+        return(sorted(self.typeCodes,key=lambda typeName: self.typeCodes[typeName]))
+
+    def getMonthNames(self):
+        return(self.monthNames)
+
+    def getStoreFolder(self):
+        return(self.storeFolder)
+
+
+########### end of the land type store custom class ##########
+
+
+############## type view custom class ##############
+
+class typeView:
+
+    # typeCode (int) - land type code, or None for the NDVI values of all land types
+    def __init__(self,codeReader,ndviReader,typeCode):
+        self.codeReader = codeReader
+        self.ndviReader = ndviReader
+        self.typeCode = typeCode
+
+    ########### custom functions ############
+
+    # read the land type NDVI values of a rectangular window
+    # row (int) - first row of the window
+    # col (int) - first column of the window
+    # numRows (int) - number of rows in the window
+    # numCols (int) - number of columns in the window
+    # level (int) - pyramid level.  Rows and columns are cells of this level
+    # outputs: 2D array of NDVI values.  Cells of other land types are 0
+    def readWindow(self,row,col,numRows,numCols,level=0):
+        ndviValues = self.ndviReader.readWindow(row,col,numRows,numCols,level)
+        if(self.typeCode is None):
+            return(ndviValues)
+        codes = self.codeReader.readWindow(row,col,numRows,numCols,level)
+        return(next(iterTypeValues(ndviValues,codes,[self.typeCode],self.ndviReader.getNoData())))
+
+    # read the land type NDVI values of individual cells.  Only the tiles that contain the cells are read
+    # rows (int array) - row of each cell
+    # cols (int array) - column of each cell
+    # level (int) - pyramid level.  Rows and columns are cells of this level
+    # outputs: array of NDVI values.  Cells of other land types are 0
+    def readCells(self,rows,cols,level=0):
+        ndviValues = self.ndviReader.readCells(rows,cols,level)
+        if(self.typeCode is None):
+            return(ndviValues)
+        codes = self.codeReader.readCells(rows,cols,level)
+        return(next(iterTypeValues(ndviValues,codes,[self.typeCode],self.ndviReader.getNoData())))
+
+    # find the cells that contain map coordinates, as in rasterReader.mapToCells
+    def mapToCells(self,inX,inY,level=0):
+        return(self.ndviReader.mapToCells(inX,inY,level))
+
+    ########## getters and setters ##########
+
+    def getNumRows(self,level=0):
+        return(self.ndviReader.getNumRows(level))
+
+    def getNumCols(self,level=0):
+        return(self.ndviReader.getNumCols(level))
+
+    def getBlockShape(self,level=0):
+        return(self.ndviReader.getBlockShape(level))
+
+    # number of pyramid levels read by the view.  Levels are only used if both the codes and NDVI have them
+    def getNumLevels(self):
+        return(min(self.codeReader.getNumLevels(),self.ndviReader.getNumLevels()))
+
+    def getTransform(self,level=0):
+        return(self.ndviReader.getTransform(level))
+
+    def getDtype(self):
+        return(self.ndviReader.getDtype())
+
+    def getNoData(self):
+        return(self.ndviReader.getNoData())
+
+    def getGeoTags(self):
+        return(self.ndviReader.getGeoTags())
+
+
+########### end of the type view custom class ##########
+
+
+# create the land type NDVI rasters in the same way as the previous arcpy script.  For each land type, the
+# whole land classification raster is read and a binary raster of the land type is written.  For each month,
+# the whole NDVI and binary rasters are then read, and their product is written
+# Inputs:
+#    classFile (string) - filepath to the land classification raster
+#    ndviFiles (string list) - filepath to the NDVI raster of each month
+#    outFiles (list of string lists) - filepath to the NDVI raster of each land type, for each month
+#    binaryFolder (string) - folder to store the binary raster of each land type
+#    inMins (int list) - lowest classification value of each land type
+#    inMaxs (int list) - highest classification value of each land type
+# Outputs:
+#    bytesRead (int) - number of bytes read from the input and binary rasters
+def splitLandTypesByType(classFile,ndviFiles,outFiles,binaryFolder,inMins,inMaxs):
+    bytesRead = 0
+    for typeNum in range(0,len(inMins)):
+        classReader = rasterIO.rasterReader(classFile)
+        classValues = classReader.readWindow(0,0,classReader.getNumRows(),classReader.getNumCols())
+        isType = (classValues >= inMins[typeNum]) & (classValues <= inMaxs[typeNum])
+        if(classReader.getNoData() is not None):
+            isType &= classValues != classReader.getNoData()
+        binaryFile = binaryFolder + "type" + str(typeNum) + "Class.tif"
+        rasterIO.writeRaster(binaryFile,isType.astype(np.uint8),classReader.getGeoTags())
+        bytesRead += classReader.getBytesRead()
+        classReader.close()
+        for monthNum in range(0,len(ndviFiles)):
+            ndviReader = rasterIO.rasterReader(ndviFiles[monthNum])
+            ndviValues = ndviReader.readWindow(0,0,ndviReader.getNumRows(),ndviReader.getNumCols())
+            binaryReader = rasterIO.rasterReader(binaryFile)
+            product = ndviValues*binaryReader.readWindow(0,0,ndviReader.getNumRows(),ndviReader.getNumCols())
+            if(ndviReader.getNoData() is not None):
+                product[ndviValues == ndviReader.getNoData()] = ndviReader.getNoData()
+            rasterIO.writeRaster(outFiles[monthNum][typeNum],product.astype(ndviValues.dtype),ndviReader.getGeoTags(),ndviReader.getNoData())
+            bytesRead += ndviReader.getBytesRead() + binaryReader.getBytesRead()
+            ndviReader.close()
+            binaryReader.close()
+    return(bytesRead)
+
+
+# create synthetic land classification and monthly NDVI rasters.  Land classification values are drawn
+# from the NLCD classes in patches of cells, and 1% of NDVI cells are NoData
+# Inputs:
+#    outFolder (string) - folder to store the rasters
+#    numRows (int) - number of rows in the rasters
+#    numCols (int) - number of columns in the rasters
+#    numMonths (int) - number of monthly NDVI rasters
+#    inSeed (int) - random number seed
+# Outputs:
+#    classFile (string) - filepath to the land classification raster
+#    ndviFiles (string list) - filepath to the NDVI raster of each month
+def makeTestRasters(outFolder,numRows,numCols,numMonths,inSeed):
+    generator = np.random.default_rng(inSeed)
+    geoTags = {33550:[12,[30.0,30.0,0.0]],33922:[12,[0.0,0.0,0.0,-2333250.0,2929560.0,0.0]]}
+    nlcdClasses = np.array([0,11,12,21,22,23,24,31,41,42,43,52,71,81,82,90,95],dtype=np.uint8)
+    patches = generator.integers(0,len(nlcdClasses),(-(-numRows//16),-(-numCols//16)))
+    classValues = nlcdClasses[np.repeat(np.repeat(patches,16,axis=0),16,axis=1)[0:numRows,0:numCols]]
+    classFile = outFolder + "testClass.tif"
+    rasterIO.writeRaster(classFile,classValues,geoTags,0)
+    ndviFiles = []
+    for monthNum in range(0,numMonths):
+        ndviValues = generator.uniform(-0.2,0.9,(numRows,numCols)).astype(np.float32)
+        ndviValues[generator.random((numRows,numCols)) < 0.01] = -3.4028235e+38
+        ndviFiles.append(outFolder + "testNDVI" + str(monthNum) + ".tif")
+        rasterIO.writeRaster(ndviFiles[-1],ndviValues,geoTags,-3.4028235e+38)
+    return([classFile,ndviFiles])
+
+
+# compare the windowed engine with one pass per land type (the previous approach) for synthetic rasters.
+# The run time, the number of bytes read, and whether both approaches create the same rasters are reported
+# Inputs:
+#    rasterSizes (list) - number of rows and columns of each test
+#    inMins (int list) - lowest classification value of each land type
+#    inMaxs (int list) - highest classification value of each land type
+#    numMonths (int) - number of monthly NDVI rasters
+def benchmarkEngine(rasterSizes=[[2048,2048],[4096,4096]],inMins=[21,41,52,71,81,82,90],inMaxs=[24,43,52,71,81,82,95],numMonths=3):
+    print("cells, one pass per type (s), one pass per type (MB read), windowed (s), windowed (MB read), same rasters")
+    for [numRows,numCols] in rasterSizes:
+        outFolder = tempfile.mkdtemp() + "/"
+        try:
+            [classFile,ndviFiles] = makeTestRasters(outFolder,numRows,numCols,numMonths,numRows)
+            typeFiles = [[outFolder + "type" + str(i) + "Month" + str(j) + ".tif" for i in range(0,len(inMins))] for j in range(0,numMonths)]
+            windowFiles = [[outFolder + "window" + str(i) + "Month" + str(j) + ".tif" for i in range(0,len(inMins))] for j in range(0,numMonths)]
+            startTime = time.time()
+            typeBytes = splitLandTypesByType(classFile,ndviFiles,typeFiles,outFolder,inMins,inMaxs)
+            typeTime = time.time() - startTime
+            startTime = time.time()
+            windowBytes = splitLandTypes(classFile,ndviFiles,windowFiles,inMins,inMaxs,multiprocessing.cpu_count())
+            windowTime = time.time() - startTime
+            isSame = all([np.array_equal(rasterIO.readRaster(typeFiles[j][i]),rasterIO.readRaster(windowFiles[j][i]))
+                          for i in range(0,len(inMins)) for j in range(0,numMonths)])
+            print(str(numRows*numCols) + ", " + str(round(typeTime,3)) + ", " + str(round(typeBytes/1e6,1)) + ", " +
+                  str(round(windowTime,3)) + ", " + str(round(windowBytes/1e6,1)) + ", " + str(isSame))
+        finally:
+            shutil.rmtree(outFolder)
+
+
+# compare a land type store with dense land type NDVI rasters for synthetic rasters.  The run time and
+# disk use of each output, the time and number of bytes read to load the NDVI values of all land types,
+# and whether views of the store match the dense rasters are reported
+# Inputs:
+#    rasterSizes (list) - number of rows and columns of each test
+#    typeNames (string list) - name of each land type
+#    inMins (int list) - lowest classification value of each land type
+#    inMaxs (int list) - highest classification value of each land type
+#    numMonths (int) - number of monthly NDVI rasters
+def benchmarkStore(rasterSizes=[[2048,2048],[4096,4096]],typeNames=["urban","forest","shrub","grassland","hay","crop","wetlands"],
+                   inMins=[21,41,52,71,81,82,90],inMaxs=[24,43,52,71,81,82,95],numMonths=3):
+    print("cells, dense (s), dense (MB on disk), store (s), store (MB on disk), dense load (s), dense load (MB read), store load (s), store load (MB read), same values")
+    for [numRows,numCols] in rasterSizes:
+        outFolder = tempfile.mkdtemp() + "/"
+        try:
+            [classFile,ndviFiles] = makeTestRasters(outFolder,numRows,numCols,numMonths,numRows)
+            monthNames = ["month" + str(j) for j in range(0,numMonths)]
+            denseFiles = [[outFolder + typeNames[i] + "NDVI" + monthNames[j] + ".tif" for i in range(0,len(inMins))] for j in range(0,numMonths)]
+            startTime = time.time()
+            splitLandTypes(classFile,ndviFiles,denseFiles,inMins,inMaxs,multiprocessing.cpu_count())
+            denseTime = time.time() - startTime
+            denseSize = sum([os.path.getsize(outFile) for monthFiles in denseFiles for outFile in monthFiles])
+            startTime = time.time()
+            writeLandTypeStore(classFile,ndviFiles,monthNames,typeNames,outFolder + "store/",inMins,inMaxs,multiprocessing.cpu_count())
+            storeTime = time.time() - startTime
+            storeSize = sum([os.path.getsize(outFolder + "store/" + fileName) for fileName in os.listdir(outFolder + "store/")])
+            startTime = time.time()
+            [denseValues,denseBytes] = [[],0]
+            for monthFiles in denseFiles:
+                for outFile in monthFiles:
+                    reader = rasterIO.rasterReader(outFile)
+                    denseValues.append(reader.readWindow(0,0,numRows,numCols))
+                    denseBytes += reader.getBytesRead()
+                    reader.close()
+            denseLoad = time.time() - startTime
+            startTime = time.time()
+            store = landTypeStore(outFolder + "store/")
+            storeValues = []
+            for monthName in monthNames:
+                storeValues += store.readTypeWindows(typeNames,monthName,0,0,numRows,numCols)
+            storeBytes = store.codeReader.getBytesRead() + sum([store.getNDVIReader(monthName).getBytesRead() for monthName in monthNames])
+            storeLoad = time.time() - startTime
+            isSame = all([np.array_equal(denseValues[i],storeValues[i]) for i in range(0,len(denseValues))])
+            for [j,monthName] in enumerate(monthNames):
+                for [i,typeName] in enumerate(typeNames):
+                    isSame &= np.array_equal(store.getView(typeName,monthName).readWindow(0,0,numRows,numCols),denseValues[j*len(typeNames) + i])
+            store.close()
+            print(str(numRows*numCols) + ", " + str(round(denseTime,3)) + ", " + str(round(denseSize/1e6,1)) + ", " + str(round(storeTime,3)) + ", " +
+                  str(round(storeSize/1e6,1)) + ", " + str(round(denseLoad,3)) + ", " + str(round(denseBytes/1e6,1)) + ", " +
+                  str(round(storeLoad,3)) + ", " + str(round(storeBytes/1e6,1)) + ", " + str(isSame))
+        finally:
+            shutil.rmtree(outFolder)
+
+
+# compare summaries of a land type store read from each pyramid level for synthetic rasters.  The run time,
+# the number of bytes read, and the largest difference from the full resolution summary in the cover
+# fraction and mean NDVI of any land type are reported
+# Inputs:
+#    rasterSize (int list) - number of rows and columns of the test rasters
+#    typeNames (string list) - name of each land type
+#    inMins (int list) - lowest classification value of each land type
+#    inMaxs (int list) - highest classification value of each land type
+#    numMonths (int) - number of monthly NDVI rasters
+def benchmarkOverviews(rasterSize=[4096,4096],typeNames=["urban","forest","shrub","grassland","hay","crop","wetlands"],
+                       inMins=[21,41,52,71,81,82,90],inMaxs=[24,43,52,71,81,82,95],numMonths=3):
+    print("level, summary (s), summary (MB read), largest cover difference, largest mean NDVI difference")
+    outFolder = tempfile.mkdtemp() + "/"
+    try:
+        [classFile,ndviFiles] = makeTestRasters(outFolder,rasterSize[0],rasterSize[1],numMonths,rasterSize[0])
+        monthNames = ["month" + str(j) for j in range(0,numMonths)]
+        writeLandTypeStore(classFile,ndviFiles,monthNames,typeNames,outFolder + "store/",inMins,inMaxs,multiprocessing.cpu_count(),makeOverviews=True)
+        store = landTypeStore(outFolder + "store/")
+        numLevels = store.codeReader.getNumLevels()
+        store.close()
+        for level in range(0,numLevels):
+            startTime = time.time()
+            [summary,bytesRead] = summarizeStore(outFolder + "store/",level)
+            summaryTime = time.time() - startTime
+            if(level == 0):
+                fullSummary = np.array([values[2:4] for values in summary])
+            errors = np.nanmax(np.abs(np.array([values[2:4] for values in summary]) - fullSummary),axis=0)
+            print(str(level) + ", " + str(round(summaryTime,3)) + ", " + str(round(bytesRead/1e6,2)) + ", " +
+                  str(round(errors[0],4)) + ", " + str(round(errors[1],4)))
+    finally:
+        shutil.rmtree(outFolder)
+
+
+# worker processes import this module, so the benchmarks only run in the main process
+if __name__ == "__main__":
+    benchmarkEngine()
+    benchmarkStore()
+    benchmarkOverviews()
+
+
+############## end of landTypeEngine.py ##################
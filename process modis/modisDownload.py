@@ -0,0 +1,554 @@
+############## modisDownload.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module downloads MODIS granules from HTTP(S) and FTP servers with several transfers
+# running in parallel.  Each transfer thread keeps its connection to the server open between files.  File
+# bodies are streamed to disk in chunks of DOWNLOAD_CHUNK_SIZE bytes, into a partial file that is renamed
+# when the transfer is complete.  Partial files left by interrupted transfers are resumed from where they
+# stopped (HTTP Range requests, FTP REST), and granules that are already on disk with the expected size or
+# checksum are skipped.  Byte ranges of files can also be read without downloading the whole file, e.g.
+# to read granule metadata.  A local HTTP server that stands in for the NASA archive is included for testing.
+
+# Requirements:
+#      none (Python standard library only)
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import ftplib
+import http.client
+import http.server
+from urllib.parse import urlparse, unquote
+from concurrent.futures import ThreadPoolExecutor
+
+# constants
+NUM_TRANSFERS = 4 # number of files downloaded in parallel
+DOWNLOAD_CHUNK_SIZE = 1048576 # number of bytes read from the server and written to disk at one time
+PART_SUFFIX = ".part" # suffix of files that are still being downloaded
+MAX_RETRIES = 3 # number of times an interrupted transfer is resumed before giving up
+TIMEOUT = 60 # number of seconds to wait for the server before a transfer is interrupted
+
+
+
+############### helper functions ##############
+
+# calculate the md5 checksum of a file, reading DOWNLOAD_CHUNK_SIZE bytes at a time
+# Inputs:
+#    inFile (string) - filepath to the file
+# Outputs:
+#    hexadecimal md5 checksum (string)
+def calcChecksum(inFile):
+    checksum = hashlib.md5()
+    with open(inFile,'rb') as ifStream:
+        block = ifStream.read(DOWNLOAD_CHUNK_SIZE)
+        while(len(block) > 0):
+            checksum.update(block)
+            block = ifStream.read(DOWNLOAD_CHUNK_SIZE)
+    return(checksum.hexdigest())
+
+
+
+########### http connection custom class ##########
+
+# custom class containing a persistent (keep-alive) connection to an HTTP or HTTPS server
+class httpConnection:
+    # instantiate an http connection.  The server is contacted when the first request is made
+    def __init__(self,scheme,host,port):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.connection = None
+
+    ########### custom functions ############
+
+    # send a request and get the response.  If the server closed the connection since the last request,
+    # the request is sent again on a new connection
+    # method (string) - HTTP method, e.g. GET or HEAD
+    # path (string) - path of the file on the server
+    # headers (dict) - additional request headers
+    def request(self,method,path,headers={}):
+        for attempt in range(0,2):
+            if(self.connection is None):
+                connectionType = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+                self.connection = connectionType(self.host,self.port,timeout=TIMEOUT)
+            try:
+                self.connection.request(method,path,headers=headers)
+                return(self.connection.getresponse())
+            except (http.client.HTTPException,OSError):
+                self.close()
+                if(attempt == 1):
+                    raise
+
+    # get the size of a file on the server, in bytes, or None if the server doesn't report it
+    # path (string) - path of the file on the server
+    def getSize(self,path):
+        response = self.request("HEAD",path)
+        response.read()
+        if(response.status != 200):
+            raise IOError("HTTP " + str(response.status) + " for " + path)
+        length = response.getheader("Content-Length")
+        return(int(length) if length is not None else None)
+
+    # stream a file from the server to an open output file, starting at a byte offset
+    # path (string) - path of the file on the server
+    # ofStream (file) - output file opened in binary mode, positioned at the offset
+    # offset (int) - number of bytes of the file that are already on disk
+    def fetch(self,path,ofStream,offset=0):
+        headers = {"Range":"bytes=" + str(offset) + "-"} if offset > 0 else {}
+        response = self.request("GET",path,headers)
+        if(response.status == 416):
+            response.read()
+            return
+        if(response.status not in (200,206)):
+            response.read()
+            raise IOError("HTTP " + str(response.status) + " for " + path)
+
+        # servers that don't support ranges send the whole file
+        if(offset > 0 and response.status == 200):
+            ofStream.seek(0)
+            ofStream.truncate()
+        block = response.read(DOWNLOAD_CHUNK_SIZE)
+        while(len(block) > 0):
+            ofStream.write(block)
+            block = response.read(DOWNLOAD_CHUNK_SIZE)
+        if(response.length is not None and response.length > 0):
+            raise IOError("connection closed before the end of " + path)
+
+    # read a range of bytes from a file on the server.  If the server doesn't support ranges, only the
+    # start of the file up to the end of the range is read, and the connection is closed
+    # path (string) - path of the file on the server
+    # start (int) - offset of the first byte
+    # stop (int) - offset after the last byte
+    # outputs: bytes of the range, which are shorter than requested if the file ends before the range
+    def fetchRange(self,path,start,stop):
+        response = self.request("GET",path,{"Range":"bytes=" + str(start) + "-" + str(stop - 1)})
+        if(response.status == 416):
+            response.read()
+            return(b"")
+        if(response.status == 206):
+            return(response.read())
+        if(response.status != 200):
+            response.read()
+            raise IOError("HTTP " + str(response.status) + " for " + path)
+        data = response.read(stop)
+        self.close()
+        return(data[start:stop])
+
+    # close the connection to the server
+    def close(self):
+        if(self.connection is not None):
+            self.connection.close()
+        self.connection = None
+
+
+########### end of the http connection custom class ##########
+
+
+
+########### ftp connection custom class ##########
+
+# custom class containing a persistent connection to an FTP server, logged in anonymously
+class ftpConnection:
+    # instantiate an ftp connection.  The server is contacted when the first request is made
+    def __init__(self,host,port):
+        self.host = host
+        self.port = port if port is not None else 21
+        self.connection = None
+
+    ########### custom functions ############
+
+    # connect and log in to the server, if not already connected
+    def connect(self):
+        if(self.connection is None):
+            self.connection = ftplib.FTP(timeout=TIMEOUT)
+            self.connection.connect(self.host,self.port)
+            self.connection.login()
+            self.connection.voidcmd("TYPE I")
+
+    # get the size of a file on the server, in bytes, or None if the server doesn't report it
+    # path (string) - path of the file on the server
+    def getSize(self,path):
+        self.connect()
+        try:
+            return(self.connection.size(path))
+        except ftplib.error_perm:
+            return(None)
+
+    # stream a file from the server to an open output file, starting at a byte offset
+    # path (string) - path of the file on the server
+    # ofStream (file) - output file opened in binary mode, positioned at the offset
+    # offset (int) - number of bytes of the file that are already on disk
+    def fetch(self,path,ofStream,offset=0):
+        self.connect()
+        self.connection.retrbinary("RETR " + path,ofStream.write,DOWNLOAD_CHUNK_SIZE,offset if offset > 0 else None)
+
+    # read a range of bytes from a file on the server.  The transfer is started at the first byte and
+    # aborted after the last byte
+    # path (string) - path of the file on the server
+    # start (int) - offset of the first byte
+    # stop (int) - offset after the last byte
+    # outputs: bytes of the range, which are shorter than requested if the file ends before the range
+    def fetchRange(self,path,start,stop):
+        self.connect()
+        blocks = []
+        numBytes = 0
+        with self.connection.transfercmd("RETR " + path,start if start > 0 else None) as dataSocket:
+            while(numBytes < stop - start):
+                block = dataSocket.recv(min(DOWNLOAD_CHUNK_SIZE,stop - start - numBytes))
+                if(len(block) == 0):
+                    break
+                blocks.append(block)
+                numBytes += len(block)
+        try:
+            self.connection.voidresp()
+        except ftplib.all_errors:
+            self.close()
+        return(b"".join(blocks))
+
+    # close the connection to the server
+    def close(self):
+        if(self.connection is not None):
+            try:
+                self.connection.quit()
+            except ftplib.all_errors:
+                self.connection.close()
+        self.connection = None
+
+
+########### end of the ftp connection custom class ##########
+
+
+
+########### granule downloader custom class ##########
+
+# custom class that downloads files with up to numTransfers transfers running in parallel.  Each transfer
+# thread keeps one open connection to each server it has downloaded from
+class granuleDownloader:
+    # instantiate a granule downloader
+    def __init__(self,numTransfers=NUM_TRANSFERS):
+        self.numTransfers = numTransfers
+        self.threadData = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    ########### custom functions ############
+
+    # get the connection of the current thread to the server of a url, opening a new one if needed
+    # inURL (string) - url of a file on the server
+    def getConnection(self,inURL):
+        parsed = urlparse(inURL)
+        if(not hasattr(self.threadData,"connections")):
+            self.threadData.connections = {}
+        key = (parsed.scheme,parsed.hostname,parsed.port)
+        if(key not in self.threadData.connections):
+            if(parsed.scheme in ("http","https")):
+                connection = httpConnection(parsed.scheme,parsed.hostname,parsed.port)
+            elif(parsed.scheme == "ftp"):
+                connection = ftpConnection(parsed.hostname,parsed.port)
+            else:
+                raise ValueError("unsupported url scheme " + parsed.scheme + " in " + inURL)
+            self.threadData.connections[key] = connection
+            with self.lock:
+                self.connections.append(connection)
+        return(self.threadData.connections[key])
+
+    # download one file.  The file is skipped if it is already on disk and its checksum matches the
+    # expected checksum or, if no checksum is given, its size matches the expected size (or the size
+    # reported by the server).  Otherwise the file is streamed into a partial file, resuming any partial
+    # file left by an earlier transfer, and renamed when complete
+    # inURL (string) - url of the file
+    # outFile (string) - filepath to save the file to
+    # expectedSize (int) - optional size of the file, in bytes
+    # expectedChecksum (string) - optional md5 checksum of the file
+    # outputs: "skipped", "downloaded", or "resumed"
+    def downloadFile(self,inURL,outFile,expectedSize=None,expectedChecksum=None):
+        connection = self.getConnection(inURL)
+        path = urlparse(inURL).path
+        if(os.path.exists(outFile)):
+            if(expectedChecksum is not None):
+                if(calcChecksum(outFile) == expectedChecksum):
+                    return("skipped")
+            else:
+                if(expectedSize is None):
+                    expectedSize = connection.getSize(path)
+                if(expectedSize is None or os.path.getsize(outFile) == expectedSize):
+                    return("skipped")
+            os.remove(outFile)
+
+        partFile = outFile + PART_SUFFIX
+        status = "resumed" if os.path.exists(partFile) else "downloaded"
+        for attempt in range(0,MAX_RETRIES + 1):
+            offset = os.path.getsize(partFile) if os.path.exists(partFile) else 0
+            if(expectedSize is not None and offset > expectedSize):
+                offset = 0
+            try:
+                with open(partFile,'r+b' if offset > 0 else 'wb') as ofStream:
+                    ofStream.seek(offset)
+                    ofStream.truncate()
+                    connection.fetch(path,ofStream,offset)
+                break
+            except (http.client.HTTPException,ftplib.Error,OSError):
+                connection.close()
+                if(attempt == MAX_RETRIES):
+                    raise
+
+        # check the completed file before replacing the output file
+        partSize = os.path.getsize(partFile)
+        if(expectedSize is not None and partSize != expectedSize):
+            os.remove(partFile)
+            raise IOError(inURL + " has " + str(partSize) + " bytes, expected " + str(expectedSize))
+        if(expectedChecksum is not None and calcChecksum(partFile) != expectedChecksum):
+            os.remove(partFile)
+            raise IOError(inURL + " does not match the expected checksum")
+        os.replace(partFile,outFile)
+        return(status)
+
+    # download several files in parallel.  Failed downloads are reported and don't stop the other downloads
+    # inTasks (list) - for each file, a list of the url and output filepath, optionally followed by the
+    # expected size and the expected checksum (see downloadFile)
+    # outputs: status of each download ("skipped", "downloaded", "resumed", or "failed")
+    def downloadAll(self,inTasks):
+        statuses = self.runAll(self.downloadFile,inTasks,"download")
+        return(["failed" if status is None else status for status in statuses])
+
+    # read a range of bytes from a file, over the current thread's connection to the server
+    # inURL (string) - url of the file
+    # start (int) - offset of the first byte
+    # stop (int) - offset after the last byte
+    def fetchRange(self,inURL,start,stop):
+        return(self.getConnection(inURL).fetchRange(urlparse(inURL).path,start,stop))
+
+    # run a function for several tasks in parallel, on numTransfers threads.  Failed tasks are reported
+    # and don't stop the other tasks
+    # inFunction (function) - function to run
+    # inTasks (list) - list of arguments for each task.  The first argument is the url of a file
+    # taskName (string) - description of the task, used to report failures
+    # outputs: result of each task, or None for failed tasks
+    def runAll(self,inFunction,inTasks,taskName):
+        with ThreadPoolExecutor(max_workers=self.numTransfers) as executor:
+            futures = [executor.submit(inFunction,*task) for task in inTasks]
+        results = []
+        for [task,future] in zip(inTasks,futures):
+            if(future.exception() is not None):
+                print("failed to " + taskName + " " + task[0] + ": " + str(future.exception()))
+                results.append(None)
+            else:
+                results.append(future.result())
+        return(results)
+
+    # close all open connections
+    def close(self):
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections = []
+        self.threadData = threading.local()
+
+    ########## getters and setters ##########
+    def getNumTransfers(self):
+        return(self.numTransfers)
+
+    def setNumTransfers(self,numTransfers):
+        self.numTransfers = numTransfers
+
+
+########### end of the granule downloader custom class ##########
+
+
+
+########### local granule server custom class ##########
+
+# custom class that serves the files in a folder over HTTP/1.1 with keep-alive connections and Range
+# requests, standing in for the NASA archive when testing.  Folder urls return a comma separated listing
+# with the name, modification time, and size of each file, like the archive's .csv listings.  The server records the number of requests and response body bytes sent.  To
+# simulate slow or unreliable networks, each request can be delayed, and a transfer can be cut off after
+# a given number of bytes
+class granuleRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    ########### custom functions ############
+
+    # write a response body and record the number of bytes sent
+    def sendBody(self,inBytes):
+        self.wfile.write(inBytes)
+        with self.server.lock:
+            self.server.bytesServed += len(inBytes)
+
+    # send the headers, and for GET requests the requested range of a file or a folder listing
+    def sendFile(self,sendBody):
+        with self.server.lock:
+            self.server.numRequests += 1
+        time.sleep(self.server.latency)
+        localPath = os.path.join(self.server.rootFolder,unquote(urlparse(self.path).path).lstrip("/"))
+        if(os.path.isdir(localPath)):
+            listing = "name,last_modified,size\n"
+            for name in sorted(os.listdir(localPath)):
+                fileStat = os.stat(os.path.join(localPath,name))
+                listing += name + "," + time.strftime("%Y-%m-%d %H:%M",time.gmtime(fileStat.st_mtime)) + "," + str(fileStat.st_size) + "\n"
+            listing = listing.encode()
+            self.send_response(200)
+            self.send_header("Content-Type","text/plain")
+            self.send_header("Content-Length",str(len(listing)))
+            self.end_headers()
+            if(sendBody):
+                self.sendBody(listing)
+            return
+        if(not os.path.isfile(localPath)):
+            self.send_error(404)
+            return
+
+        # parse a single byte range of the form bytes=start-[stop]
+        fileSize = os.path.getsize(localPath)
+        [start,stop] = [0,fileSize]
+        rangeHeader = self.headers.get("Range")
+        if(rangeHeader is not None and rangeHeader.startswith("bytes=")):
+            [startText,stopText] = rangeHeader[6:].split(",")[0].split("-")
+            if(startText == ""):
+                start = max(fileSize - int(stopText),0)
+            else:
+                start = int(startText)
+                stop = min(int(stopText) + 1,fileSize) if stopText != "" else fileSize
+            if(start >= fileSize):
+                self.send_response(416)
+                self.send_header("Content-Range","bytes */" + str(fileSize))
+                self.send_header("Content-Length","0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range","bytes " + str(start) + "-" + str(stop - 1) + "/" + str(fileSize))
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type","application/octet-stream")
+        self.send_header("Content-Length",str(stop - start))
+        self.send_header("Accept-Ranges","bytes")
+        self.end_headers()
+        if(not sendBody):
+            return
+
+        # send the file in chunks, cutting the transfer off if requested
+        with self.server.lock:
+            cutOff = self.server.cutOff
+            self.server.cutOff = None
+        with open(localPath,'rb') as ifStream:
+            ifStream.seek(start)
+            remaining = stop - start
+            while(remaining > 0):
+                block = ifStream.read(min(DOWNLOAD_CHUNK_SIZE,remaining))
+                if(cutOff is not None and cutOff < len(block)):
+                    self.sendBody(block[0:cutOff])
+                    self.close_connection = True
+                    return
+                self.sendBody(block)
+                remaining -= len(block)
+                if(cutOff is not None):
+                    cutOff -= len(block)
+
+    def do_GET(self):
+        self.sendFile(True)
+
+    def do_HEAD(self):
+        self.sendFile(False)
+
+    def log_message(self,format,*args):
+        return
+
+
+########### end of the local granule server custom class ##########
+
+
+
+# start a local granule server in a background thread
+# Inputs:
+#    rootFolder (string) - folder containing the files to serve
+#    latency (float) - number of seconds each request is delayed, to simulate a remote server
+# Outputs:
+#    server (ThreadingHTTPServer) - the server.  bytesServed and numRequests record the body bytes sent
+#    and the number of requests, and setting cutOff to a number of bytes cuts off the next file transfer
+#    baseURL (string) - url of the root folder
+def startLocalServer(rootFolder,latency=0.0):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1",0),granuleRequestHandler)
+    server.daemon_threads = True
+    server.rootFolder = rootFolder
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.bytesServed = 0
+    server.numRequests = 0
+    server.cutOff = None
+    threading.Thread(target=server.serve_forever,daemon=True).start()
+    return([server,"http://127.0.0.1:" + str(server.server_address[1]) + "/"])
+
+
+# check the downloader against a local granule server with synthetic granules.  Downloads are compared
+# with the originals, an interrupted transfer and a partial file are resumed, a second run skips every
+# granule, and run times with one and several parallel transfers are reported
+# Inputs:
+#    numGranules (int) - number of synthetic granules
+#    granuleSize (int) - size of each granule, in bytes
+#    latency (float) - number of seconds each server request is delayed
+def checkDownloader(numGranules=24,granuleSize=4000000,latency=0.05):
+    serverFolder = tempfile.mkdtemp()
+    outFolder = tempfile.mkdtemp()
+    names = ["MOD04_L2.A2015213." + str(i).zfill(4) + ".061.hdf" for i in range(0,numGranules)]
+    checksums = []
+    for name in names:
+        with open(os.path.join(serverFolder,name),'wb') as ofStream:
+            ofStream.write(os.urandom(granuleSize))
+        checksums.append(calcChecksum(os.path.join(serverFolder,name)))
+    [server,baseURL] = startLocalServer(serverFolder,latency)
+    tasks = [[baseURL + name,os.path.join(outFolder,name)] for name in names]
+    try:
+        print("transfers, run time (s), requests, MB served, statuses")
+        for numTransfers in [1,NUM_TRANSFERS]:
+            for name in os.listdir(outFolder):
+                os.remove(os.path.join(outFolder,name))
+            downloader = granuleDownloader(numTransfers)
+            [server.bytesServed,server.numRequests] = [0,0]
+            startTime = time.time()
+            statuses = downloader.downloadAll(tasks)
+            downloader.close()
+            print(str(numTransfers) + ", " + str(round(time.time() - startTime,3)) + ", " + str(server.numRequests) + ", " +
+                  str(round(server.bytesServed/1e6,2)) + ", " + str(sorted(set(statuses))))
+        isEqual = [calcChecksum(task[1]) for task in tasks] == checksums
+        print("downloads match the originals: " + str(isEqual))
+
+        # resume a partial file left by an earlier run, and a transfer cut off by the server
+        shutil.copyfile(tasks[0][1],tasks[0][1] + PART_SUFFIX)
+        with open(tasks[0][1] + PART_SUFFIX,'r+b') as ofStream:
+            ofStream.truncate(granuleSize//3)
+        os.remove(tasks[0][1])
+        os.remove(tasks[1][1])
+        downloader = granuleDownloader()
+        [server.bytesServed,server.cutOff] = [0,granuleSize//2]
+        statuses = downloader.downloadAll(tasks[0:2])
+        print("resumed statuses: " + str(statuses) + ", MB served: " + str(round(server.bytesServed/1e6,2)) + " of " +
+              str(round((granuleSize - granuleSize//3 + granuleSize)/1e6,2)) + " missing, downloads match the originals: " +
+              str([calcChecksum(task[1]) for task in tasks[0:2]] == checksums[0:2]))
+
+        # a second run skips every granule, by checksum and by size
+        server.bytesServed = 0
+        bySize = downloader.downloadAll(tasks)
+        byChecksum = downloader.downloadAll([tasks[i] + [None,checksums[i]] for i in range(0,numGranules)])
+        downloader.close()
+        print("second run statuses: " + str(sorted(set(bySize + byChecksum))) + ", MB served: " + str(round(server.bytesServed/1e6,2)))
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(serverFolder)
+        shutil.rmtree(outFolder)
+
+
+if __name__ == "__main__":
+    checkDownloader()
+
+
+############## end of modisDownload.py ##################
@@ -0,0 +1,318 @@
+############## modisIndex.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module keeps a local index of the MODIS granules in an archive, so that granule lists
+# don't have to be fetched from the server on every run.  For each product and day, the index records the
+# name and size of every granule in the day's folder listing, and the G-ring footprint of each granule once
+# it is known (see modisMetadata.py).  The index is saved as one small text file per day, in
+# product/year/day.txt files that mirror the archive's folders, so it is filled on the first crawl and
+# updated one day at a time.  Days are only listed again if they were listed less than RECRAWL_DAYS after
+# acquisition, while the archive may still have been adding granules.  Temporal and spatial queries, which
+# can cross years, are answered from the index without contacting the server.
+
+# Requirements:
+#      numpy
+#      modisDownload.py, for listing days in parallel
+#      modisMetadata.py, for testing footprints against the study area
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import os
+import re
+import time
+import shutil
+import tempfile
+import numpy as np
+from datetime import datetime, timedelta
+from urllib.request import urlopen
+
+import modisDownload
+import modisMetadata
+
+# constants
+DAY_FOLDER_FORMAT = "%Y/%j/" # strftime format of the archive folder of a day, relative to the product folder
+RECRAWL_DAYS = 10 # days listed less than this many days after acquisition are listed again
+CRAWL_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S" # format of the crawl time in index files
+FTP_LIST_LINE = re.compile(r"^[-l][rwxsStT-]{9}\S*\s+\d+\s+\S+\s+\S+\s+(\d+)\s") # unix style ftp listing line, with the file size
+
+
+
+############### helper functions ##############
+
+# parse the granule names and sizes in a folder listing.  Supports comma separated listings with a size
+# column (as served by the archive's .csv listings), unix style ftp listings, and plain or html listings
+# with names only
+# Inputs:
+#    inText (string) - folder listing
+#    fileStart (string) - text that granule names start with, e.g. MOD04_L2
+# Outputs:
+#    names (string list) - granule names, in listing order, without duplicates
+#    sizes (int list) - size of each granule in bytes, or -1 if the listing doesn't give it
+def parseListing(inText,fileStart):
+    namePattern = re.compile(re.escape(fileStart) + r"[^\s,;/\"'<>]*?\.hdf")
+    [names,sizes] = [[],[]]
+    for line in inText.splitlines():
+        match = namePattern.search(line)
+        if(match is None or match.group(0) in names):
+            continue
+        size = -1
+        ftpMatch = FTP_LIST_LINE.match(line)
+        if(ftpMatch is not None):
+            size = int(ftpMatch.group(1))
+        elif("," in line):
+            numbers = [field.strip() for field in line[match.end():].split(",") if field.strip().isdigit()]
+            size = int(numbers[-1]) if len(numbers) > 0 else -1
+        names.append(match.group(0))
+        sizes.append(size)
+    return([names,sizes])
+
+
+# read a folder listing from a server
+# Inputs:
+#    inURL (string) - url of the folder
+# Outputs:
+#    listing text (string)
+def fetchListing(inURL):
+    return(urlopen(inURL,timeout=modisDownload.TIMEOUT).read().decode('latin-1'))
+
+
+
+########### granule index custom class ##########
+
+# custom class that stores the granule names, sizes and footprints of an archive, by product and day.
+# Days are read from disk when first needed and kept in memory.  Each day is a list with the granule names,
+# an integer array of sizes, the G-ring latitudes and longitudes of each granule (lists, empty if unknown),
+# and the time the day was listed
+class granuleIndex:
+    # instantiate a granule index
+    # indexFolder (string) - folder the index is saved in.  Created if it doesn't exist
+    def __init__(self,indexFolder):
+        self.indexFolder = indexFolder
+        self.days = {}
+        if(not os.path.exists(indexFolder)):
+            os.makedirs(indexFolder)
+
+    ########### custom functions ############
+
+    # get the index file of a day
+    # product (string) - product name, e.g. MOD04_L2
+    # dayDate (datetime) - date of the day
+    def getDayFile(self,product,dayDate):
+        return(os.path.join(self.indexFolder,product,dayDate.strftime("%Y"),dayDate.strftime("%j") + ".txt"))
+
+    # read a day from the index.  Outputs the day list, or None if the day isn't in the index
+    # product (string) - product name
+    # dayDate (datetime) - date of the day
+    def readDay(self,product,dayDate):
+        key = (product,dayDate.strftime("%Y%j"))
+        if(key not in self.days):
+            dayFile = self.getDayFile(product,dayDate)
+            if(not os.path.exists(dayFile)):
+                return(None)
+            day = [[],[],[],[],None]
+            with open(dayFile,'r') as ifStream:
+                for line in ifStream:
+                    if(line.startswith("# crawled ")):
+                        day[4] = datetime.strptime(line[10:].strip(),CRAWL_TIME_FORMAT)
+                        continue
+                    fields = line.rstrip("\n").split("\t")
+                    if(line.startswith("#") or len(fields) < 4):
+                        continue
+                    day[0].append(fields[0])
+                    day[1].append(int(fields[1]))
+                    day[2].append([float(value) for value in fields[2].split(",")] if fields[2] != "" else [])
+                    day[3].append([float(value) for value in fields[3].split(",")] if fields[3] != "" else [])
+            day[1] = np.array(day[1],dtype=np.int64)
+            self.days[key] = day
+        return(self.days[key])
+
+    # save a day to the index.  The day file is replaced in one step, so an interrupted run leaves either
+    # the old or the new day file
+    # product (string) - product name
+    # dayDate (datetime) - date of the day
+    def writeDay(self,product,dayDate):
+        day = self.days[(product,dayDate.strftime("%Y%j"))]
+        dayFile = self.getDayFile(product,dayDate)
+        if(not os.path.exists(os.path.dirname(dayFile))):
+            os.makedirs(os.path.dirname(dayFile))
+        formatRing = lambda values: ",".join([repr(float(value)) for value in values])
+        with open(dayFile + ".tmp",'w') as ofStream:
+            ofStream.write("# crawled " + day[4].strftime(CRAWL_TIME_FORMAT) + "\n# name\tsize\tlatitudes\tlongitudes\n")
+            for i in range(0,len(day[0])):
+                ofStream.write(day[0][i] + "\t" + str(day[1][i]) + "\t" + formatRing(day[2][i]) + "\t" + formatRing(day[3][i]) + "\n")
+        os.replace(dayFile + ".tmp",dayFile)
+
+    # determine if a day has to be listed, because it isn't in the index or it was listed less than
+    # RECRAWL_DAYS after acquisition
+    # product (string) - product name
+    # dayDate (datetime) - date of the day
+    def needsCrawl(self,product,dayDate):
+        day = self.readDay(product,dayDate)
+        return(day is None or day[4] - dayDate < timedelta(days=RECRAWL_DAYS))
+
+    # replace the granule list of a day.  Footprints of granules that were already in the index are kept
+    # product (string) - product name
+    # dayDate (datetime) - date of the day
+    # names (string list) - granule names
+    # sizes (int list) - granule sizes in bytes, -1 if unknown
+    def updateDay(self,product,dayDate,names,sizes):
+        oldDay = self.readDay(product,dayDate)
+        oldRings = {} if oldDay is None else dict([[oldDay[0][i],[oldDay[2][i],oldDay[3][i]]] for i in range(0,len(oldDay[0]))])
+        rings = [oldRings.get(name,[[],[]]) for name in names]
+        self.days[(product,dayDate.strftime("%Y%j"))] = [list(names),np.array(sizes,dtype=np.int64),[ring[0] for ring in rings],
+                                                         [ring[1] for ring in rings],datetime.now().replace(microsecond=0)]
+        self.writeDay(product,dayDate)
+
+    # list the days of a date range that aren't complete in the index, with numTransfers listings running in
+    # parallel, and add them to the index.  Days whose listing fails are left out of the index
+    # product (string) - product name
+    # dayDates (datetime list) - dates of the days
+    # productURL (string) - url of the product folder, e.g. ftp://ladsweb.nascom.nasa.gov/allData/6/MOD04_L2/
+    # downloader (granuleDownloader) - downloader whose threads are used
+    # fileStart (string) - text that granule names start with.  Defaults to the product name
+    # outputs: number of days listed
+    def crawlDays(self,product,dayDates,productURL,downloader,fileStart=None):
+        pending = [dayDate for dayDate in dayDates if self.needsCrawl(product,dayDate)]
+        listings = downloader.runAll(fetchListing,[[productURL + dayDate.strftime(DAY_FOLDER_FORMAT)] for dayDate in pending],"list")
+        for [dayDate,listing] in zip(pending,listings):
+            if(listing is not None):
+                [names,sizes] = parseListing(listing,product if fileStart is None else fileStart)
+                self.updateDay(product,dayDate,names,sizes)
+        return(len(pending))
+
+    # record the G-ring footprints of granules of one day.  Granules without a valid footprint (fewer than
+    # three points) are left unchanged
+    # product (string) - product name
+    # dayDate (datetime) - date of the day
+    # names (string list) - granule names
+    # lats (float array) - n x k array of G-ring latitudes, padded with NaN (see modisMetadata.parseGRings)
+    # lons (float array) - n x k array of G-ring longitudes, padded with NaN
+    def setFootprints(self,product,dayDate,names,lats,lons):
+        day = self.readDay(product,dayDate)
+        if(day is None):
+            raise KeyError(product + " " + dayDate.strftime("%Y/%j") + " is not in the granule index")
+        positions = dict([[day[0][i],i] for i in range(0,len(day[0]))])
+        isChanged = False
+        for i in range(0,len(names)):
+            isPoint = ~np.isnan(lats[i]) & ~np.isnan(lons[i])
+            if(names[i] in positions and np.sum(isPoint) >= 3):
+                day[2][positions[names[i]]] = list(np.asarray(lats[i])[isPoint])
+                day[3][positions[names[i]]] = list(np.asarray(lons[i])[isPoint])
+                isChanged = True
+        if(isChanged):
+            self.writeDay(product,dayDate)
+
+    # find the granules of a date range in the index, and test their footprints against a study area.
+    # Days that aren't in the index are left out
+    # product (string) - product name
+    # startDate (datetime) - first day of the date range
+    # endDate (datetime) - last day of the date range
+    # latMin, latMax, lonMin, lonMax (float) - bounds of the study area, in decimal degrees
+    # outputs: list with, for each granule, a list of the day date, name, size, and True or False if its
+    # footprint overlaps the study area, or None if the footprint isn't in the index
+    def queryGranules(self,product,startDate,endDate,latMin,latMax,lonMin,lonMax):
+        granules = []
+        rings = [[],[]]
+        for dayNum in range(0,(endDate - startDate).days + 1):
+            dayDate = startDate + timedelta(days=dayNum)
+            day = self.readDay(product,dayDate)
+            if(day is None):
+                continue
+            for i in range(0,len(day[0])):
+                granules.append([dayDate,day[0][i],int(day[1][i]),None])
+                rings[0].append(day[2][i])
+                rings[1].append(day[3][i])
+        if(len(granules) == 0):
+            return(granules)
+        numPoints = max([len(ring) for ring in rings[0]] + [1])
+        [lats,lons] = [np.array([ring + [np.nan]*(numPoints - len(ring)) for ring in coordRings]) for coordRings in rings]
+        [isIntersecting,isValid] = modisMetadata.gringIntersects(lats,lons,latMin,latMax,lonMin,lonMax)
+        for i in np.flatnonzero(isValid):
+            granules[i][3] = bool(isIntersecting[i])
+        return(granules)
+
+    ########## getters and setters ##########
+    def getIndexFolder(self):
+        return(self.indexFolder)
+
+
+########### end of the granule index custom class ##########
+
+
+
+# check the granule index against a local granule server.  The first crawl of a date range that crosses a
+# year lists every day, footprints are added, and a second index opened on the same folder answers the same
+# temporal and spatial query with no requests to the server.  A day listed soon after acquisition is listed
+# again, and picks up a granule added to the archive later
+# Inputs:
+#    numDays (int) - number of days in the date range
+#    numGranules (int) - number of granules in each day
+def checkGranuleIndex(numDays=6,numGranules=288):
+    serverFolder = tempfile.mkdtemp()
+    indexFolder = tempfile.mkdtemp()
+    product = "MOD04_L2"
+    startDate = datetime(2015,12,29)
+    dayDates = [startDate + timedelta(days=dayNum) for dayNum in range(0,numDays)]
+    generator = np.random.default_rng(0)
+    footprints = {}
+    for dayDate in dayDates:
+        os.makedirs(os.path.join(serverFolder,product,dayDate.strftime(DAY_FOLDER_FORMAT)))
+        for i in range(0,numGranules):
+            name = product + ".A" + dayDate.strftime("%Y%j") + "." + str(i*5//60*100 + i*5 % 60).zfill(4) + ".061.hdf"
+            with open(os.path.join(serverFolder,product,dayDate.strftime(DAY_FOLDER_FORMAT),name),'wb') as ofStream:
+                ofStream.write(b"\x00"*int(generator.integers(100,1000)))
+            [centerLat,centerLon] = [generator.uniform(-70,70),generator.uniform(-180,180)]
+            footprints[name] = [[centerLat - 9,centerLat + 9,centerLat + 9,centerLat - 9],[centerLon - 10,centerLon - 10,centerLon + 10,centerLon + 10]]
+    [server,baseURL] = modisDownload.startLocalServer(serverFolder)
+    downloader = modisDownload.granuleDownloader()
+    studyArea = [41.5,46.2,-124.0,-116.0]
+    try:
+        print("run, days listed, requests, granules found, granules overlapping the study area, run time (s)")
+        for runNum in range(0,2):
+            index = granuleIndex(indexFolder)
+            server.numRequests = 0
+            startTime = time.time()
+            numListed = index.crawlDays(product,dayDates,baseURL + product + "/",downloader)
+            if(runNum == 0):
+                for dayDate in dayDates:
+                    names = index.readDay(product,dayDate)[0]
+                    [lats,lons] = [np.array([footprints[name][coordNum] for name in names]) for coordNum in [0,1]]
+                    index.setFootprints(product,dayDate,names,lats,lons)
+            granules = index.queryGranules(product,dayDates[0],dayDates[-1],*studyArea)
+            print(str(runNum) + ", " + str(numListed) + ", " + str(server.numRequests) + ", " + str(len(granules)) + ", " +
+                  str(sum([granule[3] == True for granule in granules])) + ", " + str(round(time.time() - startTime,3)))
+
+        # compare the index with the archive
+        isEqual = all([granule[2] == os.path.getsize(os.path.join(serverFolder,product,granule[0].strftime(DAY_FOLDER_FORMAT),granule[1])) for granule in granules])
+        [lats,lons] = [np.array([footprints[granule[1]][coordNum] for granule in granules]) for coordNum in [0,1]]
+        isMatched = [granule[3] for granule in granules] == list(modisMetadata.gringIntersects(lats,lons,*studyArea)[0])
+        print("sizes match the archive: " + str(isEqual) + ", overlaps match the footprints: " + str(isMatched))
+
+        # a day listed on the day of acquisition is listed again on the next run
+        recentDate = datetime.now().replace(hour=0,minute=0,second=0,microsecond=0) - timedelta(days=1)
+        recentFolder = os.path.join(serverFolder,product,recentDate.strftime(DAY_FOLDER_FORMAT))
+        os.makedirs(recentFolder)
+        open(os.path.join(recentFolder,product + ".A" + recentDate.strftime("%Y%j") + ".0000.061.hdf"),'wb').close()
+        index.crawlDays(product,[recentDate],baseURL + product + "/",downloader)
+        open(os.path.join(recentFolder,product + ".A" + recentDate.strftime("%Y%j") + ".0005.061.hdf"),'wb').close()
+        index = granuleIndex(indexFolder)
+        numListed = index.crawlDays(product,dayDates + [recentDate],baseURL + product + "/",downloader)
+        print("recent day listed again: " + str(numListed == 1) + ", granules: " + str(len(index.readDay(product,recentDate)[0])))
+    finally:
+        downloader.close()
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(serverFolder)
+        shutil.rmtree(indexFolder)
+
+
+if __name__ == "__main__":
+    checkGranuleIndex()
+
+
+############## end of modisIndex.py ##################
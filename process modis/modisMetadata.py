@@ -0,0 +1,520 @@
+############## modisMetadata.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module reads the core metadata (including the G-ring polygon of the granule's
+# footprint) of MODIS .hdf granules on a server without downloading the whole granule.  MODIS granules
+# are HDF4 files.  An HDF4 file starts with a linked list of data descriptor blocks, which give the tag,
+# reference number, offset, and length of every object in the file.  The descriptor blocks are read with
+# HTTP Range (or FTP REST) requests, the vdata headers are searched for the CoreMetadata.0 attribute, and
+# only the bytes of the attribute's vdata are read.  Reads are cached in pages of RANGE_PAGE_SIZE bytes,
+# and neighbouring pages are fetched in one request.  Footprints can also be read from the provider's
+# daily geolocation metadata (geoMeta) listings, which describe every granule of a day in one small text file.
+# Both G-ring objects of a granule are parsed with one regular expression match, and the G-rings of a whole
+# day of granules are tested for overlap with the study area in one vectorized call.  The test is an exact polygon and rectangle
+# intersection, so granules that lie inside the study area, or that contain it, are kept, and granules
+# whose bounding box overlaps the study area but whose footprint doesn't are dropped.
+
+# Requirements:
+#      numpy
+#      modisDownload.py, for connections to the server
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import os
+import re
+import time
+import shutil
+import struct
+import tempfile
+import numpy as np
+from urllib.request import urlopen
+
+import modisDownload
+
+# constants
+RANGE_PAGE_SIZE = 16384 # number of bytes in each cached page of a remote file
+HDF_MAGIC = b"\x0e\x03\x13\x01" # first four bytes of every HDF4 file
+DD_BLOCK_HEADER = 6 # number of bytes in the header of a data descriptor block
+DD_SIZE = 12 # number of bytes in each data descriptor
+DFTAG_VH = 1962 # HDF4 tag of vdata headers
+DFTAG_VS = 1963 # HDF4 tag of vdata storage
+DFNT_CHAR8 = 4 # HDF4 number type of text attributes
+MAX_DD_BLOCKS = 100000 # maximum number of data descriptor blocks read from one file
+CORE_METADATA = b"coremetadata.0" # name of the attribute containing the core metadata, in lower case
+DD_TYPE = np.dtype([("tag",">u2"),("ref",">u2"),("offset",">i4"),("length",">i4")]) # layout of a data descriptor
+GRANULE_KEY = re.compile(r"\.(A\d{7}\.\d{4})\.") # acquisition date and time in a granule name, e.g. A2015213.1835
+GRING_OBJECT = r"GRINGPOINT(LATITUDE|LONGITUDE)\s+NUM_VAL[^(]*\(([^)]*)\)" # G-ring object in core metadata, with the name and values
+GRING_PATTERN = re.compile(GRING_OBJECT + r"[^(]*?" + GRING_OBJECT) # G-ring latitude and longitude objects, which are next to each other
+
+
+
+############### helper functions ##############
+
+# get the acquisition date and time of a granule from its name, which is shared by all products of the
+# same granule (e.g. MOD04_L2.A2015213.1835.061.2017...hdf and MOD03.A2015213.1835.061.2017...hdf)
+# Inputs:
+#    granuleName (string) - name of the granule file
+# Outputs:
+#    key (string) - acquisition date and time (e.g. A2015213.1835), or None if the name doesn't have one
+def getGranuleKey(granuleName):
+    match = GRANULE_KEY.search(granuleName)
+    return(None if match is None else match.group(1))
+
+
+# read the data descriptors of an HDF4 file
+# Inputs:
+#    reader (rangedReader) - reader for the file
+# Outputs:
+#    dds (structured array) - tag, ref, offset, and length of each object, or None if the file isn't an HDF4 file
+def readDataDescriptors(reader):
+    if(reader.read(0,len(HDF_MAGIC)) != HDF_MAGIC):
+        return(None)
+    blocks = []
+    offset = len(HDF_MAGIC)
+    visited = set()
+    while(offset > 0 and offset not in visited and len(visited) < MAX_DD_BLOCKS):
+        visited.add(offset)
+        header = reader.read(offset,DD_BLOCK_HEADER)
+        if(len(header) < DD_BLOCK_HEADER):
+            break
+        [numDDs,nextOffset] = struct.unpack(">Hi",header)
+        block = reader.read(offset + DD_BLOCK_HEADER,numDDs*DD_SIZE)
+        blocks.append(np.frombuffer(block[0:(len(block)//DD_SIZE)*DD_SIZE],dtype=DD_TYPE))
+        offset = nextOffset
+    return(np.concatenate(blocks) if len(blocks) > 0 else np.zeros(0,dtype=DD_TYPE))
+
+
+# read the core metadata of an HDF4 file.  Vdata headers are fetched together, the header that names the
+# core metadata attribute is found, and the vdata storage with the same reference number is read
+# Inputs:
+#    reader (rangedReader) - reader for the file
+# Outputs:
+#    metadata (string) - core metadata text, or None if the file isn't an HDF4 file or the core metadata
+#    isn't stored as one contiguous vdata
+def readCoreMetadata(reader):
+    dds = readDataDescriptors(reader)
+    if(dds is None):
+        return(None)
+    headers = dds[(dds["tag"] == DFTAG_VH) & (dds["offset"] > 0) & (dds["length"] > 0)]
+    reader.prefetch(headers["offset"],headers["length"])
+    for header in headers:
+        if(CORE_METADATA not in reader.read(int(header["offset"]),int(header["length"])).lower()):
+            continue
+        storage = dds[(dds["tag"] == DFTAG_VS) & (dds["ref"] == header["ref"]) & (dds["length"] > 0)]
+        if(storage.size > 0):
+            text = reader.read(int(storage[0]["offset"]),int(storage[0]["length"]))
+            return(text.decode('latin-1').rstrip("\x00"))
+    return(None)
+
+
+# read the core metadata of a granule on a server (see readCoreMetadata)
+# Inputs:
+#    inURL (string) - url of the granule
+#    downloader (granuleDownloader) - downloader whose connections are used
+# Outputs:
+#    metadata (string) - core metadata text, or None if it can't be read with ranged reads
+#    numBytes (int) - number of bytes read from the server
+def fetchCoreMetadata(inURL,downloader):
+    reader = rangedReader(downloader,inURL)
+    return([readCoreMetadata(reader),reader.getBytesRead()])
+
+
+# parse the G-ring latitudes and longitudes from the core metadata of several granules.  Both G-ring objects
+# of a granule are read with one regular expression search.  The search skips the GRINGPOINT group that
+# contains the objects, since only object names are followed by NUM_VAL.  Values of all granules are
+# converted to numbers together
+# Inputs:
+#    metaStrings (string list) - core metadata of each granule.  None for granules without metadata
+# Outputs:
+#    lats (float array) - n x k array of G-ring latitudes of each granule, in decimal degrees
+#    lons (float array) - n x k array of G-ring longitudes of each granule, in decimal degrees.  Rings with
+#    fewer than k points are padded with NaN, and granules without a G-ring, or with different numbers of
+#    latitudes and longitudes, are all NaN
+def parseGRings(metaStrings):
+    granules = []
+    ringText = [[],[]]
+    for granuleNum in range(0,len(metaStrings)):
+        match = None if metaStrings[granuleNum] is None else GRING_PATTERN.search(metaStrings[granuleNum])
+        if(match != None):
+            [firstName,firstText,secondName,secondText] = match.groups()
+            if(firstName != secondName):
+                granules.append(granuleNum)
+                ringText[0].append(firstText if firstName == "LATITUDE" else secondText)
+                ringText[1].append(secondText if firstName == "LATITUDE" else firstText)
+    coords = [np.full((len(metaStrings),1),np.nan),np.full((len(metaStrings),1),np.nan)]
+    if(len(granules) == 0):
+        return(coords)
+
+    # convert the values of all granules together, and place them in the row of their granule
+    counts = [np.array([text.count(",") + 1 for text in ringText[coordNum]]) for coordNum in [0,1]]
+    maxPoints = int(max(np.max(counts[0]),np.max(counts[1])))
+    for coordNum in [0,1]:
+        try:
+            values = np.array(",".join(ringText[coordNum]).split(","),dtype=np.float64)
+        except ValueError:
+            values = np.concatenate([parseValues(text) for text in ringText[coordNum]])
+        cols = np.arange(values.size) - np.repeat(np.cumsum(counts[coordNum]) - counts[coordNum],counts[coordNum])
+        coords[coordNum] = np.full((len(metaStrings),maxPoints),np.nan)
+        coords[coordNum][np.repeat(granules,counts[coordNum]),cols] = values
+    isMismatched = np.any(np.isnan(coords[0]) != np.isnan(coords[1]),axis=1)
+    coords[0][isMismatched] = np.nan
+    coords[1][isMismatched] = np.nan
+    return(coords)
+
+
+# convert a comma separated list of metadata values to numbers
+# Inputs:
+#    inText (string) - comma separated values
+# Outputs:
+#    float array of values, all NaN if any value isn't a number
+def parseValues(inText):
+    try:
+        return(np.array(inText.split(","),dtype=np.float64))
+    except ValueError:
+        return(np.full(inText.count(",") + 1,np.nan))
+
+
+# determine which G-ring polygons intersect a latitude and longitude rectangle.  A polygon intersects the
+# rectangle if any of its edges crosses or lies inside the rectangle (Liang-Barsky clipping), or if the
+# rectangle lies inside the polygon (the rectangle center is inside).  Edges are straight lines in
+# latitude and longitude.  Rings that cross the antimeridian are unwrapped
+# Inputs:
+#    lats (float array) - n x k array of G-ring latitudes, padded with NaN (see parseGRings)
+#    lons (float array) - n x k array of G-ring longitudes, padded with NaN
+#    latMin (float) - lower latitude bound of the rectangle
+#    latMax (float) - upper latitude bound of the rectangle
+#    lonMin (float) - lower longitude bound of the rectangle
+#    lonMax (float) - upper longitude bound of the rectangle
+# Outputs:
+#    isIntersecting (boolean array) - true for polygons that intersect the rectangle
+#    isValid (boolean array) - true for polygons with at least three points
+def gringIntersects(lats,lons,latMin,latMax,lonMin,lonMax):
+    lats = np.atleast_2d(np.asarray(lats,dtype=np.float64))
+    lons = np.atleast_2d(np.asarray(lons,dtype=np.float64))
+    numPoints = np.sum(~np.isnan(lats),axis=1)
+    isValid = numPoints >= 3
+    isIntersecting = np.zeros(lats.shape[0],dtype=bool)
+    if(not np.any(isValid)):
+        return([isIntersecting,isValid])
+
+    # pad rings with their last point, and unwrap longitudes relative to the first point
+    last = np.maximum(numPoints - 1,0)[isValid,None]
+    cols = np.minimum(np.arange(lats.shape[1])[None,:],last)
+    y = np.take_along_axis(lats[isValid],cols,axis=1)
+    x = np.take_along_axis(lons[isValid],cols,axis=1)
+    x = x[:,0:1] + np.mod(x - x[:,0:1] + 180,360) - 180
+    nextX = np.roll(x,-1,axis=1)
+    nextY = np.roll(y,-1,axis=1)
+    [dx,dy] = [nextX - x,nextY - y]
+    result = np.zeros(x.shape[0],dtype=bool)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        for shift in [-360.0,0.0,360.0]:
+            # clip each edge to the rectangle
+            [t0,t1] = [np.zeros(x.shape),np.ones(x.shape)]
+            isOutside = np.zeros(x.shape,dtype=bool)
+            for [p,q] in [[-dx,x - (lonMin + shift)],[dx,(lonMax + shift) - x],[-dy,y - latMin],[dy,latMax - y]]:
+                isOutside |= (p == 0) & (q < 0)
+                ratio = q/p
+                t0 = np.where(p < 0,np.maximum(t0,ratio),t0)
+                t1 = np.where(p > 0,np.minimum(t1,ratio),t1)
+            result |= np.any(~isOutside & (t0 <= t1),axis=1)
+
+            # test if the rectangle center is inside the polygon (crossing number)
+            [centerX,centerY] = [(lonMin + lonMax)/2 + shift,(latMin + latMax)/2]
+            isCrossing = ((y > centerY) != (nextY > centerY)) & (centerX < x + dx*(centerY - y)/dy)
+            result |= np.mod(np.sum(isCrossing,axis=1),2) == 1
+    isIntersecting[isValid] = result
+    return([isIntersecting,isValid])
+
+
+# read the G-ring footprints of all granules in a geolocation metadata (geoMeta) listing.  Listings are
+# comma separated text with a header line naming the columns, including GranuleID, GRingLongitude1-4,
+# and GRingLatitude1-4
+# Inputs:
+#    inText (string) - contents of the listing
+# Outputs:
+#    footprints (dict) - latitudes and longitudes of the G-ring points for each granule key (see getGranuleKey)
+def parseGeoMeta(inText):
+    footprints = {}
+    columns = None
+    for line in inText.splitlines():
+        fields = [field.strip() for field in line.lstrip("#").split(",")]
+        if(columns is None):
+            if("GranuleID" in fields):
+                columns = dict([[fields[i],i] for i in range(0,len(fields))])
+                latColumns = [columns["GRingLatitude" + str(i)] for i in range(1,5)]
+                lonColumns = [columns["GRingLongitude" + str(i)] for i in range(1,5)]
+            continue
+        if(line.startswith("#") or len(fields) < len(columns)):
+            continue
+        key = getGranuleKey(fields[columns["GranuleID"]])
+        if(key is not None):
+            footprints[key] = [[float(fields[i]) for i in latColumns],[float(fields[i]) for i in lonColumns]]
+    return(footprints)
+
+
+
+########### ranged reader custom class ##########
+
+# custom class that reads byte ranges of a file on a server.  Bytes are cached in pages of RANGE_PAGE_SIZE,
+# and runs of missing pages are fetched with one request each
+class rangedReader:
+    # instantiate a ranged reader
+    def __init__(self,downloader,inURL):
+        self.downloader = downloader
+        self.url = inURL
+        self.pages = {}
+        self.fileSize = None
+        self.bytesRead = 0
+
+    ########### custom functions ############
+
+    # fetch all missing pages that overlap a set of byte ranges.  Consecutive missing pages are fetched
+    # with one request
+    # offsets (int array) - offset of the first byte of each range
+    # lengths (int array) - number of bytes in each range
+    def prefetch(self,offsets,lengths):
+        offsets = np.asarray(offsets,dtype=np.int64)
+        lengths = np.asarray(lengths,dtype=np.int64)
+        isValid = lengths > 0
+        if(self.fileSize is not None):
+            isValid &= offsets < self.fileSize
+        [offsets,lengths] = [offsets[isValid],lengths[isValid]]
+        if(offsets.size == 0):
+            return
+        firstPages = offsets//RANGE_PAGE_SIZE
+        numPages = (offsets + lengths - 1)//RANGE_PAGE_SIZE - firstPages + 1
+        pages = np.repeat(firstPages,numPages) + np.arange(np.sum(numPages)) - np.repeat(np.cumsum(numPages) - numPages,numPages)
+        pages = np.unique(pages)
+        pages = pages[[int(page) not in self.pages for page in pages]]
+        if(pages.size == 0):
+            return
+        runStarts = np.flatnonzero(np.diff(pages,prepend=-2) != 1)
+        runStops = np.append(runStarts[1:],pages.size)
+        for [runStart,runStop] in zip(runStarts,runStops):
+            self.fetchPages(int(pages[runStart]),int(pages[runStop - 1]) + 1)
+
+    # fetch a run of pages from the server and add them to the cache.  If the file ends within the run,
+    # the file size is recorded
+    # firstPage (int) - number of the first page
+    # stopPage (int) - number of the page after the last page
+    def fetchPages(self,firstPage,stopPage):
+        data = self.downloader.fetchRange(self.url,firstPage*RANGE_PAGE_SIZE,stopPage*RANGE_PAGE_SIZE)
+        self.bytesRead += len(data)
+        if(len(data) < (stopPage - firstPage)*RANGE_PAGE_SIZE):
+            self.fileSize = firstPage*RANGE_PAGE_SIZE + len(data)
+        for page in range(firstPage,stopPage):
+            self.pages[page] = data[(page - firstPage)*RANGE_PAGE_SIZE:(page - firstPage + 1)*RANGE_PAGE_SIZE]
+
+    # read a range of bytes, fetching any pages that aren't cached
+    # offset (int) - offset of the first byte
+    # length (int) - number of bytes to read
+    # outputs: bytes of the range, which are shorter than requested if the file ends before the range
+    def read(self,offset,length):
+        if(length <= 0 or offset < 0):
+            return(b"")
+        self.prefetch([offset],[length])
+        firstPage = offset//RANGE_PAGE_SIZE
+        lastPage = (offset + length - 1)//RANGE_PAGE_SIZE
+        data = b"".join([self.pages.get(page,b"") for page in range(firstPage,lastPage + 1)])
+        start = offset - firstPage*RANGE_PAGE_SIZE
+        return(data[start:start + length])
+
+    ########## getters and setters ##########
+    def getBytesRead(self):
+        return(self.bytesRead)
+
+    def getURL(self):
+        return(self.url)
+
+
+########### end of the ranged reader custom class ##########
+
+
+
+# format synthetic core metadata for testing, in the object description language used by MODIS granules.
+# The G-ring objects are nested in the GPOLYGON, GPOLYGONCONTAINER and GRINGPOINT groups, as in real
+# granules, and several other metadata objects come before and after them
+# Inputs:
+#    gringLats (float list) - latitudes of the G-ring points
+#    gringLons (float list) - longitudes of the G-ring points
+#    numObjects (int) - number of other metadata objects
+# Outputs:
+#    metadata (string) - core metadata text
+def formatTestMetadata(gringLats,gringLons,numObjects=40):
+    formatRing = lambda values: "(" + ", ".join([repr(round(float(value),6)) for value in values]) + ")"
+    formatObject = lambda name,value: ("    OBJECT                 = " + name + "\n      NUM_VAL              = 1\n      CLASS                = \"1\"\n" +
+                                       "      VALUE                = " + value + "\n    END_OBJECT             = " + name + "\n")
+    others = [formatObject("PARAMETERVALUE" + str(i),"(" + str(i) + ", \"QA\")") for i in range(0,numObjects)]
+    return("GROUP                  = INVENTORYMETADATA\n" + "".join(others[0:numObjects//2]) +
+           "  GROUP                  = GPOLYGON\n    OBJECT                 = GPOLYGONCONTAINER\n      CLASS                = \"1\"\n" +
+           "      GROUP                  = GRINGPOINT\n        CLASS                = \"1\"\n" +
+           formatObject("GRINGPOINTLONGITUDE",formatRing(gringLons)) + formatObject("GRINGPOINTLATITUDE",formatRing(gringLats)) +
+           formatObject("GRINGPOINTSEQUENCENO","(1, 2, 3, 4)") + "      END_GROUP              = GRINGPOINT\n" +
+           "      GROUP                  = GRING\n        CLASS                = \"1\"\n" + formatObject("EXCLUSIONGRINGFLAG","\"N\"") +
+           "      END_GROUP              = GRING\n    END_OBJECT             = GPOLYGONCONTAINER\n  END_GROUP              = GPOLYGON\n" +
+           "".join(others[numObjects//2:]) + "END_GROUP              = INVENTORYMETADATA\n")
+
+
+# format an attribute vdata (header and storage) for a synthetic HDF4 file
+# Inputs:
+#    ref (int) - reference number of the vdata
+#    name (string) - attribute name
+#    value (bytes or array) - text, or an array of values with big endian byte order
+# Outputs:
+#    list of the vdata header and storage objects, each a list of the tag, reference number and bytes
+def formatTestAttribute(ref,name,value):
+    if(isinstance(value,bytes)):
+        [numberType,numValues] = [DFNT_CHAR8,len(value)]
+    else:
+        numberType = dict([[numpyType,hdfType] for [hdfType,numpyType] in [[5,">f4"],[6,">f8"],[20,"|i1"],[21,"|u1"],[22,">i2"],[23,">u2"],[24,">i4"],[25,">u4"]]])[value.dtype.str]
+        [numValues,value] = [value.size,value.tobytes()]
+    header = struct.pack(">hiHhhHHH",0,1,len(value),1,numberType,len(value),0,numValues) + struct.pack(">h",6) + b"VALUES"
+    header += struct.pack(">h",len(name)) + name.encode() + struct.pack(">h",7) + b"Attr0.0" + struct.pack(">HHhh",0,0,3,0)
+    return([[DFTAG_VH,ref,header],[DFTAG_VS,ref,value]])
+
+
+# write a synthetic HDF4 granule for testing.  The file has the same layout as a MODIS granule: data
+# descriptor blocks of 16 descriptors spread through the file, large data objects, a vdata (header and
+# storage) for each of several attributes, and the core metadata attribute, which contains the G-ring
+# Inputs:
+#    outFile (string) - filepath to the output file
+#    gringLats (float list) - latitudes of the G-ring points
+#    gringLons (float list) - longitudes of the G-ring points
+#    dataSize (int) - total number of bytes of data objects
+#    inSeed (int) - random number seed for the data objects
+#    extraObjects (list) - optional list of other objects to write first, each a list of the tag, reference
+#    number and bytes of the object.  Reference numbers must be below 100
+def writeTestGranule(outFile,gringLats,gringLons,dataSize,inSeed,extraObjects=[]):
+    generator = np.random.default_rng(inSeed)
+    metadata = formatTestMetadata(gringLats,gringLons).ljust(40000).encode() + b"\x00"
+
+    # objects are data blocks (tag 702, scientific data), followed by attribute vdatas
+    objects = list(extraObjects) + [[702,i + 100,generator.bytes(dataSize//20)] for i in range(0,20)]
+    attributes = [["ArchiveMetadata.0",b"ARCHIVE".ljust(5000)],["StructMetadata.0",b"STRUCT".ljust(20000)],["CoreMetadata.0",metadata]]
+    for i in range(0,30):
+        attributes.insert(i % 3,["scale_factor_" + str(i),np.array([0.001],dtype=">f8")])
+    for [ref,[name,value]] in zip(range(100,100 + len(attributes)),attributes):
+        objects += formatTestAttribute(ref,name,value)
+
+    # a data descriptor block is written before every 16 objects
+    blocks = [objects[i:i + 16] for i in range(0,len(objects),16)]
+    with open(outFile,'wb') as ofStream:
+        ofStream.write(HDF_MAGIC)
+        for blockNum in range(0,len(blocks)):
+            blockOffset = ofStream.tell()
+            dataOffset = blockOffset + DD_BLOCK_HEADER + 16*DD_SIZE
+            dds = np.zeros(16,dtype=DD_TYPE)
+            dds["tag"] = 1
+            for i in range(0,len(blocks[blockNum])):
+                [tag,ref,value] = blocks[blockNum][i]
+                dds[i] = (tag,ref,dataOffset,len(value))
+                dataOffset += len(value)
+            nextOffset = dataOffset if blockNum < len(blocks) - 1 else 0
+            ofStream.write(struct.pack(">Hi",16,nextOffset) + dds.tobytes())
+            for [tag,ref,value] in blocks[blockNum]:
+                ofStream.write(value)
+
+
+# compare the bytes served for reading granule footprints from a full download and from ranged reads of
+# the core metadata, using a local granule server with synthetic granules
+# Inputs:
+#    numGranules (int) - number of synthetic granules
+#    granuleSize (int) - approximate size of each granule, in bytes
+def checkMetadataReads(numGranules=20,granuleSize=10000000):
+    serverFolder = tempfile.mkdtemp()
+    names = ["MOD04_L2.A2015213." + str(i*5).zfill(4) + ".061.hdf" for i in range(0,numGranules)]
+    rings = []
+    for i in range(0,numGranules):
+        rings.append([[40.0 + i,42.0 + i,52.0 + i,50.0 + i],[-130.0 + i,-110.0 + i,-112.0 + i,-132.0 + i]])
+        writeTestGranule(os.path.join(serverFolder,names[i]),rings[i][0],rings[i][1],granuleSize,i)
+    [server,baseURL] = modisDownload.startLocalServer(serverFolder)
+    downloader = modisDownload.granuleDownloader()
+    try:
+        print("method, run time (s), requests, MB served, metadata found")
+        startTime = time.time()
+        fullTexts = downloader.runAll(lambda inURL: urlopen(inURL).read().decode('latin-1'),[[baseURL + name] for name in names],"read")
+        print("full download, " + str(round(time.time() - startTime,3)) + ", " + str(server.numRequests) + ", " + str(round(server.bytesServed/1e6,2)) + ", " +
+              str(all(["GRINGPOINTLATITUDE" in text for text in fullTexts])))
+        [server.bytesServed,server.numRequests] = [0,0]
+        startTime = time.time()
+        results = downloader.runAll(fetchCoreMetadata,[[baseURL + name,downloader] for name in names],"read metadata from")
+        isFound = all([result[0] is not None and result[0].strip() in fullText for [result,fullText] in zip(results,fullTexts)])
+        print("ranged reads, " + str(round(time.time() - startTime,3)) + ", " + str(server.numRequests) + ", " + str(round(server.bytesServed/1e6,2)) + ", " +
+              str(isFound))
+        [lats,lons] = parseGRings([result[0] for result in results])
+        print("G-rings parsed from the ranged reads: " + str(bool(np.allclose(lats,[ring[0] for ring in rings]) and np.allclose(lons,[ring[1] for ring in rings]))))
+    finally:
+        downloader.close()
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(serverFolder)
+
+
+# benchmark the G-ring parser and the polygon intersection test on synthetic core metadata, against the
+# earlier per-granule approach (find based parsing of the G-ring values, and a bounding box test that only
+# accepts extents crossing an edge of the study area).  Synthetic granules are skewed quadrilaterals about
+# the size of a MODIS Level 2 granule, with random centers.  For each study area, prints the granules kept
+# by each test, the granules that intersect the study area but were dropped by the earlier test (e.g. 
+# granules inside a large study area), and the granules kept by the earlier test that don't intersect it
+# Inputs:
+#    dayCounts (int list) - numbers of granules to test.  288 is one day of five minute granules
+#    studyAreas (float list) - latitude min, latitude max, longitude min and longitude max of each study area
+#    inSeed (int) - random seed
+def benchmarkGRings(dayCounts=[288,2880,28800],studyAreas=[[41.5,46.2,-124.0,-116.0],[24.5,49.5,-125.0,-66.5]],inSeed=0):
+
+    # earlier approach: parse each G-ring with repeated string searches, and test the bounding box
+    def legacyBounds(metaString,boundName):
+        bounds = [9999,-9999]
+        start = metaString.find(boundName)
+        subIndex = metaString[start:metaString.find(boundName,start + 1 + len(boundName))]
+        subIndex = subIndex[subIndex.find("(") + 1:subIndex.find(")")]
+        [index,endIndex] = [0,0]
+        while(endIndex != -1):
+            endIndex = subIndex.find(",",index + 1)
+            value = float(subIndex[index:endIndex])
+            index = endIndex + 1
+            bounds = [min(bounds[0],value),max(bounds[1],value)]
+        return(bounds)
+    legacyCheck = lambda bounds,minComp,maxComp: (bounds[0] < minComp < bounds[1]) or (bounds[0] < maxComp < bounds[1])
+
+    print("study area, granules, legacy time (s), vectorized time (s), legacy kept, vectorized kept, missed by legacy, over-fetched by legacy")
+    generator = np.random.default_rng(inSeed)
+    for numGranules in dayCounts:
+        # granules about 2330 km across track and 2030 km along track, rotated by up to 15 degrees
+        centers = np.column_stack([generator.uniform(-80,80,numGranules),generator.uniform(-180,180,numGranules)])
+        centers[0:numGranules//10] = [[40.0,-105.0]] + generator.normal(0,15,(numGranules//10,2))
+        angle = np.radians(generator.uniform(-15,15,numGranules))[:,None]
+        [across,along] = [np.array([-1,1,1,-1])*10.5,np.array([-1,-1,1,1])*9.1]
+        lats = np.clip(centers[:,0:1] + across*np.sin(angle) + along*np.cos(angle),-89.9,89.9)
+        lons = centers[:,1:2] + (across*np.cos(angle) - along*np.sin(angle))/np.cos(np.radians(centers[:,0:1]))
+        lons = np.mod(lons + 180,360) - 180
+        metaStrings = [formatTestMetadata(lats[i],lons[i]) for i in range(0,numGranules)]
+
+        for [latMin,latMax,lonMin,lonMax] in studyAreas:
+            startTime = time.time()
+            legacyKept = np.array([legacyCheck(legacyBounds(metaString,"GRINGPOINTLATITUDE"),latMin,latMax) and
+                                   legacyCheck(legacyBounds(metaString,"GRINGPOINTLONGITUDE"),lonMin,lonMax) for metaString in metaStrings])
+            legacyTime = time.time() - startTime
+            startTime = time.time()
+            [parsedLats,parsedLons] = parseGRings(metaStrings)
+            [isIntersecting,isValid] = gringIntersects(parsedLats,parsedLons,latMin,latMax,lonMin,lonMax)
+            vectorTime = time.time() - startTime
+            print(str([latMin,latMax,lonMin,lonMax]).replace(",","") + ", " + str(numGranules) + ", " + str(round(legacyTime,4)) + ", " +
+                  str(round(vectorTime,4)) + ", " + str(int(np.sum(legacyKept))) + ", " + str(int(np.sum(isIntersecting))) + ", " +
+                  str(int(np.sum(isIntersecting & ~legacyKept))) + ", " + str(int(np.sum(legacyKept & ~isIntersecting))))
+            if(not (np.all(isValid) and np.allclose(parsedLats,lats,atol=1e-6) and np.allclose(parsedLons,lons,atol=1e-6))):
+                print("parsed G-rings differ from the synthetic G-rings")
+
+
+if __name__ == "__main__":
+    benchmarkGRings()
+    checkMetadataReads()
+
+
+############## end of modisMetadata.py ##################
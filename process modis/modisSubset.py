@@ -0,0 +1,507 @@
+############## modisSubset.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module subsets the aerosol optical depth (AOD) of MODIS Level 2 granules to a study
+# area and saves it in a compact store, so whole granules don't have to be kept on disk or reopened.  Only
+# the latitude, longitude and AOD scientific datasets (SDS) of a granule are read, from a local file or
+# with ranged reads from the server (modisMetadata.py), without reading the rest of the granule.  Each SDS
+# is found through its HDF4 "Var" vgroup, which lists the numeric data group (dimensions, number type and
+# data) and the attributes (scale factor, offset and fill value) of the SDS.  Data stored without
+# compression or with deflate compression is supported.  Pixels inside the study area with valid AOD are
+# saved in the store as one memory-mappable .npy file per day (year/day.npy), with the latitude,
+# longitude, AOD and acquisition time of each pixel, so extracting a day's AOD at participant locations
+# reads one small file.
+
+# Requirements:
+#      numpy, scipy
+#      modisMetadata.py, for reading HDF4 data descriptors and ranged reads
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import os
+import mmap
+import time
+import zlib
+import shutil
+import struct
+import tempfile
+import numpy as np
+from datetime import datetime
+from scipy.spatial import cKDTree
+
+import modisDownload
+import modisMetadata
+
+# constants
+AOD_DATASET = "Optical_Depth_Land_And_Ocean" # name of the AOD SDS in MOD04_L2 and MYD04_L2 granules
+LATITUDE_DATASET = "Latitude" # name of the latitude SDS
+LONGITUDE_DATASET = "Longitude" # name of the longitude SDS
+DFTAG_NT = 106 # HDF4 tag of number types
+DFTAG_SDD = 701 # HDF4 tag of SDS dimensions
+DFTAG_SD = 702 # HDF4 tag of SDS data
+DFTAG_NDG = 720 # HDF4 tag of numeric data groups
+DFTAG_VG = 1965 # HDF4 tag of vgroups
+DFTAG_COMPRESSED = 40 # HDF4 tag of compressed data
+SPECIAL_FLAG = 0x4000 # added to the tag of special (e.g. compressed) data elements
+SPECIAL_COMP = 3 # special element code of compressed elements
+COMP_CODE_NONE = 0 # HDF4 compression code of uncompressed data
+COMP_CODE_DEFLATE = 4 # HDF4 compression code of deflate (zlib) compression
+NUMBER_TYPES = {5:">f4",6:">f8",20:"|i1",21:"|u1",22:">i2",23:">u2",24:">i4",25:">u4"} # numpy types of HDF4 number types
+STORE_TYPE = np.dtype([("lat","<f4"),("lon","<f4"),("aod","<f4"),("time","<u2")]) # pixel record in the AOD store
+EARTH_RADIUS = 6371.0 # mean radius of the earth, in km
+
+
+
+############### helper functions ##############
+
+# read the "Var" vgroups of an HDF4 file, one for each SDS
+# Inputs:
+#    reader (fileReader or rangedReader) - reader for the file
+#    dds (structured array) - data descriptors of the file (see modisMetadata.readDataDescriptors)
+# Outputs:
+#    dict from SDS name to a list of the [tag,ref] of each member of its vgroup
+def readVarGroups(reader,dds):
+    vgroups = dds[(dds["tag"] == DFTAG_VG) & (dds["length"] > 0)]
+    reader.prefetch(vgroups["offset"],vgroups["length"])
+    groups = {}
+    for vgroup in vgroups:
+        element = reader.read(int(vgroup["offset"]),int(vgroup["length"]))
+        numMembers = struct.unpack(">H",element[0:2])[0]
+        members = np.frombuffer(element[2:2 + 4*numMembers],dtype=">u2").reshape(2,numMembers).T
+        offset = 2 + 4*numMembers
+        nameLength = struct.unpack(">H",element[offset:offset + 2])[0]
+        name = element[offset + 2:offset + 2 + nameLength].decode('latin-1')
+        offset += 2 + nameLength
+        classLength = struct.unpack(">H",element[offset:offset + 2])[0]
+        if(element[offset + 2:offset + 2 + classLength] == b"Var"):
+            groups[name] = [[int(tag),int(ref)] for [tag,ref] in members]
+    return(groups)
+
+
+# read the data of an HDF4 element, decompressing it if it is a compressed special element
+# Inputs:
+#    reader (fileReader or rangedReader) - reader for the file
+#    dds (structured array) - data descriptors of the file
+#    tag (int) - tag of the element
+#    ref (int) - reference number of the element
+# Outputs:
+#    bytes of the element
+def readElement(reader,dds,tag,ref):
+    matches = dds[((dds["tag"] == tag) | (dds["tag"] == tag | SPECIAL_FLAG)) & (dds["ref"] == ref)]
+    if(matches.size == 0):
+        raise KeyError("no HDF4 element with tag " + str(tag) + " and reference number " + str(ref))
+    element = reader.read(int(matches[0]["offset"]),int(matches[0]["length"]))
+    if(matches[0]["tag"] == tag):
+        return(element)
+    [specialCode,version,length,compRef,modelType,compType] = struct.unpack(">hHiHHH",element[0:14])
+    if(specialCode != SPECIAL_COMP):
+        raise ValueError("unsupported HDF4 special element " + str(specialCode))
+    compressed = readElement(reader,dds,DFTAG_COMPRESSED,compRef)
+    if(compType == COMP_CODE_DEFLATE):
+        return(zlib.decompress(compressed)[0:length])
+    if(compType == COMP_CODE_NONE):
+        return(compressed[0:length])
+    raise ValueError("unsupported HDF4 compression " + str(compType))
+
+
+# read an SDS of an HDF4 file, with its numeric attributes
+# Inputs:
+#    reader (fileReader or rangedReader) - reader for the file
+#    dds (structured array) - data descriptors of the file
+#    groups (dict) - "Var" vgroups of the file (see readVarGroups)
+#    name (string) - name of the SDS
+# Outputs:
+#    data (array) - values of the SDS, with the SDS dimensions
+#    attributes (dict) - numeric attributes of the SDS (e.g. scale_factor), as arrays
+def readDataset(reader,dds,groups,name):
+    if(name not in groups):
+        raise KeyError("no SDS named " + name)
+    members = groups[name]
+    isMember = np.isin(dds["ref"],[ref for [tag,ref] in members]) & np.isin(dds["tag"],[modisMetadata.DFTAG_VH,modisMetadata.DFTAG_VS,DFTAG_NDG])
+    reader.prefetch(dds[isMember]["offset"],dds[isMember]["length"])
+
+    # the numeric data group lists the dimension record and the data
+    ndgRef = [ref for [tag,ref] in members if tag == DFTAG_NDG][0]
+    ndg = np.frombuffer(readElement(reader,dds,DFTAG_NDG,ndgRef),dtype=">u2").reshape(-1,2)
+    sddRef = int(ndg[ndg[:,0] == DFTAG_SDD][0,1])
+    sdRef = int(ndg[ndg[:,0] == DFTAG_SD][0,1])
+    sdd = readElement(reader,dds,DFTAG_SDD,sddRef)
+    rank = struct.unpack(">h",sdd[0:2])[0]
+    shape = struct.unpack(">" + "i"*rank,sdd[2:2 + 4*rank])
+    ntRef = struct.unpack(">HH",sdd[2 + 4*rank:6 + 4*rank])[1]
+    numberType = readElement(reader,dds,DFTAG_NT,ntRef)[1]
+    data = np.frombuffer(readElement(reader,dds,DFTAG_SD,sdRef),dtype=NUMBER_TYPES[numberType],count=int(np.prod(shape))).reshape(shape)
+
+    # read the numeric attribute vdatas of the SDS
+    attributes = {}
+    for [tag,ref] in members:
+        if(tag != modisMetadata.DFTAG_VH):
+            continue
+        header = readElement(reader,dds,modisMetadata.DFTAG_VH,ref)
+        [interlace,numRecords,recordSize,numFields,fieldType] = struct.unpack(">hiHhh",header[0:12])
+        order = struct.unpack(">H",header[16:18])[0]
+        offset = 18 + 2 + struct.unpack(">h",header[18:20])[0]
+        nameLength = struct.unpack(">h",header[offset:offset + 2])[0]
+        if(numFields == 1 and fieldType in NUMBER_TYPES):
+            value = readElement(reader,dds,modisMetadata.DFTAG_VS,ref)
+            attributes[header[offset + 2:offset + 2 + nameLength].decode('latin-1')] = np.frombuffer(value,dtype=NUMBER_TYPES[fieldType],count=numRecords*order)
+    return([data,attributes])
+
+
+# read the AOD of a granule inside a study area.  MODIS values are scale_factor*(value - add_offset)
+# Inputs:
+#    reader (fileReader or rangedReader) - reader for the granule
+#    latMin, latMax, lonMin, lonMax (float) - bounds of the study area, in decimal degrees
+#    granuleTime (int) - acquisition time of the granule, in HHMM format
+# Outputs:
+#    records (structured array) - latitude, longitude, AOD and acquisition time of each pixel inside the
+#    study area with valid AOD (see STORE_TYPE)
+def subsetGranule(reader,latMin,latMax,lonMin,lonMax,granuleTime):
+    dds = modisMetadata.readDataDescriptors(reader)
+    if(dds is None):
+        raise ValueError(reader.getURL() + " is not an HDF4 file")
+    groups = readVarGroups(reader,dds)
+    lat = readDataset(reader,dds,groups,LATITUDE_DATASET)[0]
+    lon = readDataset(reader,dds,groups,LONGITUDE_DATASET)[0]
+    isInside = (lat >= latMin) & (lat <= latMax) & (lon >= lonMin) & (lon <= lonMax)
+    if(not np.any(isInside)):
+        return(np.zeros(0,dtype=STORE_TYPE))
+    [aod,attributes] = readDataset(reader,dds,groups,AOD_DATASET)
+    isInside &= aod != attributes.get("_FillValue",[None])[0]
+    if("valid_range" in attributes):
+        isInside &= (aod >= attributes["valid_range"][0]) & (aod <= attributes["valid_range"][1])
+    records = np.zeros(int(np.sum(isInside)),dtype=STORE_TYPE)
+    records["lat"] = lat[isInside]
+    records["lon"] = lon[isInside]
+    records["aod"] = attributes.get("scale_factor",[1.0])[0]*(aod[isInside] - attributes.get("add_offset",[0.0])[0])
+    records["time"] = granuleTime
+    return(records)
+
+
+# subset the AOD of a granule on a server with ranged reads (see subsetGranule)
+# Inputs:
+#    inURL (string) - url of the granule
+#    downloader (granuleDownloader) - downloader whose connections are used
+#    bounds (float list) - latitude min, latitude max, longitude min and longitude max of the study area
+# Outputs:
+#    records (structured array) - pixels inside the study area with valid AOD
+#    numBytes (int) - number of bytes read from the server
+def fetchSubset(inURL,downloader,bounds):
+    reader = modisMetadata.rangedReader(downloader,inURL)
+    return([subsetGranule(reader,*bounds,getGranuleTime(inURL)),reader.getBytesRead()])
+
+
+# subset the AOD of a granule on disk (see subsetGranule)
+# Inputs:
+#    inFile (string) - filepath to the granule
+#    bounds (float list) - latitude min, latitude max, longitude min and longitude max of the study area
+# Outputs:
+#    records (structured array) - pixels inside the study area with valid AOD
+def readSubset(inFile,bounds):
+    reader = fileReader(inFile)
+    try:
+        return(subsetGranule(reader,*bounds,getGranuleTime(inFile)))
+    finally:
+        reader.close()
+
+
+# get the acquisition time of a granule from its name
+# Inputs:
+#    granuleName (string) - name, filepath or url of the granule
+# Outputs:
+#    acquisition time in HHMM format (int)
+def getGranuleTime(granuleName):
+    key = modisMetadata.getGranuleKey(os.path.basename(granuleName))
+    if(key is None):
+        raise ValueError("no acquisition time in " + granuleName)
+    return(int(key[-4:]))
+
+
+
+########### file reader custom class ##########
+
+# custom class that reads byte ranges of a file on disk through a memory map, with the same interface as
+# the ranged reader in modisMetadata.py
+class fileReader:
+    # instantiate a file reader
+    # inFile (string) - filepath to the file
+    def __init__(self,inFile):
+        self.url = inFile
+        self.bytesRead = 0
+        with open(inFile,'rb') as ifStream:
+            self.data = mmap.mmap(ifStream.fileno(),0,access=mmap.ACCESS_READ) if os.path.getsize(inFile) > 0 else b""
+
+    ########### custom functions ############
+
+    # file pages are read on demand by the memory map
+    def prefetch(self,offsets,lengths):
+        return
+
+    # read a range of bytes
+    # offset (int) - offset of the first byte
+    # length (int) - number of bytes to read
+    # outputs: bytes of the range, which are shorter than requested if the file ends before the range
+    def read(self,offset,length):
+        if(length <= 0 or offset < 0):
+            return(b"")
+        data = self.data[offset:offset + length]
+        self.bytesRead += len(data)
+        return(data)
+
+    # close the memory map
+    def close(self):
+        if(isinstance(self.data,mmap.mmap)):
+            self.data.close()
+
+    ########## getters and setters ##########
+    def getBytesRead(self):
+        return(self.bytesRead)
+
+    def getURL(self):
+        return(self.url)
+
+
+########### end of the file reader custom class ##########
+
+
+
+########### AOD store custom class ##########
+
+# custom class that stores the AOD pixels of a study area as one .npy file per product and day
+# (storeFolder/product/year/day.npy), so Terra and Aqua granules with the same acquisition time are kept
+# apart.  Day files are memory mapped when read
+class aodStore:
+    # instantiate an AOD store
+    # storeFolder (string) - folder the store is saved in.  Created if it doesn't exist
+    def __init__(self,storeFolder):
+        self.storeFolder = storeFolder
+        if(not os.path.exists(storeFolder)):
+            os.makedirs(storeFolder)
+
+    ########### custom functions ############
+
+    # get the store file of a product and day
+    # product (string) - MODIS product, e.g. MOD04_L2
+    # dayDate (datetime) - date of the day
+    def getDayFile(self,product,dayDate):
+        return(os.path.join(self.storeFolder,product,dayDate.strftime("%Y"),dayDate.strftime("%j") + ".npy"))
+
+    # read the AOD pixels of a day, memory mapped.  Outputs an empty array if the day isn't in the store
+    # product (string) - MODIS product, e.g. MOD04_L2
+    # dayDate (datetime) - date of the day
+    def readDay(self,product,dayDate):
+        dayFile = self.getDayFile(product,dayDate)
+        if(not os.path.exists(dayFile) or os.path.getsize(dayFile) == 0):
+            return(np.zeros(0,dtype=STORE_TYPE))
+        records = np.load(dayFile,mmap_mode='r')
+        return(records if records.size > 0 else np.zeros(0,dtype=STORE_TYPE))
+
+    # get the acquisition times of the granules of a day that are in the store, including granules without
+    # pixels in the study area
+    # product (string) - MODIS product, e.g. MOD04_L2
+    # dayDate (datetime) - date of the day
+    def getGranuleTimes(self,product,dayDate):
+        timesFile = os.path.splitext(self.getDayFile(product,dayDate))[0] + "_granules.txt"
+        if(not os.path.exists(timesFile)):
+            return(set())
+        with open(timesFile,'r') as ifStream:
+            return(set([int(line) for line in ifStream if line.strip() != ""]))
+
+    # add the AOD pixels of granules to a day.  Pixels of granules that are already in the store are replaced.
+    # The day file is replaced in one step
+    # product (string) - MODIS product of the granules, e.g. MOD04_L2
+    # dayDate (datetime) - date of the day
+    # granuleTimes (int list) - acquisition time of each granule, in HHMM format
+    # granuleRecords (list) - pixels of each granule (see subsetGranule)
+    def addGranules(self,product,dayDate,granuleTimes,granuleRecords):
+        dayFile = self.getDayFile(product,dayDate)
+        if(not os.path.exists(os.path.dirname(dayFile))):
+            os.makedirs(os.path.dirname(dayFile))
+        records = np.array(self.readDay(product,dayDate))
+        records = np.concatenate([records[~np.isin(records["time"],granuleTimes)]] + list(granuleRecords))
+        records = records[np.argsort(records["time"],kind='stable')]
+        with open(dayFile + ".tmp",'wb') as ofStream:
+            np.save(ofStream,records)
+        os.replace(dayFile + ".tmp",dayFile)
+        timesFile = os.path.splitext(dayFile)[0] + "_granules.txt"
+        with open(timesFile + ".tmp",'w') as ofStream:
+            ofStream.write("".join([str(granuleTime) + "\n" for granuleTime in sorted(self.getGranuleTimes(product,dayDate) | set(granuleTimes))]))
+        os.replace(timesFile + ".tmp",timesFile)
+
+    # get the AOD of the nearest pixel of a day to each point.  Distances are great circle distances
+    # product (string) - MODIS product, e.g. MOD04_L2
+    # dayDate (datetime) - date of the day
+    # lats (float array) - latitudes of the points
+    # lons (float array) - longitudes of the points
+    # maxDistance (float) - points farther than this from every pixel get NaN, in km
+    # outputs: AOD of each point, and the distance to its pixel in km (infinite if no pixel is within maxDistance)
+    def extractPoints(self,product,dayDate,lats,lons,maxDistance=10.0):
+        records = self.readDay(product,dayDate)
+        [lats,lons] = [np.radians(np.ravel(lats).astype(np.float64)),np.radians(np.ravel(lons).astype(np.float64))]
+        aod = np.full(lats.size,np.nan)
+        dists = np.full(lats.size,np.inf)
+        if(records.size == 0 or lats.size == 0):
+            return([aod,dists])
+
+        # nearest pixels are found with a k-d tree of unit vectors, and chord lengths are converted to great
+        # circle distances
+        toXYZ = lambda inLat,inLon: np.column_stack([np.cos(inLat)*np.cos(inLon),np.cos(inLat)*np.sin(inLon),np.sin(inLat)])
+        tree = cKDTree(toXYZ(np.radians(records["lat"].astype(np.float64)),np.radians(records["lon"].astype(np.float64))))
+        maxChord = 2*np.sin(min(maxDistance/EARTH_RADIUS,np.pi)/2)
+        [chords,nearest] = tree.query(toXYZ(lats,lons),distance_upper_bound=maxChord*(1 + 1e-9))
+        isFound = np.isfinite(chords)
+        dists[isFound] = 2*EARTH_RADIUS*np.arcsin(np.clip(chords[isFound]/2,0,1))
+        aod[isFound] = records["aod"][nearest[isFound]]
+        return([aod,dists])
+
+    ########## getters and setters ##########
+    def getStoreFolder(self):
+        return(self.storeFolder)
+
+
+########### end of the AOD store custom class ##########
+
+
+
+# format the objects of an SDS for a synthetic HDF4 file: a number type, dimension record, data (deflate
+# compressed if requested), numeric data group, attribute vdatas, and a "Var" vgroup that lists them
+# Inputs:
+#    ref (int) - reference number of the SDS objects.  Attribute vdatas use reference numbers from ref*10
+#    name (string) - name of the SDS
+#    data (array) - values of the SDS, with big endian byte order
+#    attributes (dict) - attribute arrays, with big endian byte order
+#    isCompressed (boolean) - whether the data is deflate compressed
+# Outputs:
+#    list of objects, each a list of the tag, reference number and bytes of the object
+def formatTestDataset(ref,name,data,attributes,isCompressed):
+    numberType = dict([[NUMBER_TYPES[hdfType],hdfType] for hdfType in NUMBER_TYPES])[data.dtype.str]
+    objects = [[DFTAG_NT,ref,struct.pack(">BBBB",1,numberType,8*data.dtype.itemsize,1)]]
+    objects.append([DFTAG_SDD,ref,struct.pack(">h",data.ndim) + struct.pack(">" + "i"*data.ndim,*data.shape) + struct.pack(">HH",DFTAG_NT,ref) +
+                    struct.pack(">HH",DFTAG_NT,ref)*data.ndim])
+    if(isCompressed):
+        objects.append([DFTAG_SD | SPECIAL_FLAG,ref,struct.pack(">hHiHHHH",SPECIAL_COMP,0,data.nbytes,ref,0,COMP_CODE_DEFLATE,6)])
+        objects.append([DFTAG_COMPRESSED,ref,zlib.compress(data.tobytes(),6)])
+    else:
+        objects.append([DFTAG_SD,ref,data.tobytes()])
+    objects.append([DFTAG_NDG,ref,struct.pack(">HHHHHH",DFTAG_SDD,ref,DFTAG_SD,ref,DFTAG_NT,ref)])
+    members = [[DFTAG_NDG,ref]]
+    for [attributeNum,attributeName] in enumerate(sorted(attributes)):
+        objects += modisMetadata.formatTestAttribute(ref*10 + attributeNum,attributeName,attributes[attributeName])
+        members.append([modisMetadata.DFTAG_VH,ref*10 + attributeNum])
+    vgroup = struct.pack(">H",len(members)) + struct.pack(">" + "H"*len(members),*[tag for [tag,memberRef] in members])
+    vgroup += struct.pack(">" + "H"*len(members),*[memberRef for [tag,memberRef] in members])
+    vgroup += struct.pack(">H",len(name)) + name.encode() + struct.pack(">H",3) + b"Var" + struct.pack(">HHhh",0,0,3,0)
+    objects.append([DFTAG_VG,ref,vgroup])
+    return(objects)
+
+
+# write a synthetic MOD04_L2 granule for testing, with latitude, longitude and AOD datasets on a swath
+# whose corners are the G-ring points (see modisMetadata.writeTestGranule)
+# Inputs:
+#    outFile (string) - filepath to the output file
+#    gringLats (float list) - latitudes of the four corners, in G-ring order
+#    gringLons (float list) - longitudes of the four corners, in G-ring order
+#    dataSize (int) - total number of bytes of other data objects
+#    inSeed (int) - random number seed
+#    shape (int list) - number of along track and across track pixels
+#    isCompressed (boolean) - whether the datasets are deflate compressed
+# Outputs:
+#    lat, lon, aod (arrays) - latitude, longitude, and scaled AOD (NaN for fill values) of each pixel
+def writeTestSwath(outFile,gringLats,gringLons,dataSize,inSeed,shape=[203,135],isCompressed=True):
+    generator = np.random.default_rng(inSeed)
+    [along,across] = np.meshgrid(np.linspace(0,1,shape[0]),np.linspace(0,1,shape[1]),indexing='ij')
+    corners = lambda values: ((1 - along)*(1 - across)*values[0] + (1 - along)*across*values[1] + along*across*values[2] + along*(1 - across)*values[3])
+    [lat,lon] = [corners(gringLats).astype(">f4"),corners(gringLons).astype(">f4")]
+    aod = generator.integers(-50,3000,shape).astype(">i2")
+    aod[generator.random(shape) < 0.3] = -9999
+    objects = formatTestDataset(1,LATITUDE_DATASET,lat,{"_FillValue":np.array([-999.0],dtype=">f4")},isCompressed)
+    objects += formatTestDataset(2,LONGITUDE_DATASET,lon,{"_FillValue":np.array([-999.0],dtype=">f4")},isCompressed)
+    objects += formatTestDataset(3,AOD_DATASET,aod,{"_FillValue":np.array([-9999],dtype=">i2"),"valid_range":np.array([-50,5000],dtype=">i2"),
+                                                    "scale_factor":np.array([0.001],dtype=">f8"),"add_offset":np.array([0.0],dtype=">f8")},isCompressed)
+    modisMetadata.writeTestGranule(outFile,gringLats,gringLons,dataSize,inSeed,objects)
+    return([lat.astype(np.float64),lon.astype(np.float64),np.where(aod == -9999,np.nan,0.001*aod.astype(np.float64))])
+
+
+# check the AOD subsets and the store with synthetic granules.  Subsets read from local files and with
+# ranged reads from a local granule server are compared with the synthetic AOD, and the size of the store,
+# the bytes read from the server, and the time to extract a day's AOD at points from the store and from the
+# granules are reported
+# Inputs:
+#    numGranules (int) - number of synthetic granules in the day
+#    granuleSize (int) - approximate size of the other data of each granule, in bytes
+#    numPoints (int) - number of points AOD is extracted at
+def checkSubsetStore(numGranules=12,granuleSize=20000000,numPoints=10000):
+    serverFolder = tempfile.mkdtemp()
+    storeFolder = tempfile.mkdtemp()
+    dayDate = datetime(2015,8,1)
+    bounds = [41.5,46.2,-124.0,-116.0]
+    names = ["MOD04_L2.A2015213." + str(1800 + i*5).zfill(4) + ".061.hdf" for i in range(0,numGranules)]
+    truth = []
+    for i in range(0,numGranules):
+        [centerLat,centerLon] = [44.0 + 3*np.sin(i),-120.0 + 6*np.cos(i)]
+        truth.append(writeTestSwath(os.path.join(serverFolder,names[i]),[centerLat - 10,centerLat - 10,centerLat + 10,centerLat + 10],
+                                    [centerLon - 12,centerLon + 12,centerLon + 12,centerLon - 12],granuleSize,i,isCompressed=(i % 2 == 0)))
+    [server,baseURL] = modisDownload.startLocalServer(serverFolder)
+    downloader = modisDownload.granuleDownloader()
+    try:
+        # subset the granules from the server and from local files
+        startTime = time.time()
+        results = downloader.runAll(fetchSubset,[[baseURL + name,downloader,bounds] for name in names],"subset")
+        remoteTime = time.time() - startTime
+        startTime = time.time()
+        localRecords = [readSubset(os.path.join(serverFolder,name),bounds) for name in names]
+        localTime = time.time() - startTime
+        isEqual = all([result[0].tobytes() == records.tobytes() for [result,records] in zip(results,localRecords)])
+        isCorrect = True
+        for [[lat,lon,aod],records] in zip(truth,localRecords):
+            isInside = (lat >= bounds[0]) & (lat <= bounds[1]) & (lon >= bounds[2]) & (lon <= bounds[3]) & ~np.isnan(aod)
+            isCorrect &= bool(np.allclose(records["aod"],aod[isInside],atol=1e-6) and np.array_equal(records["lat"],lat[isInside].astype(np.float32)))
+        granuleBytes = sum([os.path.getsize(os.path.join(serverFolder,name)) for name in names])
+        print("granules, MB on disk, MB read with ranged reads, ranged subset time (s), local subset time (s), remote and local subsets match, subsets match the synthetic AOD")
+        print(str(numGranules) + ", " + str(round(granuleBytes/1e6,2)) + ", " + str(round(sum([result[1] for result in results])/1e6,2)) + ", " +
+              str(round(remoteTime,3)) + ", " + str(round(localTime,3)) + ", " + str(isEqual) + ", " + str(isCorrect))
+
+        # save the day in the store, and extract AOD at random points from the store and from the granules
+        store = aodStore(storeFolder)
+        store.addGranules("MOD04_L2",dayDate,[getGranuleTime(name) for name in names],localRecords)
+        store.addGranules("MOD04_L2",dayDate,[getGranuleTime(names[0])],[localRecords[0]])
+        storeBytes = os.path.getsize(store.getDayFile("MOD04_L2",dayDate))
+        generator = np.random.default_rng(0)
+        [pointLats,pointLons] = [generator.uniform(bounds[0],bounds[1],numPoints),generator.uniform(bounds[2],bounds[3],numPoints)]
+        startTime = time.time()
+        [storeAOD,storeDists] = aodStore(storeFolder).extractPoints("MOD04_L2",dayDate,pointLats,pointLons)
+        storeTime = time.time() - startTime
+        startTime = time.time()
+        granuleStore = aodStore(tempfile.mkdtemp(dir=storeFolder))
+        granuleStore.addGranules("MOD04_L2",dayDate,[getGranuleTime(name) for name in names],[readSubset(os.path.join(serverFolder,name),bounds) for name in names])
+        [granuleAOD,granuleDists] = granuleStore.extractPoints("MOD04_L2",dayDate,pointLats,pointLons)
+        granuleTime = time.time() - startTime
+        print("store MB, storage reduction (%), store extraction time (s), granule extraction time (s), extractions match, points with AOD")
+        print(str(round(storeBytes/1e6,3)) + ", " + str(round(100*(1 - storeBytes/granuleBytes),2)) + ", " + str(round(storeTime,4)) + ", " +
+              str(round(granuleTime,4)) + ", " + str(bool(np.array_equal(storeAOD,granuleAOD,equal_nan=True))) + ", " + str(int(np.sum(~np.isnan(storeAOD)))) +
+              ", granules in store: " + str(len(store.getGranuleTimes("MOD04_L2",dayDate))))
+
+        # an Aqua granule with the same acquisition time as a Terra granule is stored apart from it
+        store.addGranules("MYD04_L2",dayDate,[getGranuleTime(names[1])],[localRecords[1][:1]])
+        isSeparate = (store.getGranuleTimes("MYD04_L2",dayDate) == set([getGranuleTime(names[1])]) and
+                      store.readDay("MYD04_L2",dayDate).tobytes() == localRecords[1][:1].tobytes() and
+                      store.readDay("MOD04_L2",dayDate).size == sum([records.size for records in localRecords]))
+        print("products stored apart: " + str(isSeparate))
+    finally:
+        downloader.close()
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(serverFolder)
+        shutil.rmtree(storeFolder)
+
+
+if __name__ == "__main__":
+    checkSubsetStore()
+
+
+############## end of modisSubset.py ##################
@@ -1,11 +1,24 @@
 ######### processMODIS.py ############
 # Author: Andrew Larkin
 # Developed for Laurel Kincl, Oregon State University
-# Date last modified: September 20th, 2016
+# Date last modified: October 17th, 2026
 # Description: The purpose of this script is to download daily Level 2 MODIS atmosphere 
 # products from the designated NASA FTP site.  Files are downloaded in .hdf foormat
 # Only files within the spatial and temporal extent of interest are downloaded.  
 # Files must be downloaded separately for aqua and terra satellites
+# The spatial extent of each file is read without downloading the file, from the provider's daily 
+# geolocation metadata listing (if GEOMETA is set) or from ranged reads of the file's core metadata 
+# (modisMetadata.py), and only files whose G-ring footprint overlaps the study area are downloaded.  Each
+# day's files are downloaded once, NUM_TRANSFERS at a time, with modisDownload.py.  Downloads are streamed to disk, 
+# interrupted downloads are resumed, and files already on disk are skipped.  If the extent couldn't be 
+# read before downloading, it is read from the downloaded file, and files outside the study area are 
+# removed.  Folder listings, file sizes and extents are saved in a local granule index (modisIndex.py), so 
+# each day's folder is listed once, and reprocessing a time period (which can cross years) or a new study
+# area needs no listing or metadata requests.  The aerosol optical depth and geolocation of the study area
+# are read from each file (with ranged reads, without downloading the file, when the extent is known) and 
+# saved in a compact store with one file per product and day (modisSubset.py).  Whole .hdf files are only
+# kept if KEEP_HDF is set.
+# Requirements: Python 3 standard library, numpy, scipy (tested on Linux, Python 3.11, without ArcGIS)
 ######################################
 
 
@@ -13,11 +26,18 @@
 
 # import packages
 import datetime
-from datetime import datetime
+from datetime import datetime, timedelta
 import sys
 import os
-import urllib2
-import arcpy
+import struct
+import shutil
+import tempfile
+from urllib.request import urlopen
+import numpy as np
+import modisDownload
+import modisMetadata
+import modisIndex
+import modisSubset
 
 # define constants
 folder = os.path.dirname(sys.argv[0]) + "/" # designated folder to store all MODIS-related data
@@ -37,194 +57,240 @@ LAT_MIN = 41.5
 LONG_MAX = -116
 LONG_MIN = -124
 
-# variables names of latitude and longitude boundaries in the .hdf metadata
-LATITUDE_BOUND = "GRINGPOINTLATITUDE"
-LONGITUDE_BOUND = "GRINGPOINTLONGITUDE"
-
 # folder to store .hdf files
 outputFolder = folder + "MODIS_files/"
 
+# folder to store the aerosol optical depth of the study area, with one file per product and day
+storeFolder = folder + "MODIS_store/"
+
+KEEP_HDF = False # if True, whole .hdf files are downloaded and kept.  Otherwise only the study area's AOD is kept
+
+# folder to store the granule index, with the names, sizes, and extents of the .hdf files of each day
+indexFolder = folder + "MODIS_index/"
+
+NUM_TRANSFERS = 4 # number of .hdf files downloaded in parallel
+
+# url of the daily geolocation metadata listings, in strftime format, e.g. 
+# "https://ladsweb.modaps.eosdis.nasa.gov/archive/geoMeta/61/TERRA/%Y/MOD03_%Y-%m-%d.txt".  If None,
+# the spatial extent is read from the core metadata of each .hdf file
+GEOMETA = None
+
 ############### helper functions ###############
 
 
-# Description: The FTP folder structure names files acoording to Julian date of the aquired image.
-# This function takes the startDate and endDate and inputs, and returns the list of folders within
-# the FTP site that may contain .hdf files that fall within the time interval of interest
+# Description: The FTP folder structure names folders according to the year and Julian date of the aquired image.
+# This function takes the startDate and endDate and inputs, and returns the dates of the folders within
+# the FTP site that may contain .hdf files that fall within the time interval of interest.  The time
+# interval can cross years
 # INPUTS:
 #    startDate - startDate for the time interval of interest, in day-month-year format
 #    endDate - endDate for the time interval of interest, in day-month-year format
 # OUTPUTS:
-#    list of output folders, string array format
+#    list of folder dates, datetime array format
 def identifyFolders(startDate, endDate):
     a = datetime.strptime(startDate, "%d-%m-%Y")    
     b = datetime.strptime(endDate, "%d-%m-%Y")
-    return(range(int(a.strftime("%j")),int(b.strftime("%j"))+1))
+    return([a + timedelta(days=dayNum) for dayNum in range(0,(b - a).days + 1)])
 
     
     
-# Description: Given an input file with .hdf metadata, find the latitude bounds.
+# Description: Read the spatial extent of .hdf files of one day, without downloading the files.
+# G-ring coordinates are read from the geolocation metadata listing of the day, if GEOMETA is set, and
+# otherwise from ranged reads of the core metadata of each file
 # INPUTS:
-#    metaString - a string object containing the metadata
+#    downloader (granuleDownloader) - downloader whose connections are used
+#    hdfFolder (string) - url of the folder containing the .hdf files
+#    hdfList (string array) - .hdf file names
+#    dayDate (datetime) - date of the .hdf files
 # OUTPUTS:
-#    latBounds - a 2D float array with the minimum and maximum latitude bounds 
-#                for the .hdf file
-def getLatBounds(metaString):
-    latIndex = 0 
-    latBounds = [9999,-9999]
-    latIndex = str(metaString).find(LATITUDE_BOUND,latIndex) # LATITUDE_BOUND is a global constant
-    endIndex = str(metaString).find(LATITUDE_BOUND,latIndex + 1 + len(LATITUDE_BOUND))
-    subIndex = metaString[latIndex:endIndex] 
-    latIndex = str(subIndex).find("(")
-    endIndex = str(subIndex).find(")")
-    subIndex2 = subIndex[latIndex+1:endIndex]
-    latIndex = 0
+#    lats, lons - n x k float arrays with the G-ring latitudes and longitudes of each .hdf file, padded with
+#    NaN.  All NaN if the extent couldn't be read without downloading the file
+def readFootprints(downloader, hdfFolder, hdfList, dayDate):
+    [lats,lons] = [np.full((len(hdfList),4),np.nan),np.full((len(hdfList),4),np.nan)]
+    if(GEOMETA != None and len(hdfList) > 0):
+        try:
+            footprints = modisMetadata.parseGeoMeta(urlopen(dayDate.strftime(GEOMETA)).read().decode('latin-1'))
+        except (IOError, ValueError, KeyError) as error:
+            print("could not read the geolocation metadata listing: " + str(error))
+            footprints = {}
+        for i in range(0,len(hdfList)):
+            footprint = footprints.get(modisMetadata.getGranuleKey(hdfList[i]))
+            if(footprint != None):
+                [lats[i],lons[i]] = footprint
+
+    # read the core metadata of the remaining files with ranged reads
+    pending = [i for i in range(0,len(hdfList)) if np.all(np.isnan(lats[i]))]
+    results = downloader.runAll(modisMetadata.fetchCoreMetadata,[[hdfFolder + hdfList[i],downloader] for i in pending],"read metadata from")
+    [pendingLats,pendingLons] = modisMetadata.parseGRings([None if result == None else result[0] for result in results])
+    numPoints = max(lats.shape[1],pendingLats.shape[1])
+    [lats,lons] = [np.pad(coords,((0,0),(0,numPoints - coords.shape[1])),constant_values=np.nan) for coords in [lats,lons]]
+    lats[pending,0:pendingLats.shape[1]] = pendingLats
+    lons[pending,0:pendingLons.shape[1]] = pendingLons
+    return([lats,lons])
     
-    # search through metaString for all latitude values and update the min and max latBounds as
-    # necessary
-    while(endIndex != -1):
-        endIndex = str(subIndex2).find(",",latIndex+1)
-        testFloat = float(str(subIndex2[latIndex:endIndex]))
-        latIndex = endIndex +1
-
-        # if the candidate latitude value is less than the current minimum latitude bound, 
-        # update the minimum latitude bound
-        if(testFloat < latBounds[0]):
-            latBounds[0] = testFloat
-        # if the candidate latitude value is greater than the current maximum latitude bound, 
-        # update the maximum latitude bound            
-        if(testFloat > latBounds[1]):
-            latBounds[1] = testFloat
     
-    return(latBounds)
+    
+# Description: read the spatial extent of a downloaded .hdf file
+# INPUTS:
+#    inFile (string) - filepath to the .hdf file
+# OUTPUTS:
+#    lats, lons - 1 x k float arrays with the G-ring latitudes and longitudes of the .hdf file.  All NaN
+#    if the file doesn't contain a G-ring
+def readFileFootprint(inFile):
+    with open(inFile,'rb') as ifStream:
+        return(modisMetadata.parseGRings([ifStream.read().decode('latin-1')]))
 
 
 
-# Description: Given an input file with .hdf metadata, find the longitude bounds.
+# Description: subset the AOD of the .hdf files of one day that overlap the study area, and add it to the 
+# AOD store.  The extent of files that aren't in the granule index is read without downloading them, files 
+# that overlap the study area are subset with ranged reads, and the other files are downloaded
 # INPUTS:
-#    metaString - a string object containing the metadata
+#    dayDate (datetime) - date of the .hdf files
+#    hdfFolder (string) - url of the folder containing the .hdf files of the day
+#    filesFolder (string) - folder the .hdf files are downloaded to
+#    index (granuleIndex) - granule index, with the day listed
+#    store (aodStore) - AOD store
+#    downloader (granuleDownloader) - downloader whose connections are used
 # OUTPUTS:
-#    latBounds - a 2D float array with the minimum and maximum latitude bounds 
-#                for the .hdf file
-def getLonBounds(metaString):
-    lonIndex = 0 
-    lonBounds = [9999,-9999]
-    lonIndex = str(metaString).find(LONGITUDE_BOUND,lonIndex)
-    endIndex = str(metaString).find(LONGITUDE_BOUND,lonIndex + 1 + len(LONGITUDE_BOUND))
-    subIndex = metaString[lonIndex:endIndex]
-    lonIndex = str(subIndex).find("(")
-    endIndex = str(subIndex).find(")")
-    subIndex2 = subIndex[lonIndex+1:endIndex]
-    lonIndex = 0
-    
-    # search through metaString for all latitude values and update the min and max longBounds as
-    # necessary    
-    while(endIndex != -1):
-        endIndex = str(subIndex2).find(",",lonIndex+1)
-        testFloat = float(str(subIndex2[lonIndex:endIndex]))
-        lonIndex = endIndex +1
-        
-        # if the candidate latitude value is less than the current minimum latitude bound, 
-        # update the minimum latitude bound        
-        if(testFloat < lonBounds[0]):
-            lonBounds[0] = testFloat
-            
-        # if the candidate latitude value is greater than the current maximum latitude bound, 
-        # update the maximum latitude bound         
-        if(testFloat > lonBounds[1]):
-            lonBounds[1] = testFloat
-    return(lonBounds)    
+#    names of the .hdf files subset with ranged reads, and names of the downloaded .hdf files
+def processDay(dayDate, hdfFolder, filesFolder, index, store, downloader):
+    bounds = [LAT_MIN,LAT_MAX,LONG_MIN,LONG_MAX]
 
+    # for each hdf file that isn't in the AOD store, without a known extent and not already on disk, 
+    # read it's spatial extent before downloading it
+    storedTimes = store.getGranuleTimes(FILESTART,dayDate)
+    isStored = lambda granule: modisSubset.getGranuleTime(granule[1]) in storedTimes
+    granules = index.queryGranules(FILESTART,dayDate,dayDate,LAT_MIN,LAT_MAX,LONG_MIN,LONG_MAX)
+    newFiles = [granule[1] for granule in granules if granule[3] == None and not isStored(granule) and not os.path.exists(filesFolder + granule[1])]
+    if(len(newFiles) > 0):
+        [lats,lons] = readFootprints(downloader,hdfFolder,newFiles,dayDate)
+        index.setFootprints(FILESTART,dayDate,newFiles,lats,lons)
+        granules = index.queryGranules(FILESTART,dayDate,dayDate,LAT_MIN,LAT_MAX,LONG_MIN,LONG_MAX)
+    granules = [granule for granule in granules if granule[3] != False and not isStored(granule)]
+    print([granule[1] for granule in granules])
 
-    
-# Description: Determine if the one dimension of the study area extent and the .hdf spatial
-# extent overlap
-# INPUTS:
-#    bounds - a 2d float array with lower and upper bounds of the .hdf file
-#    minComp - lower bound for the study area
-#    maxComp - upper bound for the study area
-# OUTPUTS:
-#    boolean indicator of whether .hdf file extent and the study extent overlap for 
-#    the dimension of interest
-def boundsCheck(bounds,minComp,maxComp):
-    if((bounds[0] < minComp) & (bounds[1] > minComp)):
-        return True
-    if((bounds[0] < maxComp) & (bounds[1] > maxComp)):
-        return True    
-    return False
-    
-    
-    
-# Description: Determine if the study area coordinates are within the .hdf file coordinates
-# INPUTS:
-#    latMin (float) - lower latitude bound for the study area
-#    latMax (float) - upper latitude bound for the study area
-#    longMin (float) - lower longitude bound for the study area
-#    longMax (float) - upper longitude bound for the study area
-#    inputURL (string) - string representation of FTP link to .hdf file
-# OUTPUTS:
-#    boolean indicator of whether .hdf file extent and the study extent overlap    
-def rangeCheck(latMin,latMax, longMin, longMax, inputURL):
-    tempFile = urllib2.urlopen(inputURL).read()
-    # check if the latitude dimension overlaps
-    latBounds = getLatBounds(tempFile)
-    isValid = boundsCheck(latBounds,latMin,latMax)
-    if(isValid):
-        # check if the longitude dimension overlaps
-        lonBounds = getLonBounds(tempFile)
-        isValid = boundsCheck(lonBounds,longMin,longMax)
-    return(isValid)
-    
-    
-    
-# Description: create a list of all .hdf files associated with a specific julian date
+    # subset the AOD of hdf files that overlap the study area with ranged reads, without downloading them
+    subsets = [None for granule in granules]
+    if(not KEEP_HDF):
+        remote = [i for i in range(0,len(granules)) if granules[i][3] == True]
+        results = downloader.runAll(modisSubset.fetchSubset,[[hdfFolder + granules[i][1],downloader,bounds] for i in remote],"subset")
+        for [i,result] in zip(remote,results):
+            subsets[i] = None if result == None else result[0]
+    remoteNames = [granules[i][1] for i in range(0,len(granules)) if subsets[i] is not None]
+
+    # download the other hdf files in parallel.  Files are saved with their original names, so that
+    # files downloaded by earlier runs can be recognized by their size and skipped
+    pending = [i for i in range(0,len(granules)) if subsets[i] is None]
+    statuses = downloader.downloadAll([[hdfFolder + granules[i][1],filesFolder + granules[i][1]] + ([granules[i][2]] if granules[i][2] >= 0 else []) for i in pending])
+
+    # for each downloaded hdf file with an unknown extent, check if it's spatial extent overlaps 
+    # the study area. if they don't overlap, remove the hdf file.  Otherwise subset the AOD, and 
+    # remove the hdf file unless KEEP_HDF is set
+    for [i,status] in zip(pending,statuses):
+        hdfFile = filesFolder + granules[i][1]
+        if(status == "failed"):
+            continue
+        if(granules[i][3] == None):
+            [lats,lons] = readFileFootprint(hdfFile)
+            index.setFootprints(FILESTART,dayDate,[granules[i][1]],lats,lons)
+            [isIntersecting,isValid] = modisMetadata.gringIntersects(lats,lons,LAT_MIN,LAT_MAX,LONG_MIN,LONG_MAX)
+            if(not isValid[0]):
+                print("could not read the extent of " + granules[i][1])
+            elif(not isIntersecting[0]):
+                os.remove(hdfFile)
+                continue
+        try:
+            subsets[i] = modisSubset.readSubset(hdfFile,bounds)
+        except (KeyError, ValueError, IndexError, struct.error) as error:
+            print("could not subset the AOD of " + granules[i][1] + ": " + str(error))
+            continue
+        if(not KEEP_HDF):
+            os.remove(hdfFile)
+
+    # add the AOD subsets of the day to the store
+    done = [i for i in range(0,len(granules)) if subsets[i] is not None]
+    if(len(done) > 0):
+        store.addGranules(FILESTART,dayDate,[modisSubset.getGranuleTime(granules[i][1]) for i in done],[subsets[i] for i in done])
+    return([remoteNames,[granules[i][1] for [i,status] in zip(pending,statuses) if status != "failed"]])
+
+
+
+# Description: check the prefilter and download path of one day against a local granule server with 
+# synthetic granules, whose core metadata has the G-ring objects in the GRINGPOINT group as real granules
+# do.  Granules that overlap the study area should be subset with ranged reads, granules outside it should
+# be dropped without downloading, and a second run should make no requests
 # INPUTS:
-#    folder (string) - FTP path to the folder that potentially contains .hdf files
-# OUTPUTS:
-#    string array of .hdf file names contained within the folder of interest    
-def getHDFList(folder):
-    hdfList = []
-    endIndex = 1
-    index = 0
-    hdfText = urllib2.urlopen(folder).read()
-    while(endIndex != -1):
-        index = str(hdfText).find(FILESTART,index)
-        endIndex = str(hdfText).find(".hdf",index)
-        hdfList.append(hdfText[index:endIndex+4])
-        index = endIndex + 5
-    hdfList = hdfList[0:len(hdfList)-1]    
-    return(hdfList)
-   
-   
-   
+#    numGranules (int) - number of synthetic granules, half of them overlapping the study area
+#    granuleSize (int) - approximate size of the other data of each granule, in bytes
+def checkProcessDay(numGranules=8, granuleSize=4000000):
+    serverFolder = tempfile.mkdtemp()
+    workFolder = tempfile.mkdtemp() + "/"
+    dayDate = datetime(2015,8,1)
+    dayFolder = os.path.join(serverFolder,FILESTART,dayDate.strftime(modisIndex.DAY_FOLDER_FORMAT))
+    os.makedirs(dayFolder)
+    names = [FILESTART + ".A" + dayDate.strftime("%Y%j") + "." + str(1800 + i*5).zfill(4) + ".061.hdf" for i in range(0,numGranules)]
+    isInside = [i % 2 == 0 for i in range(0,numGranules)]
+    for i in range(0,numGranules):
+        [centerLat,centerLon] = [44.0 + np.sin(i),-120.0 + np.cos(i)] if isInside[i] else [-20.0 + i,30.0 + 3*i]
+        modisSubset.writeTestSwath(os.path.join(dayFolder,names[i]),[centerLat - 10,centerLat - 10,centerLat + 10,centerLat + 10],
+                                   [centerLon - 12,centerLon + 12,centerLon + 12,centerLon - 12],granuleSize,i)
+    [server,baseURL] = modisDownload.startLocalServer(serverFolder)
+    downloader = modisDownload.granuleDownloader(NUM_TRANSFERS)
+    try:
+        index = modisIndex.granuleIndex(workFolder + "index/")
+        store = modisSubset.aodStore(workFolder + "store/")
+        os.makedirs(workFolder + "files/")
+        index.crawlDays(FILESTART,[dayDate],baseURL + FILESTART + "/",downloader)
+        [server.bytesServed,server.numRequests] = [0,0]
+        [remoteNames,downloadedNames] = processDay(dayDate,baseURL + FILESTART + "/" + dayDate.strftime(modisIndex.DAY_FOLDER_FORMAT),
+                                                   workFolder + "files/",index,store,downloader)
+        firstBytes = server.bytesServed
+        expected = [modisSubset.readSubset(os.path.join(dayFolder,names[i]),[LAT_MIN,LAT_MAX,LONG_MIN,LONG_MAX]) for i in range(0,numGranules) if isInside[i]]
+        isStored = np.array(store.readDay(FILESTART,dayDate)).tobytes() == np.concatenate(expected).tobytes()
+        footprints = [granule[3] for granule in index.queryGranules(FILESTART,dayDate,dayDate,LAT_MIN,LAT_MAX,LONG_MIN,LONG_MAX)]
+        server.numRequests = 0
+        processDay(dayDate,baseURL + FILESTART + "/" + dayDate.strftime(modisIndex.DAY_FOLDER_FORMAT),workFolder + "files/",index,store,downloader)
+        fileFootprint = readFileFootprint(os.path.join(dayFolder,names[0]))
+        print("granules, overlapping, subset remotely, downloaded, MB served, MB on server, overlaps match, AOD stored, files left, second run requests, file footprint read")
+        print(str(numGranules) + ", " + str(sum(isInside)) + ", " + str(len(remoteNames)) + ", " + str(len(downloadedNames)) + ", " +
+              str(round(firstBytes/1e6,2)) + ", " + str(round(sum([os.path.getsize(os.path.join(dayFolder,name)) for name in names])/1e6,2)) + ", " +
+              str(footprints == isInside and sorted(remoteNames) == sorted([names[i] for i in range(0,numGranules) if isInside[i]])) + ", " + 
+              str(isStored) + ", " + str(len(os.listdir(workFolder + "files/"))) + ", " + str(server.numRequests) + ", " + 
+              str(bool(modisMetadata.gringIntersects(fileFootprint[0],fileFootprint[1],LAT_MIN,LAT_MAX,LONG_MIN,LONG_MAX)[1][0])))
+    finally:
+        downloader.close()
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(serverFolder)
+        shutil.rmtree(workFolder)
+
+
+
 ############### main function #############
 
 
     
 def main():        
-    # convert start and end date to julian format, get an array of julian dates that 
-    # cover the time period of interest
+    if(not os.path.exists(outputFolder)):
+        os.makedirs(outputFolder)
+    index = modisIndex.granuleIndex(indexFolder)
+    store = modisSubset.aodStore(storeFolder)
+    downloader = modisDownload.granuleDownloader(NUM_TRANSFERS)
+
+    # get the dates of the folders that cover the time period of interest, and list the folders that
+    # aren't in the granule index yet
     dateRange = identifyFolders(START_DATE,END_DATE)
-    dateRange = dateRange[0:len(dateRange)]
+    numListed = index.crawlDays(FILESTART,dateRange,FTP,downloader)
+    print("listed " + str(numListed) + " of " + str(len(dateRange)) + " days")
     
-    # for each day in the time interval of interest 
-    for dateVal in dateRange:
-        # get a list of hdf files associated with the specific da
-        tempFolder = FTP + "2015/" + str(dateVal) + "/"
-        hdfList = getHDFList(tempFolder)
-        print(hdfList)
-        i=0
-        # for each hdf file in the generated list, check if it's spatial extent overlaps the study area.
-        # if they overlap, download the hdf file
-        for hdfFile in hdfList:
-            isInRange = rangeCheck(LAT_MIN, LAT_MAX, LONG_MIN, LONG_MAX, tempFolder + hdfFile)
-            if(isInRange):
-                outputFile = outputFolder + "MODIS" + str(dateVal) + "n" + str(i) + ".hdf"
-                f = open(outputFile,'wb')    
-                f.write(urllib2.urlopen(tempFolder + hdfFile).read())
-                f.close()           
-                i+=1
+    # for each day in the time interval of interest, subset or download the files that overlap the study area
+    for dayDate in dateRange:
+        processDay(dayDate,FTP + dayDate.strftime(modisIndex.DAY_FOLDER_FORMAT),outputFolder,index,store,downloader)
+    downloader.close()
             
-main()
+if __name__ == "__main__":
+    main()
 
 
 ########### end of processMODIS.py ##########
\ No newline at end of file
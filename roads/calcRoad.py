@@ -5,25 +5,34 @@
 
 # Description: This script calculates exposure to major and minor roads.  
 # Major and minor roads are calculated as the distance from the 
-# sampled point to the major or minor road.  
+# sampled point to the major or minor road.  Distances are looked up in a road distance index 
+# (roadIndex.py), which is built once for each road shapefile and saved next to it.  The index is 
+# rebuilt only when the road shapefile changes, so new batches of participant points only need fast
+# lookups.  Points within REFINE_DISTANCE of a road use exact point to road segment distances, which are
+# calculated for major and minor roads in one pass over the points (roadEngine.py).  Road exposure is 
+# also calculated as the total length of major and minor roads within several buffer distances of the 
+# sampled point, using the road segments of the same index.
 
 # Requirements:
-#      ArcGIS with a liscence for the Spatial Analysis Library
+#      numpy, for reading and writing attribute tables with shared/shapefileIO.py
+#      scipy, for the road distance index in roadIndex.py.  ArcGIS is no longer required
 # Tested and developed on:
 #      Windows 10
 #      Python 2.7
 #      ArcGIS 10.3.1
+#      Linux, Python 3.11 (without ArcGIS)
 
 ############### setup ################
 
 # import modules 
-import arcpy
 import os
 import sys
 
-#set environmental variables 
-arcpy.CheckOutExtension("spatial")
-arcpy.env.overwriteOutput = True
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"shared"))
+import shapefileIO
+import geodesy
+import roadIndex
+import roadEngine
 
 # folder paths and variables 
 folder = os.path.dirname(sys.argv[0]) + "/"
@@ -31,25 +40,42 @@ tempFolder = folder # location to store intermediate files to delete later
 participantFile = folder + "exampleParticipant.shp" # shapefile containing smartphone sample points
 mjRdsShapefile = folder + "mjRds.shp" # shapefile containing major road data
 #miRdsShapefile = folder + "roads/miRds.shp" # shapefile containing minor road data
+INDEX_SUFFIX = "_index" # the road distance index for roads.shp is saved in the roads_index folder
+CELL_SIZE = 100 # resolution of the road distance raster, in meters
+BUFFER_RADII = [50,100,500] # buffer distances for road length, in meters.  An empty list skips road lengths
+REFINE_DISTANCE = 1000 # points that may be within this distance of a road, in meters, use exact distances.  0 uses raster distances for all points
     
 
-# For each point in an input shapefile, calculate the distance to the nearest major and minor road, in 
-# units of meters.  Results are stored in the temporary shapefile stored in the temp folder
+# For each point in an input shapefile, calculate the distance to the nearest major and minor road, and
+# the length of major and minor roads within each of the BUFFER_RADII, in units of meters.  Road distance
+# indices are opened (and built if needed) for each road shapefile, and road distances and lengths are 
+# written to the addedRoads shapefile in the temp folder.  Road lengths are named after the road class 
+# and buffer distance (e.g. MJLEN50 and MILEN500).  Points with null geometries have blank road distances
+# and lengths
 # Results 
 #    shapefile (string) - filepath to a shapefile containing points to calculate distance to major and minor roads
 #    mjRdsFile (string) - filepath to the shapefile containing major roads in Oregon
 #    miRdsFile (string) - filepath to the shapefile containing minor roads in Oregon
 def calcNearRds(shapefile,mjRdsFile=None,miRdsFile=None):
-    if(mjRdsFile != None):
-        arcpy.Near_analysis(shapefile,mjRdsFile,method = 'GEODESIC') # calculate distance to major roads
-        arcpy.AddField_management(shapefile, "MJRDS", "DOUBLE") # create a new field to the input shapefile and add major road distances
-        arcpy.CalculateField_management(shapefile,"MJRDS","1*!NEAR_DIST!","PYTHON_9.3")
-    if(miRdsFile != None):    
-        arcpy.Near_analysis(shapefile,miRdsFile,method = 'GEODESIC') # calculate distance to minor roads
-        # minor road distances
-        arcpy.AddField_management(shapefile, "MIRDS", "DOUBLE")      
-        arcpy.CalculateField_management(shapefile,"MIRDS","1*!NEAR_DIST!","PYTHON_9.3")    
-    arcpy.CopyFeatures_management(shapefile, tempFolder + "addedRoads.shp") # create a new field to the input shapefile and add
+    table = shapefileIO.readShapefile(shapefile)
+    [lon,lat] = geodesy.projectToGeographic(table.getX(),table.getY(),table.getPrj())
+    fieldNames = []
+    indices = []
+    for [distName,lengthName,roadFile] in [["MJRDS","MJLEN",mjRdsFile],["MIRDS","MILEN",miRdsFile]]:
+        if(roadFile != None):
+            fieldNames.append([distName,lengthName])
+            indices.append(roadIndex.openRoadIndex(roadFile,os.path.splitext(roadFile)[0] + INDEX_SUFFIX,CELL_SIZE))
+    dists = roadIndex.calcNearestRoads(indices,lon,lat,REFINE_DISTANCE)
+    lengths = roadEngine.calcRoadLengths([index.getRoadSegments() for index in indices],lon,lat,BUFFER_RADII)
+
+    # add the major and minor road distances and lengths to a copy of the input shapefile
+    roadColumns = []
+    for i in range(0,len(indices)):
+        roadColumns.append([fieldNames[i][0],dists[i],"DOUBLE"])
+        for radiusNum in range(0,len(BUFFER_RADII)):
+            roadColumns.append([fieldNames[i][1] + str(BUFFER_RADII[radiusNum]),lengths[i][:,radiusNum],"DOUBLE"])
+    table.appendColumns(roadColumns)
+    shapefileIO.writeShapefile(table,tempFolder + "addedRoads.shp")
 
     
 
@@ -63,4 +89,4 @@ main()
         
     
 
-################### end of calcRoad.py ##############
\ No newline at end of file
+################### end of calcRoad.py ############################
\ No newline at end of file
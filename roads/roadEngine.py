@@ -0,0 +1,479 @@
+############## roadEngine.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl and Perry Hystad, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module calculates the distance from points to the nearest road segment without arcpy.
+# Road polylines are broken into straight segments, which are split into pieces no longer than
+# MAX_SEGMENT_LENGTH and stored as arrays of 3D Cartesian (earth-centered, earth-fixed) end points.  The
+# midpoints of the pieces are loaded into a KD-tree.  For each point, the nearest few midpoints are found,
+# and exact point to segment distances are calculated for the candidate segments in a local east-north
+# plane centered on the point.  Planar distances are converted to distances along the earth's surface,
+# which matches the geodesic distances calculated by ArcGIS to within a few centimeters.  More midpoints are
+# searched only for points where an unsearched segment could still be closer than the nearest segment found.
+# Several road networks (e.g. major and minor roads) are processed in one pass over the points.  Points are
+# sorted along a space filling curve before searching, so that consecutive searches visit the same parts of
+# the KD-trees, and repeated coordinates are only calculated once.  The same segments and KD-tree are used
+# to calculate the total length of road within several buffer distances of each point, in one search.
+
+# Requirements:
+#      numpy, scipy
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import os
+import sys
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"shared"))
+import geodesy
+
+# constants
+MAX_SEGMENT_LENGTH = 100.0 # maximum length of indexed road segments, in meters.  Longer segments are split into pieces
+START_NEIGHBOURS = 8 # number of nearest segment midpoints searched for each point in the first pass
+NEIGHBOUR_GROWTH = 4 # factor the number of searched midpoints grows by for points that need another pass
+START_BUFFER_NEIGHBOURS = 64 # number of segment midpoints searched for each point in the first pass of road length calculations
+CHUNK_SIZE = 100000 # number of points to process at one time
+MAX_CANDIDATES = 1000000 # maximum number of point and segment pairs measured at one time in road length calculations
+QUERY_WORKERS = -1 # number of threads used to search KD-trees.  -1 uses all processors
+MORTON_BITS = 21 # number of bits per coordinate in the space filling curve codes used to sort points
+MORTON_EXTENT = geodesy.WGS84_A + 100000.0 # half width of the cube covered by the space filling curve, in meters
+
+
+
+############### helper functions ##############
+
+# find the straight segments between consecutive vertices of each part of a set of polylines.  Segments
+# with missing or invalid coordinates are removed
+# Inputs:
+#    inLon (float array) - longitude of each vertex, in decimal degrees
+#    inLat (float array) - latitude of each vertex, in decimal degrees
+#    partBounds (integer array) - vertices of part i are inLon[partBounds[i]:partBounds[i+1]]
+# Outputs:
+#    starts (integer array) - index of the first vertex of each segment.  Segment i runs from vertex
+#    starts[i] to vertex starts[i] + 1
+def getSegmentStarts(inLon,inLat,partBounds):
+    if(np.size(inLon) < 2):
+        return(np.zeros(0,dtype=np.int64))
+    isSegment = np.ones(np.size(inLon) - 1,dtype=bool)
+    isSegment[np.asarray(partBounds[1:-1],dtype=np.int64) - 1] = False
+    isValid = geodesy.validCoords(inLon,inLat)
+    return(np.flatnonzero(isSegment & isValid[:-1] & isValid[1:]))
+
+
+# break road polylines into straight segments.  Segments longer than MAX_SEGMENT_LENGTH are split into
+# equal pieces, so that every point of a segment is within MAX_SEGMENT_LENGTH/2 of its midpoint
+# Inputs:
+#    inLon (float array) - longitude of each vertex, in decimal degrees
+#    inLat (float array) - latitude of each vertex, in decimal degrees
+#    partBounds (integer array) - vertices of part i are inLon[partBounds[i]:partBounds[i+1]]
+# Outputs:
+#    segments (float array) - n x 6 array of segment start and end points, in Cartesian coordinates
+def getSegments(inLon,inLat,partBounds):
+    starts = getSegmentStarts(inLon,inLat,partBounds)
+    if(starts.size == 0):
+        return(np.zeros((0,6)))
+    xyz = geodesy.toECEF(inLon,inLat)
+    segStart = xyz[starts]
+    segEnd = xyz[starts + 1]
+    lengths = np.sqrt(np.sum((segEnd - segStart)**2,axis=1))
+
+    # split long segments into equal pieces
+    numPieces = np.maximum(np.ceil(lengths/MAX_SEGMENT_LENGTH),1).astype(np.int64)
+    pieceSegments = np.repeat(np.arange(starts.size),numPieces)
+    pieceNumbers = np.arange(pieceSegments.size) - np.repeat(np.cumsum(numPieces) - numPieces,numPieces)
+    step = (segEnd - segStart)/numPieces[:,None]
+    pieceStart = segStart[pieceSegments] + step[pieceSegments]*pieceNumbers[:,None]
+    return(np.hstack((pieceStart,pieceStart + step[pieceSegments])))
+
+
+# calculate the east and north unit vectors of the local tangent plane at each point
+# Inputs:
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+# Outputs:
+#    east (float array) - n x 3 array of east unit vectors
+#    north (float array) - n x 3 array of north unit vectors
+def getTangentPlanes(inLon,inLat):
+    lon = np.radians(np.asarray(inLon,dtype=np.float64))
+    lat = np.radians(np.asarray(inLat,dtype=np.float64))
+    east = np.column_stack((-np.sin(lon),np.cos(lon),np.zeros(lon.size)))
+    north = np.column_stack((-np.sin(lat)*np.cos(lon),-np.sin(lat)*np.sin(lon),np.cos(lat)))
+    return([east,north])
+
+
+# project road segments onto the local east-north plane of each point
+# Inputs:
+#    inXYZ (float array) - n x 3 array of point Cartesian coordinates
+#    east (float array) - n x 3 array of east unit vectors at each point
+#    north (float array) - n x 3 array of north unit vectors at each point
+#    segments (float array) - n x k x 6 array of the start and end points of k segments for each point
+# Outputs:
+#    startE, startN (float arrays) - n x k arrays of the east and north offsets of each segment start from the point, in meters
+#    dirE, dirN (float arrays) - n x k arrays of the east and north components of each segment, in meters
+def projectSegments(inXYZ,east,north,segments):
+    relStart = segments[:,:,0:3] - inXYZ[:,None,:]
+    relEnd = segments[:,:,3:6] - inXYZ[:,None,:]
+    startE = np.einsum('nkc,nc->nk',relStart,east)
+    startN = np.einsum('nkc,nc->nk',relStart,north)
+    dirE = np.einsum('nkc,nc->nk',relEnd,east) - startE
+    dirN = np.einsum('nkc,nc->nk',relEnd,north) - startN
+    return([startE,startN,dirE,dirN])
+
+
+# calculate the distance from points to road segments.  Segment end points are projected onto the local
+# east-north plane of the point, and the planar distance from the point to the segment is converted to
+# a distance along the earth's surface
+# Inputs:
+#    inXYZ (float array) - n x 3 array of point Cartesian coordinates
+#    east (float array) - n x 3 array of east unit vectors at each point
+#    north (float array) - n x 3 array of north unit vectors at each point
+#    segments (float array) - n x k x 6 array of the start and end points of k segments for each point
+# Outputs:
+#    n x k float array of distances from each point to each of its segments, in meters
+def calcSegmentDistances(inXYZ,east,north,segments):
+    [startE,startN,dirE,dirN] = projectSegments(inXYZ,east,north,segments)
+
+    # position of the closest point along each segment, from 0 (start) to 1 (end)
+    lengthSquared = dirE*dirE + dirN*dirN
+    t = np.clip(-(startE*dirE + startN*dirN)/np.where(lengthSquared > 0,lengthSquared,1),0,1)
+    planar = np.hypot(startE + t*dirE,startN + t*dirN)
+    return(geodesy.MEAN_RADIUS*np.arcsin(np.clip(planar/geodesy.MEAN_RADIUS,0,1)))
+
+
+# calculate the length of road segments within several distances of points.  Segments are projected onto
+# the local east-north plane of the point and clipped to a circle around the point for each distance
+# Inputs:
+#    inXYZ (float array) - n x 3 array of point Cartesian coordinates
+#    east (float array) - n x 3 array of east unit vectors at each point
+#    north (float array) - n x 3 array of north unit vectors at each point
+#    segments (float array) - n x k x 6 array of the start and end points of k segments for each point
+#    radii (float list) - buffer distances along the earth's surface, in meters
+# Outputs:
+#    n x r float array of the total length of the k segments within each buffer distance of each point, in meters
+def calcClippedLengths(inXYZ,east,north,segments,radii):
+    [startE,startN,dirE,dirN] = projectSegments(inXYZ,east,north,segments)
+
+    # the segment crosses a circle of radius r at positions -middle +/- sqrt(middle^2 - (distance^2 - r^2)/length^2)
+    # along the segment, from 0 (start) to 1 (end)
+    lengthSquared = dirE*dirE + dirN*dirN
+    safeSquared = np.where(lengthSquared > 0,lengthSquared,1)
+    middle = (startE*dirE + startN*dirN)/safeSquared
+    offset = (startE*startE + startN*startN)/safeSquared
+    lengths = np.sqrt(lengthSquared)
+    outLengths = np.zeros((inXYZ.shape[0],len(radii)))
+    for radiusNum in range(0,len(radii)):
+        planarRadius = geodesy.MEAN_RADIUS*np.sin(min(radii[radiusNum]/geodesy.MEAN_RADIUS,np.pi/2))
+        halfWidth = np.sqrt(np.maximum(middle*middle - offset + planarRadius*planarRadius/safeSquared,0))
+        inside = np.clip(halfWidth - middle,0,1) - np.clip(-halfWidth - middle,0,1)
+        outLengths[:,radiusNum] = np.sum(inside*lengths,axis=1)
+    return(outLengths)
+
+
+
+# calculate space filling curve (Morton) codes for 3D points.  The cube containing the earth is divided into
+# a grid of 2^MORTON_BITS cells along each axis, and the bits of the cell numbers are interleaved, so that
+# points that are close together usually have similar codes
+# Inputs:
+#    inXYZ (float array) - n x 3 array of Cartesian coordinates
+# Outputs:
+#    codes (unsigned integer array) - Morton code of each point
+def getSpatialCodes(inXYZ):
+    maxCell = 2**MORTON_BITS - 1
+    cells = np.clip((inXYZ + MORTON_EXTENT)*(maxCell/(2*MORTON_EXTENT)),0,maxCell).astype(np.uint64)
+    codes = np.zeros(inXYZ.shape[0],dtype=np.uint64)
+    for axis in range(0,3):
+        spread = cells[:,axis]
+        for [shift,mask] in [[32,0x1f00000000ffff],[16,0x1f0000ff0000ff],[8,0x100f00f00f00f00f],[4,0x10c30c30c30c30c3],[2,0x1249249249249249]]:
+            spread = (spread | (spread << np.uint64(shift))) & np.uint64(mask)
+        codes |= spread << np.uint64(axis)
+    return(codes)
+
+
+# sort points along a space filling curve.  Codes are calculated CHUNK_SIZE points at a time
+# Inputs:
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+# Outputs:
+#    integer array of point indices, in space filling curve order
+def getSpatialOrder(inLon,inLat):
+    codes = np.zeros(np.size(inLon),dtype=np.uint64)
+    for start in range(0,codes.size,CHUNK_SIZE):
+        codes[start:start + CHUNK_SIZE] = getSpatialCodes(geodesy.toECEF(inLon[start:start + CHUNK_SIZE],inLat[start:start + CHUNK_SIZE]))
+    return(np.argsort(codes,kind='stable'))
+
+
+# iterate over points in space filling curve order, in chunks of CHUNK_SIZE.  Repeated coordinates that are
+# next to each other in the sorted order are only included once in the Cartesian coordinates and tangent
+# planes of each chunk
+# Inputs:
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+#    pointIndex (integer array) - indices of the points to iterate over.  Points must have valid coordinates
+# Outputs:
+#    yields, for each chunk, the point indices in the chunk, the indices of the unique points, the position
+#    of each point of the chunk among the unique points, and the unique point Cartesian coordinates, east
+#    unit vectors, and north unit vectors
+def iterPointChunks(inLon,inLat,pointIndex):
+    pointIndex = pointIndex[getSpatialOrder(inLon[pointIndex],inLat[pointIndex])]
+    for start in range(0,pointIndex.size,CHUNK_SIZE):
+        chunk = pointIndex[start:start + CHUNK_SIZE]
+        isFirst = np.ones(chunk.size,dtype=bool)
+        isFirst[1:] = (inLon[chunk[1:]] != inLon[chunk[:-1]]) | (inLat[chunk[1:]] != inLat[chunk[:-1]])
+        uniqueIndex = chunk[isFirst]
+        copyIndex = np.cumsum(isFirst) - 1
+        xyz = geodesy.toECEF(inLon[uniqueIndex],inLat[uniqueIndex])
+        [east,north] = getTangentPlanes(inLon[uniqueIndex],inLat[uniqueIndex])
+        yield([chunk,uniqueIndex,copyIndex,xyz,east,north])
+
+
+# calculate the distance from each point to the nearest road segment in each of several road networks, in
+# one pass over the points.  Points are sorted along a space filling curve and processed in chunks of
+# CHUNK_SIZE.  Cartesian coordinates and tangent planes are calculated once per chunk and shared by all
+# networks, and repeated coordinates that are next to each other in the sorted order are calculated once
+# Inputs:
+#    roadSets (roadSegments list) - road networks
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+#    pointMasks (boolean array list) - optional.  If given, distances to road network i are only
+#    calculated for points where pointMasks[i] is true
+# Outputs:
+#    dists (float array list) - distance from each point to the nearest segment of each road network, in
+#    meters.  Points with null geometries, points that aren't calculated, and all points for networks
+#    without segments are NaN
+def calcNearestRoads(roadSets,inLon,inLat,pointMasks=None):
+    inLon = np.asarray(inLon,dtype=np.float64)
+    inLat = np.asarray(inLat,dtype=np.float64)
+    dists = [np.full(inLon.size,np.nan) for roadSet in roadSets]
+    isValid = geodesy.validCoords(inLon,inLat)
+    if(pointMasks is None):
+        pointMasks = [isValid for roadSet in roadSets]
+    else:
+        pointMasks = [isValid & np.asarray(pointMask,dtype=bool) for pointMask in pointMasks]
+    isNeeded = np.zeros(inLon.size,dtype=bool)
+    for [roadSet,pointMask] in zip(roadSets,pointMasks):
+        if(roadSet.getNumSegments() > 0):
+            isNeeded |= pointMask
+    for [chunk,uniqueIndex,copyIndex,xyz,east,north] in iterPointChunks(inLon,inLat,np.flatnonzero(isNeeded)):
+        for setNum in range(0,len(roadSets)):
+            isMasked = pointMasks[setNum][chunk]
+            subset = np.flatnonzero(np.bincount(copyIndex[isMasked],minlength=uniqueIndex.size) > 0)
+            if(roadSets[setNum].getNumSegments() == 0 or subset.size == 0):
+                continue
+            uniqueDists = np.full(uniqueIndex.size,np.nan)
+            uniqueDists[subset] = roadSets[setNum].calcChunkDistances(xyz[subset],east[subset],north[subset])
+            dists[setNum][chunk[isMasked]] = uniqueDists[copyIndex[isMasked]]
+    return(dists)
+
+
+# calculate the total length of road within several buffer distances of each point, for each of several
+# road networks, in one pass over the points (see iterPointChunks)
+# Inputs:
+#    roadSets (roadSegments list) - road networks
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+#    radii (float list) - buffer distances, in meters
+# Outputs:
+#    lengths (float array list) - n x r array for each road network of the length of road within each
+#    buffer distance of each point, in meters.  Points with null geometries are NaN
+def calcRoadLengths(roadSets,inLon,inLat,radii):
+    inLon = np.asarray(inLon,dtype=np.float64)
+    inLat = np.asarray(inLat,dtype=np.float64)
+    isValid = geodesy.validCoords(inLon,inLat)
+    lengths = []
+    for roadSet in roadSets:
+        setLengths = np.full((inLon.size,len(radii)),np.nan)
+        setLengths[isValid] = 0
+        lengths.append(setLengths)
+    if(len(radii) == 0 or max([roadSet.getNumSegments() for roadSet in roadSets] + [0]) == 0):
+        return(lengths)
+    for [chunk,uniqueIndex,copyIndex,xyz,east,north] in iterPointChunks(inLon,inLat,np.flatnonzero(isValid)):
+        for setNum in range(0,len(roadSets)):
+            if(roadSets[setNum].getNumSegments() > 0):
+                lengths[setNum][chunk] = roadSets[setNum].calcChunkLengths(xyz,east,north,radii)[copyIndex]
+    return(lengths)
+
+
+
+########### road segment custom class ##########
+
+# custom class containing the segments of a road network and a spatial index of the segment midpoints.
+# The spatial index is built the first time it is needed
+class roadSegments:
+    # instantiate a set of road segments
+    def __init__(self,inSegments):
+        self.segments = inSegments
+        self.tree = None
+        self.maxHalfLength = 0.0
+        if(inSegments.shape[0] > 0):
+            self.maxHalfLength = float(np.sqrt(np.max(np.sum((inSegments[:,3:6] - inSegments[:,0:3])**2,axis=1))))/2
+
+    ########### custom functions ############
+
+    # calculate the distance from each point to the nearest road segment, for one chunk of points.  The
+    # nearest midpoints are searched first.  Every segment with a midpoint farther away than the searched
+    # midpoints is at least that distance minus the maximum half length away, so the search is repeated
+    # with more midpoints only for points where this lower bound is less than the nearest distance found
+    # inXYZ (float array) - n x 3 array of point Cartesian coordinates
+    # east (float array) - n x 3 array of east unit vectors at each point
+    # north (float array) - n x 3 array of north unit vectors at each point
+    def calcChunkDistances(self,inXYZ,east,north):
+        tree = self.getTree()
+        dists = np.full(inXYZ.shape[0],np.nan)
+        pending = np.arange(inXYZ.shape[0])
+        numNeighbours = START_NEIGHBOURS
+        while(pending.size > 0):
+            numNeighbours = min(numNeighbours,tree.n)
+            [chords,neighbours] = tree.query(inXYZ[pending],k=numNeighbours,workers=QUERY_WORKERS)
+            chords = chords.reshape(pending.size,numNeighbours)
+            neighbours = neighbours.reshape(pending.size,numNeighbours)
+            segDists = calcSegmentDistances(inXYZ[pending],east[pending],north[pending],np.asarray(self.segments)[neighbours])
+            dists[pending] = np.min(segDists,axis=1)
+            if(numNeighbours == tree.n):
+                break
+            pending = pending[chords[:,-1] - self.maxHalfLength < dists[pending]]
+            numNeighbours *= NEIGHBOUR_GROWTH
+        return(dists)
+
+    # calculate the length of road within several buffer distances of each point, for one chunk of points.
+    # Every segment that reaches into a buffer has a midpoint within the buffer distance plus the maximum
+    # half length, so all midpoints within the largest of these search distances are measured.  Midpoints
+    # are searched with the nearest neighbour search of the KD-tree, limited to the search distance, and 
+    # the search is repeated with more midpoints for points where all searched midpoints were found.  
+    # Point and candidate segment pairs are measured in batches of up to MAX_CANDIDATES pairs
+    # inXYZ (float array) - n x 3 array of point Cartesian coordinates
+    # east (float array) - n x 3 array of east unit vectors at each point
+    # north (float array) - n x 3 array of north unit vectors at each point
+    # radii (float list) - buffer distances, in meters
+    def calcChunkLengths(self,inXYZ,east,north,radii):
+        tree = self.getTree()
+        segments = np.asarray(self.segments)
+        lengths = np.zeros((inXYZ.shape[0],len(radii)))
+        searchDistance = geodesy.arcToChord(max(radii)) + self.maxHalfLength
+        pending = np.arange(inXYZ.shape[0])
+        numNeighbours = START_BUFFER_NEIGHBOURS
+        while(pending.size > 0):
+            numNeighbours = min(numNeighbours,tree.n)
+            [chords,neighbours] = tree.query(inXYZ[pending],k=numNeighbours,distance_upper_bound=searchDistance,workers=QUERY_WORKERS)
+            neighbours = neighbours.reshape(pending.size,numNeighbours)
+            isComplete = (neighbours[:,-1] == tree.n) | (numNeighbours == tree.n)
+            complete = pending[isComplete]
+            neighbours = neighbours[isComplete]
+
+            # measure each point and candidate segment pair, and add up the lengths for each point
+            [rows,cols] = np.nonzero(neighbours < tree.n)
+            for start in range(0,rows.size,MAX_CANDIDATES):
+                pairPoints = complete[rows[start:start + MAX_CANDIDATES]]
+                pairSegments = segments[neighbours[rows[start:start + MAX_CANDIDATES],cols[start:start + MAX_CANDIDATES]]]
+                pairLengths = calcClippedLengths(inXYZ[pairPoints],east[pairPoints],north[pairPoints],pairSegments[:,None,:],radii)
+                for radiusNum in range(0,len(radii)):
+                    lengths[:,radiusNum] += np.bincount(pairPoints,pairLengths[:,radiusNum],minlength=inXYZ.shape[0])
+            pending = pending[~isComplete]
+            numNeighbours *= NEIGHBOUR_GROWTH
+        return(lengths)
+
+    # calculate the length of road within several buffer distances of each point (see calcRoadLengths)
+    # inLon (float array) - longitude of each point, in decimal degrees
+    # inLat (float array) - latitude of each point, in decimal degrees
+    # radii (float list) - buffer distances, in meters
+    def calcLengths(self,inLon,inLat,radii):
+        return(calcRoadLengths([self],inLon,inLat,radii)[0])
+
+    # calculate the distance from each point to the nearest road segment (see calcNearestRoads).  Points 
+    # with null geometries, and all points if there are no road segments, are NaN
+    # inLon (float array) - longitude of each point, in decimal degrees
+    # inLat (float array) - latitude of each point, in decimal degrees
+    def calcDistances(self,inLon,inLat):
+        return(calcNearestRoads([self],inLon,inLat)[0])
+
+    ########## getters and setters ##########
+    def getTree(self):
+        if(self.tree is None):
+            segments = np.asarray(self.segments)
+            self.tree = cKDTree((segments[:,0:3] + segments[:,3:6])/2)
+        return(self.tree)
+
+    def getSegments(self):
+        return(self.segments)
+
+    def getNumSegments(self):
+        return(self.segments.shape[0])
+
+    def getMaxHalfLength(self):
+        return(self.maxHalfLength)
+
+
+########### end of the road segment custom class ##########
+
+
+# create a synthetic road network of random walks within a region
+# Inputs:
+#    numRoads (int) - number of roads
+#    numVertices (int) - number of vertices in each road
+#    stepSize (float) - standard deviation of the distance between vertices, in decimal degrees
+#    bounds (float list) - minimum longitude, minimum latitude, maximum longitude, and maximum latitude of the region
+#    inSeed (int) - random number seed
+# Outputs:
+#    lon (float array) - longitude of each vertex, in decimal degrees
+#    lat (float array) - latitude of each vertex, in decimal degrees
+#    partBounds (integer array) - vertices of road i are lon[partBounds[i]:partBounds[i+1]]
+def makeRoadNetwork(numRoads,numVertices,stepSize,bounds,inSeed):
+    generator = np.random.default_rng(inSeed)
+    lon = np.repeat(generator.uniform(bounds[0],bounds[2],numRoads),numVertices) 
+    lat = np.repeat(generator.uniform(bounds[1],bounds[3],numRoads),numVertices)
+    steps = generator.normal(0,stepSize,(2,numRoads,numVertices))
+    steps[:,:,0] = 0
+    lon += np.cumsum(steps[0],axis=1).ravel()
+    lat += np.cumsum(steps[1],axis=1).ravel()
+    return([lon,lat,np.arange(0,numRoads + 1)*numVertices])
+
+
+# compare run times of the one pass engine with separate passes over the points in their original order
+# (the previous approach), for synthetic statewide major and minor road networks and GPS tracks in which
+# each location is recorded several times.  The run time of road lengths within buffers is also reported
+# Inputs:
+#    pointCounts (int list) - numbers of points to test
+#    radii (float list) - buffer distances for road lengths, in meters
+def benchmarkEngine(pointCounts=[100000,1000000],radii=[50,100,500]):
+    bounds = [-124.5,42.0,-116.5,46.0]
+    roadSets = []
+    for [numRoads,numVertices,stepSize,inSeed] in [[2000,200,0.003,1],[50000,20,0.002,2]]:
+        startTime = time.time()
+        roadSets.append(roadSegments(getSegments(*makeRoadNetwork(numRoads,numVertices,stepSize,bounds,inSeed))))
+        roadSets[-1].getTree()
+        print("road network with " + str(roadSets[-1].getNumSegments()) + " segments indexed in " + str(round(time.time() - startTime,3)) + " s")
+    print("points, separate passes (s), one pass (s), same distances, road lengths (s)")
+    generator = np.random.default_rng(3)
+    for numPoints in pointCounts:
+        numTracks = max(numPoints//10000,1)
+        lon = np.repeat(generator.uniform(bounds[0],bounds[2],numTracks),10000)[0:numPoints] + np.cumsum(generator.normal(0,0.0001,numPoints))
+        lat = np.repeat(generator.uniform(bounds[1],bounds[3],numTracks),10000)[0:numPoints] + np.cumsum(generator.normal(0,0.0001,numPoints))
+        lon = np.repeat(lon[::3],3)[0:numPoints]
+        lat = np.repeat(lat[::3],3)[0:numPoints]
+        startTime = time.time()
+        separateDists = [np.zeros(numPoints) for roadSet in roadSets]
+        for setNum in range(0,len(roadSets)):
+            for start in range(0,numPoints,CHUNK_SIZE):
+                [east,north] = getTangentPlanes(lon[start:start + CHUNK_SIZE],lat[start:start + CHUNK_SIZE])
+                xyz = geodesy.toECEF(lon[start:start + CHUNK_SIZE],lat[start:start + CHUNK_SIZE])
+                separateDists[setNum][start:start + CHUNK_SIZE] = roadSets[setNum].calcChunkDistances(xyz,east,north)
+        separateTime = time.time() - startTime
+        startTime = time.time()
+        dists = calcNearestRoads(roadSets,lon,lat)
+        oneTime = time.time() - startTime
+        startTime = time.time()
+        calcRoadLengths(roadSets,lon,lat,radii)
+        print(str(numPoints) + ", " + str(round(separateTime,3)) + ", " + str(round(oneTime,3)) + ", " +
+              str(all([np.array_equal(dists[i],separateDists[i]) for i in range(0,len(roadSets))])) + ", " + str(round(time.time() - startTime,3)))
+
+
+if __name__ == "__main__":
+    benchmarkEngine()
+
+
+############## end of roadEngine.py ##################
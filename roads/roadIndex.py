@@ -0,0 +1,276 @@
+############## roadIndex.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl and Perry Hystad, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module builds a road distance index once for a road shapefile, saves it to disk, and
+# uses memory-mapped copies of the index to look up the distance from new points to the nearest road.
+# The index contains the road segments (see roadEngine.py) and a distance raster.  Roads are drawn
+# onto a grid in World Mercator coordinates, and a Euclidean distance transform gives the distance from
+# every grid cell to the nearest road cell.  Mercator is conformal, so raster distances are converted to
+# distances on the ellipsoid by dividing by the Mercator scale factor at each point.  Raster lookups are
+# accurate to about one grid cell.  With exact refinement, points within a given distance of a road, and
+# points outside the raster, use exact distances to the road segments instead.  The index is rebuilt
+# automatically if the road shapefile changes.  Several indices (e.g. major and minor roads) can be
+# refined together in one pass over the points.
+
+# Requirements:
+#      numpy, scipy
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import os
+import sys
+import numpy as np
+from scipy import ndimage
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"shared"))
+import shapefileIO
+import geodesy
+import roadEngine
+
+# constants
+INDEX_VERSION = 2 # version of the index file format.  Indices with a different version are rebuilt
+RASTER_MARGIN = 20000.0 # distance the distance raster extends beyond the roads, in meters
+MAX_RASTER_CELLS = 100000000 # maximum number of cells in the distance raster
+SAMPLE_FRACTION = 0.5 # spacing of the points used to draw roads onto the raster, as a fraction of the cell size
+SAMPLE_BATCH = 1000000 # number of road segments drawn onto the raster at one time
+RASTER_ERROR = np.sqrt(2) + SAMPLE_FRACTION/2 # maximum difference between raster and exact distances, in grid cells
+
+
+
+############### helper functions ##############
+
+# get a short description of a road shapefile, used to detect when the shapefile has changed since the
+# index was built
+# Inputs:
+#    roadShapefile (string) - filepath to the road shapefile
+# Outputs:
+#    float array with the size and modification time of the .shp and .dbf files
+def getSourceStamp(roadShapefile):
+    basePath = os.path.splitext(roadShapefile)[0]
+    stamp = []
+    for extension in [".shp",".dbf"]:
+        if(os.path.exists(basePath + extension)):
+            stamp += [os.path.getsize(basePath + extension),os.path.getmtime(basePath + extension)]
+        else:
+            stamp += [0,0]
+    return(np.array(stamp,dtype=np.float64))
+
+
+# draw road segments onto a grid.  Points are sampled along each segment at a spacing of SAMPLE_FRACTION
+# grid cells, and every cell containing a sample is marked as a road cell
+# Inputs:
+#    segX (float array) - n x 2 array of the start and end x coordinates of each segment
+#    segY (float array) - n x 2 array of the start and end y coordinates of each segment
+#    originX (float) - x coordinate of the left edge of the grid
+#    originY (float) - y coordinate of the top edge of the grid
+#    cellSize (float) - width of a grid cell, in projected units
+#    shape (int tuple) - number of rows and columns in the grid
+# Outputs:
+#    isRoad (boolean array) - true for grid cells that contain a road
+def drawRoads(segX,segY,originX,originY,cellSize,shape):
+    isRoad = np.zeros(shape,dtype=bool)
+    for start in range(0,segX.shape[0],SAMPLE_BATCH):
+        x = segX[start:start + SAMPLE_BATCH]
+        y = segY[start:start + SAMPLE_BATCH]
+        lengths = np.hypot(x[:,1] - x[:,0],y[:,1] - y[:,0])
+        numSamples = np.ceil(lengths/(cellSize*SAMPLE_FRACTION)).astype(np.int64) + 1
+        sampleSegments = np.repeat(np.arange(x.shape[0]),numSamples)
+        fraction = (np.arange(sampleSegments.size) - np.repeat(np.cumsum(numSamples) - numSamples,numSamples))/np.maximum(numSamples - 1,1)[sampleSegments]
+        sampleX = x[sampleSegments,0] + (x[sampleSegments,1] - x[sampleSegments,0])*fraction
+        sampleY = y[sampleSegments,0] + (y[sampleSegments,1] - y[sampleSegments,0])*fraction
+        cols = np.clip(np.floor((sampleX - originX)/cellSize).astype(np.int64),0,shape[1] - 1)
+        rows = np.clip(np.floor((originY - sampleY)/cellSize).astype(np.int64),0,shape[0] - 1)
+        isRoad[rows,cols] = True
+    return(isRoad)
+
+
+# calculate the maximum difference between raster distances and exact distances.  Roads are drawn to
+# within RASTER_ERROR cells.  The Mercator scale factor also changes between a point and its nearest
+# road, by a relative amount of at most the tangent of the latitude times the angular distance
+# Inputs:
+#    rasterDists (float array) - distances looked up in the raster, in meters
+#    inLat (float array) - latitude of each point, in decimal degrees
+#    cellSizes (float array) - width of a raster cell on the ground at each point, in meters
+# Outputs:
+#    float array of maximum errors, in meters
+def calcRasterErrors(rasterDists,inLat,cellSizes):
+    cellError = RASTER_ERROR*cellSizes
+    angle = (rasterDists + cellError)/geodesy.MEAN_RADIUS
+    maxLat = np.minimum(np.radians(np.abs(inLat)) + angle,np.radians(89))
+    return(cellError + (rasterDists + cellError)*np.expm1(np.tan(maxLat)*angle))
+
+
+# build a road distance index and save it to disk.  The index folder contains the road segments
+# (segments.npy), the distance raster (distance.npy), and the raster extent and source file stamp
+# (header.npy)
+# Inputs:
+#    roadShapefile (string) - filepath to the road polyline shapefile
+#    indexFolder (string) - folder to save the index in
+#    cellSize (float) - approximate width of a raster cell on the ground, in meters, at the center of the roads
+def buildRoadIndex(roadShapefile,indexFolder,cellSize):
+    [x,y,partBounds,partRecords,prj] = shapefileIO.readPolylines(roadShapefile)
+    [lon,lat] = geodesy.projectToGeographic(x,y,prj)
+    segments = roadEngine.getSegments(lon,lat,partBounds)
+
+    # store segments in space filling curve order, so that nearby segments are close together on disk
+    midpoints = (segments[:,0:3] + segments[:,3:6])/2
+    segments = segments[np.argsort(roadEngine.getSpatialCodes(midpoints),kind='stable')]
+    del midpoints
+    if(not os.path.exists(indexFolder)):
+        os.makedirs(indexFolder)
+
+    # raster extent in World Mercator coordinates, with square cells of roughly cellSize meters
+    starts = roadEngine.getSegmentStarts(lon,lat,partBounds)
+    isValid = geodesy.validCoords(lon,lat)
+    header = np.zeros(10,dtype=np.float64)
+    rasterShape = (0,0)
+    if(starts.size > 0):
+        [mercX,mercY] = geodesy.toMercator(lon[isValid],lat[isValid])
+        midLat = (lat[isValid].min() + lat[isValid].max())/2
+        rasterCell = cellSize*float(geodesy.mercatorScale(midLat))
+        margin = RASTER_MARGIN*float(geodesy.mercatorScale(np.max(np.abs(lat[isValid]))))
+        originX = mercX.min() - margin
+        originY = mercY.max() + margin
+        rasterShape = (int(np.ceil((originY - mercY.min() + margin)/rasterCell)),int(np.ceil((mercX.max() + margin - originX)/rasterCell)))
+        if(rasterShape[0]*rasterShape[1] > MAX_RASTER_CELLS):
+            raise ValueError("the distance raster would have " + str(rasterShape[0]*rasterShape[1]) + " cells.  Use a larger cell size")
+        [mercX,mercY] = geodesy.toMercator(lon,lat)
+        isRoad = drawRoads(np.column_stack((mercX[starts],mercX[starts + 1])),np.column_stack((mercY[starts],mercY[starts + 1])),
+                           originX,originY,rasterCell,rasterShape)
+        distance = ndimage.distance_transform_edt(~isRoad,sampling=rasterCell).astype(np.float32)
+        header[0:4] = [originX,originY,rasterCell,cellSize]
+    else:
+        distance = np.zeros(rasterShape,dtype=np.float32)
+    header[4:6] = rasterShape
+    header[6:10] = getSourceStamp(roadShapefile)
+    np.save(os.path.join(indexFolder,"segments.npy"),segments)
+    np.save(os.path.join(indexFolder,"distance.npy"),distance)
+    np.save(os.path.join(indexFolder,"header.npy"),np.append(header,INDEX_VERSION))
+    print("completed building road index: " + indexFolder)
+
+
+# open a road distance index.  The index is built first if it doesn't exist, or if the road shapefile
+# or the cell size has changed since the index was built.  Segments and the distance raster are
+# memory mapped
+# Inputs:
+#    roadShapefile (string) - filepath to the road polyline shapefile
+#    indexFolder (string) - folder the index is saved in
+#    cellSize (float) - approximate width of a raster cell on the ground, in meters
+# Outputs:
+#    roadIndex object
+def openRoadIndex(roadShapefile,indexFolder,cellSize):
+    headerFile = os.path.join(indexFolder,"header.npy")
+    isCurrent = False
+    if(os.path.exists(headerFile)):
+        header = np.load(headerFile)
+        isCurrent = (header.size == 11 and header[10] == INDEX_VERSION and np.array_equal(header[6:10],getSourceStamp(roadShapefile))
+                     and (header[3] == cellSize or header[4] == 0))
+    if(not isCurrent):
+        buildRoadIndex(roadShapefile,indexFolder,cellSize)
+        header = np.load(headerFile)
+    segments = np.load(os.path.join(indexFolder,"segments.npy"),mmap_mode='r')
+    distance = np.load(os.path.join(indexFolder,"distance.npy"),mmap_mode='r')
+    return(roadIndex(segments,distance,header))
+
+
+# calculate the distance from each point to the nearest road in each of several road indices.  Distances
+# are looked up in the raster of each index, and exact distances for the points that need refinement
+# (see roadIndex.getRefineMask) are calculated for all indices in one pass over the points
+# Inputs:
+#    indices (roadIndex list) - road distance indices
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+#    refineDistance (float) - distance from roads within which exact distances are used, in meters
+# Outputs:
+#    dists (float array list) - distance from each point to the nearest road in each index, in meters
+def calcNearestRoads(indices,inLon,inLat,refineDistance=0):
+    inLon = np.asarray(inLon,dtype=np.float64)
+    inLat = np.asarray(inLat,dtype=np.float64)
+    dists = []
+    refineMasks = []
+    for index in indices:
+        [indexDists,refineMask] = index.getRefineMask(inLon,inLat,refineDistance)
+        dists.append(indexDists)
+        refineMasks.append(refineMask)
+    exactDists = roadEngine.calcNearestRoads([index.getRoadSegments() for index in indices],inLon,inLat,refineMasks)
+    for indexNum in range(0,len(indices)):
+        if(indices[indexNum].getRoadSegments().getNumSegments() > 0):
+            dists[indexNum][refineMasks[indexNum]] = exactDists[indexNum][refineMasks[indexNum]]
+    return(dists)
+
+
+
+########### road index custom class ##########
+
+# custom class containing a memory-mapped road distance index
+class roadIndex:
+    # instantiate a road index
+    def __init__(self,inSegments,inDistance,inHeader):
+        self.roadSegments = roadEngine.roadSegments(inSegments)
+        self.distance = inDistance
+        [self.originX,self.originY,self.rasterCell] = inHeader[0:3].tolist()
+
+    ########### custom functions ############
+
+    # look up the distance from each point to the nearest road in the distance raster
+    # inLon (float array) - longitude of each point, in decimal degrees
+    # inLat (float array) - latitude of each point, in decimal degrees
+    # outputs: distance (meters) and maximum error (meters) for each point.  Points outside the raster
+    # and points with null geometries are NaN
+    def lookupDistances(self,inLon,inLat):
+        inLon = np.asarray(inLon,dtype=np.float64)
+        inLat = np.asarray(inLat,dtype=np.float64)
+        dists = np.full(inLon.size,np.nan)
+        errors = np.full(inLon.size,np.nan)
+        validIndex = np.flatnonzero(geodesy.validCoords(inLon,inLat) & (np.abs(inLat) < 89))
+        if(self.distance.size == 0 or validIndex.size == 0):
+            return([dists,errors])
+        [x,y] = geodesy.toMercator(inLon[validIndex],inLat[validIndex])
+        cols = np.floor((x - self.originX)/self.rasterCell).astype(np.int64)
+        rows = np.floor((self.originY - y)/self.rasterCell).astype(np.int64)
+        isInside = (rows >= 0) & (rows < self.distance.shape[0]) & (cols >= 0) & (cols < self.distance.shape[1])
+        validIndex = validIndex[isInside]
+        scale = geodesy.mercatorScale(inLat[validIndex])
+        dists[validIndex] = self.distance[rows[isInside],cols[isInside]]/scale
+        errors[validIndex] = calcRasterErrors(dists[validIndex],inLat[validIndex],self.rasterCell/scale)
+        return([dists,errors])
+
+    # look up raster distances, and find the points that need exact distances.  If refineDistance is
+    # greater than 0, these are points that may be within refineDistance of a road.  Points outside the
+    # raster always need exact distances
+    # inLon (float array) - longitude of each point, in decimal degrees
+    # inLat (float array) - latitude of each point, in decimal degrees
+    # refineDistance (float) - distance from roads within which exact distances are used, in meters
+    # outputs: raster distance (meters) for each point, and a boolean array that is true for points that
+    # need exact distances
+    def getRefineMask(self,inLon,inLat,refineDistance=0):
+        [dists,errors] = self.lookupDistances(inLon,inLat)
+        isValid = geodesy.validCoords(inLon,inLat)
+        return([dists,isValid & (np.isnan(dists) | ((refineDistance > 0) & (dists - errors <= refineDistance)))])
+
+    # calculate the distance from each point to the nearest road.  Distances are looked up in the raster.
+    # If refineDistance is greater than 0, exact distances are calculated for points that may be within
+    # refineDistance of a road, and for points outside the raster
+    # inLon (float array) - longitude of each point, in decimal degrees
+    # inLat (float array) - latitude of each point, in decimal degrees
+    # refineDistance (float) - distance from roads within which exact distances are used, in meters
+    def calcDistances(self,inLon,inLat,refineDistance=0):
+        return(calcNearestRoads([self],inLon,inLat,refineDistance)[0])
+
+    ########## getters and setters ##########
+    def getRoadSegments(self):
+        return(self.roadSegments)
+
+    def getCellSize(self):
+        return(self.rasterCell)
+
+
+########### end of the road index custom class ##########
+
+
+############## end of roadIndex.py ##################
@@ -0,0 +1,266 @@
+############## geodesy.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl and Perry Hystad, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module contains distance helpers shared by the exposure scripts.  Points stored
+# as latitude and longitude are converted to 3D Cartesian (earth-centered, earth-fixed) coordinates on
+# the WGS84 ellipsoid, so that standard spatial indices (e.g. KD-trees) can be used to find all features
+# within a given distance.  Straight line (chord) distances between two points in 3D space are converted
+# to distances along the earth's surface, which agree with ellipsoidal geodesic distances to within 10
+# centimeters for distances up to 400 kilometers.  Latitude and longitude can also be projected to the
+# coordinate system of a raster (e.g. the Albers projection of the National Land Cover Database).
+
+# Requirements:
+#      numpy
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import re
+import numpy as np
+
+# constants
+WGS84_A = 6378137.0 # semi-major axis of the WGS84 ellipsoid, in meters
+WGS84_F = 1/298.257223563 # flattening of the WGS84 ellipsoid
+WGS84_E2 = WGS84_F*(2 - WGS84_F) # squared eccentricity of the WGS84 ellipsoid
+MEAN_RADIUS = 6371008.8 # mean radius of the earth, in meters
+MERCATOR_ITERATIONS = 10 # number of iterations used to invert the ellipsoidal Mercator projection
+NLCD_PRJ = ('PROJCS["USA_Contiguous_Albers_Equal_Area_Conic_USGS_version",GEOGCS["GCS_North_American_1983",'
+            'DATUM["D_North_American_1983",SPHEROID["GRS_1980",6378137.0,298.257222101]],PRIMEM["Greenwich",0.0],'
+            'UNIT["Degree",0.0174532925199433]],PROJECTION["Albers"],PARAMETER["False_Easting",0.0],PARAMETER["False_Northing",0.0],'
+            'PARAMETER["Central_Meridian",-96.0],PARAMETER["Standard_Parallel_1",29.5],PARAMETER["Standard_Parallel_2",45.5],'
+            'PARAMETER["Latitude_Of_Origin",23.0],UNIT["Meter",1.0]]') # projection definition of the National Land Cover Database rasters
+WGS84_PRJ = ('GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],'
+             'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]') # projection definition for WGS84 latitude and longitude
+
+
+
+############### helper functions ##############
+
+# convert latitude and longitude coordinates to earth-centered, earth-fixed Cartesian coordinates
+# Inputs:
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+# Outputs:
+#    xyz (float array) - n x 3 array of Cartesian coordinates, in meters
+def toECEF(inLon,inLat):
+    lon = np.radians(np.asarray(inLon,dtype=np.float64))
+    lat = np.radians(np.asarray(inLat,dtype=np.float64))
+    sinLat = np.sin(lat)
+    cosLat = np.cos(lat)
+    primeVertical = WGS84_A/np.sqrt(1 - WGS84_E2*sinLat*sinLat)
+    xyz = np.empty((lon.size,3),dtype=np.float64)
+    xyz[:,0] = primeVertical*cosLat*np.cos(lon)
+    xyz[:,1] = primeVertical*cosLat*np.sin(lon)
+    xyz[:,2] = primeVertical*(1 - WGS84_E2)*sinLat
+    return(xyz)
+
+
+# convert straight line distances through the earth to distances along the earth's surface
+# Inputs:
+#    inChord (float array) - straight line distances between two points, in meters
+# Outputs:
+#    float array of surface distances, in meters
+def chordToArc(inChord):
+    halfAngle = np.clip(np.asarray(inChord,dtype=np.float64)/(2*MEAN_RADIUS),0,1)
+    return(2*MEAN_RADIUS*np.arcsin(halfAngle))
+
+
+# convert distances along the earth's surface to straight line distances through the earth.  Used
+# to translate a search distance into a search radius for a Cartesian spatial index.  The result is
+# padded by one meter so that no features are missed due to differences between the ellipsoid and
+# the mean earth radius.
+# Inputs:
+#    inArc (float array) - surface distances, in meters
+# Outputs:
+#    float array of straight line distances, in meters
+def arcToChord(inArc):
+    angle = np.minimum(np.asarray(inArc,dtype=np.float64)/(2*MEAN_RADIUS),np.pi/2)
+    return(2*MEAN_RADIUS*np.sin(angle) + 1.0)
+
+
+# calculate the great circle distance between pairs of points with the haversine formula, on a sphere 
+# with the mean radius of the earth
+# Inputs:
+#    lon1 (float array) - longitude of the first point in each pair, in decimal degrees
+#    lat1 (float array) - latitude of the first point in each pair, in decimal degrees
+#    lon2 (float array) - longitude of the second point in each pair, in decimal degrees
+#    lat2 (float array) - latitude of the second point in each pair, in decimal degrees
+# Outputs:
+#    float array of distances, in meters.  Pairs with missing coordinates are NaN
+def haversine(lon1,lat1,lon2,lat2):
+    [lon1,lat1,lon2,lat2] = [np.radians(np.asarray(coord,dtype=np.float64)) for coord in [lon1,lat1,lon2,lat2]]
+    halfChord = np.sin((lat2 - lat1)/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin((lon2 - lon1)/2)**2
+    return(2*MEAN_RADIUS*np.arcsin(np.sqrt(np.clip(halfChord,0,1))))
+
+
+# determine which points have valid coordinates.  Null geometries are stored as very large negative
+# values in shapefiles and as NaN values in numpy arrays
+# Inputs:
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+# Outputs:
+#    boolean array, true for points with valid coordinates
+def validCoords(inLon,inLat):
+    lon = np.asarray(inLon,dtype=np.float64)
+    lat = np.asarray(inLat,dtype=np.float64)
+    return(np.isfinite(lon) & np.isfinite(lat) & (np.abs(lon) <= 360) & (np.abs(lat) <= 90))
+
+
+
+# read a numeric parameter from a projection definition (.prj file contents)
+# Inputs:
+#    inPrj (string) - projection definition, in well known text format
+#    paramName (string) - name of the parameter
+#    defaultVal (float) - value to return if the parameter isn't defined
+# Outputs:
+#    float value of the parameter
+def getPrjParameter(inPrj,paramName,defaultVal):
+    match = re.search(r'PARAMETER\["' + paramName + r'",\s*([-+0-9.eE]+)\]',inPrj,re.IGNORECASE)
+    if(match is None):
+        return(defaultVal)
+    return(float(match.group(1)))
+
+
+# convert projected coordinates to WGS84 latitude and longitude.  Geographic coordinates are returned
+# unchanged.  The World Mercator (ellipsoidal) and Web Mercator (auxiliary sphere) projections used by 
+# the example datasets are supported
+# Inputs:
+#    inX (float array) - x coordinate of each point
+#    inY (float array) - y coordinate of each point
+#    inPrj (string) - projection definition (.prj file contents), in well known text format
+# Outputs:
+#    lon (float array) - longitude of each point, in decimal degrees
+#    lat (float array) - latitude of each point, in decimal degrees
+def projectToGeographic(inX,inY,inPrj):
+    x = np.asarray(inX,dtype=np.float64)
+    y = np.asarray(inY,dtype=np.float64)
+    if(inPrj.strip() == "" or inPrj.strip().upper().startswith("GEOGCS")):
+        return([x,y])
+    projection = re.search(r'PROJECTION\["([^"]+)"\]',inPrj)
+    if(projection is None or not projection.group(1).startswith("Mercator")):
+        raise ValueError("unsupported projection: " + inPrj[0:60])
+    falseEasting = getPrjParameter(inPrj,"False_Easting",0)
+    falseNorthing = getPrjParameter(inPrj,"False_Northing",0)
+    centralMeridian = getPrjParameter(inPrj,"Central_Meridian",0)
+    lon = np.degrees((x - falseEasting)/WGS84_A) + centralMeridian
+    if(projection.group(1) == "Mercator_Auxiliary_Sphere"):
+        lat = np.degrees(np.pi/2 - 2*np.arctan(np.exp(-(y - falseNorthing)/WGS84_A)))
+        return([lon,lat])
+
+    # invert the ellipsoidal Mercator projection, scaled to the standard parallel
+    standardParallel = np.radians(getPrjParameter(inPrj,"Standard_Parallel_1",0))
+    scale = np.cos(standardParallel)/np.sqrt(1 - WGS84_E2*np.sin(standardParallel)**2)
+    lon = np.degrees((x - falseEasting)/(WGS84_A*scale)) + centralMeridian
+    t = np.exp(-(y - falseNorthing)/(WGS84_A*scale))
+    eccentricity = np.sqrt(WGS84_E2)
+    lat = np.pi/2 - 2*np.arctan(t)
+    for iteration in range(0,MERCATOR_ITERATIONS):
+        eSinLat = eccentricity*np.sin(lat)
+        lat = np.pi/2 - 2*np.arctan(t*((1 - eSinLat)/(1 + eSinLat))**(eccentricity/2))
+    return([lon,np.degrees(lat)])
+
+
+# read the semi-major axis and squared eccentricity of the ellipsoid of a projection definition.  The
+# difference between the NAD83 and WGS84 datums (about 1 meter) is ignored
+# Inputs:
+#    inPrj (string) - projection definition, in well known text format
+# Outputs:
+#    semiMajor (float) - semi-major axis, in meters
+#    eccentricity2 (float) - squared eccentricity
+def getSpheroid(inPrj):
+    match = re.search(r'SPHEROID\["[^"]*",\s*([-+0-9.eE]+),\s*([-+0-9.eE]+)',inPrj,re.IGNORECASE)
+    if(match is None):
+        return([WGS84_A,WGS84_E2])
+    flattening = 1/float(match.group(2)) if float(match.group(2)) != 0 else 0
+    return([float(match.group(1)),flattening*(2 - flattening)])
+
+
+# calculate the authalic latitude function q of the ellipsoidal Albers projection (Snyder, 1987, eq. 3-12)
+# Inputs:
+#    lat (float array) - latitude, in radians
+#    eccentricity2 (float) - squared eccentricity of the ellipsoid
+# Outputs:
+#    float array of q values
+def albersQ(lat,eccentricity2):
+    eccentricity = np.sqrt(eccentricity2)
+    eSinLat = eccentricity*np.sin(lat)
+    return((1 - eccentricity2)*(np.sin(lat)/(1 - eSinLat**2) - np.log((1 - eSinLat)/(1 + eSinLat))/(2*eccentricity)))
+
+
+# convert WGS84 latitude and longitude to projected coordinates.  Geographic coordinates are returned
+# unchanged.  The ellipsoidal Albers equal area projection (e.g. the National Land Cover Database
+# rasters) and the Mercator projections supported by projectToGeographic are supported
+# Inputs:
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+#    inPrj (string) - projection definition (.prj file contents), in well known text format
+# Outputs:
+#    x (float array) - x coordinate of each point
+#    y (float array) - y coordinate of each point
+def projectFromGeographic(inLon,inLat,inPrj):
+    lon = np.asarray(inLon,dtype=np.float64)
+    lat = np.asarray(inLat,dtype=np.float64)
+    if(inPrj.strip() == "" or inPrj.strip().upper().startswith("GEOGCS")):
+        return([lon,lat])
+    projection = re.search(r'PROJECTION\["([^"]+)"\]',inPrj)
+    if(projection is None or not (projection.group(1).startswith("Mercator") or projection.group(1).startswith("Albers"))):
+        raise ValueError("unsupported projection: " + inPrj[0:60])
+    falseEasting = getPrjParameter(inPrj,"False_Easting",0)
+    falseNorthing = getPrjParameter(inPrj,"False_Northing",0)
+    centralMeridian = getPrjParameter(inPrj,"Central_Meridian",0)
+    if(projection.group(1) == "Mercator_Auxiliary_Sphere"):
+        x = WGS84_A*np.radians(lon - centralMeridian) + falseEasting
+        y = WGS84_A*np.log(np.tan(np.pi/4 + np.radians(lat)/2)) + falseNorthing
+        return([x,y])
+    if(projection.group(1).startswith("Mercator")):
+        standardParallel = np.radians(getPrjParameter(inPrj,"Standard_Parallel_1",0))
+        scale = np.cos(standardParallel)/np.sqrt(1 - WGS84_E2*np.sin(standardParallel)**2)
+        [x,y] = toMercator(lon - centralMeridian,lat)
+        return([x*scale + falseEasting,y*scale + falseNorthing])
+
+    # project to the ellipsoidal Albers equal area projection (Snyder, 1987, eqs. 14-1 to 14-4)
+    [semiMajor,eccentricity2] = getSpheroid(inPrj)
+    [lat0,lat1,lat2] = [np.radians(getPrjParameter(inPrj,paramName,0)) for paramName in ["Latitude_Of_Origin","Standard_Parallel_1","Standard_Parallel_2"]]
+    [m1,m2] = [np.cos(parallel)/np.sqrt(1 - eccentricity2*np.sin(parallel)**2) for parallel in [lat1,lat2]]
+    [q0,q1,q2] = [albersQ(parallel,eccentricity2) for parallel in [lat0,lat1,lat2]]
+    cone = (m1**2 - m2**2)/(q2 - q1) if lat1 != lat2 else np.sin(lat1)
+    constant = m1**2 + cone*q1
+    rho = semiMajor*np.sqrt(constant - cone*albersQ(np.radians(lat),eccentricity2))/cone
+    rho0 = semiMajor*np.sqrt(constant - cone*q0)/cone
+    theta = cone*np.radians(lon - centralMeridian)
+    return([rho*np.sin(theta) + falseEasting,rho0 - rho*np.cos(theta) + falseNorthing])
+
+
+# convert WGS84 latitude and longitude to World Mercator (ellipsoidal, standard parallel 0) coordinates.
+# Mercator is conformal, so distances of up to a few kilometers are scaled by the same factor in every
+# direction, and can be converted to distances on the ellipsoid by dividing by mercatorScale
+# Inputs:
+#    inLon (float array) - longitude of each point, in decimal degrees
+#    inLat (float array) - latitude of each point, in decimal degrees
+# Outputs:
+#    x (float array) - easting of each point, in meters
+#    y (float array) - northing of each point, in meters
+def toMercator(inLon,inLat):
+    lat = np.radians(np.asarray(inLat,dtype=np.float64))
+    eSinLat = np.sqrt(WGS84_E2)*np.sin(lat)
+    x = WGS84_A*np.radians(np.asarray(inLon,dtype=np.float64))
+    y = WGS84_A*np.log(np.tan(np.pi/4 + lat/2)*((1 - eSinLat)/(1 + eSinLat))**(np.sqrt(WGS84_E2)/2))
+    return([x,y])
+
+
+# calculate the scale factor of the World Mercator projection, i.e. the ratio of projected distances to
+# distances on the ellipsoid
+# Inputs:
+#    inLat (float array) - latitude, in decimal degrees
+# Outputs:
+#    float array of scale factors
+def mercatorScale(inLat):
+    lat = np.radians(np.asarray(inLat,dtype=np.float64))
+    return(np.sqrt(1 - WGS84_E2*np.sin(lat)**2)/np.cos(lat))
+
+
+############## end of geodesy.py ##################
@@ -0,0 +1,710 @@
+############## rasterIO.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl and Perry Hystad, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module reads and writes single band GeoTIFF rasters without arcpy.  Rasters are read
+# one window at a time, and only the strips or tiles that overlap the window are read and decompressed,
+# so rasters larger than memory can be processed in blocks.  Uncompressed and deflate (zip, called LZ77
+# in ArcGIS) compressed rasters with or without horizontal differencing are supported.  Uncompressed
+# strips and tiles are memory-mapped rather than copied, and decompressed tiles are kept in a cache of
+# bounded size, dropping the least recently used tiles first, so point queries and nearby windows only
+# read each tile once.  Reduced resolution overviews (pyramids) stored in the raster or in an external .ovr
+# file are read in the same way, so coarse checks can read a small pyramid level instead of the full
+# raster.  Cell positions are taken from the GeoTIFF tags, or from the world file (e.g. .tfw) next to
+# the raster.  Rasters are written as uncompressed tiled GeoTIFFs.  The position of every tile is fixed
+# when the file is created, so tiles can be written in any order, and by several processes at the same
+# time.  GeoTIFF georeferencing tags and the NoData value are copied from the input raster.  Overviews
+# of written rasters are created as external .ovr files.
+
+# Requirements:
+#      numpy
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import os
+import struct
+import zlib
+import numpy as np
+from collections import OrderedDict
+
+# constants
+TILE_SIZE = 256 # width and height of the tiles of written rasters, in cells
+CACHE_BYTES = 64*1024*1024 # largest total size of the decompressed tiles cached by each raster reader, in bytes
+OVERVIEW_BLOCK = 2048 # width and height of the windows of each overview created at one time, in cells
+CLASSIC_LIMIT = 2**32 - 1 # largest file offset of a classic TIFF file.  Larger rasters are written as BigTIFF files
+MAX_IMAGES = 1000 # largest number of images read from one TIFF file
+TAG_NAMES = {"subfileType":254,"width":256,"height":257,"bitsPerSample":258,"compression":259,"photometric":262,"stripOffsets":273,
+             "samplesPerPixel":277,"rowsPerStrip":278,"stripByteCounts":279,"planarConfig":284,"predictor":317,
+             "tileWidth":322,"tileHeight":323,"tileOffsets":324,"tileByteCounts":325,"sampleFormat":339,
+             "pixelScale":33550,"tiePoint":33922,"transformation":34264,"geoKeys":34735,"noData":42113}
+GEO_TAGS = [33550,33922,34264,34735,34736,34737,42112] # GeoTIFF pixel scale, tie point, transformation, geo keys, and GDAL metadata tags
+UNCOMPRESSED = 1 # TIFF compression code for uncompressed data
+DEFLATE_CODES = (8,32946) # TIFF compression codes for deflate (zip) data
+HORIZONTAL_PREDICTOR = 2 # TIFF predictor code for horizontal differencing
+REDUCED_IMAGE = 1 # subfile type flag of overview images
+MASK_IMAGE = 4 # subfile type flag of transparency mask images
+OVERVIEW_SUFFIX = ".ovr" # added to the raster filepath to get the filepath of external overviews
+WORLD_FILE_SUFFIXES = [".tfw",".tifw",".wld"] # world file extensions, replacing the raster extension
+RASTER_TYPE_KEY = 1025 # GeoTIFF key for whether coordinates refer to cell corners or cell centers
+PIXEL_IS_POINT = 2 # GeoTIFF raster type for rasters with coordinates at cell centers
+
+# numpy type code and size in bytes of each TIFF field type.  Rational types are read as pairs of integers
+FIELD_TYPES = {1:['u1',1],2:['S1',1],3:['u2',2],4:['u4',4],5:['u4',8],6:['i1',1],7:['u1',1],8:['i2',2],
+               9:['i4',4],10:['i4',8],11:['f4',4],12:['f8',8],16:['u8',8],17:['i8',8],18:['u8',8]}
+SAMPLE_KINDS = {1:'u',2:'i',3:'f'} # numpy type kind for each TIFF sample format code
+
+
+
+############### helper functions ##############
+
+# read the tags of one image file directory (IFD) in a TIFF or BigTIFF file
+# Inputs:
+#    inStream (file) - TIFF file, opened in binary mode
+#    ifdOffset (int) - position of the IFD in the file, in bytes
+#    byteOrder (string) - '<' for little endian files, '>' for big endian files
+#    isBig (boolean) - true for BigTIFF files
+# Outputs:
+#    tags (dictionary) - field type and values of each tag, keyed by tag number.  Text tags are strings,
+#    all other tags are numpy arrays
+#    nextOffset (int) - position of the next IFD, or 0 if this is the last IFD
+def readIFD(inStream,ifdOffset,byteOrder,isBig):
+    [countFormat,entryFormat,entrySize,inlineSize] = ['Q','HHQ',20,8] if isBig else ['H','HHI',12,4]
+    inStream.seek(ifdOffset)
+    numEntries = struct.unpack(byteOrder + countFormat,inStream.read(struct.calcsize(countFormat)))[0]
+    entries = inStream.read(numEntries*entrySize)
+    nextOffset = struct.unpack(byteOrder + countFormat.replace('H','I'),inStream.read(inlineSize))[0]
+    tags = {}
+    for i in range(0,numEntries):
+        entry = entries[i*entrySize:(i+1)*entrySize]
+        [tag,fieldType,count] = struct.unpack(byteOrder + entryFormat,entry[0:entrySize - inlineSize])
+        if(fieldType not in FIELD_TYPES):
+            continue
+        numBytes = count*FIELD_TYPES[fieldType][1]
+        if(numBytes <= inlineSize):
+            rawValues = entry[entrySize - inlineSize:entrySize - inlineSize + numBytes]
+        else:
+            valueOffset = struct.unpack(byteOrder + ('Q' if isBig else 'I'),entry[entrySize - inlineSize:entrySize])[0]
+            inStream.seek(valueOffset)
+            rawValues = inStream.read(numBytes)
+        if(fieldType == 2):
+            tags[tag] = [fieldType,rawValues.split(b'\x00')[0].decode('latin-1')]
+        else:
+            tags[tag] = [fieldType,np.frombuffer(rawValues,dtype=byteOrder + FIELD_TYPES[fieldType][0])]
+    return([tags,nextOffset])
+
+
+# read the tags of every image in a TIFF or BigTIFF file
+# Inputs:
+#    inStream (file) - TIFF file, opened in binary mode
+# Outputs:
+#    images (list) - tags of each image, as returned by readIFD, in file order
+#    byteOrder (string) - '<' for little endian files, '>' for big endian files
+def readTiffImages(inStream):
+    inStream.seek(0)
+    header = inStream.read(16)
+    if(header[0:2] not in (b'II',b'MM')):
+        raise ValueError("not a TIFF file: " + str(inStream.name))
+    byteOrder = '<' if header[0:2] == b'II' else '>'
+    version = struct.unpack(byteOrder + 'H',header[2:4])[0]
+    if(version == 42):
+        ifdOffset = struct.unpack(byteOrder + 'I',header[4:8])[0]
+    elif(version == 43):
+        ifdOffset = struct.unpack(byteOrder + 'Q',header[8:16])[0]
+    else:
+        raise ValueError("unknown TIFF version " + str(version) + " in " + str(inStream.name))
+    images = []
+    while(ifdOffset != 0 and len(images) < MAX_IMAGES):
+        [tags,ifdOffset] = readIFD(inStream,ifdOffset,byteOrder,version == 43)
+        images.append(tags)
+    return([images,byteOrder])
+
+
+# get the first value of a tag, or a default value if the tag is not in the file
+# Inputs:
+#    tags (dictionary) - field type and values of each tag, keyed by tag number
+#    tagName (string) - name of the tag in TAG_NAMES
+#    defaultVal - value returned when the tag is missing
+# Outputs:
+#    value of the tag
+def getTagValue(tags,tagName,defaultVal=None):
+    if(TAG_NAMES[tagName] not in tags):
+        return(defaultVal)
+    return(int(tags[TAG_NAMES[tagName]][1][0]))
+
+
+# read the cell size and position of the upper left corner of a raster from a world file.  World files
+# give the position of the center of the upper left cell
+# Inputs:
+#    worldFile (string) - filepath to the world file (e.g. .tfw)
+# Outputs:
+#    transform (float list) - x coordinate of the left edge, cell width, y coordinate of the top edge, and
+#    cell height (negative for rasters stored from north to south)
+def readWorldFile(worldFile):
+    with open(worldFile) as inStream:
+        values = [float(line) for line in inStream.read().split()]
+    if(len(values) != 6):
+        raise ValueError("world file must have 6 values: " + worldFile)
+    [cellWidth,rowRotation,colRotation,cellHeight,centerX,centerY] = values
+    if(rowRotation != 0 or colRotation != 0):
+        raise ValueError("rotated rasters are not supported: " + worldFile)
+    return([centerX - cellWidth/2,cellWidth,centerY - cellHeight/2,cellHeight])
+
+
+# find the world file of a raster
+# Inputs:
+#    inFile (string) - filepath to the raster
+# Outputs:
+#    filepath to the world file, or None if the raster does not have a world file
+def findWorldFile(inFile):
+    basePath = os.path.splitext(inFile)[0]
+    for suffix in WORLD_FILE_SUFFIXES:
+        for worldFile in (basePath + suffix,inFile + suffix):
+            if(os.path.exists(worldFile)):
+                return(worldFile)
+    return(None)
+
+
+# read the cell size and position of the upper left corner of a raster from its GeoTIFF tags
+# Inputs:
+#    tags (dictionary) - field type and values of each tag, keyed by tag number
+# Outputs:
+#    transform (float list) - x coordinate of the left edge, cell width, y coordinate of the top edge, and
+#    cell height, or None if the tags do not give the cell positions
+def getTagTransform(tags):
+    if(TAG_NAMES["transformation"] in tags):
+        matrix = tags[TAG_NAMES["transformation"]][1].astype(np.float64)
+        if(matrix[1] != 0 or matrix[4] != 0):
+            raise ValueError("rotated rasters are not supported")
+        transform = [matrix[3],matrix[0],matrix[7],matrix[5]]
+    elif(TAG_NAMES["pixelScale"] in tags and TAG_NAMES["tiePoint"] in tags):
+        [scaleX,scaleY] = tags[TAG_NAMES["pixelScale"]][1][0:2].astype(np.float64)
+        [tieCol,tieRow,tieZ,tieX,tieY] = tags[TAG_NAMES["tiePoint"]][1][0:5].astype(np.float64)
+        transform = [tieX - tieCol*scaleX,scaleX,tieY + tieRow*scaleY,-scaleY]
+    else:
+        return(None)
+    if(TAG_NAMES["geoKeys"] in tags):
+        geoKeys = tags[TAG_NAMES["geoKeys"]][1].astype(np.int64)
+        keyEntries = geoKeys[4:4 + 4*int(geoKeys[3])].reshape(-1,4)
+        isType = keyEntries[:,0] == RASTER_TYPE_KEY
+        if(np.any(isType) and keyEntries[isType][0,3] == PIXEL_IS_POINT):
+            transform = [transform[0] - transform[1]/2,transform[1],transform[2] - transform[3]/2,transform[3]]
+    return([float(value) for value in transform])
+
+
+# encode the values of a tag for a little endian TIFF file
+# Inputs:
+#    fieldType (int) - TIFF field type
+#    inValues - string for text tags, sequence of numbers for all other tags
+# Outputs:
+#    count (int) - number of values in the tag, as stored in the IFD
+#    rawValues (bytes) - encoded values
+def encodeTag(fieldType,inValues):
+    if(fieldType == 2):
+        rawValues = inValues.encode('latin-1') + b'\x00'
+        return([len(rawValues),rawValues])
+    if(fieldType in (5,10)):
+        raise ValueError("rational tags can not be written")
+    rawValues = np.asarray(inValues,dtype='<' + FIELD_TYPES[fieldType][0]).tobytes()
+    return([len(rawValues)//FIELD_TYPES[fieldType][1],rawValues])
+
+
+# encode an IFD and the tag values that do not fit in the IFD, which are stored directly after it
+# Inputs:
+#    tags (list) - tag number, field type, and values of each tag, sorted by tag number
+#    ifdOffset (int) - position of the IFD in the file, in bytes
+#    nextOffset (int) - position of the next IFD, or 0 for the last IFD
+#    isBig (boolean) - true for BigTIFF files
+# Outputs:
+#    encoded IFD and tag values
+def encodeIFD(tags,ifdOffset,nextOffset,isBig):
+    [countFormat,entryFormat,offsetFormat,entrySize,inlineSize] = ['<Q','<HHQ','<Q',20,8] if isBig else ['<H','<HHI','<I',12,4]
+    outBytes = [struct.pack(countFormat,len(tags))]
+    extraBytes = []
+    extraOffset = ifdOffset + struct.calcsize(countFormat) + len(tags)*entrySize + inlineSize
+    for [tag,fieldType,inValues] in tags:
+        [count,rawValues] = encodeTag(fieldType,inValues)
+        if(len(rawValues) <= inlineSize):
+            valueField = rawValues + b'\x00'*(inlineSize - len(rawValues))
+        else:
+            valueField = struct.pack(offsetFormat,extraOffset)
+            extraBytes.append(rawValues + b'\x00'*(len(rawValues) % 2))
+            extraOffset += len(extraBytes[-1])
+        outBytes.append(struct.pack(entryFormat,tag,fieldType,count) + valueField)
+    outBytes.append(struct.pack(offsetFormat,nextOffset))
+    return(b''.join(outBytes + extraBytes))
+
+
+# create a TIFF file of one or more uncompressed tiled images.  The header, tags, and tile positions are
+# written, and the file is extended to its full size without writing the tiles, which are written later
+# with a rasterWriter.  Tiles that are never written contain zeros
+# Inputs:
+#    outFile (string) - filepath of the file to create
+#    imageShapes (list) - number of rows and columns of each image
+#    inDtype (numpy dtype) - data type of the raster cells
+#    geoTags (dictionary) - GeoTIFF tags to copy to the first image, as returned by rasterReader.getGeoTags()
+#    noData (float) - NoData value of the raster, or None if the raster does not have a NoData value
+#    tileSize (int) - width and height of each tile, in cells.  Must be a multiple of 16
+#    subfileType (int) - subfile type of the images, e.g. REDUCED_IMAGE for overviews
+def createImages(outFile,imageShapes,inDtype,geoTags,noData,tileSize,subfileType=0):
+    inDtype = np.dtype(inDtype)
+    if(tileSize % 16 != 0):
+        raise ValueError("tile size must be a multiple of 16, not " + str(tileSize))
+    if(inDtype.kind not in ('u','i','f')):
+        raise ValueError("unsupported raster data type " + str(inDtype))
+    tileBytes = tileSize*tileSize*inDtype.itemsize
+    numTiles = [(-(-numRows//tileSize))*(-(-numCols//tileSize)) for [numRows,numCols] in imageShapes]
+    sampleFormat = {'u':1,'i':2,'f':3}[inDtype.kind]
+    for isBig in (False,True):
+        offsetType = 16 if isBig else 4
+        images = []
+        for imageNum in range(0,len(imageShapes)):
+            [numRows,numCols] = imageShapes[imageNum]
+            tags = [[256,4,[numCols]],[257,4,[numRows]],[258,3,[inDtype.itemsize*8]],[259,3,[UNCOMPRESSED]],[262,3,[1]],
+                    [277,3,[1]],[284,3,[1]],[322,3,[tileSize]],[323,3,[tileSize]],[324,offsetType,np.zeros(numTiles[imageNum])],
+                    [325,offsetType,np.full(numTiles[imageNum],tileBytes)],[339,3,[sampleFormat]]]
+            if(subfileType != 0):
+                tags.append([TAG_NAMES["subfileType"],4,[subfileType]])
+            if(imageNum == 0):
+                tags += [[tag] + geoTags[tag] for tag in sorted(geoTags)]
+            if(noData is not None):
+                tags.append([TAG_NAMES["noData"],2,repr(float(noData))])
+            tags.sort(key=lambda tagVals: tagVals[0])
+            images.append(tags)
+        ifdOffsets = [16 if isBig else 8]
+        for tags in images:
+            ifdOffsets.append(ifdOffsets[-1] + len(encodeIFD(tags,0,0,isBig)))
+        dataStart = ifdOffsets[-1] + (-ifdOffsets[-1] % 16)
+        fileSize = dataStart + sum(numTiles)*tileBytes
+        if(isBig or fileSize <= CLASSIC_LIMIT):
+            break
+    if(isBig):
+        outBytes = [b'II' + struct.pack('<HHHQ',43,8,0,ifdOffsets[0])]
+    else:
+        outBytes = [b'II' + struct.pack('<HI',42,ifdOffsets[0])]
+    tileStart = dataStart
+    for imageNum in range(0,len(images)):
+        tags = images[imageNum]
+        tags[[tagVals[0] for tagVals in tags].index(324)][2] = tileStart + np.arange(0,numTiles[imageNum],dtype=np.int64)*tileBytes
+        tileStart += numTiles[imageNum]*tileBytes
+        nextOffset = ifdOffsets[imageNum + 1] if imageNum + 1 < len(images) else 0
+        outBytes.append(encodeIFD(tags,ifdOffsets[imageNum],nextOffset,isBig))
+    with open(outFile,'wb') as outStream:
+        outStream.write(b''.join(outBytes))
+        outStream.truncate(fileSize)
+
+
+# create an uncompressed tiled GeoTIFF file, to be written with a rasterWriter
+# Inputs:
+#    outFile (string) - filepath of the raster to create
+#    numRows (int) - number of rows in the raster
+#    numCols (int) - number of columns in the raster
+#    inDtype (numpy dtype) - data type of the raster cells
+#    geoTags (dictionary) - GeoTIFF tags to copy, as returned by rasterReader.getGeoTags()
+#    noData (float) - NoData value of the raster, or None if the raster does not have a NoData value
+#    tileSize (int) - width and height of each tile, in cells.  Must be a multiple of 16
+def createRaster(outFile,numRows,numCols,inDtype,geoTags={},noData=None,tileSize=TILE_SIZE):
+    createImages(outFile,[[numRows,numCols]],inDtype,geoTags,noData,tileSize)
+    if(os.path.exists(outFile + OVERVIEW_SUFFIX)):
+        os.remove(outFile + OVERVIEW_SUFFIX)
+
+
+# create the overviews of a raster in an external .ovr file.  Each overview has half the rows and columns
+# of the previous level, and takes the value of one cell of each 2 x 2 block of the previous level
+# (nearest neighbour resampling, the ArcGIS pyramid default), so overviews of land type codes and of NDVI
+# values stay aligned.  Overviews are created until both dimensions are at most minSize cells
+# Inputs:
+#    inFile (string) - filepath to the raster
+#    minSize (int) - largest number of rows and columns of the coarsest overview
+# Outputs:
+#    numOverviews (int) - number of overviews created
+def buildOverviews(inFile,minSize=TILE_SIZE):
+    reader = rasterReader(inFile)
+    [numRows,numCols] = [reader.getNumRows(),reader.getNumCols()]
+    [inDtype,noData] = [reader.getDtype(),reader.getNoData()]
+    reader.close()
+    imageShapes = []
+    while(max(numRows,numCols) > minSize):
+        [numRows,numCols] = [-(-numRows//2),-(-numCols//2)]
+        imageShapes.append([numRows,numCols])
+    if(os.path.exists(inFile + OVERVIEW_SUFFIX)):
+        os.remove(inFile + OVERVIEW_SUFFIX)
+    if(len(imageShapes) == 0):
+        return(0)
+    createImages(inFile + OVERVIEW_SUFFIX,imageShapes,inDtype,{},noData,TILE_SIZE,REDUCED_IMAGE)
+    for level in range(1,len(imageShapes) + 1):
+        reader = rasterReader(inFile)
+        writer = rasterWriter(inFile + OVERVIEW_SUFFIX,level - 1)
+        [numRows,numCols] = imageShapes[level - 1]
+        [prevRows,prevCols] = [reader.getNumRows(level - 1),reader.getNumCols(level - 1)]
+        for row in range(0,numRows,OVERVIEW_BLOCK):
+            for col in range(0,numCols,OVERVIEW_BLOCK):
+                values = reader.readWindow(2*row,2*col,min(2*OVERVIEW_BLOCK,prevRows - 2*row),min(2*OVERVIEW_BLOCK,prevCols - 2*col),level - 1)
+                writer.writeWindow(row,col,values[::2,::2])
+        writer.close()
+        reader.close()
+    return(len(imageShapes))
+
+
+# write an array to a new uncompressed tiled GeoTIFF file
+# Inputs:
+#    outFile (string) - filepath of the raster to create
+#    inArray (2D array) - cell values
+#    geoTags (dictionary) - GeoTIFF tags to copy, as returned by rasterReader.getGeoTags()
+#    noData (float) - NoData value of the raster, or None if the raster does not have a NoData value
+def writeRaster(outFile,inArray,geoTags={},noData=None):
+    createRaster(outFile,inArray.shape[0],inArray.shape[1],inArray.dtype,geoTags,noData)
+    writer = rasterWriter(outFile)
+    writer.writeWindow(0,0,inArray)
+    writer.close()
+
+
+# read all cells of a GeoTIFF raster
+# Inputs:
+#    inFile (string) - filepath to the raster
+#    level (int) - pyramid level to read.  0 is the full resolution raster
+# Outputs:
+#    2D array of cell values
+def readRaster(inFile,level=0):
+    reader = rasterReader(inFile)
+    values = reader.readWindow(0,0,reader.getNumRows(level),reader.getNumCols(level),level)
+    reader.close()
+    return(values)
+
+
+
+############## raster image custom class ##############
+
+# one image (full resolution raster or overview) of a TIFF file
+class rasterImage:
+
+    # tags (dictionary) - tags of the image, from readTiffImages
+    # byteOrder (string) - '<' for little endian files, '>' for big endian files
+    # inStream (file) - TIFF file, opened in binary mode
+    # inMap (numpy memmap) - memory map of the TIFF file, or None if the image is compressed
+    def __init__(self,tags,byteOrder,inStream,inMap):
+        if(getTagValue(tags,"samplesPerPixel",1) != 1):
+            raise ValueError("only single band rasters are supported: " + inStream.name)
+        self.numRows = getTagValue(tags,"height")
+        self.numCols = getTagValue(tags,"width")
+        if(TAG_NAMES["tileOffsets"] in tags):
+            self.blockShape = [getTagValue(tags,"tileHeight"),getTagValue(tags,"tileWidth")]
+            self.offsets = tags[TAG_NAMES["tileOffsets"]][1].astype(np.int64)
+            self.byteCounts = tags[TAG_NAMES["tileByteCounts"]][1].astype(np.int64)
+        else:
+            self.blockShape = [min(getTagValue(tags,"rowsPerStrip",self.numRows),self.numRows),self.numCols]
+            self.offsets = tags[TAG_NAMES["stripOffsets"]][1].astype(np.int64)
+            self.byteCounts = tags[TAG_NAMES["stripByteCounts"]][1].astype(np.int64)
+        self.blocksAcross = -(-self.numCols//self.blockShape[1])
+        self.compression = getTagValue(tags,"compression",UNCOMPRESSED)
+        self.predictor = getTagValue(tags,"predictor",1)
+        if(self.compression != UNCOMPRESSED and self.compression not in DEFLATE_CODES):
+            raise ValueError("unsupported TIFF compression code " + str(self.compression) + ": " + inStream.name)
+        if(self.predictor not in (1,HORIZONTAL_PREDICTOR)):
+            raise ValueError("unsupported TIFF predictor " + str(self.predictor) + ": " + inStream.name)
+        sampleKind = SAMPLE_KINDS[getTagValue(tags,"sampleFormat",1)]
+        self.dtype = np.dtype(byteOrder + sampleKind + str(getTagValue(tags,"bitsPerSample")//8))
+        self.inStream = inStream
+        self.inMap = inMap if self.compression == UNCOMPRESSED else None
+
+    ########### custom functions ############
+
+    # read one strip or tile.  Uncompressed blocks are views of the memory map, other blocks are read and
+    # decompressed.  Strips at the bottom of the raster are padded to the full strip height
+    # blockIndex (int) - index of the strip or tile, in row major order
+    # fillValue (float) - value of blocks that are not stored in the file
+    # outputs: 2D array of cell values, with the shape of a full strip or tile
+    def readBlock(self,blockIndex,fillValue):
+        numBytes = int(self.byteCounts[blockIndex])
+        blockSize = self.blockShape[0]*self.blockShape[1]
+        if(numBytes == 0):
+            return(np.full(self.blockShape,fillValue,dtype=self.dtype))
+        if(self.inMap is not None and numBytes >= blockSize*self.dtype.itemsize):
+            rawValues = self.inMap[int(self.offsets[blockIndex]):int(self.offsets[blockIndex]) + blockSize*self.dtype.itemsize]
+        else:
+            self.inStream.seek(int(self.offsets[blockIndex]))
+            rawValues = self.inStream.read(numBytes)
+        if(self.compression in DEFLATE_CODES):
+            rawValues = zlib.decompress(rawValues)
+        values = np.frombuffer(rawValues,dtype=self.dtype,count=min(len(rawValues)//self.dtype.itemsize,blockSize))
+        if(values.size < blockSize):
+            values = np.concatenate((values,np.zeros(blockSize - values.size,dtype=self.dtype)))
+        values = values.reshape(self.blockShape)
+        if(self.predictor == HORIZONTAL_PREDICTOR):
+            values = np.cumsum(values,axis=1,dtype=self.dtype)
+        return(values)
+
+    ########## getters and setters ##########
+
+    def getNumRows(self):
+        return(self.numRows)
+
+    def getNumCols(self):
+        return(self.numCols)
+
+    def getBlockShape(self):
+        return(self.blockShape)
+
+    def getBlocksAcross(self):
+        return(self.blocksAcross)
+
+    def getBlockBytes(self,blockIndex):
+        return(int(self.byteCounts[blockIndex]))
+
+    def getDtype(self):
+        return(self.dtype)
+
+
+########### end of the raster image custom class ##########
+
+
+############## raster reader custom class ##############
+
+class rasterReader:
+
+    # open a raster and its overviews.  Overviews are read from reduced resolution images in the raster
+    # and from the external .ovr file, and are sorted from the finest to the coarsest level
+    # inFile (string) - filepath to the raster
+    # cacheBytes (int) - largest total size of the decompressed tiles kept in the tile cache, in bytes
+    def __init__(self,inFile,cacheBytes=CACHE_BYTES):
+        self.inFile = inFile
+        self.inStreams = []
+        self.levels = []
+        overviews = []
+        for [filePath,isExternal] in [[inFile,False],[inFile + OVERVIEW_SUFFIX,True]]:
+            if(isExternal and not os.path.exists(filePath)):
+                continue
+            inStream = open(filePath,'rb')
+            self.inStreams.append(inStream)
+            [images,byteOrder] = readTiffImages(inStream)
+            isUncompressed = any([getTagValue(tags,"compression",UNCOMPRESSED) == UNCOMPRESSED for tags in images])
+            inMap = np.memmap(filePath,dtype=np.uint8,mode='r') if isUncompressed and os.path.getsize(filePath) > 0 else None
+            for imageNum in range(0,len(images)):
+                subfileType = getTagValue(images[imageNum],"subfileType",0)
+                if(subfileType & MASK_IMAGE):
+                    continue
+                if(not isExternal and imageNum == 0):
+                    self.levels.append(rasterImage(images[imageNum],byteOrder,inStream,inMap))
+                    self.tags = images[imageNum]
+                elif(isExternal or subfileType & REDUCED_IMAGE):
+                    overviews.append(rasterImage(images[imageNum],byteOrder,inStream,inMap))
+        overviews.sort(key=lambda image: -image.getNumCols())
+        self.levels += [image for image in overviews if image.getNumCols() < self.levels[0].getNumCols()]
+        self.dtype = self.levels[0].getDtype()
+        self.noData = None
+        if(TAG_NAMES["noData"] in self.tags and self.tags[TAG_NAMES["noData"]][1].strip() != ""):
+            self.noData = float(self.tags[TAG_NAMES["noData"]][1])
+        self.transform = getTagTransform(self.tags)
+        worldFile = findWorldFile(inFile)
+        if(self.transform is None and worldFile is not None):
+            self.transform = readWorldFile(worldFile)
+        self.cache = OrderedDict()
+        self.cacheBytes = 0
+        self.maxCacheBytes = cacheBytes
+        self.bytesRead = 0
+
+    ########### custom functions ############
+
+    # read one strip or tile of a pyramid level.  Blocks are kept in the tile cache, so each block is read
+    # and decoded once while it is in the cache
+    # blockIndex (int) - index of the strip or tile, in row major order
+    # level (int) - pyramid level.  0 is the full resolution raster
+    # outputs: 2D array of cell values, with the shape of a full strip or tile
+    def readBlock(self,blockIndex,level=0):
+        key = (level,blockIndex)
+        if(key in self.cache):
+            self.cache.move_to_end(key)
+            return(self.cache[key])
+        image = self.levels[level]
+        values = image.readBlock(blockIndex,0 if self.noData is None else self.noData)
+        self.bytesRead += image.getBlockBytes(blockIndex)
+        if(values.nbytes <= self.maxCacheBytes):
+            self.cache[key] = values
+            self.cacheBytes += values.nbytes
+            while(self.cacheBytes > self.maxCacheBytes):
+                self.cacheBytes -= self.cache.popitem(last=False)[1].nbytes
+        return(values)
+
+    # read the cells of a rectangular window.  Only the strips or tiles that overlap the window are read
+    # row (int) - first row of the window
+    # col (int) - first column of the window
+    # numRows (int) - number of rows in the window
+    # numCols (int) - number of columns in the window
+    # level (int) - pyramid level.  Rows and columns are cells of this level
+    # outputs: 2D array of cell values, in the native byte order
+    def readWindow(self,row,col,numRows,numCols,level=0):
+        image = self.levels[level]
+        if(row < 0 or col < 0 or row + numRows > image.getNumRows() or col + numCols > image.getNumCols()):
+            raise ValueError("window is outside of the raster")
+        [blockHeight,blockWidth] = image.getBlockShape()
+        values = np.empty((numRows,numCols),dtype=self.dtype.newbyteorder('='))
+        for blockRow in range(row//blockHeight,(row + numRows - 1)//blockHeight + 1):
+            for blockCol in range(col//blockWidth,(col + numCols - 1)//blockWidth + 1):
+                block = self.readBlock(blockRow*image.getBlocksAcross() + blockCol,level)
+                [top,left] = [blockRow*blockHeight,blockCol*blockWidth]
+                [startRow,endRow] = [max(row,top),min(row + numRows,top + blockHeight)]
+                [startCol,endCol] = [max(col,left),min(col + numCols,left + blockWidth)]
+                values[startRow - row:endRow - row,startCol - col:endCol - col] = block[startRow - top:endRow - top,startCol - left:endCol - left]
+        return(values)
+
+    # read the values of individual cells.  Cells are grouped by strip or tile, so each strip or tile that
+    # contains a cell is read once, and no others are read
+    # rows (int array) - row of each cell
+    # cols (int array) - column of each cell
+    # level (int) - pyramid level.  Rows and columns are cells of this level
+    # outputs: array of cell values, in the native byte order
+    def readCells(self,rows,cols,level=0):
+        image = self.levels[level]
+        rows = np.asarray(rows,dtype=np.int64)
+        cols = np.asarray(cols,dtype=np.int64)
+        if(np.any(rows < 0) or np.any(cols < 0) or np.any(rows >= image.getNumRows()) or np.any(cols >= image.getNumCols())):
+            raise ValueError("cells are outside of the raster")
+        [blockHeight,blockWidth] = image.getBlockShape()
+        blockIndices = (rows//blockHeight)*image.getBlocksAcross() + cols//blockWidth
+        order = np.argsort(blockIndices,kind='stable')
+        bounds = np.flatnonzero(np.diff(blockIndices[order])) + 1
+        values = np.empty(rows.size,dtype=self.dtype.newbyteorder('='))
+        for cellIndex in np.split(order,bounds):
+            if(cellIndex.size == 0):
+                continue
+            blockIndex = int(blockIndices[cellIndex[0]])
+            block = self.readBlock(blockIndex,level)
+            values[cellIndex] = block[rows[cellIndex] - (blockIndex//image.getBlocksAcross())*blockHeight,
+                                      cols[cellIndex] - (blockIndex % image.getBlocksAcross())*blockWidth]
+        return(values)
+
+    # find the cells that contain map coordinates
+    # inX (float array) - x coordinate of each point, in the coordinate system of the raster
+    # inY (float array) - y coordinate of each point, in the coordinate system of the raster
+    # level (int) - pyramid level
+    # outputs: rows (int array) and cols (int array) of the cell containing each point, and isInside (boolean
+    # array), which is false for points outside of the raster
+    def mapToCells(self,inX,inY,level=0):
+        [left,cellWidth,top,cellHeight] = self.getTransform(level)
+        cols = np.floor((np.asarray(inX,dtype=np.float64) - left)/cellWidth)
+        rows = np.floor((np.asarray(inY,dtype=np.float64) - top)/cellHeight)
+        isInside = (rows >= 0) & (cols >= 0) & (rows < self.getNumRows(level)) & (cols < self.getNumCols(level))
+        rows = np.where(isInside,rows,0).astype(np.int64)
+        cols = np.where(isInside,cols,0).astype(np.int64)
+        return([rows,cols,isInside])
+
+    # check if another raster covers exactly the same cells as this raster
+    # other (rasterReader) - raster to compare to
+    # outputs: true if both rasters have the same size, cell size, and position
+    def sameGrid(self,other):
+        if(self.getNumRows() != other.getNumRows() or self.getNumCols() != other.getNumCols()):
+            return(False)
+        if(self.transform is None or other.transform is None):
+            return(self.transform is None and other.transform is None)
+        return(np.allclose(self.transform,other.transform,rtol=1e-9,atol=1e-6*abs(self.transform[1])))
+
+    def close(self):
+        for inStream in self.inStreams:
+            inStream.close()
+        self.levels = []
+        self.cache.clear()
+        self.cacheBytes = 0
+
+    ########## getters and setters ##########
+
+    def getNumRows(self,level=0):
+        return(self.levels[level].getNumRows())
+
+    def getNumCols(self,level=0):
+        return(self.levels[level].getNumCols())
+
+    def getBlockShape(self,level=0):
+        return(self.levels[level].getBlockShape())
+
+    def getNumLevels(self):
+        return(len(self.levels))
+
+    # x coordinate of the left edge, cell width, y coordinate of the top edge, and cell height of a pyramid level
+    def getTransform(self,level=0):
+        if(self.transform is None):
+            raise ValueError("cell positions are not defined for " + self.inFile)
+        [left,cellWidth,top,cellHeight] = self.transform
+        return([left,cellWidth*self.getNumCols()/self.getNumCols(level),top,cellHeight*self.getNumRows()/self.getNumRows(level)])
+
+    def getDtype(self):
+        return(self.dtype.newbyteorder('='))
+
+    def getNoData(self):
+        return(self.noData)
+
+    def getBytesRead(self):
+        return(self.bytesRead)
+
+    def getCacheBytes(self):
+        return(self.cacheBytes)
+
+    def getGeoTags(self):
+        return(dict([[tag,self.tags[tag]] for tag in GEO_TAGS if tag in self.tags]))
+
+
+########### end of the raster reader custom class ##########
+
+
+############## raster writer custom class ##############
+
+class rasterWriter:
+
+    # open a tiled raster created by createRaster or createImages for writing.  Several writers can write
+    # different tiles of the same raster at the same time.  Writes are not buffered, so tiles written by
+    # worker processes are in the file even if the process exits without closing the writer
+    # outFile (string) - filepath to the raster
+    # imageNum (int) - image of the file to write, e.g. the overview level - 1 of an .ovr file
+    def __init__(self,outFile,imageNum=0):
+        self.outStream = open(outFile,'r+b',buffering=0)
+        [images,byteOrder] = readTiffImages(self.outStream)
+        tags = images[imageNum]
+        if(getTagValue(tags,"compression",UNCOMPRESSED) != UNCOMPRESSED or TAG_NAMES["tileOffsets"] not in tags):
+            raise ValueError("only uncompressed tiled rasters can be written: " + outFile)
+        self.numRows = getTagValue(tags,"height")
+        self.numCols = getTagValue(tags,"width")
+        self.tileShape = [getTagValue(tags,"tileHeight"),getTagValue(tags,"tileWidth")]
+        self.offsets = tags[TAG_NAMES["tileOffsets"]][1].astype(np.int64)
+        sampleKind = SAMPLE_KINDS[getTagValue(tags,"sampleFormat",1)]
+        self.dtype = np.dtype(byteOrder + sampleKind + str(getTagValue(tags,"bitsPerSample")//8))
+        self.tilesAcross = -(-self.numCols//self.tileShape[1])
+
+    ########### custom functions ############
+
+    # write the cells of a rectangular window.  The window must start at the corner of a tile, and must
+    # cover whole tiles, except at the bottom and right edges of the raster
+    # row (int) - first row of the window
+    # col (int) - first column of the window
+    # inValues (2D array) - cell values to write
+    def writeWindow(self,row,col,inValues):
+        [tileHeight,tileWidth] = self.tileShape
+        [numRows,numCols] = inValues.shape
+        if(row % tileHeight != 0 or col % tileWidth != 0 or row + numRows > self.numRows or col + numCols > self.numCols):
+            raise ValueError("window is not aligned with the raster tiles")
+        if((numRows % tileHeight != 0 and row + numRows != self.numRows) or (numCols % tileWidth != 0 and col + numCols != self.numCols)):
+            raise ValueError("window does not cover whole tiles")
+        inValues = inValues.astype(self.dtype,copy=False)
+        for top in range(0,numRows,tileHeight):
+            for left in range(0,numCols,tileWidth):
+                tile = inValues[top:top + tileHeight,left:left + tileWidth]
+                if(tile.shape[0] != tileHeight or tile.shape[1] != tileWidth):
+                    tile = np.pad(tile,((0,tileHeight - tile.shape[0]),(0,tileWidth - tile.shape[1])))
+                tileIndex = ((row + top)//tileHeight)*self.tilesAcross + (col + left)//tileWidth
+                self.outStream.seek(int(self.offsets[tileIndex]))
+                self.outStream.write(np.ascontiguousarray(tile).tobytes())
+
+    def close(self):
+        self.outStream.close()
+
+    ########## getters and setters ##########
+
+    def getTileShape(self):
+        return(self.tileShape)
+
+
+########### end of the raster writer custom class ##########
+
+
+############## end of rasterIO.py ##################
@@ -0,0 +1,770 @@
+############## shapefileIO.py ###################
+# Author: Andrew Larkin
+# Developed for Laurel Kincl and Perry Hystad, Oregon State University
+# Date last modified: October 17th, 2026
+
+# Description: this module reads and writes point shapefiles without arcpy.  The .shp, .shx, and .dbf
+# files are memory-mapped as arrays of fixed-width records, so coordinates and attributes are loaded
+# as numpy columns rather than one row at a time with a search cursor.  Attribute columns are decoded
+# only when requested, and result columns are encoded and written back in bulk.  Files written by
+# ArcGIS are reproduced byte for byte when they are read and written without changes.  Shapefiles 
+# larger than memory can be read in chunks of records and written incrementally with shapefileWriter.
+# The vertices of polyline shapefiles (e.g. roads) can also be read, for distance calculations.
+
+# Requirements:
+#      numpy
+# Tested and developed on:
+#      Linux
+#      Python 3.11
+
+
+# import modules
+import datetime
+import os
+import struct
+import numpy as np
+from collections import OrderedDict
+
+# constants
+FILE_CODE = 9994 # file code at the start of every .shp and .shx file
+SHAPE_VERSION = 1000 # shapefile version number
+POINT_TYPE = 1 # shape type for point shapefiles
+NULL_TYPE = 0 # shape type for null geometries
+POLYLINE_TYPES = (3,13,23) # shape types for polylines, polylines with z values, and polylines with measures
+POLYLINE_HEADER_LENGTH = 44 # length of the shape type, bounding box, and part and point counts of a polyline record, in bytes
+SHP_HEADER_LENGTH = 100 # length of .shp and .shx file headers, in bytes
+POINT_RECORD_LENGTH = 28 # length of a point record in the .shp file, including the record header, in bytes
+NO_DATA = -np.finfo(np.float64).max # coordinate value ArcGIS uses to store null point geometries
+NO_DATA_CUTOFF = -1e38 # coordinates less than this value are treated as null
+DBF_VERSION = 3 # dBASE III version number used by shapefiles
+DBF_TERMINATOR = b'\r' # byte marking the end of the .dbf field descriptors
+DBF_EOF = b'\x1a' # byte marking the end of the .dbf file
+DEFAULT_ENCODING = "UTF-8" # text encoding used when a shapefile does not have a .cpg file
+SCIENTIFIC_WIDTH = 8 # width of a floating point dbf value without its decimals: sign, first digit, decimal point, and 5 character exponent (e.g. e+002)
+
+# dbf field definitions (type, length, decimals) for each ArcGIS field type name
+FIELD_TYPES = {"DOUBLE":("F",19,11),"FLOAT":("F",13,11),"LONG":("N",10,0),"SHORT":("N",5,0),
+               "TEXT":("C",254,0),"STRING":("C",254,0),"DATE":("D",8,0)}
+
+# record layout of fixed-width point records in a .shp file
+POINT_RECORD = np.dtype([('recordNumber','>i4'),('contentLength','>i4'),('shapeType','<i4'),('x','<f8'),('y','<f8')])
+INDEX_RECORD = np.dtype([('offset','>i4'),('contentLength','>i4')])
+
+
+
+############### helper functions ##############
+
+# read the x and y coordinates from a point shapefile.  If all records are fixed-width points, the
+# coordinates are returned as views of the memory-mapped .shp file, without copying them, and values less
+# than NO_DATA_CUTOFF are only replaced with NaN when they are read from a shapeTable.  A point shapefile
+# with null geometries has shorter records, so it is never fixed-width.  Otherwise, record offsets are read
+# from the .shx file and the coordinates are gathered from each offset, with null geometries as NaN values
+# Inputs:
+#    shpFile (string) - filepath to the .shp file
+#    shxFile (string) - filepath to the .shx file
+#    start (int) - optional index of the first record to read
+#    stop (int) - optional index after the last record to read.  All records are read by default
+# Outputs:
+#    x (float array) - x coordinate of each point
+#    y (float array) - y coordinate of each point
+#    shapeType (int) - shape type stored in the .shp file header
+def readCoords(shpFile,shxFile,start=0,stop=None):
+    with open(shpFile,'rb') as inStream:
+        header = inStream.read(SHP_HEADER_LENGTH)
+    shapeType = struct.unpack('<i',header[32:36])[0]
+    fileLength = os.path.getsize(shpFile)
+    numRecords = (os.path.getsize(shxFile) - SHP_HEADER_LENGTH)//INDEX_RECORD.itemsize
+    if(stop is None or stop > numRecords):
+        stop = numRecords
+    if(stop <= start):
+        return([np.zeros(0),np.zeros(0),shapeType])
+    if(shapeType == POINT_TYPE and fileLength == SHP_HEADER_LENGTH + numRecords*POINT_RECORD_LENGTH):
+        records = np.memmap(shpFile,dtype=POINT_RECORD,mode='r',offset=SHP_HEADER_LENGTH,shape=(numRecords,))[start:stop]
+        return([records['x'],records['y'],shapeType])
+    else:
+        # gather the shape type and coordinates from the record offsets in the .shx file
+        index = np.memmap(shxFile,dtype=INDEX_RECORD,mode='r',offset=SHP_HEADER_LENGTH,shape=(numRecords,))[start:stop]
+        offsets = index['offset'].astype(np.int64)*2 + 8
+        shpBytes = np.memmap(shpFile,dtype=np.uint8,mode='r')
+        types = shpBytes[offsets[:,None] + np.arange(4)].view('<i4').ravel()
+        hasCoords = types != NULL_TYPE
+        coordBytes = np.zeros((stop - start,16),dtype=np.uint8)
+        coordBytes[hasCoords] = shpBytes[offsets[hasCoords][:,None] + 4 + np.arange(16)]
+        coords = coordBytes.view('<f8')
+        x = np.array(coords[:,0],dtype=np.float64)
+        y = np.array(coords[:,1],dtype=np.float64)
+        isNull = (types == NULL_TYPE) | (x < NO_DATA_CUTOFF) | (y < NO_DATA_CUTOFF)
+        x[isNull] = np.nan
+        y[isNull] = np.nan
+    return([x,y,shapeType])
+
+
+# read the header and field descriptors of a .dbf file
+# Inputs:
+#    dbfFile (string) - filepath to the .dbf file
+# Outputs:
+#    fields (2D array) - name, type, length, and number of decimals for each field
+#    numRecords (int) - number of records in the .dbf file
+#    headerLength (int) - length of the .dbf header, in bytes
+#    lastUpdate (bytes) - three byte date of the last update stored in the header
+def readDbfHeader(dbfFile):
+    with open(dbfFile,'rb') as inStream:
+        header = inStream.read(32)
+        [numRecords,headerLength,recordLength] = struct.unpack('<IHH',header[4:12])
+        descriptors = inStream.read(headerLength - 32)
+    fields = []
+    for start in range(0,len(descriptors) - 1,32):
+        if(descriptors[start:start + 1] == DBF_TERMINATOR):
+            break
+        descriptor = descriptors[start:start + 32]
+        name = descriptor[0:11].split(b'\x00')[0].decode('ascii')
+        fields.append([name,descriptor[11:12].decode('ascii'),descriptor[16],descriptor[17]])
+    return([fields,numRecords,headerLength,header[1:4]])
+
+
+# convert a single raw numeric dbf value to a number.  Values that can't be converted are returned
+# as NaN
+# Inputs:
+#    rawValue (bytes) - fixed-width value from the .dbf file
+# Outputs:
+#    float value
+def toFloat(rawValue):
+    try:
+        return(float(rawValue))
+    except ValueError:
+        return(np.nan)
+
+
+# convert raw numeric dbf values to a numeric array.  Blank values are returned as NaN.  Fields without
+# decimals and without blank values are returned as integers
+# Inputs:
+#    rawValues (bytes array) - fixed-width values from the .dbf file
+#    decimals (int) - number of decimals defined for the field
+# Outputs:
+#    numeric array of values
+def decodeNumbers(rawValues,decimals):
+    values = np.char.strip(np.asarray(rawValues))
+    isBlank = values == b''
+    if(decimals == 0 and not isBlank.any()):
+        try:
+            return(values.astype(np.int64))
+        except ValueError:
+            pass
+    values = np.where(isBlank,b'nan',values)
+    try:
+        return(values.astype(np.float64))
+    except ValueError:
+        return(np.array([toFloat(value) for value in values.tolist()],dtype=np.float64))
+
+
+# convert numeric values to fixed-width dbf values.  Floating point fields are written in the
+# scientific notation used by ArcGIS (e.g. 4.57710000000e+001), with as many mantissa digits as fit in
+# the field width.  NaN values are written as blanks.  Values too wide for the field raise a ValueError
+# rather than being truncated
+# Inputs:
+#    inValues (numeric array) - values to convert
+#    fieldType (string) - dbf field type
+#    length (int) - width of the field, in characters
+#    decimals (int) - number of decimals defined for the field
+# Outputs:
+#    bytes array of fixed-width values
+def encodeNumbers(inValues,fieldType,length,decimals):
+    values = np.asarray(inValues,dtype=np.float64)
+    isBlank = ~np.isfinite(values)
+    values = np.where(isBlank,0,values)
+    if(fieldType == "F"):
+        precision = max(min(decimals,length - SCIENTIFIC_WIDTH),0)
+        text = np.char.mod("%." + str(precision) + "e",values)
+        parts = np.char.partition(text,"e")
+        sign = parts[:,2].astype('U1')
+        digits = np.char.zfill(np.char.lstrip(parts[:,2],"+-"),3)
+        text = np.char.add(np.char.add(parts[:,0],"e"),np.char.add(sign,digits))
+    elif(decimals == 0):
+        text = np.char.mod("%d",np.round(values).astype(np.int64))
+    else:
+        text = np.char.mod("%." + str(decimals) + "f",values)
+    text = np.where(isBlank,"",text)
+    tooWide = np.char.str_len(text) > length
+    if(tooWide.any()):
+        raise ValueError("value " + str(values[np.argmax(tooWide)]) + " does not fit in a numeric field of width " + str(length))
+    return(np.char.rjust(text,length).astype('S' + str(length)))
+
+
+# convert dbf values to an array of values of the appropriate type
+# Inputs:
+#    rawValues (bytes array) - fixed-width values from the .dbf file
+#    field (array) - name, type, length, and number of decimals for the field
+#    encoding (string) - text encoding of the .dbf file
+# Outputs:
+#    array of decoded values.  Text fields are returned as strings, numeric fields as numbers, and
+#    date fields as numpy dates
+def decodeColumn(rawValues,field,encoding):
+    fieldType = field[1]
+    if(fieldType in ("N","F")):
+        return(decodeNumbers(rawValues,field[3]))
+    if(fieldType == "D"):
+        values = np.char.strip(np.asarray(rawValues))
+        isBlank = values == b''
+        dateInts = np.where(isBlank,b'19700101',values).astype(np.int64)
+        months = (dateInts//10000 - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (dateInts//100 % 100 - 1)
+        dates = months.astype('datetime64[D]') + (dateInts % 100 - 1)
+        dates[isBlank] = np.datetime64('NaT')
+        return(dates)
+    values = np.char.rstrip(np.asarray(rawValues),b' \x00')
+    return(np.char.decode(values,encoding))
+
+
+# convert an array of values to fixed-width dbf values
+# Inputs:
+#    inValues (array) - values to convert
+#    field (array) - name, type, length, and number of decimals for the field
+#    encoding (string) - text encoding of the .dbf file
+# Outputs:
+#    bytes array of fixed-width values
+def encodeColumn(inValues,field,encoding):
+    fieldType = field[1]
+    length = field[2]
+    if(fieldType in ("N","F")):
+        return(encodeNumbers(inValues,fieldType,length,field[3]))
+    if(fieldType == "D"):
+        dates = np.asarray(inValues,dtype='datetime64[D]')
+        text = np.char.replace(dates.astype('U10'),"-","")
+        text = np.where(np.isnat(dates),"",text)
+        return(np.char.ljust(text,length).astype('S' + str(length)))
+    values = np.asarray(inValues)
+    if(values.dtype.kind != 'U'):
+        values = np.array(["" if value is None else str(value) for value in values.tolist()],dtype=np.str_)
+    encoded = np.char.ljust(np.char.encode(values,encoding),length)
+    return(encoded.astype('S' + str(length)))
+
+
+# choose a dbf field definition for an array of values
+# Inputs:
+#    inValues (array) - values that will be stored in the field
+# Outputs:
+#    ArcGIS field type name for the values
+def inferFieldType(inValues):
+    kind = np.asarray(inValues).dtype.kind
+    if(kind in ('i','u','b')):
+        return("LONG")
+    if(kind == 'f'):
+        return("DOUBLE")
+    if(kind == 'M'):
+        return("DATE")
+    return("TEXT")
+
+
+# create the record layout of the fixed-width records in a .dbf file
+# Inputs:
+#    inFields (2D array) - name, type, length, and number of decimals for each field
+# Outputs:
+#    numpy structured data type for one .dbf record
+def makeRecordType(inFields):
+    return(np.dtype([('deleted','S1')] + [(field[0],'S' + str(field[2])) for field in inFields]))
+
+
+# create the record layout used to spill rows of a shapefile table to disk.  Each record holds the
+# FID, coordinates, and raw .dbf record of one point
+# Inputs:
+#    inFields (2D array) - name, type, length, and number of decimals for each field
+# Outputs:
+#    numpy structured data type for one spilled row
+def makeSpillType(inFields):
+    return(np.dtype([('FID','<i8'),('x','<f8'),('y','<f8'),('attributes',makeRecordType(inFields))]))
+
+
+
+########### shapefile table custom class ##########
+
+# custom class containing the coordinates and attribute table of a point shapefile.  Attributes
+# are stored as columns of raw fixed-width values, which are memory-mapped from the .dbf file
+# until a column is replaced or added
+class shapeTable:
+    # instantiate a shapefile table
+    def __init__(self,inX,inY,inFields,inColumns,inPrj="",inEncoding=DEFAULT_ENCODING,inLastUpdate=None,inSource=None):
+        self.x = np.asarray(inX,dtype=np.float64)
+        self.y = np.asarray(inY,dtype=np.float64)
+        self.fields = inFields
+        self.columns = inColumns
+        self.prj = inPrj
+        self.encoding = inEncoding
+        self.lastUpdate = inLastUpdate
+        self.source = inSource
+
+    ########### custom functions ############
+
+    # determine if the table contains a field
+    def hasField(self,fieldName):
+        return(fieldName in self.columns)
+
+    # get the x and y coordinates of the table, with null coordinates as NaN.  Coordinates may be views of a
+    # memory-mapped .shp file, so if rows is given, only those rows are read
+    def getCoords(self,rows=None):
+        [x,y] = [self.x,self.y] if rows is None else [self.x[rows],self.y[rows]]
+        isNull = (x < NO_DATA_CUTOFF) | (y < NO_DATA_CUTOFF)
+        return([np.where(isNull,np.nan,x),np.where(isNull,np.nan,y)])
+
+    # get the values of an attribute field, decoded to numbers, strings, or dates.  If rows is given, only
+    # those rows are decoded
+    def getColumn(self,fieldName,rows=None):
+        rawValues = self.columns[fieldName] if rows is None else np.asarray(self.columns[fieldName])[rows]
+        return(decodeColumn(rawValues,self.getField(fieldName),self.encoding))
+
+    # set the values of an attribute field.  If the field doesn't exist, it is added to the end of the
+    # table.  fieldType is an ArcGIS field type name (e.g. DOUBLE, TEXT), and is inferred from the
+    # values if not provided.  Field names are truncated to the 10 characters allowed by .dbf files
+    def setColumn(self,fieldName,inValues,fieldType=None):
+        self.appendColumns([[fieldName,inValues,fieldType]])
+
+    # set the values of several attribute fields at once.  All columns are checked before the table is
+    # changed, and values are encoded into the in-memory column store.  Nothing is written to disk until
+    # the table is written with writeShapefile, so the output is written once no matter how many
+    # fields are added
+    # inColumns (2D array) - field name, array of values, and ArcGIS field type name (or None) for each field
+    # position (int) - optional position in the field list to insert new fields at.  New fields are added 
+    # to the end of the table by default
+    def appendColumns(self,inColumns,position=None):
+        for [fieldName,inValues,fieldType] in inColumns:
+            if(len(inValues) != self.getNumRecords()):
+                raise ValueError("field " + fieldName + " has " + str(len(inValues)) + " values, expected " + str(self.getNumRecords()))
+            if(fieldType is not None and fieldType.upper() not in FIELD_TYPES):
+                raise ValueError("unsupported field type " + fieldType + " for field " + fieldName)
+        for [fieldName,inValues,fieldType] in inColumns:
+            fieldName = fieldName[0:10]
+            if(not self.hasField(fieldName)):
+                if(fieldType is None):
+                    fieldType = inferFieldType(inValues)
+                definition = FIELD_TYPES[fieldType.upper()]
+                if(position is None):
+                    self.fields.append([fieldName,definition[0],definition[1],definition[2]])
+                else:
+                    self.fields.insert(position,[fieldName,definition[0],definition[1],definition[2]])
+                    position += 1
+            self.columns[fieldName] = encodeColumn(inValues,self.getField(fieldName),self.encoding)
+
+    # create a new table from a subset of rows.  Raw values are copied without decoding, so field 
+    # definitions and values are unchanged
+    # inIndex (integer array) - index of each row to copy, in output order
+    def selectRows(self,inIndex):
+        columns = OrderedDict([(fieldName,np.asarray(self.columns[fieldName])[inIndex]) for fieldName in self.columns])
+        return(shapeTable(self.x[inIndex],self.y[inIndex],[list(field) for field in self.fields],columns,self.prj,self.encoding))
+
+    # get a field name that doesn't exist in the table, renaming the field in the same way as ArcGIS 
+    # joins (e.g. latitude becomes latitude_1, and longitude becomes longitude_)
+    def getUniqueFieldName(self,fieldName):
+        fieldName = fieldName[0:10]
+        suffix = 0
+        uniqueName = fieldName
+        while(self.hasField(uniqueName)):
+            suffix += 1
+            uniqueName = (fieldName + "_" + str(suffix))[0:10]
+            if(self.hasField(uniqueName)):
+                uniqueName = fieldName[0:9-len(str(suffix))] + "_" + str(suffix)
+        return(uniqueName)
+
+    # copy rows to an array of fixed-width records (see makeSpillType), so that partitions of a large
+    # table can be appended to files on disk and read back with tableFromRecords
+    # inFIDs (integer array) - FID value to store with each row
+    def getRecords(self,inFIDs):
+        records = np.empty(self.getNumRecords(),dtype=makeSpillType(self.fields))
+        records['FID'] = inFIDs
+        records['x'] = self.x
+        records['y'] = self.y
+        records['attributes']['deleted'] = b' '
+        for field in self.fields:
+            records['attributes'][field[0]] = self.columns[field[0]]
+        return(records)
+
+    # copy all memory-mapped columns into memory, so that the source files can be overwritten
+    def loadIntoMemory(self):
+        for fieldName in self.columns:
+            self.columns[fieldName] = np.array(self.columns[fieldName])
+        self.source = None
+
+    ########## getters and setters ##########
+    def getNumRecords(self):
+        return(self.x.size)
+
+    def getX(self,rows=None):
+        return(self.getCoords(rows)[0])
+
+    def getY(self,rows=None):
+        return(self.getCoords(rows)[1])
+
+    def getFieldNames(self):
+        return([field[0] for field in self.fields])
+
+    def getField(self,fieldName):
+        for field in self.fields:
+            if(field[0] == fieldName):
+                return(field)
+        raise KeyError("field " + fieldName + " does not exist")
+
+    def getPrj(self):
+        return(self.prj)
+
+    def getSource(self):
+        return(self.source)
+
+
+########### end of the shapefile table custom class ##########
+
+
+
+# read a point shapefile into a shapefile table
+# Inputs:
+#    inShapefile (string) - filepath to the .shp file
+# Outputs:
+#    shapeTable object containing coordinates and memory-mapped attribute columns
+def readShapefile(inShapefile):
+    basePath = os.path.splitext(inShapefile)[0]
+    [x,y,shapeType] = readCoords(basePath + ".shp",basePath + ".shx")
+    [fields,numRecords,headerLength,lastUpdate] = readDbfHeader(basePath + ".dbf")
+    recordType = makeRecordType(fields)
+    columns = OrderedDict()
+    if(numRecords > 0):
+        records = np.memmap(basePath + ".dbf",dtype=recordType,mode='r',offset=headerLength,shape=(numRecords,))
+        for field in fields:
+            columns[field[0]] = records[field[0]]
+    else:
+        for field in fields:
+            columns[field[0]] = np.zeros(0,dtype='S' + str(field[2]))
+    [prj,encoding] = readPrjAndEncoding(basePath)
+    return(shapeTable(x,y,fields,columns,prj,encoding,lastUpdate,os.path.abspath(basePath)))
+
+
+# read the projection (.prj) and text encoding (.cpg) files of a shapefile, if they exist
+# Inputs:
+#    basePath (string) - filepath of the shapefile, without the extension
+# Outputs:
+#    prj (string) - projection definition, or an empty string if there is no .prj file
+#    encoding (string) - text encoding of the .dbf file
+def readPrjAndEncoding(basePath):
+    prj = ""
+    if(os.path.exists(basePath + ".prj")):
+        with open(basePath + ".prj",'r') as inStream:
+            prj = inStream.read()
+    encoding = DEFAULT_ENCODING
+    if(os.path.exists(basePath + ".cpg")):
+        with open(basePath + ".cpg",'r') as inStream:
+            encoding = inStream.read().strip() or DEFAULT_ENCODING
+    return([prj,encoding])
+
+
+# read a point shapefile in chunks of consecutive records.  The attributes of each chunk are copied into
+# memory and released before the next chunk is read, and coordinates are read from the memory-mapped .shp
+# file, so memory use is bounded by the chunk size rather than the size of the shapefile
+# Inputs:
+#    inShapefile (string) - filepath to the .shp file
+#    chunkSize (int) - maximum number of records in each chunk
+# Outputs:
+#    generator of [start,table] pairs, where start is the FID of the first record in the chunk and
+#    table is a shapeTable containing the chunk's coordinates and attributes
+def readShapefileChunks(inShapefile,chunkSize):
+    basePath = os.path.splitext(inShapefile)[0]
+    [fields,numRecords,headerLength,lastUpdate] = readDbfHeader(basePath + ".dbf")
+    recordType = makeRecordType(fields)
+    [prj,encoding] = readPrjAndEncoding(basePath)
+    with open(basePath + ".dbf",'rb') as inStream:
+        inStream.seek(headerLength)
+        for start in range(0,numRecords,chunkSize):
+            stop = min(start + chunkSize,numRecords)
+            [x,y,shapeType] = readCoords(basePath + ".shp",basePath + ".shx",start,stop)
+            records = np.fromfile(inStream,dtype=recordType,count=stop - start)
+            columns = OrderedDict([(field[0],records[field[0]]) for field in fields])
+            yield([start,shapeTable(x,y,[list(field) for field in fields],columns,prj,encoding)])
+
+
+# create a shapefile table from rows spilled to disk with shapeTable.getRecords
+# Inputs:
+#    inRecords (structured array) - spilled rows, with the record layout from makeSpillType
+#    inFields (2D array) - name, type, length, and number of decimals for each field
+#    inPrj (string) - projection definition of the coordinates
+#    inEncoding (string) - text encoding of the text fields
+# Outputs:
+#    table (shapeTable) - coordinates and attributes of the rows
+#    FIDs (integer array) - FID value stored with each row
+def tableFromRecords(inRecords,inFields,inPrj,inEncoding):
+    attributes = inRecords['attributes']
+    columns = OrderedDict([(field[0],attributes[field[0]]) for field in inFields])
+    table = shapeTable(inRecords['x'],inRecords['y'],[list(field) for field in inFields],columns,inPrj,inEncoding)
+    return([table,np.array(inRecords['FID'],dtype=np.int64)])
+
+
+# read the vertices of every part of a polyline shapefile (e.g. roads).  The part and point counts of all
+# records are gathered from the record offsets in the .shx file, and the vertices of all records are
+# gathered from the memory-mapped .shp file in one step.  Z values and measures are ignored
+# Inputs:
+#    inShapefile (string) - filepath to the .shp file
+# Outputs:
+#    x (float array) - x coordinate of each vertex, for all parts in order
+#    y (float array) - y coordinate of each vertex, for all parts in order
+#    partBounds (integer array) - vertices of part i are x[partBounds[i]:partBounds[i+1]]
+#    partRecords (integer array) - FID of the record each part belongs to
+#    prj (string) - projection definition of the coordinates
+def readPolylines(inShapefile):
+    basePath = os.path.splitext(inShapefile)[0]
+    with open(basePath + ".shp",'rb') as inStream:
+        shapeType = struct.unpack('<i',inStream.read(SHP_HEADER_LENGTH)[32:36])[0]
+    if(shapeType not in POLYLINE_TYPES):
+        raise ValueError(inShapefile + " is not a polyline shapefile (shape type " + str(shapeType) + ")")
+    prj = readPrjAndEncoding(basePath)[0]
+    numRecords = (os.path.getsize(basePath + ".shx") - SHP_HEADER_LENGTH)//INDEX_RECORD.itemsize
+    if(numRecords == 0):
+        return([np.zeros(0),np.zeros(0),np.zeros(1,dtype=np.int64),np.zeros(0,dtype=np.int64),prj])
+    index = np.memmap(basePath + ".shx",dtype=INDEX_RECORD,mode='r',offset=SHP_HEADER_LENGTH,shape=(numRecords,))
+    offsets = index['offset'].astype(np.int64)*2 + 8
+    shpBytes = np.memmap(basePath + ".shp",dtype=np.uint8,mode='r')
+    types = shpBytes[offsets[:,None] + np.arange(4)].view('<i4').ravel()
+    counts = np.zeros((numRecords,2),dtype=np.int64)
+    hasShape = types != NULL_TYPE
+    counts[hasShape] = shpBytes[offsets[hasShape][:,None] + 36 + np.arange(8)].view('<i4').reshape(-1,2)
+    [numParts,numPoints] = [counts[:,0],counts[:,1]]
+
+    # first vertex of each part, relative to the first vertex of its record
+    partRecords = np.repeat(np.arange(numRecords),numParts)
+    partPositions = np.arange(partRecords.size) - np.repeat(np.cumsum(numParts) - numParts,numParts)
+    partStarts = offsets[partRecords] + POLYLINE_HEADER_LENGTH + 4*partPositions
+    partStarts = shpBytes[partStarts[:,None] + np.arange(4)].view('<i4').ravel().astype(np.int64)
+    
+    # vertex coordinates of all records
+    firstPoint = np.cumsum(numPoints) - numPoints
+    pointRecords = np.repeat(np.arange(numRecords),numPoints)
+    pointOffsets = offsets[pointRecords] + POLYLINE_HEADER_LENGTH + 4*numParts[pointRecords] + 16*(np.arange(pointRecords.size) - firstPoint[pointRecords])
+    x = gatherFloats(shpBytes,pointOffsets)
+    y = gatherFloats(shpBytes,pointOffsets + 8)
+    partBounds = np.append(partStarts + firstPoint[partRecords],pointRecords.size)
+    return([x,y,partBounds,partRecords,prj])
+
+
+# read little-endian 8 byte floats that start at arbitrary byte positions of a file.  Shapefile records
+# are only aligned to 2 bytes, so the file is viewed as floats once for each of the 8 possible alignments
+# Inputs:
+#    inBytes (uint8 array) - memory-mapped bytes of the file
+#    positions (integer array) - byte position of each value
+# Outputs:
+#    values (float array) - value at each position
+def gatherFloats(inBytes,positions):
+    values = np.empty(positions.size,dtype=np.float64)
+    alignments = positions % 8
+    for alignment in np.unique(alignments).tolist():
+        isAligned = alignments == alignment
+        view = np.ndarray(((inBytes.size - alignment)//8,),dtype='<f8',buffer=inBytes,offset=alignment)
+        values[isAligned] = view[(positions[isAligned] - alignment)//8]
+    return(values)
+
+
+# calculate the bounding box of a set of points.  Null geometries (NaN coordinates) are ignored
+# Inputs:
+#    inX (float array) - x coordinate of each point
+#    inY (float array) - y coordinate of each point
+# Outputs:
+#    bounds (float array) - minimum x, minimum y, maximum x, and maximum y.  All values are 0 if
+#    there are no valid points
+def calcBounds(inX,inY):
+    isNull = ~(np.isfinite(inX) & np.isfinite(inY))
+    if(isNull.all()):
+        return([0.0,0.0,0.0,0.0])
+    return([inX[~isNull].min(),inY[~isNull].min(),inX[~isNull].max(),inY[~isNull].max()])
+
+
+# create the 100 byte header of a .shp or .shx file.  The two files differ only in the file length
+# Inputs:
+#    numBytes (int) - total length of the file, in bytes
+#    bounds (float array) - minimum x, minimum y, maximum x, and maximum y of all points
+# Outputs:
+#    header (bytes) - file header
+def makeShpHeader(numBytes,bounds):
+    header = struct.pack('>7i',FILE_CODE,0,0,0,0,0,numBytes//2) + struct.pack('<2i',SHAPE_VERSION,POINT_TYPE)
+    header += struct.pack('<8d',bounds[0],bounds[1],bounds[2],bounds[3],0,0,0,0)
+    return(header)
+
+
+# create the .shp and .shx records for a set of points.  Null geometries (NaN coordinates) are written
+# as point records with no data coordinates, in the same way as ArcGIS
+# Inputs:
+#    inX (float array) - x coordinate of each point
+#    inY (float array) - y coordinate of each point
+#    firstRecord (int) - number of records written to the file before these points
+# Outputs:
+#    records (structured array) - .shp records
+#    index (structured array) - .shx records
+def makePointRecords(inX,inY,firstRecord=0):
+    numRecords = inX.size
+    isNull = ~(np.isfinite(inX) & np.isfinite(inY))
+    records = np.zeros(numRecords,dtype=POINT_RECORD)
+    records['recordNumber'] = np.arange(firstRecord + 1,firstRecord + numRecords + 1)
+    records['contentLength'] = (POINT_RECORD_LENGTH - 8)//2
+    records['shapeType'] = POINT_TYPE
+    records['x'] = np.where(isNull,NO_DATA,inX)
+    records['y'] = np.where(isNull,NO_DATA,inY)
+    index = np.zeros(numRecords,dtype=INDEX_RECORD)
+    index['offset'] = (SHP_HEADER_LENGTH + np.arange(firstRecord,firstRecord + numRecords)*POINT_RECORD_LENGTH)//2
+    index['contentLength'] = (POINT_RECORD_LENGTH - 8)//2
+    return([records,index])
+
+
+# write the .shp and .shx files for a set of points
+# Inputs:
+#    basePath (string) - filepath of the shapefile, without the extension
+#    inX (float array) - x coordinate of each point
+#    inY (float array) - y coordinate of each point
+def writeCoords(basePath,inX,inY):
+    bounds = calcBounds(inX,inY)
+    [records,index] = makePointRecords(inX,inY)
+    for [extension,body] in [[".shp",records],[".shx",index]]:
+        with open(basePath + extension,'wb') as outStream:
+            outStream.write(makeShpHeader(SHP_HEADER_LENGTH + body.nbytes,bounds))
+            body.tofile(outStream)
+
+
+# create the header and field descriptors of a .dbf file
+# Inputs:
+#    inFields (2D array) - name, type, length, and number of decimals for each field
+#    numRecords (int) - number of records in the file
+#    lastUpdate (bytes) - three byte date of the last update.  Today's date is used if not provided
+# Outputs:
+#    header (bytes) - file header
+def makeDbfHeader(inFields,numRecords,lastUpdate=None):
+    if(lastUpdate is None):
+        today = datetime.date.today()
+        lastUpdate = struct.pack('<3B',today.year - 1900,today.month,today.day)
+    header = struct.pack('<B',DBF_VERSION) + lastUpdate
+    header += struct.pack('<IHH',numRecords,32 + 32*len(inFields) + 1,makeRecordType(inFields).itemsize) + b'\x00'*20
+    for field in inFields:
+        header += field[0].encode('ascii').ljust(11,b'\x00') + field[1].encode('ascii') + b'\x00'*4
+        header += struct.pack('<BB',field[2],field[3]) + b'\x00'*14
+    header += DBF_TERMINATOR
+    return(header)
+
+
+# assemble the attributes of a shapefile table as one array of fixed-width .dbf records
+# Inputs:
+#    inTable (shapeTable) - table containing the attribute fields and values
+# Outputs:
+#    records (structured array) - .dbf records
+def makeDbfRecords(inTable):
+    records = np.empty(inTable.getNumRecords(),dtype=makeRecordType(inTable.fields))
+    records['deleted'] = b' '
+    for field in inTable.fields:
+        records[field[0]] = inTable.columns[field[0]]
+    return(records)
+
+
+# write the .dbf file for a shapefile table.  All records are assembled as one array of fixed-width
+# records and written in a single pass
+# Inputs:
+#    basePath (string) - filepath of the shapefile, without the extension
+#    inTable (shapeTable) - table containing the attribute fields and values
+def writeDbf(basePath,inTable):
+    with open(basePath + ".dbf",'wb') as outStream:
+        outStream.write(makeDbfHeader(inTable.fields,inTable.getNumRecords(),inTable.lastUpdate))
+        makeDbfRecords(inTable).tofile(outStream)
+        outStream.write(DBF_EOF)
+
+
+# write the .prj and .cpg files of a shapefile.  The .prj file is only written if the projection is known
+# Inputs:
+#    basePath (string) - filepath of the shapefile, without the extension
+#    inPrj (string) - projection definition
+#    inEncoding (string) - text encoding of the .dbf file
+def writePrjAndEncoding(basePath,inPrj,inEncoding):
+    if(inPrj != ""):
+        with open(basePath + ".prj",'w') as outStream:
+            outStream.write(inPrj)
+    with open(basePath + ".cpg",'w') as outStream:
+        outStream.write(inEncoding)
+
+
+# write a shapefile table to a point shapefile.  The .prj and .cpg files are written if the table
+# has a projection and encoding
+# Inputs:
+#    inTable (shapeTable) - table containing coordinates and attributes
+#    outShapefile (string) - filepath to the output .shp file
+def writeShapefile(inTable,outShapefile):
+    basePath = os.path.splitext(outShapefile)[0]
+    if(inTable.getSource() == os.path.abspath(basePath)):
+        inTable.loadIntoMemory()
+    writeCoords(basePath,inTable.getX(),inTable.getY())
+    writeDbf(basePath,inTable)
+    writePrjAndEncoding(basePath,inTable.getPrj(),inTable.encoding)
+
+
+
+########### shapefile writer custom class ##########
+
+# custom class that writes a point shapefile one table at a time, so that outputs larger than memory
+# can be written incrementally.  The field definitions, projection, and encoding are taken from the
+# first table written.  Records are appended to the .shp, .shx, and .dbf files as they are written, and
+# the record counts, file lengths, and bounding box in the file headers are filled in when the writer
+# is closed.  The output is identical to writing all of the tables at once with writeShapefile
+class shapefileWriter:
+    # instantiate a shapefile writer
+    def __init__(self,outShapefile):
+        self.basePath = os.path.splitext(outShapefile)[0]
+        self.fields = None
+        self.prj = ""
+        self.encoding = DEFAULT_ENCODING
+        self.numRecords = 0
+        self.bounds = None
+        self.streams = None
+
+    ########### custom functions ############
+
+    # create the output files with placeholder headers
+    def open(self,inFields,inPrj,inEncoding):
+        self.fields = [list(field) for field in inFields]
+        self.prj = inPrj
+        self.encoding = inEncoding
+        self.streams = OrderedDict([(extension,open(self.basePath + extension,'wb')) for extension in [".shp",".shx",".dbf"]])
+        self.streams[".shp"].write(makeShpHeader(SHP_HEADER_LENGTH,[0.0,0.0,0.0,0.0]))
+        self.streams[".shx"].write(makeShpHeader(SHP_HEADER_LENGTH,[0.0,0.0,0.0,0.0]))
+        self.streams[".dbf"].write(makeDbfHeader(self.fields,0))
+
+    # append the points and attributes of a shapefile table.  All tables must have the same fields
+    def writeTable(self,inTable):
+        if(self.streams is None):
+            self.open(inTable.fields,inTable.getPrj(),inTable.encoding)
+        if(inTable.fields != self.fields):
+            raise ValueError("the fields of the table don't match the fields of " + self.basePath + ".shp")
+        if(inTable.getNumRecords() == 0):
+            return
+        [records,index] = makePointRecords(inTable.getX(),inTable.getY(),self.numRecords)
+        records.tofile(self.streams[".shp"])
+        index.tofile(self.streams[".shx"])
+        makeDbfRecords(inTable).tofile(self.streams[".dbf"])
+        self.numRecords += inTable.getNumRecords()
+        if((np.isfinite(inTable.getX()) & np.isfinite(inTable.getY())).any()):
+            bounds = calcBounds(inTable.getX(),inTable.getY())
+            if(self.bounds is None):
+                self.bounds = bounds
+            else:
+                self.bounds = [min(self.bounds[0],bounds[0]),min(self.bounds[1],bounds[1]),
+                               max(self.bounds[2],bounds[2]),max(self.bounds[3],bounds[3])]
+
+    # fill in the file headers and close the output files.  If no tables were written, an empty
+    # shapefile without fields is created
+    def close(self):
+        if(self.streams is None):
+            self.open([],self.prj,self.encoding)
+        bounds = [0.0,0.0,0.0,0.0] if self.bounds is None else self.bounds
+        self.streams[".dbf"].write(DBF_EOF)
+        self.streams[".dbf"].seek(0)
+        self.streams[".dbf"].write(makeDbfHeader(self.fields,self.numRecords))
+        for [extension,recordLength] in [[".shp",POINT_RECORD_LENGTH],[".shx",INDEX_RECORD.itemsize]]:
+            self.streams[extension].seek(0)
+            self.streams[extension].write(makeShpHeader(SHP_HEADER_LENGTH + self.numRecords*recordLength,bounds))
+        for extension in self.streams:
+            self.streams[extension].close()
+        writePrjAndEncoding(self.basePath,self.prj,self.encoding)
+        self.streams = None
+
+    ########## getters and setters ##########
+    def getNumRecords(self):
+        return(self.numRecords)
+
+
+########### end of the shapefile writer custom class ##########
+
+
+############## end of shapefileIO.py ##################